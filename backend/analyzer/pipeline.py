@@ -32,6 +32,11 @@ from .stages import (
 
 logger = logging.getLogger(__name__)
 
+try:
+    from cleanup_service import cleanup_service
+except ImportError:
+    cleanup_service = None
+
 class IntelligencePipeline:
     """
     Main pipeline for exhaustive repository analysis
@@ -69,6 +74,8 @@ class IntelligencePipeline:
             - intelligence_profile: IntelligenceProfile 
             - stack_blueprint: StackBlueprint
             - local_repo_path: str
+            - workspace_id: cleanup_service id pinning local_repo_path; the caller
+              must ``cleanup_service.release_workspace(workspace_id)`` when done
             - analysis_time_seconds: float
         """
         temp_dir = None
@@ -127,11 +134,22 @@ class IntelligencePipeline:
             
             logger.info(f"🎉 Analysis complete! {analysis_time:.1f}s, {len(context.files)} files")
             
+            # The clone outlives this call (callers read local_repo_path); hand it
+            # to the workspace manager pinned, so disk-pressure eviction waits
+            # until the caller releases it
+            workspace_id = None
+            if cleanup_service is not None:
+                cleanup_service.register_repository(
+                    deployment_id, temp_dir, {"source": "intelligence_pipeline", "repo_url": repo_url}, in_use=True
+                )
+                workspace_id = deployment_id
+            
             return {
                 "success": True,
                 "intelligence_profile": intelligence_profile,
                 "stack_blueprint": stack_blueprint, 
                 "local_repo_path": temp_dir,
+                "workspace_id": workspace_id,
                 "analysis_time_seconds": analysis_time,
                 "deployment_id": deployment_id
             }
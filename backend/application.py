@@ -5,6 +5,7 @@ This file imports the main FastAPI application from simple_api.py
 
 import sys
 import os
+import time
 
 # Fix GitPython issue BEFORE any other imports
 os.environ['GIT_PYTHON_REFRESH'] = 'quiet'
@@ -20,12 +21,14 @@ print(f"🔍 GIT_PYTHON_REFRESH: {os.environ.get('GIT_PYTHON_REFRESH', 'NOT SET'
 try:
     # Import the FastAPI app from simple_api.py
     print("🔄 Attempting to import from simple_api...")
+    import_started = time.perf_counter()
     from simple_api import app
     
     # This is the WSGI/ASGI application that Elastic Beanstalk will use
     application = app
     
-    print("✅ Successfully imported FastAPI app from simple_api")
+    # Per-phase breakdown: GET /api/system/startup (CODEFLOWOPS_STARTUP_PROFILE=1 for per-module timings)
+    print(f"✅ Successfully imported FastAPI app from simple_api in {time.perf_counter() - import_started:.2f}s")
     
 except ImportError as e:
     print(f"❌ Failed to import from simple_api: {e}")
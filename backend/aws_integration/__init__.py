@@ -3,25 +3,33 @@ AWS Integration module for secure credential usage.
 Handles role assumption, session management, and permission validation.
 """
 
-import boto3
 import json
 import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from botocore.exceptions import ClientError, NoCredentialsError
 from botocore.credentials import RefreshableCredentials
 from botocore.session import get_session
 import logging
 
+from core.aws_clients import get_aws_client, get_refreshable_session
+from .sts_cache import get_sts_credential_cache
+
 logger = logging.getLogger(__name__)
 
 class AWSSessionManager:
     """Manages AWS sessions with temporary credentials."""
     
-    def __init__(self):
+    def __init__(self, max_sessions: int = 10000):
         """Initialize AWS session manager."""
-        self.active_sessions = {}  # Store active sessions
+        self.active_sessions = OrderedDict()  # Store active sessions (oldest first, bounded)
+        self.max_sessions = max_sessions
         self.session_timeout = 3600  # 1 hour default
+        self.credential_cache = get_sts_credential_cache()
+        self._sessions_lock = threading.Lock()
     
     def create_session(
         self,
@@ -48,22 +56,15 @@ class AWSSessionManager:
             session_id = str(uuid.uuid4())
             session_name = session_name or f"CodeFlowOps-{tenant_id}-{user_id}"
             
-            if credentials.get('credential_type') == 'role_arn':
-                # Use role assumption for cross-account access
-                temp_creds = self._assume_role(
-                    role_arn=credentials['role_arn'],
-                    external_id=credentials.get('external_id'),
-                    session_name=session_name,
-                    duration_seconds=session_duration
-                )
-            else:
-                # Use access keys to create STS session
-                temp_creds = self._create_sts_session(
-                    access_key_id=credentials['access_key_id'],
-                    secret_access_key=credentials['secret_access_key'],
-                    session_name=session_name,
-                    duration_seconds=session_duration
-                )
+            # Temporary credentials are shared per (tenant, role/key, external ID, session
+            # name) and renewed in the background, so this only calls STS on a cache miss
+            temp_creds = self.get_temporary_credentials(
+                tenant_id, credentials, session_duration=session_duration, session_name=session_name
+            )
+            expires_at = min(
+                datetime.utcnow() + timedelta(seconds=session_duration),
+                temp_creds['Expiration'].astimezone(timezone.utc).replace(tzinfo=None)
+            )
             
             # Store session information
             session_info = {
@@ -72,12 +73,14 @@ class AWSSessionManager:
                 'user_id': user_id,
                 'credentials': temp_creds,
                 'created_at': datetime.utcnow(),
-                'expires_at': datetime.utcnow() + timedelta(seconds=session_duration),
+                'expires_at': expires_at,
                 'last_used': datetime.utcnow(),
                 'region': credentials.get('aws_region', 'us-east-1')
             }
             
-            self.active_sessions[session_id] = session_info
+            with self._sessions_lock:
+                self._prune_sessions_locked()
+                self.active_sessions[session_id] = session_info
             
             logger.info(f"Created AWS session {session_id} for tenant {tenant_id}")
             
@@ -94,6 +97,84 @@ class AWSSessionManager:
             logger.error(f"Failed to create AWS session for tenant {tenant_id}: {e}")
             raise
     
+    def get_temporary_credentials(
+        self,
+        tenant_id: str,
+        credentials: Dict[str, Any],
+        session_duration: int = 3600,
+        session_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get cached (or freshly issued) temporary credentials for a tenant.
+        
+        Args:
+            tenant_id: Tenant identifier
+            credentials: AWS credentials (role_arn + external_id, or access keys)
+            session_duration: Requested credential lifetime in seconds
+            session_name: Role session name used when credentials are issued
+            
+        Returns:
+            STS credentials dict
+        """
+        session_name = session_name or f"CodeFlowOps-{tenant_id}"
+        # The session name is part of the key: it is what CloudTrail attributes the calls to
+        cache_key = self._credential_cache_key(tenant_id, credentials, session_name)
+        
+        if credentials.get('credential_type') == 'role_arn':
+            # Use role assumption for cross-account access
+            fetch = lambda: self._assume_role(
+                role_arn=credentials['role_arn'],
+                external_id=credentials.get('external_id'),
+                session_name=session_name,
+                duration_seconds=session_duration
+            )
+        else:
+            # Use access keys to create STS session
+            access_key_id = credentials['access_key_id']
+            secret_access_key = credentials['secret_access_key']
+            fetch = lambda: self._create_sts_session(
+                access_key_id=access_key_id,
+                secret_access_key=secret_access_key,
+                session_name=session_name,
+                duration_seconds=session_duration
+            )
+        
+        return self.credential_cache.get_credentials(cache_key, fetch)
+    
+    def get_boto3_session(self, tenant_id: str, credentials: Dict[str, Any], session_duration: int = 3600):
+        """
+        Get a pooled boto3 session whose clients renew their credentials automatically.
+        
+        Args:
+            tenant_id: Tenant identifier
+            credentials: AWS credentials (role_arn + external_id, or access keys)
+            session_duration: Requested credential lifetime in seconds
+            
+        Returns:
+            Session whose clients are shared across callers with the same credentials
+        """
+        def refresh() -> Dict[str, str]:
+            temp_creds = self.get_temporary_credentials(tenant_id, credentials, session_duration=session_duration)
+            return {
+                'access_key': temp_creds['AccessKeyId'],
+                'secret_key': temp_creds['SecretAccessKey'],
+                'token': temp_creds['SessionToken'],
+                'expiry_time': temp_creds['Expiration'].astimezone(timezone.utc).isoformat()
+            }
+        
+        cache_key = "|".join(self._credential_cache_key(tenant_id, credentials, f"CodeFlowOps-{tenant_id}"))
+        return get_refreshable_session(cache_key, refresh, region_name=credentials.get('aws_region', 'us-east-1'))
+    
+    @staticmethod
+    def _credential_cache_key(tenant_id: str, credentials: Dict[str, Any], session_name: str) -> Tuple[str, str, str, str]:
+        """Cache key (tenant, role ARN or access key fingerprint, external ID, session name); never holds secrets."""
+        if credentials.get('credential_type') == 'role_arn':
+            return (tenant_id, credentials['role_arn'], credentials.get('external_id') or '', session_name)
+        digest = hashlib.sha256(
+            f"{credentials['access_key_id']}:{credentials['secret_access_key']}".encode('utf-8')
+        ).hexdigest()[:24]
+        return (tenant_id, f"keys:{digest}", '', session_name)
+    
     def _assume_role(
         self,
         role_arn: str,
@@ -103,7 +184,7 @@ class AWSSessionManager:
     ) -> Dict[str, str]:
         """Assume AWS IAM role and return temporary credentials."""
         try:
-            sts_client = boto3.client('sts')
+            sts_client = get_aws_client('sts')
             
             assume_role_params = {
                 'RoleArn': role_arn,
@@ -131,7 +212,7 @@ class AWSSessionManager:
     ) -> Dict[str, str]:
         """Create STS session token from access keys."""
         try:
-            sts_client = boto3.client(
+            sts_client = get_aws_client(
                 'sts',
                 aws_access_key_id=access_key_id,
                 aws_secret_access_key=secret_access_key
@@ -149,7 +230,8 @@ class AWSSessionManager:
     
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get active session by ID."""
-        session = self.active_sessions.get(session_id)
+        with self._sessions_lock:
+            session = self.active_sessions.get(session_id)
         
         if not session:
             return None
@@ -166,14 +248,23 @@ class AWSSessionManager:
     
     def revoke_session(self, session_id: str) -> bool:
         """Revoke (delete) an active session."""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        with self._sessions_lock:
+            session = self.active_sessions.pop(session_id, None)
+        if session is not None:
             logger.info(f"Revoked AWS session {session_id}")
             return True
         return False
     
     def cleanup_expired_sessions(self):
         """Remove expired sessions from memory."""
+        with self._sessions_lock:
+            expired = self._prune_sessions_locked()
+        
+        if expired:
+            logger.info(f"Cleaned up {expired} expired sessions")
+    
+    def _prune_sessions_locked(self) -> int:
+        """Drop expired sessions, then the oldest ones beyond max_sessions."""
         current_time = datetime.utcnow()
         expired_sessions = [
             session_id for session_id, session in self.active_sessions.items()
@@ -183,14 +274,19 @@ class AWSSessionManager:
         for session_id in expired_sessions:
             del self.active_sessions[session_id]
         
-        if expired_sessions:
-            logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
+        while len(self.active_sessions) >= self.max_sessions:
+            self.active_sessions.popitem(last=False)
+        
+        return len(expired_sessions)
     
     def list_active_sessions(self, tenant_id: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """List active sessions with optional filtering."""
         sessions = []
         
-        for session_id, session in self.active_sessions.items():
+        with self._sessions_lock:
+            active_sessions = list(self.active_sessions.items())
+        
+        for session_id, session in active_sessions:
             if tenant_id and session['tenant_id'] != tenant_id:
                 continue
             if user_id and session['user_id'] != user_id:
@@ -213,8 +309,8 @@ class CrossAccountRoleManager:
     
     def __init__(self):
         """Initialize cross-account role manager."""
-        self.iam_client = boto3.client('iam')
-        self.sts_client = boto3.client('sts')
+        self.iam_client = get_aws_client('iam')
+        self.sts_client = get_aws_client('sts')
     
     def create_tenant_role(
         self,
@@ -332,7 +428,7 @@ class PermissionValidator:
     
     def __init__(self):
         """Initialize permission validator."""
-        self.iam_client = boto3.client('iam')
+        self.iam_client = get_aws_client('iam')
         self.dangerous_permissions = [
             'iam:*',
             'sts:AssumeRole',
@@ -380,7 +476,7 @@ class PermissionValidator:
         """Validate access keys and check permissions."""
         try:
             # Test credentials by making a simple API call
-            sts_client = boto3.client(
+            sts_client = get_aws_client(
                 'sts',
                 aws_access_key_id=access_key_id,
                 aws_secret_access_key=secret_access_key
@@ -389,7 +485,7 @@ class PermissionValidator:
             identity = sts_client.get_caller_identity()
             
             # Get user/role permissions
-            iam_client = boto3.client(
+            iam_client = get_aws_client(
                 'iam',
                 aws_access_key_id=access_key_id,
                 aws_secret_access_key=secret_access_key
@@ -6,7 +6,6 @@ Production-ready AWS Lightsail container deployment module.
 Handles the complete deployment process from Docker image to live service.
 """
 
-import boto3
 import json
 import time
 import asyncio
@@ -14,6 +13,7 @@ import logging
 from typing import Dict, Any, Optional
 from botocore.exceptions import ClientError, NoCredentialsError
 from .docker_manager import DockerImageManager
+from core.aws_clients import get_aws_client
 
 logger = logging.getLogger(__name__)
 
@@ -35,14 +35,14 @@ class LightsailContainerDeployer:
         self.docker_manager = DockerImageManager()
         
         try:
-            self.lightsail_client = boto3.client(
+            self.lightsail_client = get_aws_client(
                 'lightsail',
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
                 region_name=region
             )
             
-            self.ecr_client = boto3.client(
+            self.ecr_client = get_aws_client(
                 'ecr',
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
@@ -0,0 +1,239 @@
+"""
+STS Credential Cache
+====================
+
+Caches temporary credentials per (tenant, role ARN / access key, external ID,
+role session name) so repeated session creation during a deployment does not
+call STS every time. The session name is kept in the key so each user's calls
+stay attributed to their own session in CloudTrail.
+
+- Entries are refreshed in the background ahead of expiry while they are in use
+- Concurrent requests for the same key share one STS call (single-flight)
+- The number of cached entries is bounded (least recently used is dropped)
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (tenant_id, role ARN or access key fingerprint, external ID, role session name)
+CacheKey = Tuple[str, str, str, str]
+Fetcher = Callable[[], Dict[str, Any]]
+
+
+@dataclass
+class _CacheEntry:
+    """Cached STS credentials and the fetcher used to renew them"""
+    credentials: Dict[str, Any]
+    expires_at: float
+    fetch: Fetcher
+    last_used: float
+    refresh_failures: int = 0
+
+
+def _expiration_timestamp(credentials: Dict[str, Any]) -> float:
+    """Epoch seconds of an STS ``Credentials['Expiration']`` (datetime or ISO string)"""
+    expiration = credentials['Expiration']
+    if isinstance(expiration, str):
+        expiration = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration.timestamp()
+
+
+class STSCredentialCache:
+    """Bounded, self-refreshing cache of temporary AWS credentials."""
+    
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        refresh_margin: int = 300,
+        idle_timeout: int = 1800,
+        retry_interval: int = 30
+    ):
+        """
+        Initialize the credential cache.
+        
+        Args:
+            max_entries: Maximum number of cached credential sets
+            refresh_margin: Refresh credentials this many seconds before they expire
+            idle_timeout: Stop refreshing entries unused for this many seconds
+            retry_interval: Delay before retrying a failed background refresh
+        """
+        self.max_entries = max_entries
+        self.refresh_margin = refresh_margin
+        self.idle_timeout = idle_timeout
+        self.retry_interval = retry_interval
+        
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._schedule: list = []  # heap of (refresh_at, key)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._refresher: Optional[threading.Thread] = None
+        self._stopped = False
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_failures': 0, 'evictions': 0}
+    
+    def get_credentials(self, key: CacheKey, fetch: Fetcher, min_remaining: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Return cached credentials for key, calling fetch (once, across threads) when needed.
+        
+        Args:
+            key: (tenant_id, role ARN or access key fingerprint, external ID)
+            fetch: Callable returning an STS ``Credentials`` dict
+            min_remaining: Minimum remaining lifetime in seconds (defaults to refresh_margin)
+        
+        Returns:
+            STS credentials dict (AccessKeyId, SecretAccessKey, SessionToken, Expiration)
+        """
+        min_remaining = self.refresh_margin if min_remaining is None else min_remaining
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and entry.expires_at - now > min_remaining:
+                entry.last_used = now
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry.credentials
+            self.stats['misses'] += 1
+        
+        return self._refresh(key, fetch)
+    
+    def invalidate(self, key: CacheKey) -> bool:
+        """Drop cached credentials (e.g. after the role or its trust policy changed)."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+    
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        """Drop every cached credential set for a tenant."""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == tenant_id]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'max_entries': self.max_entries}
+    
+    def stop(self):
+        """Stop the background refresher."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify_all()
+    
+    def _refresh(self, key: CacheKey, fetch: Fetcher) -> Dict[str, Any]:
+        """Fetch credentials for key; concurrent callers wait for the same STS call."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            credentials = fetch()
+            expires_at = _expiration_timestamp(credentials)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        
+        with self._wakeup:
+            self._inflight.pop(key, None)
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _CacheEntry(credentials=credentials, expires_at=expires_at, fetch=fetch, last_used=now)
+                self._entries[key] = entry
+            else:
+                entry.credentials, entry.expires_at, entry.fetch = credentials, expires_at, fetch
+                entry.refresh_failures = 0
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            heapq.heappush(self._schedule, (expires_at - self.refresh_margin, key))
+            self._ensure_refresher()
+            self._wakeup.notify()
+        
+        future.set_result(credentials)
+        return credentials
+    
+    def _ensure_refresher(self):
+        """Start the background refresher thread (lock held)."""
+        if self._refresher is None or not self._refresher.is_alive():
+            self._stopped = False
+            self._refresher = threading.Thread(target=self._refresh_loop, name="sts-credential-refresher", daemon=True)
+            self._refresher.start()
+    
+    def _refresh_loop(self):
+        """Renew in-use entries shortly before they expire; let idle ones lapse."""
+        while True:
+            with self._wakeup:
+                while not self._stopped:
+                    if self._schedule and self._schedule[0][0] <= time.time():
+                        break
+                    timeout = self._schedule[0][0] - time.time() if self._schedule else None
+                    self._wakeup.wait(timeout)
+                if self._stopped:
+                    return
+                
+                refresh_at, key = heapq.heappop(self._schedule)
+                entry = self._entries.get(key)
+                now = time.time()
+                if entry is None or entry.expires_at - self.refresh_margin > refresh_at + 1:
+                    continue  # Evicted, or already renewed by a foreground call
+                if now - entry.last_used > self.idle_timeout:
+                    if entry.expires_at <= now:
+                        del self._entries[key]
+                    continue
+                fetch = entry.fetch
+            
+            try:
+                self._refresh(key, fetch)
+                with self._lock:
+                    self.stats['refreshes'] += 1
+                logger.debug(f"Refreshed STS credentials for tenant {key[0]}")
+            except Exception as e:
+                with self._wakeup:
+                    self.stats['refresh_failures'] += 1
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.refresh_failures += 1
+                        # Keep serving the old credentials and retry while they remain valid
+                        if entry.expires_at - time.time() > self.retry_interval:
+                            heapq.heappush(self._schedule, (time.time() + self.retry_interval, key))
+                logger.warning(f"Background STS refresh failed for tenant {key[0]}: {e}")
+
+
+_credential_cache: Optional[STSCredentialCache] = None
+_credential_cache_lock = threading.Lock()
+
+
+def get_sts_credential_cache() -> STSCredentialCache:
+    """Get the process-wide STS credential cache."""
+    global _credential_cache
+    if _credential_cache is None:
+        with _credential_cache_lock:
+            if _credential_cache is None:
+                _credential_cache = STSCredentialCache(
+                    max_entries=int(os.getenv("CODEFLOWOPS_STS_CACHE_MAX_ENTRIES", 1000)),
+                    refresh_margin=int(os.getenv("CODEFLOWOPS_STS_REFRESH_MARGIN_SECONDS", 300))
+                )
+    return _credential_cache
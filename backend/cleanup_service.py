@@ -1,31 +1,125 @@
 """
 Repository Cleanup Service
 Manages temporary repositories and deployment artifacts cleanup
+
+Workspaces (cloned repositories, build directories) are tracked with their
+last access time and size. A background sweep keeps the total under a global
+disk budget by evicting the least recently used workspaces that are not in
+use by an active deployment, removes workspaces older than ``max_age_hours``
+and, on startup, removes orphaned temp directories left behind by previous
+processes.
+
+Every registered workspace gets a lease file (owner host and pid) that the
+sweep keeps fresh, so the orphan scan of one worker never deletes a workspace
+another live worker on the same host is still using.
 """
 
 import os
+import json
 import shutil
+import socket
+import tempfile
 import threading
 import time
 import logging
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# tempfile.mkdtemp prefixes used across the backend for repo clones and builds
+ORPHAN_WORKSPACE_PREFIXES = (
+    "intel_",            # analyzer.pipeline.IntelligencePipeline
+    "repo_",             # repository_enhancer
+    "repo_analysis_",    # src/services/analysis
+    "fallback_",         # enhanced_repository_analyzer fallback clone
+    "deploy_",           # simple_api basic deployment
+    "react_build_",      # direct_react_builder
+    "react_analysis_",   # react_deployer
+    "smart-deploy-",     # smart deploy uploads
+    "php_build_",
+    "nodejs_build_",
+    "python_build_",
+    "java_build_",
+    "nodejs_api_",
+    "python_api_",
+    "codeflowops_",      # core.utils.create_temp_directory
+)
+
+LEASE_DIR_NAME = "codeflowops-workspace-leases"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # Exists but owned by someone else
+    return True
+
+def _directory_size(path: str) -> int:
+    """Total size in bytes of all files below path (symlinks are not followed)"""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
 class CleanupService:
     """
     Background service for cleaning up temporary repositories and deployment artifacts
+    
+    - Global disk budget with LRU eviction by last access
+    - Reference counting: workspaces in use by active deploys are never evicted
+    - Age-based expiry of idle workspaces
+    - Startup scan for orphaned temp directories, skipping workspaces leased by live workers
     """
     
-    def __init__(self):
+    def __init__(self, disk_budget_mb: Optional[int] = None):
         self.repositories: Dict[str, Dict[str, Any]] = {}
         self.cleanup_thread: Optional[threading.Thread] = None
         self.running = False
-        self.cleanup_interval = 3600  # 1 hour
+        self.cleanup_interval = 300  # 5 minutes; bursts also wake the sweep early
         self.max_age_hours = 24  # 24 hours
+        self.disk_budget_bytes = (
+            disk_budget_mb if disk_budget_mb is not None
+            else int(os.getenv("CODEFLOWOPS_WORKSPACE_BUDGET_MB", "10240"))
+        ) * 1024 * 1024
+        # Orphans younger than this may belong to another worker process
+        self.orphan_min_age_seconds = int(os.getenv("CODEFLOWOPS_ORPHAN_MIN_AGE_SECONDS", "3600"))
+        # Unleased directories were never registered by any worker; only remove them once clearly abandoned
+        self.unleased_orphan_min_age_seconds = int(
+            os.getenv("CODEFLOWOPS_UNLEASED_ORPHAN_MIN_AGE_SECONDS", str(self.max_age_hours * 3600))
+        )
+        self.temp_root = tempfile.gettempdir()
+        self.lease_dir = os.path.join(self.temp_root, LEASE_DIR_NAME)
+        # A lease not refreshed for this long is stale even if its pid looks alive (pid reuse, other host)
+        self.lease_ttl_seconds = self.cleanup_interval * 3
+        self.hostname = socket.gethostname()
         self._lock = threading.RLock()
+        self._wake = threading.Event()
+        
+        self.metrics = {
+            "evicted_lru": 0,
+            "expired": 0,
+            "orphans_removed": 0,
+            "bytes_reclaimed": 0,
+            "last_sweep_at": None,
+        }
     
     def start_background_cleanup(self):
         """Start the background cleanup thread"""
@@ -38,20 +132,36 @@ class CleanupService:
     def stop_background_cleanup(self):
         """Stop the background cleanup thread"""
         self.running = False
+        self._wake.set()
         if self.cleanup_thread:
             self.cleanup_thread.join(timeout=5.0)
         logger.info("🛑 Background cleanup service stopped")
     
-    def register_repository(self, deployment_id: str, repo_path: str, metadata: Dict[str, Any]):
-        """Register a repository for cleanup tracking"""
+    def register_repository(self, deployment_id: str, repo_path: str, metadata: Dict[str, Any],
+                            in_use: bool = False):
+        """Register a repository for cleanup tracking
+        
+        With ``in_use=True`` the workspace starts with one reference and is
+        protected from eviction until ``release_workspace`` is called.
+        """
+        now = datetime.utcnow()
         with self._lock:
+            existing = self.repositories.get(deployment_id)
             self.repositories[deployment_id] = {
-                "repo_path": repo_path,
-                "created_at": datetime.utcnow(),
-                "last_activity": datetime.utcnow(),
-                "metadata": metadata.copy()
+                "repo_path": str(repo_path),
+                "created_at": existing["created_at"] if existing else now,
+                "last_activity": now,
+                "metadata": metadata.copy(),
+                "ref_count": (existing["ref_count"] if existing else 0) + (1 if in_use else 0),
+                "size_bytes": existing["size_bytes"] if existing else 0,
+                "size_stale": True
             }
             logger.debug(f"📝 Registered repository for cleanup: {deployment_id} -> {repo_path}")
+        
+        self._write_lease(str(repo_path), deployment_id)
+        
+        # New workspaces may push usage over budget; let the sweep run now
+        self._wake.set()
     
     def update_activity(self, deployment_id: str, status: str):
         """Update the last activity time for a deployment"""
@@ -59,8 +169,51 @@ class CleanupService:
             if deployment_id in self.repositories:
                 self.repositories[deployment_id]["last_activity"] = datetime.utcnow()
                 self.repositories[deployment_id]["metadata"]["status"] = status
+                self.repositories[deployment_id]["size_stale"] = True
                 logger.debug(f"🔄 Updated activity for {deployment_id}: {status}")
     
+    def touch(self, deployment_id: str):
+        """Mark a workspace as recently used (moves it to the back of the LRU order)"""
+        with self._lock:
+            if deployment_id in self.repositories:
+                self.repositories[deployment_id]["last_activity"] = datetime.utcnow()
+    
+    def acquire_workspace(self, deployment_id: str) -> Optional[str]:
+        """Take a reference on a workspace; returns its path or None if it is gone"""
+        with self._lock:
+            repo_info = self.repositories.get(deployment_id)
+            if not repo_info or not os.path.exists(repo_info["repo_path"]):
+                return None
+            repo_info["ref_count"] += 1
+            repo_info["last_activity"] = datetime.utcnow()
+            return repo_info["repo_path"]
+    
+    def release_workspace(self, deployment_id: str):
+        """Drop a reference taken by acquire_workspace / register_repository(in_use=True)"""
+        with self._lock:
+            repo_info = self.repositories.get(deployment_id)
+            if repo_info:
+                repo_info["ref_count"] = max(0, repo_info["ref_count"] - 1)
+                repo_info["last_activity"] = datetime.utcnow()
+                repo_info["size_stale"] = True
+    
+    @contextmanager
+    def workspace_in_use(self, deployment_id: str):
+        """Context manager pinning a workspace for the duration of a deploy step"""
+        path = self.acquire_workspace(deployment_id)
+        try:
+            yield path
+        finally:
+            if path is not None:
+                self.release_workspace(deployment_id)
+    
+    def discard_workspace(self, deployment_id: str):
+        """Delete a workspace now and stop tracking it, regardless of references"""
+        with self._lock:
+            repo_info = self.repositories.pop(deployment_id, None)
+        if repo_info:
+            self._remove_path(repo_info["repo_path"])
+    
     async def cleanup_user_cancellation(self, deployment_id: str):
         """Clean up resources when user cancels a deployment"""
         with self._lock:
@@ -69,14 +222,13 @@ class CleanupService:
                 repo_path = repo_info["repo_path"]
                 
                 try:
-                    if os.path.exists(repo_path):
-                        shutil.rmtree(repo_path)
+                    if os.path.exists(repo_path) and self._remove_path(repo_path):
                         logger.info(f"🗑️ Cleaned up cancelled deployment: {repo_path}")
                     
                     # Remove from tracking
                     del self.repositories[deployment_id]
                     logger.info(f"✅ Removed {deployment_id} from cleanup tracking")
-                    
+                
                 except Exception as e:
                     logger.error(f"❌ Failed to cleanup {deployment_id}: {e}")
     
@@ -100,49 +252,232 @@ class CleanupService:
                 "active_repositories": active_count,
                 "old_repositories": old_count,
                 "cleanup_interval_minutes": self.cleanup_interval // 60,
-                "max_age_hours": self.max_age_hours
+                "max_age_hours": self.max_age_hours,
+                **self.get_usage_metrics()
             }
     
+    def get_usage_metrics(self) -> Dict[str, Any]:
+        """Disk usage of tracked workspaces against the budget, plus sweep counters"""
+        with self._lock:
+            tracked_bytes = sum(info["size_bytes"] for info in self.repositories.values())
+            in_use = sum(1 for info in self.repositories.values() if info["ref_count"] > 0)
+            metrics = dict(self.metrics)
+        
+        try:
+            disk = shutil.disk_usage(self.temp_root)
+            disk_free_bytes, disk_total_bytes = disk.free, disk.total
+        except OSError:
+            disk_free_bytes = disk_total_bytes = None
+        
+        return {
+            "tracked_bytes": tracked_bytes,
+            "disk_budget_bytes": self.disk_budget_bytes,
+            "budget_used_percent": round(100.0 * tracked_bytes / self.disk_budget_bytes, 1) if self.disk_budget_bytes else None,
+            "workspaces_in_use": in_use,
+            "disk_free_bytes": disk_free_bytes,
+            "disk_total_bytes": disk_total_bytes,
+            **metrics
+        }
+    
+    def _lease_path(self, repo_path: str) -> str:
+        return os.path.join(self.lease_dir, os.path.basename(os.path.normpath(repo_path)) + ".lease")
+    
+    def _write_lease(self, repo_path: str, deployment_id: str):
+        """Claim a workspace for this process (also refreshes the lease timestamp)"""
+        try:
+            os.makedirs(self.lease_dir, exist_ok=True)
+            lease = {"host": self.hostname, "pid": os.getpid(), "deployment_id": deployment_id,
+                     "path": os.path.realpath(repo_path)}
+            with open(self._lease_path(repo_path), "w", encoding="utf-8") as f:
+                json.dump(lease, f)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write workspace lease for {repo_path}: {e}")
+    
+    def _refresh_leases(self):
+        with self._lock:
+            paths = [info["repo_path"] for info in self.repositories.values()]
+        for repo_path in paths:
+            lease_path = self._lease_path(repo_path)
+            try:
+                os.utime(lease_path)
+            except FileNotFoundError:
+                self._write_lease(repo_path, "")
+            except OSError:
+                continue
+    
+    def _lease_is_live(self, lease_path: str) -> bool:
+        """A lease protects its workspace while the owner process runs and keeps refreshing it"""
+        try:
+            refreshed_at = os.stat(lease_path).st_mtime
+            with open(lease_path, "r", encoding="utf-8") as f:
+                lease = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - refreshed_at > self.lease_ttl_seconds:
+            return False
+        if lease.get("host") == self.hostname and not _pid_alive(int(lease.get("pid", 0))):
+            return False
+        return True
+    
+    def scan_orphaned_workspaces(self) -> int:
+        """
+        Remove untracked temp directories created with known mkdtemp prefixes
+        
+        Directories with a live lease belong to another worker and are kept.
+        Directories whose lease expired (owner gone) are removed after
+        ``orphan_min_age_seconds``; directories that were never leased only
+        after ``unleased_orphan_min_age_seconds``, since some code paths
+        create workspaces without registering them.
+        """
+        with self._lock:
+            tracked = {os.path.realpath(info["repo_path"]) for info in self.repositories.values()}
+        
+        removed = 0
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.temp_root))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not scan {self.temp_root} for orphaned workspaces: {e}")
+            return 0
+        
+        for entry in entries:
+            try:
+                if not entry.name.startswith(ORPHAN_WORKSPACE_PREFIXES):
+                    continue
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if os.path.realpath(entry.path) in tracked:
+                    continue
+                lease_path = self._lease_path(entry.path)
+                leased = os.path.exists(lease_path)
+                if leased and self._lease_is_live(lease_path):
+                    continue
+                min_age = self.orphan_min_age_seconds if leased else self.unleased_orphan_min_age_seconds
+                if entry.stat(follow_symlinks=False).st_mtime > now - min_age:
+                    continue
+            except OSError:
+                continue
+            
+            if self._remove_path(entry.path):
+                removed += 1
+        
+        with self._lock:
+            self.metrics["orphans_removed"] += removed
+        if removed:
+            logger.info(f"🗑️ Removed {removed} orphaned workspaces from {self.temp_root}")
+        return removed
+    
     def _cleanup_loop(self):
         """Main cleanup loop running in background thread"""
         logger.info(f"🔄 Cleanup loop started (interval: {self.cleanup_interval}s)")
         
+        try:
+            self.scan_orphaned_workspaces()
+        except Exception as e:
+            logger.error(f"❌ Orphaned workspace scan failed: {e}")
+        
         while self.running:
             try:
+                self._refresh_leases()
                 self._perform_cleanup()
-                time.sleep(self.cleanup_interval)
+                self._wake.wait(self.cleanup_interval)
+                self._wake.clear()
             except Exception as e:
                 logger.error(f"❌ Cleanup loop error: {e}")
                 time.sleep(60)  # Wait 1 minute on error
     
     def _perform_cleanup(self):
-        """Perform the actual cleanup of old repositories"""
+        """Expire old workspaces, then evict LRU workspaces until under the disk budget"""
         now = datetime.utcnow()
-        to_remove = []
+        max_age = timedelta(hours=self.max_age_hours)
+        
+        with self._lock:
+            snapshot = {
+                deployment_id: dict(repo_info)
+                for deployment_id, repo_info in self.repositories.items()
+            }
+        
+        # Measure sizes outside the lock; directory walks can be slow
+        for deployment_id, repo_info in snapshot.items():
+            if repo_info["size_stale"]:
+                repo_info["size_bytes"] = _directory_size(repo_info["repo_path"])
+        
+        expired: List[str] = []
+        evicted: List[str] = []
         
         with self._lock:
+            for deployment_id, repo_info in snapshot.items():
+                current = self.repositories.get(deployment_id)
+                if current is None:
+                    continue
+                if repo_info["size_stale"]:
+                    current["size_bytes"] = repo_info["size_bytes"]
+                    current["size_stale"] = False
+            
+            # Age-based expiry (idle workspaces only)
             for deployment_id, repo_info in self.repositories.items():
-                age = now - repo_info["last_activity"]
-                
-                if age.total_seconds() > (self.max_age_hours * 3600):
-                    repo_path = repo_info["repo_path"]
-                    
-                    try:
-                        if os.path.exists(repo_path):
-                            shutil.rmtree(repo_path)
-                            logger.info(f"🗑️ Cleaned up old repository: {repo_path}")
-                        
-                        to_remove.append(deployment_id)
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Failed to cleanup {repo_path}: {e}")
+                if repo_info["ref_count"] == 0 and now - repo_info["last_activity"] > max_age:
+                    expired.append(deployment_id)
+            
+            total_bytes = sum(
+                info["size_bytes"] for deployment_id, info in self.repositories.items()
+                if deployment_id not in expired
+            )
             
-            # Remove cleaned up repositories from tracking
-            for deployment_id in to_remove:
-                del self.repositories[deployment_id]
+            # LRU eviction until the budget is met
+            if total_bytes > self.disk_budget_bytes:
+                candidates = sorted(
+                    (
+                        (info["last_activity"], deployment_id)
+                        for deployment_id, info in self.repositories.items()
+                        if info["ref_count"] == 0 and deployment_id not in expired
+                    )
+                )
+                for _, deployment_id in candidates:
+                    if total_bytes <= self.disk_budget_bytes:
+                        break
+                    total_bytes -= self.repositories[deployment_id]["size_bytes"]
+                    evicted.append(deployment_id)
+                
+                if total_bytes > self.disk_budget_bytes:
+                    logger.warning(
+                        f"⚠️ Workspace usage {total_bytes // (1024 * 1024)}MB exceeds budget "
+                        f"{self.disk_budget_bytes // (1024 * 1024)}MB; remaining workspaces are in use"
+                    )
             
-            if to_remove:
-                logger.info(f"✅ Cleaned up {len(to_remove)} old repositories")
+            removed = {
+                deployment_id: self.repositories.pop(deployment_id)
+                for deployment_id in expired + evicted
+            }
+        
+        reclaimed = 0
+        for deployment_id, repo_info in removed.items():
+            if self._remove_path(repo_info["repo_path"]):
+                reclaimed += repo_info["size_bytes"]
+                reason = "expired" if deployment_id in expired else "evicted (LRU)"
+                logger.info(f"🗑️ Cleaned up {reason} repository: {repo_info['repo_path']}")
+        
+        with self._lock:
+            self.metrics["expired"] += len(expired)
+            self.metrics["evicted_lru"] += len(evicted)
+            self.metrics["bytes_reclaimed"] += reclaimed
+            self.metrics["last_sweep_at"] = now.isoformat()
+        
+        if removed:
+            logger.info(f"✅ Cleaned up {len(removed)} repositories ({reclaimed // (1024 * 1024)}MB reclaimed)")
+    
+    def _remove_path(self, repo_path: str) -> bool:
+        try:
+            if os.path.exists(repo_path):
+                shutil.rmtree(repo_path)
+            try:
+                os.remove(self._lease_path(repo_path))
+            except FileNotFoundError:
+                pass
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to cleanup {repo_path}: {e}")
+            return False
     
     def force_cleanup_all(self):
         """Force cleanup of all tracked repositories (for shutdown)"""
@@ -153,11 +488,11 @@ class CleanupService:
                 
                 try:
                     if os.path.exists(repo_path):
-                        shutil.rmtree(repo_path)
                         cleaned += 1
+                    self._remove_path(repo_path)
                     
                     del self.repositories[deployment_id]
-                    
+                
                 except Exception as e:
                     logger.error(f"❌ Failed to force cleanup {repo_path}: {e}")
             
@@ -0,0 +1,275 @@
+# core/aws_clients.py
+"""
+Process-wide pool of boto3 sessions and clients
+
+Creating a client loads (and parses) the botocore service model and opens
+a fresh connection pool, so building clients per request or per object
+costs tens of milliseconds of CPU and a TLS handshake each time. Clients
+are thread-safe and are cached here per (credential fingerprint, region,
+service, config) in a bounded LRU. All sessions share one botocore data
+loader, so each service model is parsed once per process.
+
+Credential handling:
+
+- no explicit keys: the default provider chain (env, profile, SSO, instance
+  or task role); botocore refreshes those temporary credentials itself
+- explicit keys: the fingerprint covers key, secret and session token, so
+  rotated or re-issued credentials get new clients
+- ``get_refreshable_session``: credentials produced by a callable (e.g. an
+  STS AssumeRole) are refreshed automatically shortly before they expire
+
+Call sites use ``get_aws_client`` / ``get_aws_session`` the way they used
+``boto3.client`` / ``boto3.Session``.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CLIENTS = 256
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+
+def _fingerprint(aws_access_key_id: Optional[str] = None, aws_secret_access_key: Optional[str] = None,
+                 aws_session_token: Optional[str] = None, profile_name: Optional[str] = None) -> str:
+    """Cache key for a credential set; secrets never leave this function"""
+    if not aws_access_key_id:
+        return f"default:{profile_name or ''}"
+    digest = hashlib.sha256()
+    for part in (aws_access_key_id, aws_secret_access_key, aws_session_token):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return f"keys:{digest.hexdigest()[:24]}"
+
+
+def _config_key(config: Optional[Config]) -> str:
+    if config is None:
+        return ""
+    return repr(sorted(config._user_provided_options.items()))
+
+
+class PooledSession:
+    """
+    boto3.Session facade whose ``client()`` calls are served from the pool
+    
+    Everything else (``resource``, ``get_credentials``, ``region_name``, ...)
+    is delegated to the wrapped session.
+    """
+    
+    def __init__(self, factory: "AWSClientFactory", session: boto3.Session, fingerprint: str):
+        self._factory = factory
+        self._session = session
+        self._fingerprint = fingerprint
+    
+    @property
+    def boto3_session(self) -> boto3.Session:
+        return self._session
+    
+    def client(self, service_name: str, region_name: Optional[str] = None, config: Optional[Config] = None, **kwargs):
+        return self._factory._client_for(self, service_name, region_name, config, kwargs)
+    
+    def resource(self, service_name: str, region_name: Optional[str] = None, config: Optional[Config] = None, **kwargs):
+        # Resources are not thread-safe, so they are never shared; they still reuse the loaded models
+        return self._session.resource(
+            service_name, region_name=region_name or self._session.region_name,
+            config=self._factory.client_config(config), **kwargs
+        )
+    
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+
+
+class AWSClientFactory:
+    """Bounded LRU of sessions (per credential set) and clients (per session, region, service)"""
+    
+    def __init__(self, max_clients: int = DEFAULT_MAX_CLIENTS, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+        self.max_clients = max_clients
+        self.max_sessions = max_sessions
+        self.base_config = Config(max_pool_connections=max_pool_connections, tcp_keepalive=True)
+        
+        self._loader = botocore.session.get_session().get_component("data_loader")
+        self._sessions: "OrderedDict[str, PooledSession]" = OrderedDict()
+        self._clients: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def client_config(self, config: Optional[Config] = None) -> Config:
+        """Pool defaults with any caller-supplied options taking precedence"""
+        return self.base_config.merge(config) if config is not None else self.base_config
+    
+    def session(self, region_name: Optional[str] = None, aws_access_key_id: Optional[str] = None,
+                aws_secret_access_key: Optional[str] = None, aws_session_token: Optional[str] = None,
+                profile_name: Optional[str] = None) -> PooledSession:
+        """Shared session for a credential set (one per fingerprint and default region)"""
+        fingerprint = _fingerprint(aws_access_key_id, aws_secret_access_key, aws_session_token, profile_name)
+        key = f"{fingerprint}|{region_name or ''}"
+        
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None:
+                self._sessions.move_to_end(key)
+                return pooled
+        
+        session = boto3.Session(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_session_token=aws_session_token,
+            region_name=region_name,
+            profile_name=profile_name,
+            botocore_session=self._botocore_session()
+        )
+        return self._remember_session(key, PooledSession(self, session, fingerprint))
+    
+    def refreshable_session(self, cache_key: str, refresh: Callable[[], Dict[str, str]],
+                            region_name: Optional[str] = None) -> PooledSession:
+        """
+        Shared session whose credentials come from ``refresh``
+        
+        ``refresh`` returns botocore credential metadata (``access_key``,
+        ``secret_key``, ``token``, ``expiry_time`` as ISO 8601) and is called
+        again by botocore shortly before expiry, so long-lived clients never
+        hold expired credentials.
+        """
+        key = f"refresh:{cache_key}|{region_name or ''}"
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None:
+                self._sessions.move_to_end(key)
+                return pooled
+        
+        botocore_session = self._botocore_session()
+        botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+            metadata=refresh(), refresh_using=refresh, method="codeflowops-refresh"
+        )
+        session = boto3.Session(region_name=region_name, botocore_session=botocore_session)
+        return self._remember_session(key, PooledSession(self, session, f"refresh:{cache_key}"))
+    
+    def client(self, service_name: str, region_name: Optional[str] = None, config: Optional[Config] = None,
+               aws_access_key_id: Optional[str] = None, aws_secret_access_key: Optional[str] = None,
+               aws_session_token: Optional[str] = None, profile_name: Optional[str] = None, **kwargs):
+        """Drop-in for ``boto3.client(...)``"""
+        session = self.session(
+            region_name=region_name, aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key, aws_session_token=aws_session_token,
+            profile_name=profile_name
+        )
+        return session.client(service_name, region_name=region_name, config=config, **kwargs)
+    
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._sessions.clear()
+            self._session_locks.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "sessions": len(self._sessions),
+                "max_clients": self.max_clients,
+                "max_pool_connections": self.base_config.max_pool_connections,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+    
+    def _client_for(self, pooled: PooledSession, service_name: str, region_name: Optional[str],
+                    config: Optional[Config], kwargs: Dict[str, Any]):
+        region = region_name or pooled._session.region_name
+        key = (pooled._fingerprint, region, service_name, _config_key(config), repr(sorted(kwargs.items())))
+        
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+            session_lock = self._session_locks.setdefault(pooled._fingerprint, threading.Lock())
+        
+        # Creating clients from one session concurrently is not thread-safe in botocore
+        with session_lock:
+            with self._lock:
+                client = self._clients.get(key)
+            if client is None:
+                client = pooled._session.client(
+                    service_name, region_name=region, config=self.client_config(config), **kwargs
+                )
+        
+        with self._lock:
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_clients:
+                # Evicted clients stay usable by whoever still holds them
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+    
+    def _botocore_session(self) -> botocore.session.Session:
+        botocore_session = botocore.session.get_session()
+        # Service models are parsed once per process instead of once per session
+        botocore_session.register_component("data_loader", self._loader)
+        return botocore_session
+    
+    def _remember_session(self, key: str, pooled: PooledSession) -> PooledSession:
+        with self._lock:
+            existing = self._sessions.get(key)
+            if existing is not None:
+                return existing
+            self._sessions[key] = pooled
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return pooled
+
+
+_client_factory: Optional[AWSClientFactory] = None
+_client_factory_lock = threading.Lock()
+
+
+def get_client_factory() -> AWSClientFactory:
+    """Process-wide factory (sized by CODEFLOWOPS_AWS_CLIENT_CACHE_SIZE / CODEFLOWOPS_AWS_MAX_POOL_CONNECTIONS)"""
+    global _client_factory
+    if _client_factory is None:
+        with _client_factory_lock:
+            if _client_factory is None:
+                _client_factory = AWSClientFactory(
+                    max_clients=int(os.getenv("CODEFLOWOPS_AWS_CLIENT_CACHE_SIZE", DEFAULT_MAX_CLIENTS)),
+                    max_pool_connections=int(os.getenv("CODEFLOWOPS_AWS_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS))
+                )
+    return _client_factory
+
+
+def get_aws_client(service_name: str, region_name: Optional[str] = None, **kwargs):
+    """Pooled equivalent of ``boto3.client(service_name, region_name=..., **credentials)``"""
+    return get_client_factory().client(service_name, region_name=region_name, **kwargs)
+
+
+def get_aws_session(region_name: Optional[str] = None, aws_access_key_id: Optional[str] = None,
+                    aws_secret_access_key: Optional[str] = None, aws_session_token: Optional[str] = None,
+                    profile_name: Optional[str] = None) -> PooledSession:
+    """Pooled equivalent of ``boto3.Session(...)``"""
+    return get_client_factory().session(
+        region_name=region_name, aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key, aws_session_token=aws_session_token,
+        profile_name=profile_name
+    )
+
+
+def get_refreshable_session(cache_key: str, refresh: Callable[[], Dict[str, str]],
+                            region_name: Optional[str] = None) -> PooledSession:
+    return get_client_factory().refreshable_session(cache_key, refresh, region_name=region_name)
@@ -6,7 +6,7 @@ Database backup automation with point-in-time recovery
 Enterprise-grade backup management with cross-region replication
 """
 
-import boto3
+from .aws_clients import get_aws_client
 import logging
 import json
 from dataclasses import dataclass
@@ -93,11 +93,11 @@ class BackupAutomation:
     
     def __init__(self, region: str = "us-east-1"):
         self.region = region
-        self.rds = boto3.client('rds', region_name=region)
-        self.s3 = boto3.client('s3', region_name=region)
-        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        self.events = boto3.client('events', region_name=region)
-        self.lambda_client = boto3.client('lambda', region_name=region)
+        self.rds = get_aws_client('rds', region_name=region)
+        self.s3 = get_aws_client('s3', region_name=region)
+        self.cloudwatch = get_aws_client('cloudwatch', region_name=region)
+        self.events = get_aws_client('events', region_name=region)
+        self.lambda_client = get_aws_client('lambda', region_name=region)
         
         logger.info(f"💾 Backup automation initialized in {region}")
     
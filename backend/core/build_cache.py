@@ -0,0 +1,419 @@
+# core/build_cache.py
+"""
+Content-addressed cache for JavaScript dependency installs and build output
+
+Two kinds of entries live under one size-bounded (LRU) cache directory:
+
+- dependencies: ``node_modules`` keyed by lockfile + package.json dependency
+  sections and scripts + package-manager config files + Node version +
+  package manager + platform. When the root package has install lifecycle
+  scripts (which can run arbitrary repository code) the whole source tree
+  is part of the key, so only identical repositories share the entry.
+- artifacts: the build output directory keyed by the dependency key plus a
+  hash of the source tree and the public build-time environment
+
+Builds run untrusted code, so workspaces never share files with the cache:
+entries are copied in and out, each entry records a digest of its content
+and a restore that does not reproduce the digest discards the entry.
+Dependencies are snapshotted right after install, before any build script
+runs, and only committed to the cache once the build succeeds.
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import platform
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCKFILES = ["pnpm-lock.yaml", "yarn.lock", "package-lock.json", "bun.lockb", "npm-shrinkwrap.json"]
+DEPENDENCY_SECTIONS = [
+    "dependencies", "devDependencies", "optionalDependencies", "peerDependencies",
+    "resolutions", "overrides", "pnpm", "packageManager", "engines", "scripts"
+]
+# Root scripts npm/yarn/pnpm run during install
+INSTALL_LIFECYCLE_SCRIPTS = ("preinstall", "install", "postinstall", "prepare", "prepublish")
+# Files that change how an install resolves or fetches packages
+INSTALL_CONFIG_FILES = [".npmrc", ".yarnrc", ".yarnrc.yml", ".pnpmfile.cjs"]
+# Never part of the source hash, at any depth: installs and VCS data
+SOURCE_EXCLUDES = {"node_modules", ".git"}
+# Build outputs and tool caches, excluded only at the repository root; a nested
+# src/build/ or packages/x/dist/ may well be source
+ROOT_OUTPUT_EXCLUDES = {
+    "build", "dist", "out", ".next", ".nuxt", ".output", ".svelte-kit", ".turbo", ".cache", "coverage"
+}
+# Environment variables inlined into client bundles by CRA, Vite and Next.js
+BUILD_ENV_PREFIXES = ("REACT_APP_", "VITE_", "NEXT_PUBLIC_", "PUBLIC_URL", "NODE_ENV")
+# Tool caches written inside node_modules; not worth caching and often rewritten in place
+DEPENDENCY_EXCLUDES = {".cache", ".vite"}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Staging directories left by a crashed or failed build are removed after this long
+STALE_STAGING_SECONDS = 6 * 3600
+
+
+class BuildCache:
+    """Size-bounded LRU cache of node_modules trees and build outputs"""
+    
+    def __init__(self, root: Path, max_bytes: int = 10 * 1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._node_version: Optional[str] = None
+        self._evict_lock = threading.Lock()
+        self.stats = {"dependency_hits": 0, "dependency_misses": 0, "artifact_hits": 0, "artifact_misses": 0,
+                      "evictions": 0, "integrity_failures": 0}
+        for kind in ("deps", "artifacts", "tmp"):
+            (self.root / kind).mkdir(parents=True, exist_ok=True)
+        self._remove_stale_staging()
+    
+    # Keys
+    
+    def dependency_key(self, repo_dir: Path, package_manager: str) -> Optional[str]:
+        """Key for the installed dependency tree, or None when there is no lockfile to pin it"""
+        lockfiles = [repo_dir / name for name in LOCKFILES if (repo_dir / name).is_file()]
+        if not lockfiles:
+            return None
+        
+        digest = hashlib.sha256()
+        digest.update(f"pm={package_manager}|node={self.node_version()}|{sys.platform}-{platform.machine()}".encode())
+        for lockfile in lockfiles:
+            digest.update(lockfile.name.encode())
+            _hash_file(digest, lockfile)
+        try:
+            package = json.loads((repo_dir / "package.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            package = {}
+        sections = {section: package.get(section) for section in DEPENDENCY_SECTIONS if section in package}
+        digest.update(json.dumps(sections, sort_keys=True).encode())
+        for name in INSTALL_CONFIG_FILES:
+            if (repo_dir / name).is_file():
+                digest.update(f"\0{name}\0".encode())
+                _hash_file(digest, repo_dir / name)
+        scripts = package.get("scripts") if isinstance(package.get("scripts"), dict) else {}
+        if any(name in scripts for name in INSTALL_LIFECYCLE_SCRIPTS):
+            # The scripts may read any file in the repository while node_modules is being populated
+            digest.update(b"\0lifecycle-sources\0")
+            _hash_source_tree(digest, repo_dir)
+        return digest.hexdigest()
+    
+    def source_key(self, repo_dir: Path, dependency_key: Optional[str], build_command: str = "") -> Optional[str]:
+        """Key for the build output: dependencies + every source file + public build env"""
+        if dependency_key is None:
+            return None
+        
+        digest = hashlib.sha256()
+        digest.update(f"deps={dependency_key}|cmd={build_command}".encode())
+        for name in sorted(os.environ):
+            if name.startswith(BUILD_ENV_PREFIXES):
+                digest.update(f"{name}={os.environ[name]}\0".encode())
+        _hash_source_tree(digest, repo_dir)
+        return digest.hexdigest()
+    
+    def node_version(self) -> str:
+        if self._node_version is None:
+            try:
+                result = subprocess.run(["node", "--version"], capture_output=True, text=True, timeout=10)
+                self._node_version = result.stdout.strip() or "unknown"
+            except (OSError, subprocess.TimeoutExpired):
+                self._node_version = "unknown"
+        return self._node_version
+    
+    # Dependencies
+    
+    def restore_dependencies(self, key: Optional[str], repo_dir: Path) -> bool:
+        """Copy a cached node_modules into repo_dir; False on a miss"""
+        entry = self._entry("deps", key)
+        if entry is None or (repo_dir / "node_modules").exists():
+            self.stats["dependency_misses"] += 1
+            return False
+        if not self._restore(entry, "node_modules", repo_dir / "node_modules"):
+            self.stats["dependency_misses"] += 1
+            return False
+        self.stats["dependency_hits"] += 1
+        logger.info(f"♻️ Restored node_modules from build cache ({key[:12]})")
+        return True
+    
+    def snapshot_dependencies(self, key: Optional[str], repo_dir: Path) -> Optional[Path]:
+        """
+        Copy a fresh install's node_modules into a staging entry
+        
+        Taken before the build runs, so build scripts cannot alter what is
+        cached; ``commit_snapshot`` publishes it once the build succeeded.
+        """
+        source = repo_dir / "node_modules"
+        if key is None or not source.is_dir() or (self.root / "deps" / key / "meta.json").is_file():
+            return None
+        return self._stage("deps", {"node_modules": source}, excludes=DEPENDENCY_EXCLUDES)
+    
+    def commit_snapshot(self, key: Optional[str], snapshot: Optional[Path]):
+        if key is not None and snapshot is not None:
+            self._commit("deps", key, snapshot)
+    
+    def discard_snapshot(self, snapshot: Optional[Path]):
+        if snapshot is not None and snapshot.exists():
+            _remove_tree(snapshot)
+    
+    def save_dependencies(self, key: Optional[str], repo_dir: Path):
+        self.commit_snapshot(key, self.snapshot_dependencies(key, repo_dir))
+    
+    def discard_dependencies(self, key: Optional[str]):
+        """Drop a dependency entry that produced a failing build"""
+        if key is not None and (self.root / "deps" / key).exists():
+            _remove_tree(self.root / "deps" / key)
+            logger.info(f"🧹 Discarded cached node_modules {key[:12]}")
+    
+    # Build artifacts
+    
+    def restore_artifact(self, key: Optional[str], repo_dir: Path) -> Optional[Path]:
+        """Copy a cached build output into repo_dir and return its path; None on a miss"""
+        entry = self._entry("artifacts", key)
+        if entry is None:
+            self.stats["artifact_misses"] += 1
+            return None
+        try:
+            meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+            target = repo_dir / meta["output_dir"]
+        except (OSError, ValueError, KeyError):
+            self.stats["artifact_misses"] += 1
+            return None
+        if target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+        if not self._restore(entry, "output", target):
+            self.stats["artifact_misses"] += 1
+            return None
+        self.stats["artifact_hits"] += 1
+        logger.info(f"♻️ Reused cached build output {meta['output_dir']}/ ({key[:12]}) - skipping install and build")
+        return target
+    
+    def save_artifact(self, key: Optional[str], repo_dir: Path, output_dir: Path):
+        """Store a successful build's output directory (must be inside repo_dir)"""
+        if key is None or not output_dir.is_dir():
+            return
+        try:
+            relative = output_dir.resolve().relative_to(repo_dir.resolve()).as_posix()
+        except ValueError:
+            return
+        if relative == ".":
+            return  # Output is the repository itself; nothing to skip next time
+        if (self.root / "artifacts" / key / "meta.json").is_file():
+            return
+        staging = self._stage("artifacts", {"output": output_dir}, meta={"output_dir": relative})
+        if staging is not None:
+            self._commit("artifacts", key, staging)
+    
+    # Shared package-manager download caches
+    
+    def package_manager_env(self) -> Dict[str, str]:
+        """Point npm/yarn/pnpm download caches into the cache root so misses install warm"""
+        downloads = self.root / "downloads"
+        return {
+            "npm_config_cache": str(downloads / "npm"),
+            "YARN_CACHE_FOLDER": str(downloads / "yarn"),
+            "npm_config_store_dir": str(downloads / "pnpm-store"),
+            # pnpm hardlinks from its store by default; copies keep build scripts out of it
+            "npm_config_package_import_method": "copy",
+            "BUN_INSTALL_CACHE_DIR": str(downloads / "bun")
+        }
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "bytes": sum(size for _, size, _ in self._entries())}
+    
+    # Internals
+    
+    def _entry(self, kind: str, key: Optional[str]) -> Optional[Path]:
+        if key is None:
+            return None
+        entry = self.root / kind / key
+        if not (entry / "meta.json").is_file():
+            return None
+        try:
+            os.utime(entry / "meta.json")  # LRU recency
+        except OSError:
+            return None
+        return entry
+    
+    def _restore(self, entry: Path, name: str, target: Path) -> bool:
+        """Copy entry/name to target, verifying the digest recorded when the entry was stored"""
+        try:
+            meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+            _, digest = _copy_tree(entry / name, target)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Build cache restore failed ({e}); falling back to a clean install/build")
+            shutil.rmtree(target, ignore_errors=True)
+            return False
+        if meta.get("digests", {}).get(name) != digest:
+            self.stats["integrity_failures"] += 1
+            logger.warning(f"⚠️ Build cache entry {entry.parent.name}/{entry.name[:12]} was modified after it was stored; discarding it")
+            shutil.rmtree(target, ignore_errors=True)
+            _remove_tree(entry)
+            return False
+        return True
+    
+    def _stage(self, kind: str, trees: Dict[str, Path], excludes=frozenset(), meta: Optional[dict] = None) -> Optional[Path]:
+        """Copy trees into a staging directory with their digests in meta.json"""
+        staging = Path(tempfile.mkdtemp(prefix=f"{kind}-", dir=self.root / "tmp"))
+        try:
+            size = 0
+            digests = {}
+            for name, source in trees.items():
+                tree_size, digests[name] = _copy_tree(source, staging / name, excludes=excludes)
+                size += tree_size
+            (staging / "meta.json").write_text(
+                json.dumps({**(meta or {}), "size": size, "digests": digests, "created_at": time.time()}), encoding="utf-8"
+            )
+            return staging
+        except OSError as e:
+            logger.warning(f"⚠️ Could not store {kind} in build cache: {e}")
+            _remove_tree(staging)
+            return None
+    
+    def _commit(self, kind: str, key: str, staging: Path):
+        final = self.root / kind / key
+        try:
+            os.rename(staging, final)
+            size = json.loads((final / "meta.json").read_text(encoding="utf-8"))["size"]
+            logger.info(f"💾 Stored {kind} in build cache ({key[:12]}, {size / (1024 * 1024):.1f} MB)")
+        except (OSError, ValueError, KeyError):
+            pass  # Another deployment stored the same key first
+        finally:
+            if staging.exists():
+                _remove_tree(staging)
+        self._evict()
+        self._remove_stale_staging()
+    
+    def _remove_stale_staging(self):
+        cutoff = time.time() - STALE_STAGING_SECONDS
+        for staging in (self.root / "tmp").iterdir():
+            try:
+                if staging.stat().st_mtime < cutoff:
+                    _remove_tree(staging)
+            except OSError:
+                continue
+    
+    def _entries(self):
+        """(path, size, last_used) for every stored entry"""
+        for kind in ("deps", "artifacts"):
+            for entry in (self.root / kind).iterdir():
+                try:
+                    meta_path = entry / "meta.json"
+                    yield entry, json.loads(meta_path.read_text(encoding="utf-8"))["size"], meta_path.stat().st_mtime
+                except (OSError, ValueError, KeyError):
+                    continue
+    
+    def _evict(self):
+        with self._evict_lock:
+            entries = sorted(self._entries(), key=lambda item: item[2])
+            total = sum(size for _, size, _ in entries)
+            for entry, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove_tree(entry)
+                total -= size
+                self.stats["evictions"] += 1
+                logger.info(f"🧹 Evicted {entry.parent.name}/{entry.name[:12]} from build cache")
+
+
+def _hash_file(digest, path: Path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+
+def _hash_source_tree(digest, repo_dir: Path):
+    for current, dirs, files in os.walk(repo_dir):
+        excludes = SOURCE_EXCLUDES | ROOT_OUTPUT_EXCLUDES if Path(current) == Path(repo_dir) else SOURCE_EXCLUDES
+        dirs[:] = sorted(d for d in dirs if d not in excludes)
+        for name in sorted(files):
+            path = Path(current) / name
+            relative = path.relative_to(repo_dir).as_posix()
+            digest.update(f"\0{relative}\0".encode())
+            if path.is_symlink():
+                digest.update(os.readlink(path).encode())
+            else:
+                _hash_file(digest, path)
+
+
+def _copy_tree(source: Path, target: Path, excludes=frozenset()) -> Tuple[int, str]:
+    """
+    Recreate source at target with copied files, hashing what is written
+    
+    Symlinks are recreated as-is, which keeps pnpm's relative links and
+    node_modules/.bin working. Returns the bytes copied and a digest of
+    the paths, link targets and file contents (walk order is sorted, so
+    equal trees give equal digests).
+    """
+    total = 0
+    digest = hashlib.sha256()
+    for current, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if d not in excludes)
+        relative = Path(current).relative_to(source)
+        destination = target / relative
+        destination.mkdir(parents=True, exist_ok=True)
+        # os.walk lists symlinked directories in dirs; recreate them as links
+        for name in list(dirs):
+            if (Path(current) / name).is_symlink():
+                link = os.readlink(Path(current) / name)
+                os.symlink(link, destination / name)
+                digest.update(f"\0L{(relative / name).as_posix()}\0{link}".encode())
+                dirs.remove(name)
+        for name in sorted(files):
+            src = Path(current) / name
+            dst = destination / name
+            if src.is_symlink():
+                link = os.readlink(src)
+                os.symlink(link, dst)
+                digest.update(f"\0L{(relative / name).as_posix()}\0{link}".encode())
+                continue
+            digest.update(f"\0F{(relative / name).as_posix()}\0".encode())
+            with open(src, "rb") as reader, open(dst, "wb") as writer:
+                for chunk in iter(lambda: reader.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    writer.write(chunk)
+                    total += len(chunk)
+            shutil.copystat(src, dst)
+    return total, digest.hexdigest()
+
+
+def _remove_tree(path: Path):
+    def _make_writable(function, failed_path, _):
+        os.chmod(failed_path, stat.S_IWUSR | stat.S_IRUSR | stat.S_IXUSR)
+        function(failed_path)
+    shutil.rmtree(path, onerror=_make_writable)
+
+
+_build_cache: Optional[BuildCache] = None
+_build_cache_lock = threading.Lock()
+
+
+def get_build_cache() -> Optional[BuildCache]:
+    """
+    Process-wide build cache
+    
+    CODEFLOWOPS_BUILD_CACHE_DIR sets the location (default: temp dir),
+    CODEFLOWOPS_BUILD_CACHE_MAX_BYTES the LRU bound and
+    CODEFLOWOPS_BUILD_CACHE=off disables caching.
+    """
+    global _build_cache
+    if os.getenv("CODEFLOWOPS_BUILD_CACHE", "on").lower() in ("off", "false", "0"):
+        return None
+    with _build_cache_lock:
+        if _build_cache is None:
+            try:
+                _build_cache = BuildCache(
+                    Path(os.getenv("CODEFLOWOPS_BUILD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "codeflowops-build-cache"))),
+                    max_bytes=int(os.getenv("CODEFLOWOPS_BUILD_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+                )
+            except OSError as e:
+                logger.warning(f"⚠️ Build cache disabled: {e}")
+                return None
+        return _build_cache
@@ -9,7 +9,7 @@ This is a NEW component that manages configuration without affecting existing sy
 import os
 import json
 import logging
-import boto3
+from .aws_clients import get_aws_client
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -77,8 +77,8 @@ class ConfigManager:
     
     def __init__(self, environment: Environment = Environment.DEVELOPMENT):
         self.environment = environment
-        self.ssm = boto3.client('ssm')
-        self.secrets_manager = boto3.client('secretsmanager')
+        self.ssm = get_aws_client('ssm')
+        self.secrets_manager = get_aws_client('secretsmanager')
         
         # ✅ Load configuration hierarchy
         self.config = self._load_configuration()
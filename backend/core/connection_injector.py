@@ -6,12 +6,17 @@ Connection string injection via AWS Secrets Manager
 Secure database credential management and environment variable injection
 """
 
-import boto3
+from .aws_clients import get_aws_client
 import json
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
+from botocore.exceptions import ClientError
 
 from .database_provisioner import EnhancedDatabaseInstance
 
@@ -34,6 +39,22 @@ class ConnectionConfig:
         if self.custom_variables is None:
             self.custom_variables = {}
 
+@dataclass
+class CachedConfig:
+    """Cached Secrets Manager / Parameter Store read"""
+    values: Dict[str, str]
+    version: int
+    expires_at: float
+
+# Error codes SSM and Secrets Manager return when a burst of calls is throttled
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'TooManyUpdates',
+    'RequestLimitExceeded',
+}
+
 @dataclass
 class InjectionResult:
     """Result of connection string injection"""
@@ -54,12 +75,27 @@ class ConnectionInjector:
     - RDS Proxy integration
     - Connection pooling configuration
     - Framework-specific variable formats
+    - Parallel, throttling-aware Parameter Store writes
+    - Read-through cache with TTL and versioned invalidation
     """
     
-    def __init__(self, region: str = "us-east-1"):
+    def __init__(self, region: str = "us-east-1", cache_ttl_seconds: int = 300,
+                 max_parallel_writes: int = 5, max_write_retries: int = 5):
         self.region = region
-        self.secrets_manager = boto3.client('secretsmanager', region_name=region)
-        self.ssm = boto3.client('ssm', region_name=region)
+        self.secrets_manager = get_aws_client('secretsmanager', region_name=region)
+        self.ssm = get_aws_client('ssm', region_name=region)
+        
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_parallel_writes = max(1, max_parallel_writes)
+        self.max_write_retries = max_write_retries
+        
+        # Cache entries are keyed by (kind, application, environment). Each
+        # (application, environment) pair carries a version that is bumped on
+        # every write, so a read that raced with a write never repopulates the
+        # cache with stale values.
+        self._cache: Dict[Tuple[str, str, str], CachedConfig] = {}
+        self._cache_versions: Dict[Tuple[str, str], int] = {}
+        self._cache_lock = threading.Lock()
         
         logger.info("🔐 Connection injector initialized")
     
@@ -90,6 +126,9 @@ class ConnectionInjector:
             # Store configuration in Parameter Store for easy retrieval
             self._store_parameter_store_config(config.application_name, env_vars, config.environment)
             
+            # Readers must see the freshly published configuration
+            self.invalidate_cache(config.application_name, config.environment)
+            
             result = InjectionResult(
                 success=True,
                 environment_variables=env_vars,
@@ -325,7 +364,11 @@ class ConnectionInjector:
     
     def _store_parameter_store_config(self, application_name: str, env_vars: Dict[str, str], 
                                     environment: EnvironmentType):
-        """Store non-sensitive configuration in Parameter Store"""
+        """Store non-sensitive configuration in Parameter Store
+        
+        Parameters are written in parallel (bounded by ``max_parallel_writes``)
+        and each write backs off and retries when SSM throttles the burst.
+        """
         
         # Non-sensitive configuration variables
         non_sensitive_vars = {
@@ -334,71 +377,154 @@ class ConnectionInjector:
             and not any(pattern in key.lower() for pattern in ['host', 'uri', 'url'])  # These go to secrets
         }
         
-        parameter_prefix = f"/codeflowops/{application_name}/{environment.value}/database"
+        if not non_sensitive_vars:
+            return
         
-        for key, value in non_sensitive_vars.items():
-            parameter_name = f"{parameter_prefix}/{key.lower()}"
+        parameter_prefix = f"/codeflowops/{application_name}/{environment.value}/database"
+        tags = [
+            {'Key': 'Application', 'Value': application_name},
+            {'Key': 'Environment', 'Value': environment.value},
+            {'Key': 'ManagedBy', 'Value': 'CodeFlowOps-Phase3'}
+        ]
+        
+        stored = 0
+        workers = min(self.max_parallel_writes, len(non_sensitive_vars))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._put_parameter_with_retry, f"{parameter_prefix}/{key.lower()}", value, tags):
+                    f"{parameter_prefix}/{key.lower()}"
+                for key, value in non_sensitive_vars.items()
+            }
             
+            for future in as_completed(futures):
+                parameter_name = futures[future]
+                try:
+                    future.result()
+                    stored += 1
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to store parameter {parameter_name}: {e}")
+        
+        self.invalidate_cache(application_name, environment)
+        logger.info(f"✅ Stored {stored}/{len(non_sensitive_vars)} parameters in Parameter Store")
+    
+    def _put_parameter_with_retry(self, parameter_name: str, value: str, tags: List[Dict[str, str]]):
+        """Write a single parameter, retrying with jittered exponential backoff on throttling"""
+        
+        attempt = 0
+        while True:
             try:
-                self.ssm.put_parameter(
-                    Name=parameter_name,
-                    Value=value,
-                    Type='String',
-                    Overwrite=True,
-                    Tags=[
-                        {'Key': 'Application', 'Value': application_name},
-                        {'Key': 'Environment', 'Value': environment.value},
-                        {'Key': 'ManagedBy', 'Value': 'CodeFlowOps-Phase3'}
-                    ]
-                )
+                try:
+                    return self.ssm.put_parameter(
+                        Name=parameter_name,
+                        Value=value,
+                        Type='String',
+                        Tags=tags
+                    )
+                except self.ssm.exceptions.ParameterAlreadyExists:
+                    # Tags cannot be combined with Overwrite, so existing parameters are updated untagged
+                    return self.ssm.put_parameter(
+                        Name=parameter_name,
+                        Value=value,
+                        Type='String',
+                        Overwrite=True
+                    )
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code', '')
+                if error_code not in THROTTLING_ERROR_CODES or attempt >= self.max_write_retries:
+                    raise
                 
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to store parameter {parameter_name}: {e}")
+                delay = min(0.2 * (2 ** attempt), 10.0) * random.uniform(0.5, 1.5)
+                attempt += 1
+                logger.debug(f"⏳ Throttled writing {parameter_name}, retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+    
+    def invalidate_cache(self, application_name: str, environment: EnvironmentType):
+        """Drop cached secrets/parameters for an application and bump its cache version"""
+        
+        scope = (application_name, environment.value)
+        with self._cache_lock:
+            self._cache_versions[scope] = self._cache_versions.get(scope, 0) + 1
+            for kind in ('secrets', 'parameters'):
+                self._cache.pop((kind, application_name, environment.value), None)
+    
+    def _cached_read(self, kind: str, application_name: str, environment: EnvironmentType,
+                     loader) -> Dict[str, str]:
+        """Read-through cache shared by secret and parameter retrieval
+        
+        ``loader`` returns ``(values, cacheable)``; failed reads are not cached.
+        """
+        
+        cache_key = (kind, application_name, environment.value)
+        scope = (application_name, environment.value)
+        
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+            version = self._cache_versions.get(scope, 0)
+            if entry and entry.version == version and entry.expires_at > time.monotonic():
+                return dict(entry.values)
+        
+        values, cacheable = loader()
+        
+        if cacheable and self.cache_ttl_seconds > 0:
+            with self._cache_lock:
+                # Only populate if no write invalidated the scope while we were loading
+                if self._cache_versions.get(scope, 0) == version:
+                    self._cache[cache_key] = CachedConfig(
+                        values=dict(values),
+                        version=version,
+                        expires_at=time.monotonic() + self.cache_ttl_seconds
+                    )
         
-        logger.info(f"✅ Stored {len(non_sensitive_vars)} parameters in Parameter Store")
+        return values
     
     def retrieve_connection_secrets(self, application_name: str, environment: EnvironmentType) -> Dict[str, str]:
-        """Retrieve connection secrets from AWS Secrets Manager"""
+        """Retrieve connection secrets from AWS Secrets Manager (cached)"""
         
         secret_name = f"codeflowops/{application_name}/{environment.value}/database"
         
-        try:
-            response = self.secrets_manager.get_secret_value(SecretId=secret_name)
-            secrets = json.loads(response['SecretString'])
-            
-            logger.info(f"✅ Retrieved connection secrets for {application_name}")
-            return secrets
-            
-        except self.secrets_manager.exceptions.ResourceNotFoundException:
-            logger.error(f"❌ Connection secrets not found for {application_name}")
-            return {}
-        except Exception as e:
-            logger.error(f"❌ Failed to retrieve connection secrets: {e}")
-            return {}
+        def load() -> Tuple[Dict[str, str], bool]:
+            try:
+                response = self.secrets_manager.get_secret_value(SecretId=secret_name)
+                secrets = json.loads(response['SecretString'])
+                
+                logger.info(f"✅ Retrieved connection secrets for {application_name}")
+                return secrets, True
+                
+            except self.secrets_manager.exceptions.ResourceNotFoundException:
+                logger.error(f"❌ Connection secrets not found for {application_name}")
+                return {}, False
+            except Exception as e:
+                logger.error(f"❌ Failed to retrieve connection secrets: {e}")
+                return {}, False
+        
+        return self._cached_read('secrets', application_name, environment, load)
     
     def retrieve_connection_parameters(self, application_name: str, environment: EnvironmentType) -> Dict[str, str]:
-        """Retrieve connection parameters from Parameter Store"""
+        """Retrieve connection parameters from Parameter Store (cached)"""
         
         parameter_prefix = f"/codeflowops/{application_name}/{environment.value}/database"
         
-        try:
-            response = self.ssm.get_parameters_by_path(
-                Path=parameter_prefix,
-                Recursive=True,
-                WithDecryption=True
-            )
-            
-            parameters = {}
-            for param in response['Parameters']:
-                key = param['Name'].split('/')[-1].upper()
-                parameters[key] = param['Value']
-            
-            logger.info(f"✅ Retrieved {len(parameters)} connection parameters for {application_name}")
-            return parameters
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to retrieve connection parameters: {e}")
-            return {}
+        def load() -> Tuple[Dict[str, str], bool]:
+            try:
+                parameters = {}
+                paginator = self.ssm.get_paginator('get_parameters_by_path')
+                for page in paginator.paginate(
+                    Path=parameter_prefix,
+                    Recursive=True,
+                    WithDecryption=True
+                ):
+                    for param in page['Parameters']:
+                        key = param['Name'].split('/')[-1].upper()
+                        parameters[key] = param['Value']
+                
+                logger.info(f"✅ Retrieved {len(parameters)} connection parameters for {application_name}")
+                return parameters, True
+                
+            except Exception as e:
+                logger.error(f"❌ Failed to retrieve connection parameters: {e}")
+                return {}, False
+        
+        return self._cached_read('parameters', application_name, environment, load)
     
     def get_runtime_environment_variables(self, application_name: str, 
                                         environment: EnvironmentType, 
@@ -472,18 +598,23 @@ class ConnectionInjector:
             
             # Delete parameters
             parameter_prefix = f"/codeflowops/{application_name}/{environment.value}/database"
-            parameters_response = self.ssm.get_parameters_by_path(
-                Path=parameter_prefix,
-                Recursive=True
-            )
+            paginator = self.ssm.get_paginator('get_parameters_by_path')
+            parameter_names = [
+                param['Name']
+                for page in paginator.paginate(Path=parameter_prefix, Recursive=True)
+                for param in page['Parameters']
+            ]
             
-            parameter_names = [param['Name'] for param in parameters_response['Parameters']]
+            # DeleteParameters accepts at most 10 names per call
+            for i in range(0, len(parameter_names), 10):
+                self.ssm.delete_parameters(Names=parameter_names[i:i + 10])
             if parameter_names:
-                self.ssm.delete_parameters(Names=parameter_names)
                 logger.info(f"✅ Deleted {len(parameter_names)} parameters")
             
         except Exception as e:
             logger.warning(f"⚠️ Cleanup warning: {e}")
+        finally:
+            self.invalidate_cache(application_name, environment)
 
 
 # Example usage and testing
@@ -6,7 +6,7 @@ Multi-database deployment support with production hardening
 Enterprise-grade database provisioning with RDS Proxy, VPC endpoints, and security
 """
 
-import boto3
+from .aws_clients import get_aws_client
 import logging
 import json
 from dataclasses import dataclass, field
@@ -85,11 +85,11 @@ class DatabaseProvisioner:
         self.region = region
         
         # AWS clients
-        self.ec2 = boto3.client('ec2', region_name=region)
-        self.rds = boto3.client('rds', region_name=region)
-        self.secrets_manager = boto3.client('secretsmanager', region_name=region)
-        self.iam = boto3.client('iam', region_name=region)
-        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
+        self.ec2 = get_aws_client('ec2', region_name=region)
+        self.rds = get_aws_client('rds', region_name=region)
+        self.secrets_manager = get_aws_client('secretsmanager', region_name=region)
+        self.iam = get_aws_client('iam', region_name=region)
+        self.cloudwatch = get_aws_client('cloudwatch', region_name=region)
         
         # Database providers from Phase 2
         self.providers = {
@@ -11,11 +11,12 @@ Cross-component dependency management with service discovery
 import asyncio
 import logging
 import json
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-import boto3
+from .aws_clients import get_aws_client
 
 logger = logging.getLogger(__name__)
 
@@ -95,18 +96,28 @@ class DependencyManager:
     ✅ Dynamic service discovery with health monitoring
     """
     
-    def __init__(self, region: str = 'us-east-1'):
+    def __init__(self, region: str = 'us-east-1', max_concurrency: int = 10,
+                 health_check_interval_seconds: int = 60):
         self.region = region
         
+        # Bounds how many dependencies are resolved / health-checked at once
+        self.max_concurrency = max(1, max_concurrency)
+        self.health_check_interval_seconds = health_check_interval_seconds
+        
         # AWS services
-        self.ssm_client = boto3.client('ssm', region_name=region)
-        self.secretsmanager_client = boto3.client('secretsmanager', region_name=region)
-        self.servicediscovery_client = boto3.client('servicediscovery', region_name=region)
+        self.ssm_client = get_aws_client('ssm', region_name=region)
+        self.secretsmanager_client = get_aws_client('secretsmanager', region_name=region)
+        self.servicediscovery_client = get_aws_client('servicediscovery', region_name=region)
         
         # Internal state
         self.dependency_graphs: Dict[str, DependencyGraph] = {}
         self.service_registry: Dict[str, ServiceEndpoint] = {}
         
+        # Periodic batched health monitoring
+        self.monitored_deployments: Set[str] = set()
+        self.latest_health: Dict[str, Dict[str, Any]] = {}
+        self._health_monitor_task: Optional[asyncio.Task] = None
+        
         logger.info(f"🔗 Dependency Manager initialized for region: {region}")
     
     async def create_dependency_graph(self, deployment_id: str, components: Dict[str, Dict[str, Any]]) -> DependencyGraph:
@@ -137,10 +148,15 @@ class DependencyManager:
         logger.info(f"✅ Dependency graph created with {len(dependency_graph.components)} components")
         return dependency_graph
     
-    async def resolve_dependencies(self, deployment_id: str) -> bool:
+    async def resolve_dependencies(self, deployment_id: str, verify_health: bool = False) -> bool:
         """
         Resolve all dependencies in the dependency graph
         ✅ Complete dependency resolution with service discovery
+        ✅ Independent components in a topological level resolve concurrently
+        
+        Args:
+            deployment_id: Deployment whose graph should be resolved
+            verify_health: Also health-check each dependency right after it resolves
         """
         
         logger.info(f"🔧 Resolving dependencies for deployment: {deployment_id}")
@@ -150,25 +166,49 @@ class DependencyManager:
         
         dependency_graph = self.dependency_graphs[deployment_id]
         
-        # Calculate resolution order based on dependencies
-        resolution_order = await self._calculate_resolution_order(dependency_graph)
+        # Group components into levels; a level only depends on earlier levels
+        resolution_levels = await self._calculate_resolution_levels(dependency_graph)
         
-        logger.info(f"📊 Dependency resolution order: {resolution_order}")
+        logger.info(f"📊 Dependency resolution levels: {resolution_levels}")
         
-        # Resolve dependencies in order
-        for component_name in resolution_order:
-            component_dependencies = dependency_graph.components[component_name]
-            
-            logger.info(f"🔧 Resolving dependencies for component: {component_name}")
-            
-            for dependency in component_dependencies:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        health_session = None
+        if verify_health:
+            import aiohttp
+            health_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        
+        async def resolve(dependency: ComponentDependency) -> Tuple[ComponentDependency, bool]:
+            async with semaphore:
                 resolved = await self._resolve_single_dependency(dependency, dependency_graph)
+                if resolved and verify_health:
+                    resolved = await self._check_dependency_health(dependency, health_session)
+                return dependency, resolved
+        
+        try:
+            for level_index, level in enumerate(resolution_levels):
+                logger.info(f"🔧 Resolving level {level_index}: {level}")
+                
+                level_dependencies = [
+                    dependency
+                    for component_name in level
+                    for dependency in dependency_graph.components[component_name]
+                ]
+                results = await asyncio.gather(*(resolve(dependency) for dependency in level_dependencies))
                 
-                if not resolved and dependency.required:
-                    logger.error(f"❌ Failed to resolve required dependency: {dependency.name}")
+                failed_required = False
+                for dependency, resolved in results:
+                    if not resolved and dependency.required:
+                        logger.error(f"❌ Failed to resolve required dependency: {dependency.name}")
+                        failed_required = True
+                    elif resolved:
+                        logger.info(f"✅ Resolved dependency: {dependency.name}")
+                
+                # Later levels depend on this one, so stop at the first failing level
+                if failed_required:
                     return False
-                elif resolved:
-                    logger.info(f"✅ Resolved dependency: {dependency.name}")
+        finally:
+            if health_session is not None:
+                await health_session.close()
         
         # Update dependency graph status
         dependency_graph.resolution_status = "resolved"
@@ -296,6 +336,17 @@ class DependencyManager:
         if deployment_id not in self.dependency_graphs:
             raise Exception(f"Dependency graph not found for deployment: {deployment_id}")
         
+        import aiohttp
+        
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            return await self._collect_dependency_health(
+                deployment_id, session, asyncio.Semaphore(self.max_concurrency)
+            )
+    
+    async def _collect_dependency_health(self, deployment_id: str, session: Any,
+                                         semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Health-check every dependency of a deployment concurrently"""
+        
         dependency_graph = self.dependency_graphs[deployment_id]
         health_status = {
             'deployment_id': deployment_id,
@@ -304,14 +355,23 @@ class DependencyManager:
             'checked_at': datetime.utcnow().isoformat()
         }
         
+        async def check(dependency: ComponentDependency) -> bool:
+            async with semaphore:
+                return await self._check_dependency_health(dependency, session)
+        
+        checks = {
+            component_name: asyncio.gather(*(check(dependency) for dependency in dependencies))
+            for component_name, dependencies in dependency_graph.components.items()
+        }
+        component_results = dict(zip(checks.keys(), await asyncio.gather(*checks.values())))
+        
         for component_name, dependencies in dependency_graph.components.items():
             component_health = {
                 'healthy': True,
                 'dependencies': []
             }
             
-            for dependency in dependencies:
-                dep_health = await self._check_dependency_health(dependency)
+            for dependency, dep_health in zip(dependencies, component_results[component_name]):
                 component_health['dependencies'].append({
                     'name': dependency.name,
                     'type': dependency.type.value,
@@ -328,6 +388,68 @@ class DependencyManager:
         
         return health_status
     
+    def start_health_monitoring(self, deployment_id: str):
+        """
+        Add a deployment to periodic batched health monitoring
+        ✅ One background loop checks every monitored deployment per interval
+        """
+        
+        if deployment_id not in self.dependency_graphs:
+            raise Exception(f"Dependency graph not found for deployment: {deployment_id}")
+        
+        self.monitored_deployments.add(deployment_id)
+        
+        if self._health_monitor_task is None or self._health_monitor_task.done():
+            self._health_monitor_task = asyncio.create_task(self._health_monitor_loop())
+            logger.info(f"🏥 Started periodic dependency health monitoring "
+                        f"(every {self.health_check_interval_seconds}s)")
+    
+    async def stop_health_monitoring(self, deployment_id: Optional[str] = None):
+        """Stop monitoring one deployment, or all of them when no ID is given"""
+        
+        if deployment_id is None:
+            self.monitored_deployments.clear()
+        else:
+            self.monitored_deployments.discard(deployment_id)
+            self.latest_health.pop(deployment_id, None)
+        
+        if not self.monitored_deployments and self._health_monitor_task:
+            self._health_monitor_task.cancel()
+            try:
+                await self._health_monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._health_monitor_task = None
+    
+    async def _health_monitor_loop(self):
+        """Periodically health-check all monitored deployments in one batch"""
+        
+        import aiohttp
+        
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            while self.monitored_deployments:
+                started = asyncio.get_running_loop().time()
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                deployment_ids = [
+                    deployment_id for deployment_id in self.monitored_deployments
+                    if deployment_id in self.dependency_graphs
+                ]
+                
+                results = await asyncio.gather(
+                    *(self._collect_dependency_health(deployment_id, session, semaphore)
+                      for deployment_id in deployment_ids),
+                    return_exceptions=True
+                )
+                
+                for deployment_id, result in zip(deployment_ids, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Dependency health check failed for {deployment_id}: {result}")
+                    else:
+                        self.latest_health[deployment_id] = result
+                
+                elapsed = asyncio.get_running_loop().time() - started
+                await asyncio.sleep(max(0.0, self.health_check_interval_seconds - elapsed))
+    
     async def update_dependency(self, deployment_id: str, component_name: str, dependency_name: str, 
                               new_endpoint: ServiceEndpoint) -> bool:
         """
@@ -463,6 +585,16 @@ class DependencyManager:
     async def _calculate_resolution_order(self, dependency_graph: DependencyGraph) -> List[str]:
         """Calculate optimal dependency resolution order using topological sort"""
         
+        levels = await self._calculate_resolution_levels(dependency_graph)
+        return [component for level in levels for component in level]
+    
+    async def _calculate_resolution_levels(self, dependency_graph: DependencyGraph) -> List[List[str]]:
+        """Group components into topological levels (Kahn's algorithm, level by level)
+        
+        Every component in a level only depends on components from earlier
+        levels, so a whole level can be resolved concurrently.
+        """
+        
         # Build in-degree count
         in_degree = {component: 0 for component in dependency_graph.components}
         adjacency = {component: [] for component in dependency_graph.components}
@@ -474,23 +606,29 @@ class DependencyManager:
                     adjacency[dep_component].append(component_name)
                     in_degree[component_name] += 1
         
-        # Topological sort
-        queue = [component for component, degree in in_degree.items() if degree == 0]
-        resolution_order = []
+        # Topological sort, one level at a time
+        current_level = deque(component for component, degree in in_degree.items() if degree == 0)
+        levels: List[List[str]] = []
+        resolved_count = 0
         
-        while queue:
-            current = queue.pop(0)
-            resolution_order.append(current)
+        while current_level:
+            levels.append(list(current_level))
+            resolved_count += len(current_level)
+            next_level = deque()
+            
+            while current_level:
+                current = current_level.popleft()
+                for neighbor in adjacency[current]:
+                    in_degree[neighbor] -= 1
+                    if in_degree[neighbor] == 0:
+                        next_level.append(neighbor)
             
-            for neighbor in adjacency[current]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
+            current_level = next_level
         
-        if len(resolution_order) != len(dependency_graph.components):
+        if resolved_count != len(dependency_graph.components):
             raise Exception("Cannot resolve dependencies due to circular references")
         
-        return resolution_order
+        return levels
     
     async def _resolve_single_dependency(self, dependency: ComponentDependency, dependency_graph: DependencyGraph) -> bool:
         """Resolve a single dependency"""
@@ -538,8 +676,11 @@ class DependencyManager:
             logger.error(f"❌ Failed to resolve dependency {dependency.name}: {str(e)}")
             return False
     
-    async def _check_dependency_health(self, dependency: ComponentDependency) -> bool:
-        """Check health of a single dependency"""
+    async def _check_dependency_health(self, dependency: ComponentDependency, session: Any = None) -> bool:
+        """Check health of a single dependency
+        
+        Batched callers pass a shared aiohttp session so checks reuse connections.
+        """
         
         if dependency.status != DependencyStatus.RESOLVED or not dependency.endpoint:
             return False
@@ -552,7 +693,11 @@ class DependencyManager:
                 health_url += f":{dependency.endpoint.port}"
             health_url += dependency.endpoint.health_check_path
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            owns_session = session is None
+            if owns_session:
+                session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+            
+            try:
                 async with session.get(health_url) as response:
                     is_healthy = response.status == 200
                     dependency.last_health_check = datetime.utcnow()
@@ -563,6 +708,9 @@ class DependencyManager:
                         dependency.error_message = None
                     
                     return is_healthy
+            finally:
+                if owns_session:
+                    await session.close()
                     
         except Exception as e:
             dependency.error_message = str(e)
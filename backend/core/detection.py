@@ -0,0 +1,393 @@
+"""
+Declarative stack detection rules and the single-pass repository index
+"""
+import os
+import re
+import json
+import logging
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directories that never decide the stack but can hold most of a checkout's files
+PRUNED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "jspm_packages", "vendor",
+    "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", ".next", ".nuxt",
+    ".gradle", "Pods", ".terraform", ".idea", ".vscode"
+})
+DEFAULT_MAX_ENTRIES = 100_000
+MAX_READ_BYTES = 256 * 1024
+MAX_CONTENT_FILES = 20
+
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+@lru_cache(maxsize=512)
+def _glob_regex(pattern: str) -> "re.Pattern":
+    """Regex for a pathlib-style glob over POSIX relative paths (``**`` spans directories)"""
+    parts = []
+    for segment in pattern.strip("/").split("/"):
+        if segment == "**":
+            parts.append("(?:[^/]+/)*")
+            continue
+        regex = ""
+        i = 0
+        while i < len(segment):
+            char = segment[i]
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[" and "]" in segment[i + 1:]:
+                end = segment.index("]", i + 1)
+                regex += "[" + segment[i + 1:end].replace("!", "^", 1) + "]"
+                i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+        parts.append(regex + "/")
+    return re.compile("".join(parts)[:-1] + r"\Z")
+
+
+def _is_literal(pattern: str) -> bool:
+    return not any(char in pattern for char in "*?[")
+
+
+def _last_suffix(tail: str) -> str:
+    """".component.ts" -> ".ts" (os.path.splitext treats ".py" as having no suffix)"""
+    return "." + tail.rsplit(".", 1)[1]
+
+
+class RepoIndex:
+    """
+    Every file and directory of a repository, collected in one walk
+    
+    Dependency and tool directories (``PRUNED_DIRS``) are not descended
+    into. Lookups by exact path, name and suffix are dictionary hits, so
+    detectors can ask for ``**/*.php`` or ``AndroidManifest.xml`` anywhere
+    without walking the tree again.
+    """
+    
+    def __init__(self, root: Path, pruned_dirs: Iterable[str] = PRUNED_DIRS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.root = Path(root)
+        self.pruned_dirs = frozenset(pruned_dirs)
+        self.max_entries = max_entries
+        self.truncated = False
+        self.entries: Dict[str, bool] = {}  # relative POSIX path -> is_dir
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_suffix: Dict[str, List[str]] = {}
+        self._text_cache: Dict[str, Optional[str]] = {}
+        self._json_cache: Dict[str, Optional[Any]] = {}
+        self._dependency_cache: Dict[str, Set[str]] = {}
+        self._walk()
+    
+    def _walk(self):
+        if not self.root.is_dir():
+            return
+        stack = [("", str(self.root))]
+        while stack:
+            prefix, directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    children = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            for entry in children:
+                if len(self.entries) >= self.max_entries:
+                    self.truncated = True
+                    logger.warning(
+                        f"⚠️ Repository index of {self.root} stopped at {self.max_entries} entries; "
+                        f"lookups past that point will miss files"
+                    )
+                    return
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                rel = prefix + entry.name
+                self.entries[rel] = is_dir
+                self._by_name.setdefault(entry.name, []).append(rel)
+                suffix = os.path.splitext(entry.name)[1]
+                if suffix:
+                    self._by_suffix.setdefault(suffix, []).append(rel)
+                if is_dir and entry.name not in self.pruned_dirs:
+                    stack.append((rel + "/", entry.path))
+    
+    @property
+    def files(self) -> List[str]:
+        return [rel for rel, is_dir in self.entries.items() if not is_dir]
+    
+    def exists(self, rel: str) -> bool:
+        return rel.strip("/") in self.entries
+    
+    def is_dir(self, rel: str) -> bool:
+        return self.entries.get(rel.strip("/")) is True
+    
+    def is_file(self, rel: str) -> bool:
+        return self.entries.get(rel.strip("/")) is False
+    
+    def match(self, pattern: str, files_only: bool = False) -> List[str]:
+        """Relative paths matching a pathlib-style glob, in walk order"""
+        pattern = pattern.strip("/")
+        if _is_literal(pattern):
+            candidates = [pattern] if pattern in self.entries else []
+        elif pattern.startswith("**/") and _is_literal(pattern[3:]) and "/" not in pattern[3:]:
+            candidates = self._by_name.get(pattern[3:], [])
+        elif pattern.startswith("**/*") and "/" not in pattern[4:] and _is_literal(pattern[4:]) and "." in pattern[4:]:
+            tail = pattern[4:]
+            candidates = [rel for rel in self._by_suffix.get(_last_suffix(tail), []) if rel.endswith(tail)]
+        else:
+            regex = _glob_regex(pattern)
+            candidates = [rel for rel in self.entries if regex.match(rel)]
+        if files_only:
+            return [rel for rel in candidates if not self.entries[rel]]
+        return list(candidates)
+    
+    def glob(self, pattern: str, files_only: bool = False) -> List[Path]:
+        """Drop-in for ``Path.glob`` (without descending into pruned directories)"""
+        return [self.root / rel for rel in self.match(pattern, files_only)]
+    
+    def rglob(self, pattern: str, files_only: bool = False) -> List[Path]:
+        """Drop-in for ``Path.rglob``"""
+        return self.glob("**/" + pattern, files_only)
+    
+    def extension_counts(self, exclude_prefix: Optional[str] = ".git") -> Dict[str, int]:
+        """File counts by lower-cased suffix, skipping paths with a part starting with ``exclude_prefix``"""
+        counts: Dict[str, int] = {}
+        for rel, is_dir in self.entries.items():
+            if is_dir or (exclude_prefix and any(part.startswith(exclude_prefix) for part in rel.split("/"))):
+                continue
+            ext = os.path.splitext(rel)[1].lower()
+            counts[ext] = counts.get(ext, 0) + 1
+        return counts
+    
+    def read_text(self, rel: str, max_bytes: int = MAX_READ_BYTES) -> Optional[str]:
+        """File contents (cached); None when missing, unreadable or larger than ``max_bytes``"""
+        if rel not in self._text_cache:
+            content = None
+            path = self.root / rel
+            try:
+                if path.stat().st_size <= max_bytes:
+                    content = path.read_text(encoding="utf-8", errors="ignore")
+            except OSError:
+                pass
+            self._text_cache[rel] = content
+        return self._text_cache[rel]
+    
+    def read_json(self, rel: str) -> Optional[Any]:
+        if rel not in self._json_cache:
+            content = self.read_text(rel)
+            try:
+                self._json_cache[rel] = json.loads(content) if content else None
+            except ValueError:
+                self._json_cache[rel] = None
+        return self._json_cache[rel]
+    
+    def dependencies(self, manifest: str) -> Set[str]:
+        """Declared dependency names of a root package.json, composer.json or requirements.txt"""
+        if manifest not in self._dependency_cache:
+            names: Set[str] = set()
+            if manifest.endswith(".json"):
+                data = self.read_json(manifest)
+                if isinstance(data, dict):
+                    sections = ("require", "require-dev") if manifest == "composer.json" else \
+                        ("dependencies", "devDependencies", "peerDependencies")
+                    for section in sections:
+                        if isinstance(data.get(section), dict):
+                            names.update(data[section])
+            else:
+                for line in (self.read_text(manifest) or "").splitlines():
+                    found = _REQUIREMENT_NAME.match(line)
+                    if found and not line.lstrip().startswith(("#", "-")):
+                        names.add(found.group(1).lower().replace("_", "-"))
+            self._dependency_cache[manifest] = names
+        return self._dependency_cache[manifest]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One detection signal
+    
+    kind is ``glob`` (a path pattern, literal paths included), ``dependency``
+    (a name declared in ``manifest``) or ``content`` (``regex`` found in a
+    file matching ``pattern``). A stack with required rules is only a
+    candidate when at least one of them matches.
+    """
+    kind: str
+    pattern: str
+    weight: float = 1.0
+    required: bool = False
+    manifest: str = "package.json"
+    regex: Optional[str] = None
+
+
+def has_path(pattern: str, weight: float = 1.0, required: bool = False) -> Rule:
+    return Rule("glob", pattern, weight, required)
+
+
+def has_dependency(name: str, manifest: str = "package.json", weight: float = 1.0, required: bool = False) -> Rule:
+    return Rule("dependency", name, weight, required, manifest=manifest)
+
+
+def has_content(pattern: str, regex: str, weight: float = 1.0, required: bool = False) -> Rule:
+    return Rule("content", pattern, weight, required, regex=regex)
+
+
+@dataclass
+class StackRules:
+    """Detection rules of one stack; a candidate needs at least ``min_score``"""
+    stack: str
+    rules: List[Rule]
+    min_score: float = 0.0
+
+
+@dataclass
+class Candidate:
+    stack: str
+    score: float
+    confidence: float
+    evidence: List[str] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stack": self.stack, "score": self.score, "confidence": self.confidence, "evidence": self.evidence}
+
+
+class RuleMatcher:
+    """
+    Rules of every stack compiled into lookup tables
+    
+    ``match`` makes one pass over a ``RepoIndex``: each path is checked with
+    a dictionary lookup by exact path, by name and by suffix, and only the
+    globs that need it are tried as regular expressions. Dependency rules
+    read each manifest once and content rules only open files whose path
+    already matched.
+    """
+    
+    def __init__(self, rule_sets: Iterable[StackRules]):
+        self.rule_sets = list(rule_sets)
+        self._exact: Dict[str, List[Tuple[int, int]]] = {}
+        self._by_name: Dict[str, List[Tuple[int, int]]] = {}
+        self._by_suffix: Dict[str, List[Tuple[str, int, int]]] = {}
+        self._regexes: List[Tuple["re.Pattern", int, int]] = []
+        self._dependencies: List[Tuple[str, str, int, int]] = []
+        self._content: Dict[Tuple[int, int], "re.Pattern"] = {}
+        
+        for si, rule_set in enumerate(self.rule_sets):
+            for ri, rule in enumerate(rule_set.rules):
+                if rule.kind == "dependency":
+                    self._dependencies.append((rule.manifest, rule.pattern, si, ri))
+                    continue
+                if rule.kind == "content":
+                    self._content[(si, ri)] = re.compile(rule.regex, re.MULTILINE)
+                pattern = rule.pattern.strip("/")
+                tail = pattern[3:] if pattern.startswith("**/") else None
+                if _is_literal(pattern):
+                    self._exact.setdefault(pattern, []).append((si, ri))
+                elif tail and "/" not in tail and _is_literal(tail):
+                    self._by_name.setdefault(tail, []).append((si, ri))
+                elif tail and tail.startswith("*") and "/" not in tail and _is_literal(tail[1:]) and "." in tail:
+                    suffix = _last_suffix(tail[1:])
+                    self._by_suffix.setdefault(suffix, []).append((tail[1:], si, ri))
+                else:
+                    self._regexes.append((_glob_regex(pattern), si, ri))
+    
+    def match(self, index: RepoIndex) -> List[Candidate]:
+        """Scored candidates, best first"""
+        hits: Dict[Tuple[int, int], List[str]] = {}
+        
+        for rel in index.entries:
+            name = rel.rsplit("/", 1)[-1]
+            for key in self._exact.get(rel, ()):
+                hits.setdefault(key, []).append(rel)
+            for key in self._by_name.get(name, ()):
+                hits.setdefault(key, []).append(rel)
+            for tail, si, ri in self._by_suffix.get(os.path.splitext(name)[1], ()):
+                if name.endswith(tail):
+                    hits.setdefault((si, ri), []).append(rel)
+            for regex, si, ri in self._regexes:
+                if regex.match(rel):
+                    hits.setdefault((si, ri), []).append(rel)
+        
+        for key, regex in self._content.items():
+            paths = [rel for rel in hits.get(key, []) if not index.entries[rel]][:MAX_CONTENT_FILES]
+            matched = [rel for rel in paths if regex.search(index.read_text(rel) or "")]
+            if matched:
+                hits[key] = matched
+            else:
+                hits.pop(key, None)
+        
+        for manifest, name, si, ri in self._dependencies:
+            if name in index.dependencies(manifest):
+                hits[(si, ri)] = [f"{manifest}: {name}"]
+        
+        candidates = []
+        for si, rule_set in enumerate(self.rule_sets):
+            score, total, evidence, required_hit = 0.0, 0.0, [], False
+            has_required = any(rule.required for rule in rule_set.rules)
+            for ri, rule in enumerate(rule_set.rules):
+                total += max(rule.weight, 0.0)
+                matched = hits.get((si, ri))
+                if not matched:
+                    continue
+                score += rule.weight
+                required_hit = required_hit or rule.required
+                evidence.append(matched[0] if len(matched) == 1 else f"{rule.pattern} ({len(matched)} matches)")
+            if score <= 0 or score < rule_set.min_score or (has_required and not required_hit):
+                continue
+            candidates.append(Candidate(
+                stack=rule_set.stack,
+                score=round(score, 2),
+                confidence=round(min(1.0, score / total), 2) if total else 0.0,
+                evidence=evidence
+            ))
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        return candidates
+
+
+_active_index: ContextVar[Optional[RepoIndex]] = ContextVar("codeflowops_repo_index", default=None)
+
+
+@contextmanager
+def repo_index_scope(index: RepoIndex) -> Iterator[RepoIndex]:
+    """Share ``index`` with every ``get_repo_index`` call for the same repository inside the block"""
+    token = _active_index.set(index)
+    try:
+        yield index
+    finally:
+        _active_index.reset(token)
+
+
+def get_repo_index(repo_dir: Path) -> RepoIndex:
+    """The index of the current detection run, or a fresh one for ``repo_dir``"""
+    active = _active_index.get()
+    if active is not None and (active.root == Path(repo_dir) or active.root.resolve() == Path(repo_dir).resolve()):
+        return active
+    return RepoIndex(Path(repo_dir))
+
+
+def shares_repo_index(param: str) -> Callable:
+    """
+    Run the decorated detector inside a ``repo_index_scope`` for its ``param`` argument
+    
+    Entry points called outside ``StackRegistry.detect_stack`` otherwise
+    build a new index in every helper that asks for one. An index already
+    active for the same repository is reused.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            repo_dir = signature.bind(*args, **kwargs).arguments[param]
+            with repo_index_scope(get_repo_index(Path(repo_dir))):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
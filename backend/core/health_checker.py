@@ -8,7 +8,7 @@ This is a NEW component that adds monitoring without affecting existing deployme
 
 import asyncio
 import aiohttp
-import boto3
+from .aws_clients import get_aws_client
 import json
 import logging
 import time
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime, timedelta
 
+from .metrics_aggregator import get_metric_aggregator
+
 logger = logging.getLogger(__name__)
 
 class HealthStatus(Enum):
@@ -54,9 +56,9 @@ class HealthChecker:
     
     def __init__(self, region: str = 'us-east-1'):
         self.region = region
-        self.cloudwatch = boto3.client('cloudwatch')
-        self.rds = boto3.client('rds')
-        self.elbv2 = boto3.client('elbv2')
+        self.cloudwatch = get_aws_client('cloudwatch')
+        self.rds = get_aws_client('rds')
+        self.elbv2 = get_aws_client('elbv2')
         
         # ✅ Standard health check endpoints
         self.standard_endpoints = [
@@ -321,42 +323,22 @@ class HealthChecker:
         """
         
         try:
-            metrics = []
+            # Recorded into the shared aggregator; the background flusher does the API calls
+            aggregator = get_metric_aggregator()
             
             for result in results:
+                dimensions = {'ServiceName': result.service_name}
+                
                 # Health status metric (1 = healthy, 0 = unhealthy)
                 health_value = 1 if result.status == HealthStatus.HEALTHY else 0
-                
-                metrics.append({
-                    'MetricName': 'ServiceHealth',
-                    'Dimensions': [
-                        {'Name': 'ServiceName', 'Value': result.service_name}
-                    ],
-                    'Value': health_value,
-                    'Unit': 'None',
-                    'Timestamp': result.timestamp
-                })
+                aggregator.record(namespace, 'ServiceHealth', health_value, unit='None',
+                                  dimensions=dimensions, timestamp=result.timestamp)
                 
                 # Response time metric
-                metrics.append({
-                    'MetricName': 'ResponseTime',
-                    'Dimensions': [
-                        {'Name': 'ServiceName', 'Value': result.service_name}
-                    ],
-                    'Value': result.response_time_ms,
-                    'Unit': 'Milliseconds',
-                    'Timestamp': result.timestamp
-                })
-            
-            # Publish in batches (CloudWatch limit is 20 metrics per request)
-            for i in range(0, len(metrics), 20):
-                batch = metrics[i:i+20]
-                self.cloudwatch.put_metric_data(
-                    Namespace=namespace,
-                    MetricData=batch
-                )
+                aggregator.record(namespace, 'ResponseTime', result.response_time_ms, unit='Milliseconds',
+                                  dimensions=dimensions, timestamp=result.timestamp)
             
-            logger.info(f"✅ Published {len(metrics)} metrics to CloudWatch")
+            logger.info(f"✅ Queued {len(results) * 2} metrics for CloudWatch")
             
         except Exception as e:
             logger.error(f"Failed to publish metrics to CloudWatch: {e}")
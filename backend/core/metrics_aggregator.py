@@ -0,0 +1,299 @@
+# Phase 5: Process-wide CloudWatch Metric Aggregation
+# backend/core/metrics_aggregator.py
+
+"""
+Process-wide CloudWatch metric aggregator
+✅ Pre-aggregates identical series into statistic sets (min/max/sum/count) per period
+✅ Flushes in a background thread on size/time triggers, never on the caller's event loop
+✅ Retries throttled or failed PutMetricData calls with exponential backoff
+✅ In-memory sink for tests and local development
+"""
+
+import os
+import time
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# PutMetricData accepts up to 1000 datums per request
+MAX_DATUMS_PER_PUT = 1000
+
+# Units CloudWatch accepts; anything else would fail the whole PutMetricData call
+CLOUDWATCH_UNITS = {
+    "Seconds", "Microseconds", "Milliseconds", "Bytes", "Kilobytes", "Megabytes", "Gigabytes",
+    "Terabytes", "Bits", "Kilobits", "Megabits", "Gigabits", "Terabits", "Percent", "Count",
+    "Bytes/Second", "Kilobytes/Second", "Megabytes/Second", "Gigabytes/Second", "Terabytes/Second",
+    "Bits/Second", "Kilobits/Second", "Megabits/Second", "Gigabits/Second", "Terabits/Second",
+    "Count/Second", "None"
+}
+UNIT_ALIASES = {"percentage": "Percent", "percent": "Percent", "ms": "Milliseconds", "seconds": "Seconds", "count": "Count"}
+
+DimensionsInput = Union[Dict[str, str], List[Dict[str, str]], None]
+SeriesKey = Tuple[Optional[str], str, str, str, Tuple[Tuple[str, str], ...], int]
+
+
+class StatisticSet:
+    """Running min/max/sum/count for one series in one period"""
+    
+    __slots__ = ("minimum", "maximum", "total", "count")
+    
+    def __init__(self):
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.total = 0.0
+        self.count = 0
+    
+    def add(self, value: float):
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.total += value
+        self.count += 1
+    
+    def to_cloudwatch(self) -> Dict[str, float]:
+        return {
+            "SampleCount": float(self.count),
+            "Sum": self.total,
+            "Minimum": self.minimum,
+            "Maximum": self.maximum
+        }
+
+
+class CloudWatchMetricSink:
+    """Writes datums with boto3, one CloudWatch client per region"""
+    
+    def __init__(self):
+        self._clients: Dict[Optional[str], Any] = {}
+        self._lock = threading.Lock()
+    
+    def put(self, region: Optional[str], namespace: str, datums: List[Dict[str, Any]]):
+        self._client(region).put_metric_data(Namespace=namespace, MetricData=datums)
+    
+    def _client(self, region: Optional[str]):
+        with self._lock:
+            client = self._clients.get(region)
+            if client is None:
+                from .aws_clients import get_aws_client
+                client = get_aws_client("cloudwatch", region_name=region)
+                self._clients[region] = client
+            return client
+
+
+class InMemoryMetricSink:
+    """Collects flushed datums instead of calling CloudWatch (tests, local runs)"""
+    
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    
+    def put(self, region: Optional[str], namespace: str, datums: List[Dict[str, Any]]):
+        with self._lock:
+            self.calls.append({"region": region, "namespace": namespace, "datums": list(datums)})
+    
+    def datums(self, namespace: Optional[str] = None, metric_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                datum
+                for call in self.calls
+                if namespace is None or call["namespace"] == namespace
+                for datum in call["datums"]
+                if metric_name is None or datum["MetricName"] == metric_name
+            ]
+    
+    def clear(self):
+        with self._lock:
+            self.calls.clear()
+
+
+class MetricAggregator:
+    """
+    One aggregation buffer shared by every component that emits CloudWatch metrics
+    
+    ``record()`` is cheap, thread-safe and never performs I/O: samples for
+    the same namespace/metric/unit/dimensions within a period are folded
+    into a single statistic set. A daemon thread flushes when
+    ``flush_interval_seconds`` elapses or ``max_series`` series are pending,
+    sending up to 1000 datums per PutMetricData call.
+    """
+    
+    def __init__(
+        self,
+        sink=None,
+        period_seconds: int = 60,
+        flush_interval_seconds: float = 10.0,
+        max_series: int = MAX_DATUMS_PER_PUT,
+        max_retries: int = 4,
+        base_backoff_seconds: float = 0.5
+    ):
+        self.sink = sink or CloudWatchMetricSink()
+        self.period_seconds = period_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_series = max_series
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        
+        self._series: Dict[SeriesKey, StatisticSet] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        self.stats = {
+            "samples_recorded": 0,
+            "datums_sent": 0,
+            "put_calls": 0,
+            "put_retries": 0,
+            "datums_dropped": 0
+        }
+    
+    def record(
+        self,
+        namespace: str,
+        metric_name: str,
+        value: float,
+        unit: str = "Count",
+        dimensions: DimensionsInput = None,
+        timestamp: Optional[datetime] = None,
+        region: Optional[str] = None
+    ):
+        """Fold one sample into its series (non-blocking)"""
+        if timestamp is None:
+            epoch = time.time()
+        elif timestamp.tzinfo is None:
+            epoch = timestamp.replace(tzinfo=timezone.utc).timestamp()  # Callers use naive UTC
+        else:
+            epoch = timestamp.timestamp()
+        period_start = int(epoch // self.period_seconds) * self.period_seconds
+        
+        key = (region, namespace, metric_name, _normalize_unit(unit), _normalize_dimensions(dimensions), period_start)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = StatisticSet()
+            series.add(float(value))
+            self.stats["samples_recorded"] += 1
+            pending = len(self._series)
+        
+        self._ensure_flusher()
+        if pending >= self.max_series:
+            self._wake.set()
+    
+    def flush(self):
+        """Send everything pending now (blocking; safe to call from any thread)"""
+        with self._flush_lock:
+            with self._lock:
+                series, self._series = self._series, {}
+            if not series:
+                return
+            
+            batches: Dict[Tuple[Optional[str], str], List[Dict[str, Any]]] = {}
+            for (region, namespace, metric_name, unit, dimensions, period_start), stats in series.items():
+                datum = {
+                    "MetricName": metric_name,
+                    "Dimensions": [{"Name": name, "Value": value} for name, value in dimensions],
+                    "Timestamp": datetime.fromtimestamp(period_start, tz=timezone.utc),
+                    "StatisticValues": stats.to_cloudwatch(),
+                    "Unit": unit
+                }
+                batches.setdefault((region, namespace), []).append(datum)
+            
+            for (region, namespace), datums in batches.items():
+                for start in range(0, len(datums), MAX_DATUMS_PER_PUT):
+                    self._put_with_retry(region, namespace, datums[start:start + MAX_DATUMS_PER_PUT])
+    
+    def close(self):
+        """Stop the flusher thread and send whatever is still pending"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds + 5)
+            self._thread = None
+        self.flush()
+    
+    def pending_series(self) -> int:
+        with self._lock:
+            return len(self._series)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending_series": self.pending_series()}
+    
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name="metric-aggregator", daemon=True)
+            self._thread.start()
+    
+    def _flush_loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=self.flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ Metric aggregator flush failed: {str(e)}")
+    
+    def _put_with_retry(self, region: Optional[str], namespace: str, datums: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink.put(region, namespace, datums)
+                self.stats["put_calls"] += 1
+                self.stats["datums_sent"] += len(datums)
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.stats["datums_dropped"] += len(datums)
+                    logger.error(f"❌ Dropped {len(datums)} CloudWatch datums for {namespace}: {str(e)}")
+                    return
+                self.stats["put_retries"] += 1
+                delay = self.base_backoff_seconds * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
+
+def _normalize_unit(unit: Optional[str]) -> str:
+    if unit in CLOUDWATCH_UNITS:
+        return unit
+    return UNIT_ALIASES.get(str(unit).lower(), "None")
+
+
+def _normalize_dimensions(dimensions: DimensionsInput) -> Tuple[Tuple[str, str], ...]:
+    """Accept {'Name': value} maps or CloudWatch [{'Name','Value'}] lists; order-independent"""
+    if not dimensions:
+        return ()
+    if isinstance(dimensions, dict):
+        pairs = dimensions.items()
+    else:
+        pairs = ((d["Name"], d["Value"]) for d in dimensions)
+    return tuple(sorted((str(name), str(value)) for name, value in pairs))
+
+
+_metric_aggregator: Optional[MetricAggregator] = None
+_metric_aggregator_lock = threading.Lock()
+
+
+def get_metric_aggregator() -> MetricAggregator:
+    """Process-wide aggregator; CODEFLOWOPS_METRICS_SINK=memory keeps metrics in-process"""
+    global _metric_aggregator
+    if _metric_aggregator is None:
+        with _metric_aggregator_lock:
+            if _metric_aggregator is None:
+                sink = InMemoryMetricSink() if os.getenv("CODEFLOWOPS_METRICS_SINK") == "memory" else None
+                _metric_aggregator = MetricAggregator(sink=sink)
+                atexit.register(_metric_aggregator.close)
+    return _metric_aggregator
+
+
+def set_metric_aggregator(aggregator: Optional[MetricAggregator]):
+    """Replace the process-wide aggregator (e.g. with an InMemoryMetricSink in tests)"""
+    global _metric_aggregator
+    with _metric_aggregator_lock:
+        _metric_aggregator = aggregator
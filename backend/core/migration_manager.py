@@ -8,16 +8,18 @@ Enterprise-grade schema migration system with rollback capabilities
 
 import os
 import re
+import time
+import zlib
 import logging
 import hashlib
 import json
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Iterable
 from pathlib import Path
 from enum import Enum
 
-import boto3
+from .aws_clients import get_aws_client
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,7 @@ class Migration:
     status: MigrationStatus = MigrationStatus.PENDING
     execution_time_ms: Optional[int] = None
     rollback_sql: Optional[str] = None
+    file_path: Optional[str] = None  # Set when the body is streamed from disk instead of held in sql_content
 
 @dataclass
 class MigrationResult:
@@ -61,16 +64,31 @@ class MigrationManager:
     - Cross-database engine support
     - Migration history tracking
     - Rollback capabilities
+    - Streaming parser for large migration files
+    - Batched statement execution (several statements per round trip)
+    - Advisory locking so concurrent deploys never double-apply
     """
     
+    # Files larger than this are streamed from disk instead of being held in memory
+    STREAMING_THRESHOLD_BYTES = 1024 * 1024
+    # Statements are grouped into one round trip up to these limits
+    BATCH_MAX_STATEMENTS = 50
+    BATCH_MAX_BYTES = 256 * 1024
+    # How long a deploy waits for another deploy's migration run to finish
+    LOCK_TIMEOUT_SECONDS = 300
+    STATUS_CACHE_TTL_SECONDS = 30
+    
     def __init__(self, region: str = "us-east-1"):
         self.region = region
-        self.rds = boto3.client('rds', region_name=region)
-        self.secrets_manager = boto3.client('secretsmanager', region_name=region)
+        self.rds = get_aws_client('rds', region_name=region)
+        self.secrets_manager = get_aws_client('secretsmanager', region_name=region)
         
-        # Database connections will be established per migration run
+        # Database connections are reused across calls, keyed by target database
         self.db_connections = {}
         
+        # Cached get_migration_status results: key -> (expires_at, status)
+        self._status_cache: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+        
         logger.info("🔄 Migration manager initialized")
     
     def discover_migrations(self, migrations_path: str) -> List[Migration]:
@@ -117,6 +135,20 @@ class MigrationManager:
         version = match.group(1)
         description = match.group(2).replace('_', ' ')
         
+        if migration_file.stat().st_size > self.STREAMING_THRESHOLD_BYTES:
+            # Large (seed) migrations are checksummed and scanned line by line;
+            # the body is streamed again at execution time
+            checksum, rollback_sql = self._scan_migration_file(migration_file)
+            return Migration(
+                filename=filename,
+                version=version,
+                description=description,
+                sql_content="",
+                checksum=checksum,
+                rollback_sql=rollback_sql,
+                file_path=str(migration_file)
+            )
+        
         # Read migration content
         sql_content = migration_file.read_text(encoding='utf-8')
         
@@ -135,6 +167,36 @@ class MigrationManager:
             rollback_sql=rollback_sql
         )
     
+    def _scan_migration_file(self, migration_file: Path) -> Tuple[str, Optional[str]]:
+        """Checksum a migration file and extract its rollback section without loading it whole"""
+        
+        digest = hashlib.sha256()
+        rollback_lines: List[str] = []
+        in_rollback = False
+        
+        with open(migration_file, 'r', encoding='utf-8', newline='') as f:
+            for line in f:
+                digest.update(line.encode('utf-8'))
+                if self._is_rollback_start(line):
+                    in_rollback = True
+                    continue
+                if in_rollback:
+                    if self._is_rollback_end(line):
+                        in_rollback = False
+                    else:
+                        rollback_lines.append(line)
+        
+        rollback_sql = ''.join(rollback_lines).strip()
+        return digest.hexdigest(), rollback_sql or None
+    
+    @staticmethod
+    def _is_rollback_start(line: str) -> bool:
+        return re.match(r'\s*--\s*ROLLBACK\s*$', line, re.IGNORECASE) is not None
+    
+    @staticmethod
+    def _is_rollback_end(line: str) -> bool:
+        return re.match(r'\s*--\s*END\s*ROLLBACK\s*$', line, re.IGNORECASE) is not None
+    
     def _extract_rollback_sql(self, sql_content: str) -> Optional[str]:
         """Extract rollback SQL from migration content"""
         
@@ -186,6 +248,9 @@ class MigrationManager:
                 )
                 applied_migrations.append(migration)
             
+            # End the read transaction so the reused connection can start a fresh one
+            connection.commit()
+            
             logger.info(f"✅ Found {len(applied_migrations)} applied migrations")
             return applied_migrations
             
@@ -250,16 +315,52 @@ class MigrationManager:
         # Discover all migrations
         all_migrations = self.discover_migrations(migrations_path)
         
-        # Get already applied migrations
+        if dry_run:
+            pending_migrations = self._pending_migrations(all_migrations, db_connection_info, target_version)
+            if not pending_migrations:
+                logger.info("✅ No pending migrations to run")
+            for migration in pending_migrations:
+                logger.info(f"🔍 Would apply: {migration.filename} - {migration.description}")
+            return []
+        
+        connection = self._get_database_connection(db_connection_info)
+        
+        # Serialize concurrent deploys of the same database; the pending set is
+        # computed only after the lock is held so a waiting deploy sees the
+        # migrations the previous holder applied
+        if not self._acquire_migration_lock(connection, db_connection_info):
+            raise TimeoutError(
+                f"Timed out after {self.LOCK_TIMEOUT_SECONDS}s waiting for migration lock on "
+                f"{db_connection_info.get('database')}"
+            )
+        
+        try:
+            return self._run_pending_migrations(connection, all_migrations, db_connection_info, target_version)
+        finally:
+            self._release_migration_lock(connection, db_connection_info)
+            self._invalidate_status_cache(db_connection_info)
+    
+    def _pending_migrations(self, all_migrations: List[Migration], db_connection_info: Dict[str, str],
+                            target_version: Optional[str]) -> List[Migration]:
+        """Determine which discovered migrations still need to be applied"""
+        
         applied_migrations = self.get_applied_migrations(db_connection_info)
-        applied_versions = {m.version for m in applied_migrations}
+        applied_versions = {
+            m.version for m in applied_migrations if m.status == MigrationStatus.COMPLETED
+        }
         
-        # Determine which migrations to run
-        pending_migrations = [
+        return [
             m for m in all_migrations 
             if m.version not in applied_versions and 
             (target_version is None or m.version <= target_version)
         ]
+    
+    def _run_pending_migrations(self, connection: Any, all_migrations: List[Migration],
+                                db_connection_info: Dict[str, str],
+                                target_version: Optional[str]) -> List[MigrationResult]:
+        """Apply pending migrations; the caller must hold the migration lock"""
+        
+        pending_migrations = self._pending_migrations(all_migrations, db_connection_info, target_version)
         
         if not pending_migrations:
             logger.info("✅ No pending migrations to run")
@@ -267,14 +368,8 @@ class MigrationManager:
         
         logger.info(f"📋 Found {len(pending_migrations)} pending migrations")
         
-        if dry_run:
-            for migration in pending_migrations:
-                logger.info(f"🔍 Would apply: {migration.filename} - {migration.description}")
-            return []
-        
         # Execute migrations
         results = []
-        connection = self._get_database_connection(db_connection_info)
         
         for migration in pending_migrations:
             try:
@@ -319,15 +414,10 @@ class MigrationManager:
             # Update migration status to running
             self._update_migration_status(cursor, migration, MigrationStatus.RUNNING, engine)
             
-            # Execute migration SQL
-            statements = self._split_sql_statements(migration.sql_content)
+            # Execute migration SQL, several statements per round trip
             rows_affected = 0
-            
-            for statement in statements:
-                if statement.strip():
-                    cursor.execute(statement)
-                    if hasattr(cursor, 'rowcount'):
-                        rows_affected += cursor.rowcount
+            for batch in self._batch_statements(self._iter_migration_statements(migration)):
+                rows_affected += self._execute_batch(cursor, batch, engine)
             
             # Calculate execution time
             execution_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -375,25 +465,217 @@ class MigrationManager:
     def _split_sql_statements(self, sql_content: str) -> List[str]:
         """Split SQL content into individual statements"""
         
-        # Remove comments and split by semicolon
-        # This is a simplified approach - a real implementation would use a proper SQL parser
-        statements = []
+        return list(self._iter_sql_statements(sql_content.splitlines(keepends=True)))
+    
+    def _iter_migration_statements(self, migration: Migration) -> Iterator[str]:
+        """Yield the forward statements of a migration, streaming from disk when possible"""
+        
+        if migration.file_path:
+            with open(migration.file_path, 'r', encoding='utf-8') as f:
+                yield from self._iter_sql_statements(f, skip_rollback=True)
+        else:
+            yield from self._iter_sql_statements(
+                migration.sql_content.splitlines(keepends=True), skip_rollback=True
+            )
+    
+    def _iter_sql_statements(self, lines: Iterable[str], skip_rollback: bool = False) -> Iterator[str]:
+        """
+        Incrementally split SQL into statements
+        
+        Understands quoted strings/identifiers, ``--``/``#`` line comments,
+        ``/* */`` block comments and PostgreSQL dollar quoting, so semicolons
+        inside function bodies or literals do not end a statement. With
+        ``skip_rollback`` the ``-- ROLLBACK`` ... ``-- END ROLLBACK`` section is
+        not part of the forward migration.
+        """
         
-        for line in sql_content.split('\n'):
-            line = line.strip()
+        buffer: List[str] = []
+        quote: Optional[str] = None       # ', " or ` while inside a quoted token
+        dollar_tag: Optional[str] = None  # e.g. $$ or $body$ while inside a dollar-quoted body
+        in_block_comment = False
+        in_rollback = False
+        
+        for line in lines:
+            if quote is None and dollar_tag is None and not in_block_comment:
+                if skip_rollback:
+                    if in_rollback:
+                        if self._is_rollback_end(line):
+                            in_rollback = False
+                        continue
+                    if self._is_rollback_start(line):
+                        in_rollback = True
+                        continue
+                
+                stripped = line.strip()
+                if stripped.startswith('--') or stripped.startswith('#'):
+                    continue
             
-            # Skip comments
-            if line.startswith('--') or line.startswith('#'):
-                continue
+            i = 0
+            length = len(line)
+            while i < length:
+                char = line[i]
+                
+                if in_block_comment:
+                    if line.startswith('*/', i):
+                        in_block_comment = False
+                        i += 2
+                    else:
+                        i += 1
+                    continue
+                
+                if dollar_tag is not None:
+                    if line.startswith(dollar_tag, i):
+                        buffer.append(dollar_tag)
+                        i += len(dollar_tag)
+                        dollar_tag = None
+                    else:
+                        buffer.append(char)
+                        i += 1
+                    continue
                 
-            if line:
-                statements.append(line)
+                if quote is not None:
+                    buffer.append(char)
+                    if char == '\\' and quote != '`' and i + 1 < length:
+                        buffer.append(line[i + 1])
+                        i += 2
+                        continue
+                    if char == quote:
+                        quote = None
+                    i += 1
+                    continue
+                
+                if char in ("'", '"', '`'):
+                    quote = char
+                    buffer.append(char)
+                    i += 1
+                elif line.startswith('--', i):
+                    break  # Rest of line is a comment
+                elif line.startswith('/*', i):
+                    in_block_comment = True
+                    i += 2
+                elif char == '$':
+                    match = re.match(r'\$[A-Za-z_]*\$', line[i:])
+                    if match:
+                        dollar_tag = match.group(0)
+                        buffer.append(dollar_tag)
+                        i += len(dollar_tag)
+                    else:
+                        buffer.append(char)
+                        i += 1
+                elif char == ';':
+                    statement = ''.join(buffer).strip()
+                    if statement:
+                        yield statement
+                    buffer = []
+                    i += 1
+                else:
+                    buffer.append(char)
+                    i += 1
+            
+            if quote is None and dollar_tag is None and not in_block_comment:
+                # Keep statements on one logical line, as the previous splitter did
+                buffer.append(' ')
+            else:
+                buffer.append('\n')
+        
+        statement = ''.join(buffer).strip()
+        if statement:
+            yield statement
+    
+    def _batch_statements(self, statements: Iterable[str]) -> Iterator[List[str]]:
+        """Group statements so each batch is sent to the server in a single round trip"""
+        
+        batch: List[str] = []
+        batch_bytes = 0
+        
+        for statement in statements:
+            statement_bytes = len(statement)
+            if batch and (len(batch) >= self.BATCH_MAX_STATEMENTS or
+                          batch_bytes + statement_bytes > self.BATCH_MAX_BYTES):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(statement)
+            batch_bytes += statement_bytes
+        
+        if batch:
+            yield batch
+    
+    def _execute_batch(self, cursor: Any, batch: List[str], engine: str) -> int:
+        """Execute a batch of statements in one round trip and return rows affected
+        
+        psycopg2 raises from ``execute`` when any statement of the batch
+        fails. PyMySQL only reports errors of statements 2..N when their
+        result is read with ``nextset()``, so on MySQL every result set is
+        consumed and its errors propagate to fail the migration.
+        """
+        
+        if len(batch) == 1:
+            cursor.execute(batch[0])
+        else:
+            cursor.execute(';\n'.join(batch))
+        
+        rows_affected = max(getattr(cursor, 'rowcount', 0) or 0, 0)
         
-        # Join and split by semicolon
-        full_sql = ' '.join(statements)
-        statements = [stmt.strip() for stmt in full_sql.split(';') if stmt.strip()]
+        # PyMySQL exposes one result per statement when MULTI_STATEMENTS is enabled
+        if engine.startswith('mysql'):
+            while cursor.nextset():
+                rows_affected += max(getattr(cursor, 'rowcount', 0) or 0, 0)
         
-        return statements
+        return rows_affected
+    
+    def _migration_lock_key(self, connection_info: Dict[str, str]) -> str:
+        return f"codeflowops:schema_migrations:{connection_info.get('database', '')}"
+    
+    def _acquire_migration_lock(self, connection: Any, connection_info: Dict[str, str]) -> bool:
+        """Take a session-level advisory lock guarding this database's migrations"""
+        
+        engine = connection_info['engine']
+        lock_key = self._migration_lock_key(connection_info)
+        cursor = connection.cursor()
+        
+        if engine.startswith('postgres'):
+            # pg advisory locks take a bigint key; a stable 32-bit hash is plenty here
+            pg_key = zlib.crc32(lock_key.encode('utf-8'))
+            deadline = time.monotonic() + self.LOCK_TIMEOUT_SECONDS
+            while True:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (pg_key,))
+                acquired = cursor.fetchone()[0]
+                connection.commit()
+                if acquired:
+                    break
+                if time.monotonic() >= deadline:
+                    return False
+                logger.info("⏳ Another deployment is applying migrations, waiting for lock")
+                time.sleep(2)
+        elif engine.startswith('mysql'):
+            # MySQL lock names are limited to 64 characters
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (lock_key[:64], self.LOCK_TIMEOUT_SECONDS))
+            acquired = cursor.fetchone()[0] == 1
+            connection.commit()
+            if not acquired:
+                return False
+        
+        logger.info("🔒 Acquired migration lock")
+        return True
+    
+    def _release_migration_lock(self, connection: Any, connection_info: Dict[str, str]):
+        """Release the advisory lock taken by _acquire_migration_lock"""
+        
+        engine = connection_info['engine']
+        lock_key = self._migration_lock_key(connection_info)
+        
+        try:
+            connection.rollback()  # Clear any aborted transaction before unlocking
+            cursor = connection.cursor()
+            if engine.startswith('postgres'):
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (zlib.crc32(lock_key.encode('utf-8')),))
+            elif engine.startswith('mysql'):
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_key[:64],))
+            connection.commit()
+            logger.info("🔓 Released migration lock")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to release migration lock: {e}")
     
     def _update_migration_status(self, cursor: Any, migration: Migration, status: MigrationStatus, engine: str):
         """Update migration status in tracking table"""
@@ -480,6 +762,30 @@ class MigrationManager:
         results = []
         connection = self._get_database_connection(db_connection_info)
         
+        if not self._acquire_migration_lock(connection, db_connection_info):
+            raise TimeoutError(
+                f"Timed out after {self.LOCK_TIMEOUT_SECONDS}s waiting for migration lock on "
+                f"{db_connection_info.get('database')}"
+            )
+        
+        try:
+            results = self._run_rollbacks(connection, migrations_to_rollback, db_connection_info)
+        finally:
+            self._release_migration_lock(connection, db_connection_info)
+            self._invalidate_status_cache(db_connection_info)
+        
+        # Summary
+        successful = sum(1 for r in results if r.success)
+        logger.info(f"✅ Rollback completed: {successful}/{len(results)} successful")
+        
+        return results
+    
+    def _run_rollbacks(self, connection: Any, migrations_to_rollback: List[Migration],
+                       db_connection_info: Dict[str, str]) -> List[MigrationResult]:
+        """Roll back migrations in order; the caller must hold the migration lock"""
+        
+        results = []
+        
         for migration in migrations_to_rollback:
             try:
                 logger.info(f"🔄 Rolling back migration: {migration.filename}")
@@ -500,10 +806,6 @@ class MigrationManager:
                 results.append(result)
                 break
         
-        # Summary
-        successful = sum(1 for r in results if r.success)
-        logger.info(f"✅ Rollback completed: {successful}/{len(results)} successful")
-        
         return results
     
     def _execute_rollback(self, connection: Any, migration: Migration, engine: str) -> MigrationResult:
@@ -528,11 +830,9 @@ class MigrationManager:
             cursor = connection.cursor()
             
             # Execute rollback SQL
-            statements = self._split_sql_statements(migration.rollback_sql)
-            
-            for statement in statements:
-                if statement.strip():
-                    cursor.execute(statement)
+            statements = self._iter_sql_statements(migration.rollback_sql.splitlines(keepends=True))
+            for batch in self._batch_statements(statements):
+                self._execute_batch(cursor, batch, engine)
             
             # Remove migration record from tracking table
             if engine.startswith('postgres') or engine.startswith('mysql'):
@@ -563,8 +863,35 @@ class MigrationManager:
                 execution_time_ms=int((datetime.now() - start_time).total_seconds() * 1000)
             )
     
+    def _connection_key(self, connection_info: Dict[str, str]) -> Tuple[str, str, str]:
+        return (
+            str(connection_info.get('host')),
+            str(connection_info.get('port')),
+            str(connection_info.get('database'))
+        )
+    
     def _get_database_connection(self, connection_info: Dict[str, str]) -> Any:
-        """Get database connection based on engine type"""
+        """Get database connection based on engine type, reusing an open one when available"""
+        
+        key = self._connection_key(connection_info)
+        connection = self.db_connections.get(key)
+        if connection is not None and self._is_connection_open(connection):
+            return connection
+        
+        connection = self._open_database_connection(connection_info)
+        self.db_connections[key] = connection
+        return connection
+    
+    @staticmethod
+    def _is_connection_open(connection: Any) -> bool:
+        if hasattr(connection, 'closed'):
+            return connection.closed == 0  # psycopg2
+        if hasattr(connection, 'open'):
+            return bool(connection.open)  # pymysql
+        return True
+    
+    def _open_database_connection(self, connection_info: Dict[str, str]) -> Any:
+        """Open a new database connection based on engine type"""
         
         engine = connection_info['engine']
         
@@ -579,17 +906,29 @@ class MigrationManager:
             )
         elif engine.startswith('mysql'):
             import pymysql
+            from pymysql.constants import CLIENT
             return pymysql.connect(
                 host=connection_info['host'],
                 port=int(connection_info['port']),
                 database=connection_info['database'],
                 user=connection_info['username'],
                 password=connection_info['password'],
-                autocommit=False
+                autocommit=False,
+                client_flag=CLIENT.MULTI_STATEMENTS  # Needed for batched statements
             )
         else:
             raise ValueError(f"Unsupported database engine: {engine}")
     
+    def close_connections(self):
+        """Close all reused database connections"""
+        
+        for connection in self.db_connections.values():
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self.db_connections.clear()
+    
     def generate_migration_template(self, version: str, description: str, 
                                   migrations_path: str, include_rollback: bool = True) -> str:
         """Generate a new migration file template"""
@@ -630,8 +969,21 @@ class MigrationManager:
         logger.info(f"✅ Migration template created: {filepath}")
         return str(filepath)
     
-    def get_migration_status(self, db_connection_info: Dict[str, str]) -> Dict[str, Any]:
-        """Get comprehensive migration status and history"""
+    def _invalidate_status_cache(self, db_connection_info: Dict[str, str]):
+        self._status_cache.pop(self._connection_key(db_connection_info), None)
+    
+    def get_migration_status(self, db_connection_info: Dict[str, str], use_cache: bool = True) -> Dict[str, Any]:
+        """Get comprehensive migration status and history
+        
+        Results are cached for ``STATUS_CACHE_TTL_SECONDS`` and invalidated
+        whenever this manager runs or rolls back migrations.
+        """
+        
+        cache_key = self._connection_key(db_connection_info)
+        if use_cache:
+            cached = self._status_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
         
         applied_migrations = self.get_applied_migrations(db_connection_info)
         
@@ -653,6 +1005,7 @@ class MigrationManager:
             ]
         }
         
+        self._status_cache[cache_key] = (time.monotonic() + self.STATUS_CACHE_TTL_SECONDS, status)
         return status
 
 
@@ -17,9 +17,11 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-import boto3
+from .aws_clients import get_aws_client
 from contextlib import asynccontextmanager
 
+from .metrics_aggregator import get_metric_aggregator
+
 logger = logging.getLogger(__name__)
 
 class TraceContext(Enum):
@@ -123,13 +125,13 @@ class ObservabilityManager:
         self.observability_level = observability_level
         
         # AWS services
-        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        self.xray_client = boto3.client('xray', region_name=region)
-        self.logs_client = boto3.client('logs', region_name=region)
+        self.cloudwatch = get_aws_client('cloudwatch', region_name=region)
+        self.xray_client = get_aws_client('xray', region_name=region)
+        self.logs_client = get_aws_client('logs', region_name=region)
         
         # Internal state
         self.active_traces: Dict[str, TraceSpan] = {}
-        self.metrics_buffer: List[MetricDataPoint] = []
+        self.metric_aggregator = get_metric_aggregator()
         self.deployment_analytics: Dict[str, DeploymentAnalytics] = {}
         
         # Configuration
@@ -253,56 +255,27 @@ class ObservabilityManager:
         if component_name:
             metric.dimensions['Component'] = component_name
         
-        # Buffer metric
-        self.metrics_buffer.append(metric)
-        
-        # Flush if buffer is full
-        if len(self.metrics_buffer) >= 20:  # CloudWatch batch limit
-            await self.flush_metrics()
+        # Aggregate into the shared per-period statistic sets (flushed in the background)
+        self.metric_aggregator.record(
+            'CodeFlowOps/Phase5',
+            metric.metric_name,
+            metric.value,
+            unit=metric.unit,
+            dimensions=metric.dimensions,
+            timestamp=metric.timestamp,
+            region=self.region
+        )
         
         logger.debug(f"📊 Recorded metric: {metric_name} = {value} {unit}")
     
     async def flush_metrics(self):
         """
-        Flush buffered metrics to CloudWatch
-        ✅ Batch metric submission to CloudWatch
+        Flush aggregated metrics to CloudWatch now
+        ✅ Batch metric submission to CloudWatch (normally done by the background flusher)
         """
         
-        if not self.metrics_buffer:
-            return
-        
         try:
-            # Prepare CloudWatch metric data
-            metric_data = []
-            
-            for metric in self.metrics_buffer:
-                metric_datum = {
-                    'MetricName': metric.metric_name,
-                    'Value': metric.value,
-                    'Unit': metric.unit,
-                    'Timestamp': metric.timestamp,
-                    'Dimensions': [
-                        {'Name': key, 'Value': value}
-                        for key, value in metric.dimensions.items()
-                    ]
-                }
-                metric_data.append(metric_datum)
-            
-            # Send to CloudWatch in batches
-            batch_size = 20
-            for i in range(0, len(metric_data), batch_size):
-                batch = metric_data[i:i+batch_size]
-                
-                self.cloudwatch.put_metric_data(
-                    Namespace='CodeFlowOps/Phase5',
-                    MetricData=batch
-                )
-            
-            logger.debug(f"📊 Flushed {len(self.metrics_buffer)} metrics to CloudWatch")
-            
-            # Clear buffer
-            self.metrics_buffer.clear()
-            
+            await asyncio.to_thread(self.metric_aggregator.flush)
         except Exception as e:
             logger.error(f"❌ Failed to flush metrics: {str(e)}")
     
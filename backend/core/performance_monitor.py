@@ -15,9 +15,11 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
-import boto3
+from .aws_clients import get_aws_client
 from botocore.exceptions import ClientError
 
+from .metrics_aggregator import get_metric_aggregator
+
 logger = logging.getLogger(__name__)
 
 class MetricType(Enum):
@@ -99,9 +101,9 @@ class PerformanceMonitor:
     
     def __init__(self, region: str = 'us-east-1'):
         self.region = region
-        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        self.logs_client = boto3.client('logs', region_name=region)
-        self.sns_client = boto3.client('sns', region_name=region)
+        self.cloudwatch = get_aws_client('cloudwatch', region_name=region)
+        self.logs_client = get_aws_client('logs', region_name=region)
+        self.sns_client = get_aws_client('sns', region_name=region)
         
         # Internal state
         self.active_alerts = {}
@@ -521,28 +523,19 @@ class PerformanceMonitor:
         return aws_metrics
     
     async def _send_metrics_to_cloudwatch(self, deployment_id: str, metrics: Dict[MetricType, MetricValue]):
-        """Send metrics to CloudWatch"""
+        """Send metrics to CloudWatch via the shared aggregator"""
         try:
-            metric_data = []
+            aggregator = get_metric_aggregator()
             
             for metric_type, metric_value in metrics.items():
-                metric_data.append({
-                    'MetricName': metric_type.value,
-                    'Value': metric_value.value,
-                    'Unit': metric_value.unit.replace('_', ' ').title(),
-                    'Timestamp': metric_value.timestamp,
-                    'Dimensions': [
-                        {
-                            'Name': 'DeploymentId',
-                            'Value': deployment_id
-                        }
-                    ]
-                })
-            
-            if metric_data:
-                self.cloudwatch.put_metric_data(
-                    Namespace='CodeFlowOps/Performance',
-                    MetricData=metric_data
+                aggregator.record(
+                    'CodeFlowOps/Performance',
+                    metric_type.value,
+                    metric_value.value,
+                    unit=metric_value.unit.replace('_', ' ').title(),
+                    dimensions={'DeploymentId': deployment_id},
+                    timestamp=metric_value.timestamp,
+                    region=self.region
                 )
                 
         except Exception as e:
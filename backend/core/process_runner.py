@@ -0,0 +1,437 @@
+# core/process_runner.py
+"""
+Streaming subprocess runner for clone/install/build steps
+
+``subprocess.run(capture_output=True)`` holds a step's entire output in
+memory and shows nothing until the process exits. Steps run here instead
+read stdout/stderr incrementally on an asyncio loop:
+
+- every line is handed to a sink (e.g. the deployment log) as it arrives
+- only the last ``tail_lines`` lines of each stream are kept, and a
+  successful step keeps an even shorter tail
+- the process runs in its own process group (session on POSIX), so a
+  timeout or cancellation kills npm *and* the node/esbuild children it spawned
+- wall time and CPU time (the whole process group, sampled from /proc or
+  psutil) are recorded per step
+
+Blocking callers (deployment worker threads, ``core.utils.run_command``)
+use ``run_step``; async callers await ``run_streamed`` directly.
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import threading
+import subprocess
+import concurrent.futures
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # CPU time is read from /proc on Linux, unavailable elsewhere
+    psutil = None
+
+# (stream name, line) -> None; stream name is "stdout" or "stderr"
+LineSink = Callable[[str, str], None]
+
+DEFAULT_TAIL_LINES = 200
+SUCCESS_TAIL_LINES = 20
+MAX_LINE_CHARS = 2000
+READ_CHUNK_SIZE = 64 * 1024
+KILL_GRACE_SECONDS = 5.0
+DRAIN_GRACE_SECONDS = 2.0
+CPU_SAMPLE_INTERVAL = 0.5
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") and "SC_CLK_TCK" in getattr(os, "sysconf_names", {}) else 100
+
+
+class LineRing:
+    """Bounded tail of a stream plus totals for everything that passed through"""
+    
+    def __init__(self, max_lines: int = DEFAULT_TAIL_LINES):
+        self.lines = deque(maxlen=max(1, max_lines))
+        self.total_lines = 0
+        self.total_chars = 0
+    
+    def append(self, line: str):
+        self.lines.append(line)
+        self.total_lines += 1
+        self.total_chars += len(line) + 1
+    
+    def tail(self, count: Optional[int] = None) -> str:
+        lines = list(self.lines)
+        if count is not None:
+            lines = lines[-count:] if count > 0 else []
+        return "\n".join(lines)
+
+
+@dataclass
+class StepResult:
+    """Outcome and accounting for one subprocess step"""
+    name: str
+    command: List[str]
+    returncode: Optional[int] = None
+    stdout: str = ""  # tail only
+    stderr: str = ""  # tail only
+    wall_seconds: float = 0.0
+    cpu_seconds: Optional[float] = None
+    output_lines: int = 0
+    output_chars: int = 0
+    timed_out: bool = False
+    cancelled: bool = False
+    error: Optional[str] = None  # Spawn failure (executable missing, bad cwd, ...)
+    
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not (self.timed_out or self.cancelled or self.error)
+    
+    @property
+    def failure_reason(self) -> str:
+        if self.error:
+            return self.error
+        if self.timed_out:
+            return f"timed out after {self.wall_seconds:.0f}s"
+        if self.cancelled:
+            return "cancelled"
+        return f"exit code {self.returncode}"
+    
+    def timing(self) -> Dict[str, object]:
+        """JSON-friendly accounting record for deployment state"""
+        return {
+            "step": self.name,
+            "success": self.success,
+            "returncode": self.returncode,
+            "wall_seconds": round(self.wall_seconds, 2),
+            "cpu_seconds": round(self.cpu_seconds, 2) if self.cpu_seconds is not None else None,
+            "output_lines": self.output_lines
+        }
+    
+    def summary(self) -> str:
+        cpu = f", {self.cpu_seconds:.1f}s CPU" if self.cpu_seconds is not None else ""
+        status = "ok" if self.success else self.failure_reason
+        return f"{self.name}: {status} in {self.wall_seconds:.1f}s{cpu}, {self.output_lines} lines"
+
+
+class StepLogSink:
+    """
+    Rate-limited adapter from a LineSink to a list-like log
+    
+    Installs print thousands of lines; forwarding all of them would flood
+    the deployment log (and its shared store). At most one line per
+    ``min_interval`` seconds and ``max_lines`` lines per step are forwarded;
+    ``flush`` emits the last line held back and a count of what was skipped.
+    """
+    
+    def __init__(self, append: Callable[[str], None], prefix: str = "", max_lines: int = 300, min_interval: float = 0.2):
+        self.append = append
+        self.prefix = prefix
+        self.max_lines = max_lines
+        self.min_interval = min_interval
+        self.forwarded = 0
+        self.skipped = 0
+        self._held: Optional[str] = None
+        self._last_forward = 0.0
+        self._lock = threading.Lock()
+    
+    def __call__(self, stream: str, line: str):
+        if not line.strip():
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self.forwarded >= self.max_lines or now - self._last_forward < self.min_interval:
+                if self._held is not None:
+                    self.skipped += 1
+                self._held = line
+                return
+            self._held = None
+            self._last_forward = now
+            self.forwarded += 1
+        self.append(f"{self.prefix}{line}")
+    
+    def flush(self):
+        with self._lock:
+            held, skipped = self._held, self.skipped
+            self._held = None
+            self.skipped = 0
+        if held is not None:
+            self.append(f"{self.prefix}{held}")
+        if skipped:
+            self.append(f"{self.prefix}… {skipped} more lines not shown")
+
+
+class _RunningStep:
+    """Handle used to cancel a step from another thread"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, process):
+        self.loop = loop
+        self.process = process
+        self.cancel_requested = asyncio.Event()
+    
+    def cancel(self):
+        try:
+            self.loop.call_soon_threadsafe(self.cancel_requested.set)
+        except RuntimeError:  # Loop already closed; the step has finished
+            pass
+
+
+_running: Dict[str, Set[_RunningStep]] = {}
+_running_lock = threading.Lock()
+
+
+def cancel_scope(scope: str) -> int:
+    """Kill the process groups of every step running under ``scope``; returns how many"""
+    with _running_lock:
+        steps = list(_running.get(scope, ()))
+    for step in steps:
+        step.cancel()
+    if steps:
+        logger.info(f"🛑 Cancelling {len(steps)} running step(s) for {scope}")
+    return len(steps)
+
+
+def cancel_all() -> int:
+    """Kill every running step (used on shutdown so no npm trees are orphaned)"""
+    with _running_lock:
+        scopes = list(_running)
+    return sum(cancel_scope(scope) for scope in scopes)
+
+
+def running_steps() -> Dict[str, int]:
+    with _running_lock:
+        return {scope: len(steps) for scope, steps in _running.items() if steps}
+
+
+async def run_streamed(
+    command: Sequence[str],
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    on_line: Optional[LineSink] = None,
+    name: Optional[str] = None,
+    scope: Optional[str] = None,
+    tail_lines: int = DEFAULT_TAIL_LINES,
+    success_tail_lines: int = SUCCESS_TAIL_LINES,
+    shell: bool = False
+) -> StepResult:
+    """
+    Run a command, streaming its output line by line
+    
+    Never raises for process failures: spawn errors, non-zero exits,
+    timeouts and cancellations are all reported on the returned StepResult.
+    Cancelling the awaiting task kills the process group and re-raises.
+    """
+    command = [str(part) for part in command]
+    result = StepResult(name=name or " ".join(command[:3]), command=command)
+    stdout_ring = LineRing(tail_lines)
+    stderr_ring = LineRing(tail_lines)
+    started = time.monotonic()
+    
+    spawn_kwargs = {"start_new_session": True} if os.name == "posix" else {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    try:
+        if shell:
+            process = await asyncio.create_subprocess_shell(
+                subprocess.list2cmdline(command), cwd=cwd, env=env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **spawn_kwargs
+            )
+        else:
+            process = await asyncio.create_subprocess_exec(
+                *command, cwd=cwd, env=env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **spawn_kwargs
+            )
+    except (OSError, ValueError) as e:
+        result.error = f"Failed to start {command[0]}: {e}"
+        result.stderr = result.error
+        result.wall_seconds = time.monotonic() - started
+        return result
+    
+    step = _RunningStep(asyncio.get_running_loop(), process)
+    if scope:
+        with _running_lock:
+            _running.setdefault(scope, set()).add(step)
+    
+    cpu_samples = [None]
+    
+    async def sample_cpu():
+        while True:
+            sample = _group_cpu_seconds(process.pid)
+            if sample is not None and (cpu_samples[0] is None or sample > cpu_samples[0]):
+                cpu_samples[0] = sample
+            await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+    
+    readers = asyncio.gather(
+        _pump(process.stdout, "stdout", stdout_ring, on_line),
+        _pump(process.stderr, "stderr", stderr_ring, on_line)
+    )
+    sampler = asyncio.ensure_future(sample_cpu())
+    exited = asyncio.ensure_future(process.wait())
+    cancel_wait = asyncio.ensure_future(step.cancel_requested.wait())
+    
+    try:
+        done, _ = await asyncio.wait({exited, cancel_wait}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if exited not in done:
+            result.cancelled = cancel_wait in done
+            result.timed_out = not result.cancelled
+            logger.warning(f"⏹️ {result.name} {'cancelled' if result.cancelled else 'timed out'}; killing process group {process.pid}")
+            await _kill_group(process)
+        # Output still buffered in the pipes is read before the step is reported
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), DRAIN_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            # A background grandchild kept the pipe open; it belongs to this step
+            _signal_group(process.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            readers.cancel()
+    except asyncio.CancelledError:
+        result.cancelled = True
+        await _kill_group(process)
+        readers.cancel()
+        raise
+    finally:
+        for task in (sampler, cancel_wait, exited):
+            task.cancel()
+        if scope:
+            with _running_lock:
+                steps = _running.get(scope)
+                if steps is not None:
+                    steps.discard(step)
+                    if not steps:
+                        del _running[scope]
+        result.wall_seconds = time.monotonic() - started
+        result.cpu_seconds = cpu_samples[0]
+        result.returncode = process.returncode
+        result.output_lines = stdout_ring.total_lines + stderr_ring.total_lines
+        result.output_chars = stdout_ring.total_chars + stderr_ring.total_chars
+        keep = None if not result.success else success_tail_lines
+        result.stdout = stdout_ring.tail(keep)
+        result.stderr = stderr_ring.tail(keep)
+    
+    logger.debug(f"⏱️ {result.summary()}")
+    return result
+
+
+def run_step(command: Sequence[str], cwd: Optional[str] = None, **kwargs) -> StepResult:
+    """
+    Blocking wrapper around ``run_streamed`` for worker threads
+    
+    Runs on a private event loop. When called from a thread that already
+    runs a loop, the step is moved to a helper thread so that loop is not
+    re-entered (the caller still blocks, exactly as subprocess.run did).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_streamed(command, cwd, **kwargs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="process-runner") as pool:
+        return pool.submit(asyncio.run, run_streamed(command, cwd, **kwargs)).result()
+
+
+async def _pump(stream, stream_name: str, ring: LineRing, on_line: Optional[LineSink]):
+    """Split a pipe into lines without readline()'s 64 KiB line limit"""
+    pending = b""
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            _emit(raw, stream_name, ring, on_line)
+        if len(pending) > MAX_LINE_CHARS * 4:
+            _emit(pending, stream_name, ring, on_line)
+            pending = b""
+    if pending:
+        _emit(pending, stream_name, ring, on_line)
+
+
+def _emit(raw: bytes, stream_name: str, ring: LineRing, on_line: Optional[LineSink]):
+    # Progress bars redraw with \r; only the final state of the line matters
+    line = raw.decode("utf-8", errors="replace").rstrip("\r").split("\r")[-1].rstrip()
+    if len(line) > MAX_LINE_CHARS:
+        line = line[:MAX_LINE_CHARS] + " …"
+    ring.append(line)
+    if on_line is not None:
+        try:
+            on_line(stream_name, line)
+        except Exception as e:
+            logger.debug(f"Line sink failed: {e}")
+
+
+async def _kill_group(process):
+    """SIGTERM the process group, then SIGKILL whatever survives the grace period"""
+    _signal_group(process.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    _signal_group(process.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error(f"❌ Process {process.pid} did not exit after SIGKILL")
+
+
+def _signal_group(pid: int, sig):
+    if os.name == "posix":
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+        return
+    # Windows has no process groups to signal; taskkill /T walks the child tree
+    try:
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True, timeout=10)
+    except Exception as e:
+        logger.debug(f"taskkill failed for {pid}: {e}")
+
+
+def _group_cpu_seconds(pgid: int) -> Optional[float]:
+    """
+    User + system CPU of every live process in the group, including reaped children
+    
+    Sampled while the step runs; the largest sample is reported, so the
+    figure can trail the true total by at most one sampling interval.
+    """
+    if sys.platform.startswith("linux"):
+        total = 0
+        found = False
+        try:
+            entries = os.listdir("/proc")
+        except OSError:
+            return None
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "rb") as handle:
+                    stat = handle.read().decode("ascii", errors="replace")
+            except OSError:
+                continue
+            # Fields after the parenthesised command name: state ppid pgrp ... utime(14) stime cutime cstime
+            fields = stat[stat.rfind(")") + 2:].split()
+            if len(fields) < 15 or int(fields[2]) != pgid:
+                continue
+            found = True
+            total += sum(int(value) for value in fields[11:15])
+        return total / _CLOCK_TICKS if found else None
+    
+    if psutil is not None:
+        try:
+            leader = psutil.Process(pgid)
+            processes = [leader] + leader.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0.0
+        for process in processes:
+            try:
+                times = process.cpu_times()
+            except psutil.Error:
+                continue
+            total += times.user + times.system + getattr(times, "children_user", 0.0) + getattr(times, "children_system", 0.0)
+        return total
+    return None
@@ -13,11 +13,13 @@ import logging
 import json
 import time
 import hashlib
+import threading
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Callable, Awaitable
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple, Deque
 from dataclasses import dataclass, field
 from enum import Enum
-import boto3
+from .aws_clients import get_aws_client
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -71,9 +73,12 @@ class ReliabilityConfig:
     exponential_backoff: bool = True
     
     # Circuit breaker configuration
-    failure_threshold: int = 5
+    failure_threshold: int = 5               # Minimum failures inside the window before tripping
+    failure_rate_threshold: float = 0.5      # ...and the failure rate that must be reached
+    failure_window_seconds: int = 60         # Sliding window; older outcomes no longer count
+    window_max_calls: int = 100              # Ring-buffer size bounding memory per breaker
     recovery_timeout_seconds: int = 60
-    half_open_max_calls: int = 3
+    half_open_max_calls: int = 3             # Concurrent probes allowed, and successes needed to close
     
     # Timeout configuration
     operation_timeout_seconds: int = 300
@@ -87,86 +92,300 @@ class ReliabilityConfig:
 class CircuitBreakerStats:
     """Circuit breaker statistics"""
     state: CircuitState = CircuitState.CLOSED
-    failure_count: int = 0
-    success_count: int = 0
+    failure_count: int = 0                   # Failures inside the sliding window
+    success_count: int = 0                   # Successes inside the sliding window
     last_failure_time: Optional[datetime] = None
     state_changed_time: datetime = field(default_factory=datetime.utcnow)
+    
+    # Lifetime counters, exposed through CircuitBreaker.get_metrics()
+    total_calls: int = 0
+    total_failures: int = 0
+    rejected_calls: int = 0
+    times_opened: int = 0
+
+class CircuitBreakerOpenError(Exception):
+    """Raised when a call is rejected by an OPEN (or saturated HALF_OPEN) circuit breaker"""
+    
+    def __init__(self, name: str, state: CircuitState):
+        self.breaker_name = name
+        self.state = state
+        super().__init__(f"Circuit breaker {name} is {state.name}")
 
 class CircuitBreaker:
     """
     Circuit breaker implementation for reliable service calls
     ✅ Circuit breaker pattern with configurable thresholds and recovery
+    ✅ Sliding-window failure-rate accounting (stale failures age out)
+    ✅ Bounded HALF_OPEN probes
+    
+    The protected call itself never runs under a lock. State bookkeeping
+    takes a short ``threading.Lock`` (never held across an ``await``) so the
+    same breaker can guard async code and boto3 calls made from deployer
+    threads.
     """
     
     def __init__(self, name: str, config: ReliabilityConfig):
         self.name = name
         self.config = config
         self.stats = CircuitBreakerStats()
-        self._lock = asyncio.Lock()
+        
+        # Ring buffer of (monotonic timestamp, succeeded) outcomes
+        self._window: Deque[Tuple[float, bool]] = deque(maxlen=max(1, config.window_max_calls))
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._lock = threading.Lock()
     
     async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
         """Execute function through circuit breaker"""
         
-        async with self._lock:
-            # Check circuit state
-            current_state = await self._get_current_state()
-            
-            if current_state == CircuitState.OPEN:
-                raise Exception(f"Circuit breaker {self.name} is OPEN")
-            
-            if current_state == CircuitState.HALF_OPEN:
-                if self.stats.success_count >= self.config.half_open_max_calls:
-                    raise Exception(f"Circuit breaker {self.name} is HALF_OPEN and max calls exceeded")
+        probe = self.before_call()
         
         try:
             # Execute function
             result = await func(*args, **kwargs)
-            
-            # Record success
-            await self._record_success()
-            
-            return result
-            
-        except Exception as e:
+        except Exception:
             # Record failure
-            await self._record_failure()
+            self.record_outcome(False, probe)
             raise
+        
+        # Record success
+        self.record_outcome(True, probe)
+        return result
     
-    async def _get_current_state(self) -> CircuitState:
-        """Get current circuit breaker state"""
+    def call_sync(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Execute a blocking function (e.g. a boto3 call) through circuit breaker"""
         
-        if self.stats.state == CircuitState.OPEN:
-            # Check if we should transition to HALF_OPEN
-            if (datetime.utcnow() - self.stats.state_changed_time).total_seconds() > self.config.recovery_timeout_seconds:
-                self.stats.state = CircuitState.HALF_OPEN
-                self.stats.state_changed_time = datetime.utcnow()
-                logger.info(f"🔄 Circuit breaker {self.name} transitioned to HALF_OPEN")
+        probe = self.before_call()
         
-        return self.stats.state
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_outcome(False, probe)
+            raise
+        
+        self.record_outcome(True, probe)
+        return result
     
-    async def _record_success(self):
-        """Record successful call"""
+    def before_call(self) -> bool:
+        """
+        Admit or reject a call
         
-        self.stats.success_count += 1
+        Returns True when the admitted call is a HALF_OPEN probe; raises
+        CircuitBreakerOpenError when the call is rejected.
+        """
         
-        if self.stats.state == CircuitState.HALF_OPEN:
-            # Transition back to CLOSED
-            self.stats.state = CircuitState.CLOSED
+        with self._lock:
+            state = self._current_state_locked()
+            
+            if state == CircuitState.OPEN:
+                self.stats.rejected_calls += 1
+                raise CircuitBreakerOpenError(self.name, state)
+            
+            if state == CircuitState.HALF_OPEN:
+                if self._half_open_in_flight >= self.config.half_open_max_calls:
+                    self.stats.rejected_calls += 1
+                    raise CircuitBreakerOpenError(self.name, state)
+                self._half_open_in_flight += 1
+                return True
+            
+            return False
+    
+    def record_outcome(self, success: bool, probe: bool = False):
+        """Record the result of a call admitted by before_call()"""
+        
+        now = time.monotonic()
+        
+        with self._lock:
+            self.stats.total_calls += 1
+            if not success:
+                self.stats.total_failures += 1
+                self.stats.last_failure_time = datetime.utcnow()
+            
+            if probe:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            
+            if self.stats.state == CircuitState.HALF_OPEN:
+                if not success:
+                    self._transition_locked(CircuitState.OPEN, now)
+                elif probe:
+                    self._half_open_successes += 1
+                    if self._half_open_successes >= self.config.half_open_max_calls:
+                        self._transition_locked(CircuitState.CLOSED, now)
+                return
+            
+            if self.stats.state == CircuitState.OPEN:
+                return  # Late result of a call admitted before the breaker opened
+            
+            self._window.append((now, success))
+            self._refresh_window_locked(now)
+            
+            if not success and self._should_trip_locked():
+                self._transition_locked(CircuitState.OPEN, now)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of breaker state and sliding-window statistics"""
+        
+        with self._lock:
+            state = self._current_state_locked()
+            self._refresh_window_locked(time.monotonic())
+            window_calls = self.stats.failure_count + self.stats.success_count
+            
+            return {
+                'name': self.name,
+                'state': state.value,
+                'window_seconds': self.config.failure_window_seconds,
+                'window_calls': window_calls,
+                'window_failures': self.stats.failure_count,
+                'failure_rate': (self.stats.failure_count / window_calls) if window_calls else 0.0,
+                'half_open_in_flight': self._half_open_in_flight,
+                'total_calls': self.stats.total_calls,
+                'total_failures': self.stats.total_failures,
+                'rejected_calls': self.stats.rejected_calls,
+                'times_opened': self.stats.times_opened,
+                'last_failure_time': self.stats.last_failure_time.isoformat() if self.stats.last_failure_time else None,
+                'state_changed_time': self.stats.state_changed_time.isoformat()
+            }
+    
+    def _current_state_locked(self) -> CircuitState:
+        """Get current circuit breaker state, moving OPEN to HALF_OPEN once recovery time passes"""
+        
+        if self.stats.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at > self.config.recovery_timeout_seconds:
+                self._transition_locked(CircuitState.HALF_OPEN, time.monotonic())
+        
+        return self.stats.state
+    
+    def _refresh_window_locked(self, now: float):
+        """Drop outcomes older than the sliding window and recount"""
+        
+        cutoff = now - self.config.failure_window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+        
+        failures = sum(1 for _, succeeded in self._window if not succeeded)
+        self.stats.failure_count = failures
+        self.stats.success_count = len(self._window) - failures
+    
+    def _should_trip_locked(self) -> bool:
+        failures = self.stats.failure_count
+        total = failures + self.stats.success_count
+        if failures < self.config.failure_threshold or total == 0:
+            return False
+        return failures / total >= self.config.failure_rate_threshold
+    
+    def _transition_locked(self, new_state: CircuitState, now: float):
+        self.stats.state = new_state
+        self.stats.state_changed_time = datetime.utcnow()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        
+        if new_state == CircuitState.OPEN:
+            self._opened_at = now
+            self.stats.times_opened += 1
+            logger.warning(f"⚠️ Circuit breaker {self.name} transitioned to OPEN")
+        elif new_state == CircuitState.HALF_OPEN:
+            logger.info(f"🔄 Circuit breaker {self.name} transitioned to HALF_OPEN")
+        else:
+            # Start CLOSED with a clean window so pre-outage failures cannot re-trip it
+            self._window.clear()
             self.stats.failure_count = 0
-            self.stats.state_changed_time = datetime.utcnow()
+            self.stats.success_count = 0
             logger.info(f"✅ Circuit breaker {self.name} transitioned to CLOSED")
+
+class CircuitBreakerRegistry:
+    """
+    Process-wide registry of circuit breakers keyed by (service, region, tenant)
+    ✅ A flaky region or a single tenant's failures only open their own breaker
+    """
+    
+    def __init__(self, config: Optional[ReliabilityConfig] = None):
+        self.config = config or ReliabilityConfig()
+        self._breakers: Dict[Tuple[str, str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
     
-    async def _record_failure(self):
-        """Record failed call"""
+    def get(self, service: str, region: str, tenant: Optional[str] = None) -> CircuitBreaker:
+        """Get or create the breaker for a (service, region, tenant) key"""
         
-        self.stats.failure_count += 1
-        self.stats.last_failure_time = datetime.utcnow()
+        key = (service, region or 'global', tenant or 'default')
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(name=':'.join(key), config=self.config)
+                    self._breakers[key] = breaker
+        return breaker
+    
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Metrics for every registered breaker"""
         
-        if self.stats.failure_count >= self.config.failure_threshold:
-            # Transition to OPEN
-            self.stats.state = CircuitState.OPEN
-            self.stats.state_changed_time = datetime.utcnow()
-            logger.warning(f"⚠️ Circuit breaker {self.name} transitioned to OPEN")
+        return [breaker.get_metrics() for breaker in list(self._breakers.values())]
+    
+    def open_breakers(self) -> List[str]:
+        return [m['name'] for m in self.get_metrics() if m['state'] != CircuitState.CLOSED.value]
+
+_breaker_registry: Optional[CircuitBreakerRegistry] = None
+
+def get_circuit_breaker_registry() -> CircuitBreakerRegistry:
+    """Shared breaker registry used by AWS call sites"""
+    
+    global _breaker_registry
+    if _breaker_registry is None:
+        _breaker_registry = CircuitBreakerRegistry()
+    return _breaker_registry
+
+# AWS errors that indicate the service/region is unhealthy, as opposed to
+# caller errors (missing bucket, bad parameters, ...) that must not trip a breaker
+_AWS_BREAKER_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestLimitExceeded',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'SlowDown',
+    'RequestTimeout', 'RequestTimeoutException', 'ServiceUnavailable', 'ServiceUnavailableException',
+    'InternalError', 'InternalFailure', 'InternalServerError', 'InternalServiceError',
+}
+
+def credential_fingerprint(access_key_id: Optional[str]) -> Optional[str]:
+    """Stable, non-reversible tenant key derived from an access key ID"""
+    
+    if not access_key_id:
+        return None
+    return hashlib.sha256(access_key_id.encode('utf-8')).hexdigest()[:12]
+
+def protect_client(client: Any, tenant: Optional[str] = None,
+                   registry: Optional[CircuitBreakerRegistry] = None) -> Any:
+    """
+    Guard every API call of a boto3 client with the (service, region, tenant) breaker
+    
+    Uses botocore's before-call / after-call event hooks, so existing call
+    sites keep using the client unchanged. Only throttling, 5xx and
+    connection errors count as failures.
+    """
+    
+    registry = registry or get_circuit_breaker_registry()
+    service = client.meta.service_model.service_name
+    breaker = registry.get(service, client.meta.region_name, tenant)
+    local = threading.local()
+    
+    def before_call(**kwargs):
+        local.probe = breaker.before_call()
+    
+    def after_call(http_response=None, parsed=None, **kwargs):
+        status = getattr(http_response, 'status_code', 200) or 200
+        error_code = (parsed or {}).get('Error', {}).get('Code', '')
+        failed = status >= 500 or error_code in _AWS_BREAKER_ERROR_CODES
+        breaker.record_outcome(not failed, getattr(local, 'probe', False))
+    
+    def after_call_error(exception=None, **kwargs):
+        breaker.record_outcome(False, getattr(local, 'probe', False))
+    
+    # Each client owns its event emitter, so the unqualified event names only
+    # match this client's calls
+    events = client.meta.events
+    events.register('before-call', before_call, unique_id='codeflowops-circuit-breaker-before')
+    events.register('after-call', after_call, unique_id='codeflowops-circuit-breaker-after')
+    events.register('after-call-error', after_call_error, unique_id='codeflowops-circuit-breaker-error')
+    
+    return client
 
 def with_retry(config: ReliabilityConfig):
     """
@@ -218,10 +437,10 @@ class ProductionHardening:
         self.security_level = security_level
         
         # AWS services
-        self.iam_client = boto3.client('iam', region_name=region)
-        self.kms_client = boto3.client('kms', region_name=region)
-        self.waf_client = boto3.client('wafv2', region_name=region)
-        self.config_client = boto3.client('config', region_name=region)
+        self.iam_client = get_aws_client('iam', region_name=region)
+        self.kms_client = get_aws_client('kms', region_name=region)
+        self.waf_client = get_aws_client('wafv2', region_name=region)
+        self.config_client = get_aws_client('config', region_name=region)
         
         # Circuit breakers
         self.circuit_breakers: Dict[str, CircuitBreaker] = {}
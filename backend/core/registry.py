@@ -4,7 +4,9 @@ Stack registry and plugin management
 from typing import Dict, List, Optional, Type
 from .interfaces import StackPlugin, StackDetector, StackBuilder, StackProvisioner, StackDeployer
 from .models import StackPlan
+from .detection import Candidate, RepoIndex, RuleMatcher, StackRules, repo_index_scope
 from pathlib import Path
+import inspect
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,7 +34,9 @@ class StackRegistry:
     
     def __init__(self):
         self._stacks: Dict[str, StackComponents] = {}
-        self._detectors: List[tuple[int, str, StackDetector]] = []  # (priority, key, detector)
+        self._detectors: List[tuple[int, str, StackDetector, bool]] = []  # (priority, key, detector, accepts_context)
+        self._rule_sets: Dict[str, StackRules] = {}
+        self._matcher: Optional[RuleMatcher] = None
         
     def register_stack(self, plugin: StackPlugin) -> None:
         """Register a complete stack plugin"""
@@ -51,29 +55,59 @@ class StackRegistry:
         
         # Add detector to ordered list
         priority = plugin.detector.get_priority()
-        self._detectors.append((priority, plugin.stack_key, plugin.detector))
+        accepts_context = 'context' in inspect.signature(plugin.detector.detect).parameters
+        self._detectors.append((priority, plugin.stack_key, plugin.detector, accepts_context))
         self._detectors.sort(key=lambda x: x[0], reverse=True)  # Higher priority first
         
+        # Declarative rules (detector.rules) are compiled into one matcher on the next detection
+        rules = getattr(plugin.detector, "rules", None)
+        if isinstance(rules, StackRules):
+            self._rule_sets[plugin.stack_key] = rules
+            self._matcher = None
+        
         logger.info(f"✅ Registered stack plugin: {plugin.stack_key} ({plugin.display_name})")
         
     def get_stack(self, stack_key: str) -> Optional[StackComponents]:
         """Get stack components by key"""
         return self._stacks.get(stack_key)
         
+    def detect_candidates(self, repo_dir: Path, index: Optional[RepoIndex] = None) -> List[Candidate]:
+        """Score every stack with declared rules in one pass over the repository"""
+        if self._matcher is None:
+            self._matcher = RuleMatcher(self._rule_sets.values())
+        return self._matcher.match(index or RepoIndex(repo_dir))
+        
     def detect_stack(self, repo_dir: Path, context: Optional[dict] = None) -> Optional[StackPlan]:
         """
         Run detectors in priority order to identify the best stack for a repository
+        
+        The repository is indexed once and shared with the detectors; detectors
+        whose declared rules do not match it are skipped. A truncated index
+        (very large repository) could miss the files a rule needs, so then
+        every detector runs.
         """
         logger.info(f"🔍 Detecting stack for repository: {repo_dir}")
         
-        for priority, stack_key, detector in self._detectors:
+        index = RepoIndex(repo_dir)
+        candidates = None
+        if index.truncated:
+            logger.warning(f"⚠️ {repo_dir} is too large to index fully; running every detector without rule gating")
+        else:
+            candidates = {candidate.stack: candidate for candidate in self.detect_candidates(repo_dir, index)}
+        
+        with repo_index_scope(index):
+            return self._run_detectors(repo_dir, context, candidates)
+        
+    def _run_detectors(self, repo_dir: Path, context: Optional[dict],
+                       candidates: Optional[Dict[str, Candidate]]) -> Optional[StackPlan]:
+        for priority, stack_key, detector, accepts_context in self._detectors:
+            if candidates is not None and stack_key in self._rule_sets and stack_key not in candidates:
+                logger.debug(f"Skipping detector: {stack_key} (rules not matched)")
+                continue
             try:
                 logger.debug(f"Trying detector: {stack_key} (priority: {priority})")
                 
-                # Check if detector supports context parameter
-                import inspect
-                detector_params = inspect.signature(detector.detect).parameters
-                if 'context' in detector_params:
+                if accepts_context:
                     plan = detector.detect(repo_dir, context)
                 else:
                     plan = detector.detect(repo_dir)
@@ -200,7 +234,7 @@ class StackRegistry:
             "display_name": components.display_name,
             "description": components.plugin.description,
             "priority": next(
-                (priority for priority, key, _ in self._detectors if key == stack_key), 
+                (priority for priority, key, _, _ in self._detectors if key == stack_key), 
                 0
             )
         }
@@ -259,6 +293,10 @@ def detect_stack(repo_dir: Path, context: Optional[dict] = None) -> Optional[Sta
     """Detect stack using global registry"""
     return _registry.detect_stack(repo_dir, context)
 
+def detect_candidates(repo_dir: Path) -> List[Candidate]:
+    """Scored stack candidates using global registry"""
+    return _registry.detect_candidates(repo_dir)
+
 def list_stacks() -> List[str]:
     """List all registered stacks"""
     return _registry.list_stacks()
@@ -6,7 +6,7 @@ Enterprise-grade security policies and VPC endpoint management
 This is a NEW component that enhances security without affecting existing deployments
 """
 
-import boto3
+from .aws_clients import get_aws_client
 import json
 import logging
 from typing import Dict, List, Optional, Any
@@ -47,8 +47,8 @@ class SecurityManagerV2:
     
     def __init__(self, region: str = 'us-east-1'):
         self.region = region
-        self.iam = boto3.client('iam')
-        self.ec2 = boto3.client('ec2')
+        self.iam = get_aws_client('iam')
+        self.ec2 = get_aws_client('ec2')
         
         # ✅ VPC Interface Endpoints for cost optimization and security
         self.vpc_endpoints = {
@@ -14,6 +14,8 @@ from botocore.exceptions import ClientError
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from .aws_clients import get_aws_session
+
 logger = logging.getLogger(__name__)
 
 class DeploymentStatus(Enum):
@@ -58,7 +60,7 @@ class StateManagerV2:
         """
         Initialize with separate table to avoid conflicts with existing system
         """
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_aws_session().resource('dynamodb')
         self.table_name = table_name
         self.table = None
         self._ensure_table_exists()
@@ -14,7 +14,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
-import boto3
+from .aws_clients import get_aws_client
 from botocore.exceptions import ClientError
 
 # Import Environment class
@@ -74,9 +74,9 @@ class TrafficManager:
     
     def __init__(self, region: str = 'us-east-1'):
         self.region = region
-        self.elbv2_client = boto3.client('elbv2', region_name=region)
-        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        self.route53 = boto3.client('route53', region_name=region)
+        self.elbv2_client = get_aws_client('elbv2', region_name=region)
+        self.cloudwatch = get_aws_client('cloudwatch', region_name=region)
+        self.route53 = get_aws_client('route53', region_name=region)
         
         # Traffic shift thresholds
         self.ERROR_RATE_THRESHOLD = 0.05  # 5%
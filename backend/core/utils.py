@@ -2,7 +2,6 @@
 Utility functions shared across the plugin system
 """
 import os
-import subprocess
 import logging
 import shutil
 import tempfile
@@ -10,9 +9,12 @@ import json
 import uuid
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
+from .production_hardening import protect_client, credential_fingerprint
+from .process_runner import run_step, LineSink
+from .aws_clients import get_aws_session
+
 logger = logging.getLogger(__name__)
 
 # File system utilities
@@ -49,13 +51,18 @@ def run_command(
     cwd: Path, 
     env: Optional[Dict[str, str]] = None,
     timeout: int = 300,
-    capture_output: bool = True
+    capture_output: bool = True,
+    on_line: Optional[LineSink] = None,
+    scope: Optional[str] = None
 ) -> Tuple[bool, str, str]:
     """
     Run a shell command safely
     
+    Output is streamed line by line to ``on_line`` (debug log by default)
+    and only its tail is kept; ``scope`` lets ``cancel_scope`` kill the step.
+    
     Returns:
-        (success, stdout, stderr)
+        (success, stdout tail, stderr tail)
     """
     try:
         # Prepare environment
@@ -75,31 +82,38 @@ def run_command(
             elif command[0].endswith('.cmd') or command[0].endswith('.bat'):
                 use_shell = True
         
-        result = subprocess.run(
+        if on_line is None:
+            on_line = lambda stream, line: logger.debug(f"[{command[0]}] {line}")
+        
+        result = run_step(
             command,
             cwd=str(cwd),
             env=run_env,
-            capture_output=capture_output,
-            text=True,
             timeout=timeout,
+            on_line=on_line,
+            scope=scope,
             shell=use_shell
         )
-        
-        success = result.returncode == 0
+        logger.debug(f"⏱️ {result.summary()}")
+        
+        if result.timed_out:
+            logger.error(f"Command timed out after {timeout}s: {' '.join(command)}")
+            return False, result.stdout, f"Command timed out after {timeout} seconds"
+        if result.error:
+            logger.error(f"File not found error (WinError 2): {result.error}")
+            logger.error(f"Command attempted: {' '.join(command)}")
+            logger.error(f"Working directory: {cwd}")
+            return False, "", f"File not found: {' '.join(command)} - {result.error}"
+        
+        success = result.success
         if not success:
-            logger.error(f"Command failed with code {result.returncode}: {' '.join(command)}")
+            logger.error(f"Command failed ({result.failure_reason}): {' '.join(command)}")
             logger.error(f"Stderr: {result.stderr}")
-            
+        
+        if not capture_output:
+            return success, "", ""
         return success, result.stdout, result.stderr
         
-    except subprocess.TimeoutExpired:
-        logger.error(f"Command timed out after {timeout}s: {' '.join(command)}")
-        return False, "", f"Command timed out after {timeout} seconds"
-    except FileNotFoundError as e:
-        logger.error(f"File not found error (WinError 2): {e}")
-        logger.error(f"Command attempted: {' '.join(command)}")
-        logger.error(f"Working directory: {cwd}")
-        return False, "", f"File not found: {' '.join(command)} - {str(e)}"
     except Exception as e:
         logger.error(f"Command execution failed: {e}")
         return False, "", str(e)
@@ -108,7 +122,9 @@ def run_npm_command(
     command: List[str],
     cwd: Path,
     timeout: int = 600,
-    env: Optional[Dict[str, str]] = None
+    env: Optional[Dict[str, str]] = None,
+    on_line: Optional[LineSink] = None,
+    scope: Optional[str] = None
 ) -> Tuple[bool, str, str]:
     """Run npm command with optimized environment and production fixes"""
     
@@ -254,7 +270,7 @@ def run_npm_command(
     if len(command) >= 2 and command[1] == "install":
         command.extend(["--no-optional", "--no-audit", "--no-fund"])
     
-    return run_command(command, cwd, env=npm_env, timeout=timeout)
+    return run_command(command, cwd, env=npm_env, timeout=timeout, on_line=on_line, scope=scope)
 
 # Git utilities
 def clone_repository(repo_url: str, target_dir: Path, depth: int = 1) -> bool:
@@ -278,7 +294,7 @@ def validate_aws_credentials(credentials: Dict[str, str]) -> Dict[str, Any]:
     """Validate AWS credentials and check permissions"""
     try:
         # Create session with provided credentials
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=credentials.get("aws_access_key_id"),
             aws_secret_access_key=credentials.get("aws_secret_access_key"),
             region_name=credentials.get("aws_region", "us-east-1")
@@ -328,7 +344,7 @@ def create_s3_bucket(bucket_name: str, region: str, credentials: Dict[str, str])
         logger.info(f"🔍 Debug: create_s3_bucket called with bucket={bucket_name}, region={region}")
         logger.info(f"🔍 Debug: credentials keys: {list(credentials.keys())}")
         
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=credentials["aws_access_key_id"],
             aws_secret_access_key=credentials["aws_secret_access_key"],
             region_name=region
@@ -336,7 +352,7 @@ def create_s3_bucket(bucket_name: str, region: str, credentials: Dict[str, str])
         
         logger.info(f"🔍 Debug: boto3 session created successfully")
         
-        s3 = session.client('s3')
+        s3 = protect_client(session.client('s3'), credential_fingerprint(credentials["aws_access_key_id"]))
         logger.info(f"🔍 Debug: S3 client created successfully")
         
         # Create bucket (only once!)
@@ -553,13 +569,13 @@ def get_file_content(file_path: Path, max_size: int = 10000) -> Optional[str]:
 def create_cloudfront_distribution(bucket_name: str, region: str, credentials: Dict[str, str]) -> Dict[str, str]:
     """Create CloudFront distribution for S3 bucket"""
     try:
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=credentials["aws_access_key_id"],
             aws_secret_access_key=credentials["aws_secret_access_key"],
             region_name=region
         )
         
-        cloudfront = session.client('cloudfront')
+        cloudfront = protect_client(session.client('cloudfront'), credential_fingerprint(credentials["aws_access_key_id"]))
         
         # CloudFront distribution configuration
         distribution_config = {
@@ -634,13 +650,13 @@ def ensure_static_website_ready(bucket_name: str, region: str, credentials: dict
 def create_nextjs_cloudfront_distribution(bucket_name: str, region: str, credentials: Dict[str, str]) -> Dict[str, str]:
     """Create CloudFront distribution optimized for Next.js apps with _next/* behavior"""
     try:
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=credentials["aws_access_key_id"],
             aws_secret_access_key=credentials["aws_secret_access_key"],
             region_name=region
         )
         
-        cloudfront = session.client('cloudfront')
+        cloudfront = protect_client(session.client('cloudfront'), credential_fingerprint(credentials["aws_access_key_id"]))
         
         # S3 website endpoint format
         website_domain = f"{bucket_name}.s3-website-{region}.amazonaws.com"
@@ -753,12 +769,12 @@ def create_nextjs_cloudfront_distribution(bucket_name: str, region: str, credent
 def create_cloudfront_invalidation(distribution_id: str, credentials: Dict[str, str], paths: List[str] = None) -> bool:
     """Create CloudFront invalidation for specified paths"""
     try:
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=credentials["aws_access_key_id"],
             aws_secret_access_key=credentials["aws_secret_access_key"],
         )
         
-        cloudfront = session.client('cloudfront')
+        cloudfront = protect_client(session.client('cloudfront'), credential_fingerprint(credentials["aws_access_key_id"]))
         
         # Default to invalidating everything if no paths specified
         if paths is None:
@@ -785,13 +801,13 @@ def create_cloudfront_invalidation(distribution_id: str, credentials: Dict[str,
     import json
     import time
     
-    session = boto3.Session(
+    session = get_aws_session(
         aws_access_key_id=credentials["aws_access_key_id"],
         aws_secret_access_key=credentials["aws_secret_access_key"],
         aws_session_token=credentials.get("aws_session_token"),
         region_name=region,
     )
-    s3 = session.client("s3")
+    s3 = protect_client(session.client("s3"), credential_fingerprint(credentials["aws_access_key_id"]))
 
     logger.info(f"🔧 Configuring S3 bucket for static website hosting: {bucket_name}")
 
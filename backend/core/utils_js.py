@@ -5,7 +5,7 @@ import platform
 import shutil
 import logging
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Callable, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -99,7 +99,9 @@ def robust_install_and_build(
     pm: str, 
     has_build_script: bool, 
     timeout_install: int = 900, 
-    timeout_build: int = 900
+    timeout_build: int = 900,
+    dependencies_ready: bool = False,
+    on_installed: Optional[Callable[[], None]] = None
 ) -> Tuple[bool, str]:
     """
     Robust install and build with automatic fallback handling
@@ -112,6 +114,8 @@ def robust_install_and_build(
         has_build_script: whether package.json has a build script
         timeout_install: install timeout in seconds
         timeout_build: build timeout in seconds
+        dependencies_ready: node_modules was restored from the build cache; skip install
+        on_installed: called after a fresh install, before any build script runs
     
     Returns:
         (success, message)
@@ -143,8 +147,12 @@ def robust_install_and_build(
     logger.info(f"🔨 Build command: {' '.join(build_cmd)}")
 
     # 2) Initial install attempt
-    logger.info("📦 Running initial install...")
-    ok, out, err = run_cmd(install_cmd, repo_dir, env=env, timeout=timeout_install)
+    if dependencies_ready:
+        logger.info("♻️ Dependencies restored from build cache, skipping install")
+        ok, out, err = True, "", ""
+    else:
+        logger.info("📦 Running initial install...")
+        ok, out, err = run_cmd(install_cmd, repo_dir, env=env, timeout=timeout_install)
     
     if not ok:
         text = f"{out}\n{err}"
@@ -175,6 +183,9 @@ def robust_install_and_build(
                 if not ok:
                     return False, f"Reinstall attempts failed: {err or out}"
 
+    if on_installed is not None and not dependencies_ready:
+        on_installed()
+
     # 4) Build attempt (with auto-retry on Rollup error)
     logger.info("🔨 Running build...")
     ok, out, err = run_cmd(build_cmd, repo_dir, env=env, timeout=timeout_build)
@@ -10,11 +10,12 @@ from typing import Dict, Any, Optional
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import boto3
 from botocore.exceptions import ClientError
 import hashlib
 import logging
 
+from core.aws_clients import get_aws_client
+
 logger = logging.getLogger(__name__)
 
 class CredentialEncryption:
@@ -41,7 +42,7 @@ class CredentialEncryption:
     def _init_kms(self):
         """Initialize AWS KMS client."""
         try:
-            self.kms_client = boto3.client('kms')
+            self.kms_client = get_aws_client('kms')
             logger.info("AWS KMS client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize KMS client: {e}")
@@ -148,7 +149,7 @@ class CredentialEncryption:
     def _get_account_id(self) -> str:
         """Get current AWS account ID."""
         try:
-            sts = boto3.client('sts')
+            sts = get_aws_client('sts')
             return sts.get_caller_identity()['Account']
         except Exception as e:
             logger.error(f"Failed to get AWS account ID: {e}")
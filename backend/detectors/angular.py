@@ -5,6 +5,7 @@ Detects Angular applications including Angular CLI projects
 from pathlib import Path
 import json
 import logging
+from core.detection import get_repo_index
 
 logger = logging.getLogger(__name__)
 
@@ -46,8 +47,9 @@ def detect_angular(repo_root: Path, package_json: dict | None = None):
     has_app = (repo_root / "src" / "app").exists() if has_src else False
     
     # Check for TypeScript files (Angular typically uses TypeScript)
-    ts_files = list(repo_root.glob("**/*.ts"))
-    component_files = list(repo_root.glob("**/*.component.ts"))
+    index = get_repo_index(repo_root)
+    ts_files = index.glob("**/*.ts")
+    component_files = index.glob("**/*.component.ts")
     
     # Check for Angular CLI commands
     scripts = package_json.get('scripts', {})
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 
 # Import our documentation detector
 from .documentation_detector import DocumentationDetector
+from core.detection import get_repo_index
 
 logger = logging.getLogger(__name__)
 
@@ -481,19 +482,10 @@ class EnhancedStackDetector:
         }
         
         try:
-            for file_path in repo.rglob('*'):
-                if file_path.is_file() and not any(part.startswith('.git') for part in file_path.parts):
-                    total_files += 1
-                    ext = file_path.suffix.lower()
-                    
-                    # Count file types
-                    if ext not in file_types:
-                        file_types[ext] = 0
-                    file_types[ext] += 1
-                    
-                    # Count source files
-                    if ext in source_extensions:
-                        source_files_count += 1
+            # One pruned walk (node_modules, vendor, ... are not descended into)
+            file_types = get_repo_index(repo).extension_counts(exclude_prefix='.git')
+            total_files = sum(file_types.values())
+            source_files_count = sum(count for ext, count in file_types.items() if ext in source_extensions)
                         
         except Exception as e:
             logger.warning(f"Failed to analyze files in {repo}: {e}")
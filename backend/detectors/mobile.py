@@ -17,6 +17,7 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
+from core.detection import get_repo_index, repo_index_scope
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +38,12 @@ class MobileDetector:
         4. iOS (native)  
         5. Xamarin (cross-platform)
         """
-        
+        # All platform checks share one walk of the repository
+        with repo_index_scope(get_repo_index(repo_path)):
+            return self._detect_platforms(repo_path, file_stats)
+    
+    def _detect_platforms(self, repo_path: Path, file_stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Run the platform checks in priority order"""
         # Check React Native first (has web deployment potential)
         react_native_result = self._detect_react_native(repo_path)
         if react_native_result:
@@ -160,7 +166,7 @@ class MobileDetector:
             evidence.append("lib/ directory")
             
         # Check for Dart files
-        dart_files = list(repo_path.rglob("*.dart"))
+        dart_files = get_repo_index(repo_path).rglob("*.dart")
         if dart_files:
             score += min(2, len(dart_files) // 5 + 1)
             evidence.append(f"{len(dart_files)} Dart files")
@@ -190,21 +196,22 @@ class MobileDetector:
         """Detect Android applications"""
         score = 0
         evidence = []
+        index = get_repo_index(repo_path)
         
         # Check for Gradle build files
-        gradle_files = list(repo_path.rglob("build.gradle")) + list(repo_path.rglob("*.gradle"))
+        gradle_files = index.rglob("build.gradle") + index.rglob("*.gradle")
         if gradle_files:
             score += 2
             evidence.append("Gradle build files")
             
         # Check for AndroidManifest.xml
-        manifest_files = list(repo_path.rglob("AndroidManifest.xml"))
+        manifest_files = index.rglob("AndroidManifest.xml")
         if manifest_files:
             score += 3
             evidence.append("AndroidManifest.xml")
             
         # Check for res/ directory (Android resources)
-        res_dirs = [p for p in repo_path.rglob("res") if p.is_dir()]
+        res_dirs = [rel for rel in index.match("**/res") if index.is_dir(rel)]
         if res_dirs:
             score += 2
             evidence.append("Android res/ directory")
@@ -218,7 +225,7 @@ class MobileDetector:
         # Check for typical Android directories
         android_indicators = ["src/main/java", "app/src", "gradle"]
         for indicator in android_indicators:
-            if any(indicator in str(p) for p in repo_path.rglob("*")):
+            if any(indicator in rel for rel in index.entries):
                 score += 1
                 evidence.append(f"Android structure: {indicator}")
                 break
@@ -248,10 +255,11 @@ class MobileDetector:
         """Detect iOS applications"""
         score = 0
         evidence = []
+        index = get_repo_index(repo_path)
         
         # Check for Xcode project files
-        xcodeproj = list(repo_path.rglob("*.xcodeproj"))
-        xcworkspace = list(repo_path.rglob("*.xcworkspace"))
+        xcodeproj = index.rglob("*.xcodeproj")
+        xcworkspace = index.rglob("*.xcworkspace")
         
         if xcodeproj:
             score += 3
@@ -262,13 +270,13 @@ class MobileDetector:
             evidence.append(".xcworkspace file")
             
         # Check for Info.plist
-        if list(repo_path.rglob("Info.plist")):
+        if index.rglob("Info.plist"):
             score += 2
             evidence.append("Info.plist")
             
         # Check for Swift/Objective-C files
-        swift_files = list(repo_path.rglob("*.swift"))
-        objc_files = list(repo_path.rglob("*.m")) + list(repo_path.rglob("*.h"))
+        swift_files = index.rglob("*.swift")
+        objc_files = index.rglob("*.m") + index.rglob("*.h")
         
         if swift_files:
             score += min(2, len(swift_files) // 10 + 1)
@@ -303,9 +311,10 @@ class MobileDetector:
         """Detect Xamarin applications"""
         score = 0
         evidence = []
+        index = get_repo_index(repo_path)
         
         # Check for .sln file (Visual Studio solution)
-        if list(repo_path.rglob("*.sln")):
+        if index.rglob("*.sln"):
             score += 2
             evidence.append("Visual Studio solution")
             
@@ -317,7 +326,7 @@ class MobileDetector:
         ]
         
         for pattern in xamarin_indicators:
-            if list(repo_path.rglob(pattern)):
+            if index.rglob(pattern):
                 score += 1
                 evidence.append(pattern)
                 
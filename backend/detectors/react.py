@@ -5,6 +5,7 @@ Detects React applications including Create React App, Vite, Next.js, and custom
 from pathlib import Path
 import json
 import logging
+from core.detection import get_repo_index
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +36,9 @@ def detect_react(repo_root: Path, package_json: dict | None = None):
     has_react_dom = 'react-dom' in all_deps
     
     # Check for React files
-    jsx_files = list(repo_root.glob("**/*.jsx")) + list(repo_root.glob("**/*.js"))
-    tsx_files = list(repo_root.glob("**/*.tsx")) + list(repo_root.glob("**/*.ts"))
+    index = get_repo_index(repo_root)
+    jsx_files = index.glob("**/*.jsx") + index.glob("**/*.js")
+    tsx_files = index.glob("**/*.tsx") + index.glob("**/*.ts")
     
     # Check for React project structure
     has_src = (repo_root / "src").exists()
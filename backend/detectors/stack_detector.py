@@ -2,6 +2,7 @@
 from pathlib import Path
 import json
 import logging
+from core.detection import get_repo_index, shares_repo_index
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,8 @@ def is_php_repo(repo: Path) -> bool:
         return True
     
     # Signal 2: Check for PHP files
-    php_files = list(repo.glob("*.php")) + list(repo.glob("**/*.php"))
+    index = get_repo_index(repo)
+    php_files = index.glob("*.php") + index.glob("**/*.php")
     if php_files:
         logger.info(f"Detected PHP: Found {len(php_files)} PHP files")
         return True
@@ -61,10 +63,11 @@ def classify_laravel_type(repo: Path) -> str:
     logger.info("Laravel detected - classifying type...")
     
     # Check for SPA split architecture
+    index = get_repo_index(repo)
     spa_dirs = [repo / "frontend", repo / "client"]
     for spa_dir in spa_dirs:
         if spa_dir.exists():
-            vue_files = list(spa_dir.glob("**/*.vue"))
+            vue_files = index.glob(f"{spa_dir.name}/**/*.vue")
             package_json = spa_dir / "package.json"
             if vue_files and package_json.exists():
                 logger.info("Laravel SPA Split: Frontend/client directory with Vue files and package.json")
@@ -86,7 +89,7 @@ def classify_laravel_type(repo: Path) -> str:
             pass
     
     # Check for HandleInertiaRequests middleware
-    middleware_files = list(repo.glob("app/Http/Middleware/**/*.php"))
+    middleware_files = index.glob("app/Http/Middleware/**/*.php")
     for middleware_file in middleware_files:
         try:
             content = middleware_file.read_text(encoding='utf-8', errors='ignore')
@@ -106,7 +109,7 @@ def classify_laravel_type(repo: Path) -> str:
     webpack_mix = (repo / "webpack.mix.js").exists()
     
     # Vue files in resources
-    resources_vue = list((repo / "resources/js").glob("**/*.vue")) if (repo / "resources/js").exists() else []
+    resources_vue = index.glob("resources/js/**/*.vue")
     
     # Check package.json for Vue/Inertia dependencies
     vue_in_package = False
@@ -202,6 +205,7 @@ def is_static_site(repo: Path) -> bool:
     
     return False
 
+@shares_repo_index("repo_path")
 def classify_stack(repo_path: str) -> dict | str:
     """
     Classify the stack type based on repository analysis
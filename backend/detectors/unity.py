@@ -18,6 +18,7 @@ import re
 import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
+from core.detection import get_repo_index
 
 logger = logging.getLogger(__name__)
 
@@ -172,8 +173,9 @@ class UnityDetector:
         """Quick count of Unity-specific files"""
         count = 0
         try:
+            index = get_repo_index(repo_path)
             for ext in self.unity_extensions:
-                files = list(repo_path.rglob(f"*{ext}"))
+                files = index.rglob(f"*{ext}")
                 # Filter out files in skip directories
                 filtered_files = [
                     f for f in files 
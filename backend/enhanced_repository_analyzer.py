@@ -13,6 +13,11 @@ sys.path.insert(0, str(Path(__file__).parent))
 from analyzer.pipeline import IntelligencePipeline
 from analyzer.stack_composer import StackComposer, create_stack_composer
 
+try:
+    from cleanup_service import cleanup_service
+except ImportError:  # Workspace tracking unavailable (e.g. scripts outside the API)
+    cleanup_service = None
+
 logger = logging.getLogger(__name__)
 
 class EnhancedRepositoryAnalyzer:
@@ -67,6 +72,7 @@ class EnhancedRepositoryAnalyzer:
         - executive_summary: High-level project overview
         - legacy_format: Compatible with existing API
         """
+        pipeline_result = None
         try:
             logger.info(f"🚀 Starting comprehensive analysis for {repo_url}")
             
@@ -173,6 +179,11 @@ class EnhancedRepositoryAnalyzer:
                 "error": str(e),
                 "analyzer_version": "2.0.0-intelligence-pipeline"
             }
+        finally:
+            # The clone stays on disk for later steps, but it is no longer read here;
+            # unpin it so disk-pressure eviction may reclaim it
+            if cleanup_service is not None and pipeline_result and pipeline_result.get("workspace_id"):
+                cleanup_service.release_workspace(pipeline_result["workspace_id"])
     
     def _get_frontend_project_type(self, stack_blueprint: Dict[str, Any]) -> str:
         """Convert framework name to frontend-expected projectType format"""
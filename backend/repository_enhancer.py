@@ -330,9 +330,22 @@ SSR Required: {preflight['ssrRequired']}"""
             if 'userMessage' in preflight:
                 logger.info(f"🐛 DEBUG: userMessage length: {len(preflight['userMessage'])}")
 
+            # Pinned until the caller is done with local_repo_path (release_workspace(workspace_id))
+            workspace_id = None
+            try:
+                from cleanup_service import cleanup_service
+                cleanup_service.register_repository(
+                    f"enhancer_{deployment_id}", temp_dir, {"source": "repository_enhancer", "repo_url": github_url},
+                    in_use=True
+                )
+                workspace_id = f"enhancer_{deployment_id}"
+            except ImportError:
+                pass
+            
             return {
                 "success": True,
                 "local_repo_path": temp_dir,
+                "workspace_id": workspace_id,
                 "framework": framework_info,
                 "analysis": analysis,
                 "enhancements": enhancement_result,
@@ -14,9 +14,17 @@ class StackRouterRegistry:
     """Registry for stack-specific routers"""
     
     def __init__(self):
-        self.routers: Dict[str, APIRouter] = {}
+        self._routers: Dict[str, APIRouter] = {}
         self.loaded_stacks: set = set()
-        self._load_base_routers()
+        self._base_routers_loaded = False
+    
+    @property
+    def routers(self) -> Dict[str, APIRouter]:
+        """Routers by stack type; the base routers are imported on first access"""
+        if not self._base_routers_loaded:
+            self._base_routers_loaded = True
+            self._load_base_routers()
+        return self._routers
     
     def _load_base_routers(self):
         """Load core routers that are always available"""
@@ -11,6 +11,10 @@ os.environ['GIT_PYTHON_REFRESH'] = 'quiet'
 from dotenv import load_dotenv
 load_dotenv()
 
+# Import-time breakdown of startup (GET /api/system/startup); CODEFLOWOPS_STARTUP_PROFILE=1 adds per-module timings
+from src.utils.startup_profile import get_startup_profile
+startup_profile = get_startup_profile()
+
 from fastapi import FastAPI, HTTPException, APIRouter, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
@@ -29,13 +33,18 @@ import subprocess
 import asyncio
 import sys
 from pathlib import Path
-import boto3
+import importlib
+import importlib.util
 import shutil
-from concurrent.futures import ThreadPoolExecutor
 import threading
 
 from pathlib import Path
 
+# Heavy SDKs, detectors and stack routers are imported on first use (or by the warm-up)
+from src.utils.lazy_loading import lazy_import, lazy_attribute, module_getattr, LazyRouter
+boto3 = lazy_import("boto3")
+startup_profile.mark("fastapi")
+
 # Ensure a logger is available before any early import-time logging
 logger = logging.getLogger(__name__)
 
@@ -55,17 +64,10 @@ try:
 except Exception as e:
     ENHANCED_SUBS_AVAILABLE = False
     logger.warning(f"⚠️ Enhanced subscription flow not available in simple_api: {e}")
+startup_profile.mark("auth")
 
-# Import the ReactDeployer for React-specific deployments
-try:
-    from react_deployer import ReactDeployer
-    REACT_DEPLOYER_AVAILABLE = True
-    logger = logging.getLogger(__name__)
-    logger.info("✅ ReactDeployer imported successfully")
-except ImportError as e:
-    REACT_DEPLOYER_AVAILABLE = False
-    logger = logging.getLogger(__name__)
-    logger.warning(f"⚠️ ReactDeployer not available: {e}")
+# ReactDeployer (boto3, DirectReactBuilder) is imported on the first React deployment
+REACT_DEPLOYER_AVAILABLE = importlib.util.find_spec("react_deployer") is not None
 
 # Configure logging
 logging.basicConfig(
@@ -74,15 +76,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Background deployment infrastructure (simplified)
-executor = ThreadPoolExecutor(max_workers=4)
-_DEPLOY_STATES = {}
-_ANALYSIS_SESSIONS = {}  # Store analysis data by deployment_id
-_USER_DEPLOYMENT_HISTORY = {}  # Store completed deployments by user_id for dashboard
+# Background deployment infrastructure
+# Deployments run from a durable job queue (src/services/job_queue.py). Workers run inline
+# in this process unless CODEFLOWOPS_JOB_WORKERS=external, in which case separate
+# `python -m src.services.job_queue` processes pick the jobs up.
+# The shared queue is only used when any worker can report progress where the API polls it
+# (DEPLOYMENT_STATE_REDIS_URL) and open the sealed credentials (CODEFLOWOPS_JOB_SECRET_KEY);
+# otherwise each process runs the jobs it queued from a process-local queue.
+try:
+    from src.services.job_queue import JobWorker, JobQueue, SQLiteJobBackend, get_job_queue
+    from src.utils import job_secrets
+    JOB_QUEUE_AVAILABLE = True
+except Exception as e:
+    from concurrent.futures import ThreadPoolExecutor
+    JOB_QUEUE_AVAILABLE = False
+    fallback_executor = ThreadPoolExecutor(max_workers=4)
+    logger.warning(f"⚠️ Deployment job queue not available, running deployments in-process: {e}")
+DEPLOYMENT_JOB_HANDLER = "simple_api:_run_deployment_job"
+_JOB_WORKER = None
+_LOCAL_JOB_QUEUE = None
+
+def _job_queue_is_shared() -> bool:
+    return bool(os.getenv("DEPLOYMENT_STATE_REDIS_URL")) and job_secrets.has_shared_key()
+
+def _deployment_job_queue():
+    """The shared queue when state and secrets are shared, else a queue only this process claims from"""
+    global _LOCAL_JOB_QUEUE
+    if _job_queue_is_shared():
+        return get_job_queue()
+    if _LOCAL_JOB_QUEUE is None:
+        _LOCAL_JOB_QUEUE = JobQueue(SQLiteJobBackend(":memory:"))
+    return _LOCAL_JOB_QUEUE
+# TTL/LRU-bounded stores, shared across workers when DEPLOYMENT_STATE_REDIS_URL is set
+from src.services.deployment_state_store import (
+    get_deployment_states, get_analysis_sessions, get_deployment_history
+)
+_DEPLOY_STATES = get_deployment_states()
+_ANALYSIS_SESSIONS = get_analysis_sessions()  # Store analysis data by deployment_id
+_USER_DEPLOYMENT_HISTORY = get_deployment_history()  # Store completed deployments by user_id for dashboard
 _LOCK = threading.Lock()
+# Summary-first analysis responses with paginated detail endpoints
+from src.utils.analysis_views import summarize_analysis, full_analysis, list_files, list_tree, list_findings
+# Clone/install/build commands stream their output into the deployment log
+from core.process_runner import run_step, StepLogSink, StepResult, cancel_all as cancel_running_steps
+startup_profile.mark("deployment_state")
 
-# Import repository enhancer and cleanup service
-from repository_enhancer import RepositoryEnhancer, _get_primary_language
+# Import cleanup service (repository_enhancer pulls in GitPython and is loaded lazily)
 from cleanup_service import cleanup_service
 
 # Import deployment quota manager with error handling
@@ -111,37 +150,47 @@ try:
 except ImportError as e:
     logger.warning(f"⚠️ Trial management service not available: {e}")
     TRIAL_SERVICE_AVAILABLE = False
+startup_profile.mark("quota_and_trial")
 
 # Simple Stripe configuration
-try:
-    from config.stripe_config import StripeConfig
-    import stripe
-    stripe.api_key = StripeConfig.get_secret_key()
-    STRIPE_AVAILABLE = True
-    logger.info("✅ Simple Stripe configuration loaded")
-except Exception as e:
-    logger.warning(f"⚠️ Stripe not available: {e}")
-    STRIPE_AVAILABLE = False
+# Runs in the warm-up: the secret key may come from Parameter Store, and
+# StripeService sets the key itself before calling Stripe anyway.
+STRIPE_AVAILABLE = importlib.util.find_spec("stripe") is not None
+
+def configure_stripe():
+    global STRIPE_AVAILABLE
+    try:
+        from config.stripe_config import StripeConfig
+        import stripe
+        stripe.api_key = StripeConfig.get_secret_key()
+        STRIPE_AVAILABLE = True
+        logger.info("✅ Simple Stripe configuration loaded")
+    except Exception as e:
+        logger.warning(f"⚠️ Stripe not available: {e}")
+        STRIPE_AVAILABLE = False
 
 # Add backend paths to import existing components
 sys.path.append(str(backend_path))
 sys.path.append(str(src_path))
 
-# Import existing analysis components
-try:
-    from detectors.stack_detector import classify_stack, is_nextjs_repo, is_php_repo, is_static_site
-    from detectors.enhanced_stack_detector import EnhancedStackDetector
-    from detectors.angular import detect_angular
-    from detectors.laravel import detect_laravel
-    from detectors.python import PythonFrameworkDetector
-    from detectors.react import detect_react
-    from detectors.nodejs import detect_nodejs
-    logger.info("✅ Analysis components loaded successfully")
-    ANALYSIS_COMPONENTS_AVAILABLE = True
-except ImportError as e:
-    logger.error(f"⚠️ Could not import analysis components: {e}")
-    classify_stack = None
-    ANALYSIS_COMPONENTS_AVAILABLE = False
+# Existing analysis components, imported on first attribute access (simple_api.classify_stack, ...)
+_LAZY_ATTRIBUTES = {
+    "classify_stack": ("detectors.stack_detector", "classify_stack"),
+    "is_nextjs_repo": ("detectors.stack_detector", "is_nextjs_repo"),
+    "is_php_repo": ("detectors.stack_detector", "is_php_repo"),
+    "is_static_site": ("detectors.stack_detector", "is_static_site"),
+    "EnhancedStackDetector": ("detectors.enhanced_stack_detector", "EnhancedStackDetector"),
+    "detect_angular": ("detectors.angular", "detect_angular"),
+    "detect_laravel": ("detectors.laravel", "detect_laravel"),
+    "PythonFrameworkDetector": ("detectors.python", "PythonFrameworkDetector"),
+    "detect_react": ("detectors.react", "detect_react"),
+    "detect_nodejs": ("detectors.nodejs", "detect_nodejs"),
+    "RepositoryEnhancer": ("repository_enhancer", "RepositoryEnhancer"),
+    "_get_primary_language": ("repository_enhancer", "_get_primary_language"),
+    "ReactDeployer": ("react_deployer", "ReactDeployer"),
+}
+__getattr__ = module_getattr(__name__, _LAZY_ATTRIBUTES)
+ANALYSIS_COMPONENTS_AVAILABLE = importlib.util.find_spec("detectors") is not None
 
 # Import modular router system
 MODULAR_ROUTERS_AVAILABLE = False
@@ -153,6 +202,21 @@ try:
 except ImportError as e:
     logger.error(f"⚠️ Modular router system not available: {e}")
     stack_router_registry = None
+startup_profile.mark("router_registry")
+
+# Preloaded in the background once the server accepts connections (CODEFLOWOPS_WARMUP=0 disables)
+def _warm_lazy_modules():
+    module_names = sorted({module_name for module_name, _ in _LAZY_ATTRIBUTES.values()})
+    for module_name in module_names + ["enhanced_repository_analyzer"]:
+        try:
+            lazy_attribute(module_name, "__name__", trigger="warmup")
+        except ImportError as e:
+            logger.warning(f"⚠️ Could not preload {module_name}: {e}")
+
+startup_profile.add_warmup("stripe", configure_stripe)
+startup_profile.add_warmup("detectors and deployers", _warm_lazy_modules)
+if stack_router_registry is not None:
+    startup_profile.add_warmup("base routers", lambda: stack_router_registry.routers)
 
 def authorize_github_url(repo_url: str, github_token: Optional[str] = None) -> str:
     """
@@ -172,6 +236,7 @@ class RepoAnalysisRequest(BaseModel):
     repo_url: str
     analysis_type: str = "full"
     github_token: Optional[str] = None
+    include_details: bool = False  # Inline the file list/tree/findings instead of paginating them
 
 class DeployRequest(BaseModel):
     deployment_id: Optional[str] = None
@@ -233,6 +298,50 @@ class LoginResponse(BaseModel):
 # Create FastAPI app and router
 app = FastAPI(title="CodeFlowOps Simple SaaS API - Streamlined")
 
+@app.on_event("startup")
+def start_workspace_cleanup():
+    """Scan for orphaned temp workspaces and start the disk-budget sweep"""
+    cleanup_service.start_background_cleanup()
+
+@app.on_event("shutdown")
+def stop_workspace_cleanup():
+    cleanup_service.stop_background_cleanup()
+
+@app.on_event("startup")
+def start_deployment_workers():
+    """Run deployment jobs in this process unless dedicated worker processes are configured"""
+    global _JOB_WORKER
+    if not JOB_QUEUE_AVAILABLE:
+        return
+    if os.getenv("CODEFLOWOPS_JOB_WORKERS", "inline").lower() == "external":
+        if _job_queue_is_shared():
+            logger.info("👷 Deployment jobs are handled by external workers")
+            return
+        logger.error(
+            "❌ External job workers need DEPLOYMENT_STATE_REDIS_URL and CODEFLOWOPS_JOB_SECRET_KEY; "
+            "running this process's deployments inline"
+        )
+    _JOB_WORKER = JobWorker(_deployment_job_queue(), concurrency=int(os.getenv("CODEFLOWOPS_JOB_CONCURRENCY", "4")))
+    _JOB_WORKER.register(DEPLOYMENT_JOB_HANDLER, _run_deployment_job)
+    _JOB_WORKER.start()
+
+@app.on_event("shutdown")
+def stop_deployment_workers():
+    if _JOB_WORKER is not None:
+        _JOB_WORKER.stop()
+    cancel_running_steps()  # Don't leave npm/git process groups behind
+
+_WARMUP_TASK = None
+
+@app.on_event("startup")
+async def start_warmup():
+    """Preload lazily imported components without holding up startup"""
+    global _WARMUP_TASK
+    if os.getenv("CODEFLOWOPS_WARMUP", "1").lower() in ("0", "false", "no"):
+        return
+    delay = float(os.getenv("CODEFLOWOPS_WARMUP_DELAY_SECONDS", "1"))
+    _WARMUP_TASK = asyncio.create_task(startup_profile.run_warmup(delay))
+
 # Root-level health endpoint for ALB health checks (no auth, fast response)
 @app.get("/health")
 def health():
@@ -245,6 +354,61 @@ def api_health_simple():
     """Health endpoint for frontend API calls"""
     return {"ok": True}
 
+@app.get("/api/system/startup")
+def startup_profile_report():
+    """Import-time breakdown, lazy loads and warm-up progress of this process"""
+    return startup_profile.report()
+
+# Per-route latency, in-flight requests and event-loop lag; CODEFLOWOPS_SLOW_REQUEST_PROFILE_MS=<ms> profiles slow requests
+# Served to localhost only unless CODEFLOWOPS_OBSERVABILITY_TOKEN is set (then as a Bearer token)
+from src.middleware.request_metrics import get_request_metrics
+from src.utils.request_profiler import get_request_profiler, folded_text
+from src.auth.observability_access import require_observability_access
+request_metrics = get_request_metrics()
+request_profiler = get_request_profiler()
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    request_metrics.loop_lag.start()
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    request_metrics.loop_lag.stop()
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_observability_access)])
+def prometheus_metrics():
+    """Prometheus scrape endpoint for the API's own request metrics"""
+    return Response(request_metrics.render(request_profiler), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/system/latency", dependencies=[Depends(require_observability_access)])
+def latency_report(limit: int = 20, quantile: float = 0.99):
+    """Routes ranked by estimated latency quantile (p99 by default)"""
+    return {
+        "routes": request_metrics.slowest_routes(quantile=quantile, limit=limit),
+        "in_flight": request_metrics.in_flight,
+        "event_loop_lag": {"last_ms": round(request_metrics.loop_lag.last * 1000, 1),
+                           "max_ms": round(request_metrics.loop_lag.max * 1000, 1)},
+        "profiling": {"enabled": request_profiler is not None,
+                      "threshold_ms": request_profiler.threshold_ms if request_profiler else None}
+    }
+
+@app.get("/api/system/profiles", dependencies=[Depends(require_observability_access)])
+def list_request_profiles():
+    """Stored profiles of slow requests, newest first"""
+    if request_profiler is None:
+        return {"enabled": False, "profiles": []}
+    return {"enabled": True, "threshold_ms": request_profiler.threshold_ms, "profiles": request_profiler.store.list()}
+
+@app.get("/api/system/profiles/{profile_id}", dependencies=[Depends(require_observability_access)])
+def get_request_profile(profile_id: str, format: str = "json"):
+    """One slow-request profile; ``format=folded`` returns collapsed stacks for flamegraph tools"""
+    profile = request_profiler.store.get(profile_id) if request_profiler is not None else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return Response(folded_text(profile), media_type="text/plain")
+    return profile
+
 router = APIRouter()
 
 # Auth storage (in-memory for simple implementation)
@@ -1014,7 +1178,8 @@ async def analyze_repository(request: RepoAnalysisRequest):
         
         return {
             "success": True,
-            "analysis": analysis,
+            # File list, directory tree and findings are paged via /api/analysis/{analysis_id}/...
+            "analysis": full_analysis(analysis, deployment_id) if request.include_details else summarize_analysis(analysis, deployment_id),
             "analysis_id": deployment_id,
             "timestamp": datetime.utcnow().isoformat(),
             "modular_system_available": MODULAR_ROUTERS_AVAILABLE,
@@ -1047,6 +1212,45 @@ async def analyze_repository(request: RepoAnalysisRequest):
             
         raise HTTPException(status_code=500, detail=error_msg)
 
+def _stored_analysis(analysis_id: str) -> Dict[str, Any]:
+    session = _ANALYSIS_SESSIONS.get(analysis_id)
+    if not session or not session.get("analysis"):
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return session["analysis"]
+
+@router.get("/api/analysis/{analysis_id}")
+async def get_analysis_summary(analysis_id: str):
+    """Summary of a stored analysis (same shape as the /api/analyze-repo response)"""
+    return {
+        "success": True,
+        "analysis": summarize_analysis(_stored_analysis(analysis_id), analysis_id),
+        "analysis_id": analysis_id
+    }
+
+@router.get("/api/analysis/{analysis_id}/files")
+async def get_analysis_files(analysis_id: str, offset: int = 0, limit: int = 100, prefix: Optional[str] = None, language: Optional[str] = None):
+    """Paginated per-file metadata of a stored analysis"""
+    return {"success": True, "analysis_id": analysis_id, **list_files(_stored_analysis(analysis_id), offset, limit, prefix, language)}
+
+@router.get("/api/analysis/{analysis_id}/tree")
+async def get_analysis_tree(analysis_id: str, path: str = "", offset: int = 0, limit: int = 100):
+    """One level of the repository tree under path"""
+    return {"success": True, "analysis_id": analysis_id, **list_tree(_stored_analysis(analysis_id), path, offset, limit)}
+
+@router.get("/api/analysis/{analysis_id}/findings")
+async def get_analysis_findings(analysis_id: str, offset: int = 0, limit: int = 100, severity: Optional[str] = None):
+    """Paginated security findings of a stored analysis, most severe first"""
+    return {"success": True, "analysis_id": analysis_id, **list_findings(_stored_analysis(analysis_id), offset, limit, severity)}
+
+@router.get("/api/system/workspaces")
+async def get_workspace_usage():
+    """Disk usage of cloned repositories / build workspaces against the budget"""
+    return {
+        "success": True,
+        "workspaces": cleanup_service.get_cleanup_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @router.post("/api/validate-credentials")
 async def validate_credentials(request: CredentialsRequest):
     """Validate AWS credentials"""
@@ -1095,16 +1299,8 @@ def _store_completed_deployment(deployment_id: str, deployment_state: Dict[str,
             "technology": deployment_state.get("framework", "Static")
         }
         
-        # Store in user deployment history
-        with _LOCK:
-            if user_id not in _USER_DEPLOYMENT_HISTORY:
-                _USER_DEPLOYMENT_HISTORY[user_id] = []
-            
-            # Add to beginning of list (newest first)
-            _USER_DEPLOYMENT_HISTORY[user_id].insert(0, history_entry)
-            
-            # Keep only last 50 deployments per user
-            _USER_DEPLOYMENT_HISTORY[user_id] = _USER_DEPLOYMENT_HISTORY[user_id][:50]
+        # Store in user deployment history (newest first, last 50 per user)
+        _USER_DEPLOYMENT_HISTORY.add(user_id, history_entry)
         
         logger.info(f"📝 Stored deployment {deployment_id} in history for user {user_id} (status: {history_entry['status']})")
         
@@ -1162,16 +1358,10 @@ async def get_quota_status(request: Request, user_id: Optional[str] = None, plan
         # Mock current usage - in production, get from database
         current_runs = 2  # Example: user has made 2 deployments this month
         
-        # Count actual active deployments from _DEPLOY_STATES FOR THIS USER
-        active_runs = 0
-        with _LOCK:
-            for dep_id, state in _DEPLOY_STATES.items():
-                state_user_id = state.get('user_id', 'unknown')
-                if (state_user_id == user_id and 
-                    state.get('status') in ['initializing', 'routing', 'deploying', 'routing_react', 'routing_secure_baas', 'routing_fullstack']):
-                    active_runs += 1
+        # Count actual active deployments FOR THIS USER (per-user index, no scan)
+        active_runs = _DEPLOY_STATES.active_count(user_id)
         
-        logger.info(f"🔍 User {user_id} active deployments: {active_runs} (from {len(_DEPLOY_STATES)} total tracked states)")
+        logger.info(f"🔍 User {user_id} active deployments: {active_runs}")
         
         quota_status = deployment_quota_manager.get_quota_status(
             user_id=user_id,
@@ -1220,16 +1410,10 @@ async def check_deployment_quota(user_id: Optional[str] = None, plan: Optional[s
         # Mock current usage - in production, get from database
         current_runs = 2
         
-        # Count actual active deployments from _DEPLOY_STATES FOR THIS USER
-        active_runs = 0
-        with _LOCK:
-            for dep_id, state in _DEPLOY_STATES.items():
-                state_user_id = state.get('user_id', 'unknown')
-                if (state_user_id == user_id and 
-                    state.get('status') in ['initializing', 'routing', 'deploying', 'routing_react', 'routing_secure_baas', 'routing_fullstack']):
-                    active_runs += 1
+        # Count actual active deployments FOR THIS USER (per-user index, no scan)
+        active_runs = _DEPLOY_STATES.active_count(user_id)
         
-        logger.info(f"🔍 User {user_id} active deployments: {active_runs} (from {len(_DEPLOY_STATES)} total tracked states)")
+        logger.info(f"🔍 User {user_id} active deployments: {active_runs}")
         
         # Check both monthly and concurrent limits
         can_deploy_monthly, monthly_reason = deployment_quota_manager.check_monthly_quota(
@@ -1282,29 +1466,11 @@ async def deploy_to_aws(request: DeployRequest):
             plan_tier = "free"     # TODO: Get from user subscription
             current_runs = 2       # TODO: Get from database
             
-            # Count actual active deployments from _DEPLOY_STATES PER USER
-            active_runs = 0
-            with _LOCK:
-                # Clean up completed/failed deployments first
-                completed_states = []
-                for dep_id, state in _DEPLOY_STATES.items():
-                    status = state.get('status', '')
-                    if status in ['completed', 'failed', 'error']:
-                        completed_states.append(dep_id)
-                
-                # Remove completed deployments
-                for dep_id in completed_states:
-                    del _DEPLOY_STATES[dep_id]
-                    logger.info(f"🧹 Cleaned up completed deployment state: {dep_id}")
-                
-                # Count remaining active deployments FOR THIS USER ONLY
-                for dep_id, state in _DEPLOY_STATES.items():
-                    state_user_id = state.get('user_id', 'unknown')
-                    if (state_user_id == user_id and 
-                        state.get('status') in ['initializing', 'routing', 'deploying', 'routing_react', 'routing_secure_baas', 'routing_fullstack']):
-                        active_runs += 1
+            # Count active deployments FOR THIS USER ONLY (per-user index, no scan);
+            # finished states expire from the store on their own
+            active_runs = _DEPLOY_STATES.active_count(user_id)
             
-            logger.info(f"🔍 Quota check - User {user_id} active deployments: {active_runs} (from {len(_DEPLOY_STATES)} total states)")
+            logger.info(f"🔍 Quota check - User {user_id} active deployments: {active_runs}")
             
             # Validate quota limits
             can_deploy_monthly, monthly_reason = deployment_quota_manager.check_monthly_quota(
@@ -1411,6 +1577,7 @@ async def deploy_to_aws(request: DeployRequest):
             _DEPLOY_STATES[deployment_id] = {
                 "status": "initializing",
                 "user_id": user_id,  # Track which user owns this deployment
+                "plan_tier": plan_tier,
                 "steps": [{"step": "Deployment Started", "status": "in_progress", "message": "Starting deployment..."}],
                 "logs": ["🚀 Starting streamlined deployment..."],
                 "created_at": datetime.utcnow().isoformat(),
@@ -1496,7 +1663,7 @@ async def deploy_to_aws(request: DeployRequest):
                 _DEPLOY_STATES[deployment_id]["progress"] = 25
             
             # Route to ReactDeployer
-            executor.submit(_run_react_deployment, deployment_id, analysis, request)
+            _enqueue_deployment("react", deployment_id, analysis, request)
             
             return {
                 "success": True,
@@ -1522,7 +1689,7 @@ async def deploy_to_aws(request: DeployRequest):
                     _DEPLOY_STATES[deployment_id]["progress"] = 25
                 
                 # Route to secure BaaS deployment
-                executor.submit(_run_secure_baas_deployment, deployment_id, analysis, request)
+                _enqueue_deployment("secure_baas", deployment_id, analysis, request)
                 
                 return {
                     "success": True,
@@ -1547,7 +1714,7 @@ async def deploy_to_aws(request: DeployRequest):
                     _DEPLOY_STATES[deployment_id]["progress"] = 25
                 
                 # Route to full-stack orchestrator
-                executor.submit(_run_fullstack_deployment, deployment_id, analysis, request)
+                _enqueue_deployment("fullstack", deployment_id, analysis, request)
                 
                 return {
                     "success": True,
@@ -1587,7 +1754,7 @@ async def deploy_to_aws(request: DeployRequest):
         logger.info("🔧 Using fallback deployment for unsupported or generic stack")
         
         # Start background deployment
-        executor.submit(_run_basic_deployment, deployment_id, analysis, request)
+        _enqueue_deployment("basic", deployment_id, analysis, request)
         
         return {
             "success": True,
@@ -1622,6 +1789,98 @@ async def deploy_to_aws(request: DeployRequest):
         
         raise HTTPException(status_code=500, detail=f"Deployment failed: {error_detail}")
 
+def _enqueue_deployment(kind: str, deployment_id: str, analysis: Dict[str, Any], request: DeployRequest):
+    """Queue a deployment; re-submitting the same deployment_id returns the existing job"""
+    if not JOB_QUEUE_AVAILABLE:
+        fallback_executor.submit(_run_deployment_job, kind, deployment_id, analysis, request.model_dump())
+        return None
+    
+    with _LOCK:
+        state = _DEPLOY_STATES.get(deployment_id, {})
+        user_id = state.get("user_id")
+        plan_tier = state.get("plan_tier", "free")
+    
+    # AWS keys never reach the job store in plaintext
+    request_data, sealed_credentials = job_secrets.split_secrets(request.model_dump())
+    
+    queue = _deployment_job_queue()
+    job = queue.enqueue(
+        job_type=f"deploy_{kind}",
+        handler=DEPLOYMENT_JOB_HANDLER,
+        payload={
+            "kind": kind,
+            "deployment_id": deployment_id,
+            "analysis": analysis,
+            "request_data": request_data,
+            "sealed_credentials": sealed_credentials,
+            "user_id": user_id,
+            "plan_tier": plan_tier
+        },
+        tenant_id=user_id or "anonymous",
+        plan_tier=plan_tier,
+        idempotency_key=f"deploy:{deployment_id}",
+        max_attempts=1  # Deployments are not safe to replay blindly
+    )
+    position = queue.position(job.job_id)
+    
+    with _LOCK:
+        if deployment_id in _DEPLOY_STATES:
+            _DEPLOY_STATES[deployment_id]["job_id"] = job.job_id
+            if position:
+                _DEPLOY_STATES[deployment_id]["logs"].append(f"⏳ Queued behind {position} other deployment(s)...")
+    return job
+
+def _run_deployment_job(kind: str, deployment_id: str, analysis: Dict[str, Any], request_data: Dict[str, Any],
+                        sealed_credentials: Optional[str] = None, user_id: Optional[str] = None,
+                        plan_tier: Optional[str] = None):
+    """Job queue entry point for deployments"""
+    runners = {
+        "react": _run_react_deployment,
+        "secure_baas": _run_secure_baas_deployment,
+        "fullstack": _run_fullstack_deployment,
+        "basic": _run_basic_deployment
+    }
+    if sealed_credentials:
+        request_data = {**request_data, **job_secrets.unseal(sealed_credentials)}
+    request = DeployRequest(**request_data)
+    
+    with _LOCK:
+        # Worker processes (or a restarted API) have no state for this deployment yet
+        _DEPLOY_STATES.setdefault(deployment_id, {
+            "status": "deploying",
+            "user_id": user_id,
+            "plan_tier": plan_tier or "free",
+            "steps": [],
+            "logs": ["🔁 Deployment resumed by job worker..."],
+            "created_at": datetime.utcnow().isoformat(),
+            "progress": 25,
+            "analysis": analysis,
+            "repository_url": request.repository_url,
+            "project_name": request.project_name,
+            "aws_region": request.aws_region
+        })
+    
+    runners[kind](deployment_id, analysis, request)
+
+def _run_logged_step(deployment_id: str, command: List[str], cwd: Optional[Path] = None, timeout: int = 600, env: Optional[Dict[str, str]] = None, name: Optional[str] = None) -> StepResult:
+    """Run a deployment command, streaming its output into the deployment logs and recording its timing"""
+    def append_log(line: str):
+        with _LOCK:
+            _DEPLOY_STATES[deployment_id]["logs"].append(line)
+    
+    sink = StepLogSink(append_log, prefix="   │ ")
+    result = run_step(
+        command, cwd=str(cwd) if cwd else None, env=env, timeout=timeout,
+        on_line=sink, name=name or " ".join(command[:3]), scope=deployment_id
+    )
+    sink.flush()
+    
+    with _LOCK:
+        state = _DEPLOY_STATES[deployment_id]
+        state["step_timings"] = list(state.get("step_timings") or []) + [result.timing()]
+        state["logs"].append(f"⏱️ {result.summary()}")
+    return result
+
 def _run_react_deployment(deployment_id: str, analysis: Dict[str, Any], request: DeployRequest):
     """
     Scalable React deployment using AWS CodeBuild
@@ -1706,7 +1965,7 @@ def _run_react_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         
         # Initialize ReactDeployer and deploy
         try:
-            react_deployer = ReactDeployer()
+            react_deployer = lazy_attribute("react_deployer", "ReactDeployer")()
             
             with _LOCK:
                 _DEPLOY_STATES[deployment_id]["logs"].append("⚛️ Deploying with DirectReactBuilder + S3 + CloudFront...")
@@ -1804,6 +2063,10 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         # Step 1: Clone repository
         temp_dir = Path(tempfile.mkdtemp(prefix=f"deploy_{deployment_id}_"))
         clone_dir = temp_dir / "repo"
+        # Pinned while the deploy runs so disk-budget eviction never touches it
+        cleanup_service.register_repository(
+            f"deploy_{deployment_id}", str(temp_dir), {"source": "basic_deployment"}, in_use=True
+        )
         
         with _LOCK:
             _DEPLOY_STATES[deployment_id]["logs"].append(f"� Cloning repository: {repo_url}")
@@ -1811,7 +2074,7 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         
         # Clone the repository
         clone_cmd = ["git", "clone", "--depth", "1", repo_url, str(clone_dir)]
-        clone_result = subprocess.run(clone_cmd, capture_output=True, text=True, timeout=300)
+        clone_result = _run_logged_step(deployment_id, clone_cmd, timeout=300, name="git clone")
         
         if clone_result.returncode != 0:
             raise Exception(f"Git clone failed: {clone_result.stderr}")
@@ -1917,7 +2180,23 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         with _LOCK:
             _DEPLOY_STATES[deployment_id]["logs"].append(f"🔍 Node.js project detected: {is_node_project}")
         
-        if is_node_project and (clone_dir / "package.json").exists():
+        # Unchanged sources reuse a cached build output; unchanged lockfiles reuse node_modules
+        from core.build_cache import get_build_cache
+        build_cache = get_build_cache() if is_node_project and (clone_dir / "package.json").exists() else None
+        cached_build_dir = None
+        dependency_key = source_key = None
+        cache_pm = "yarn" if (clone_dir / "yarn.lock").exists() else "npm"
+        if build_cache is not None:
+            dependency_key = build_cache.dependency_key(clone_dir, cache_pm)
+            source_key = build_cache.source_key(clone_dir, dependency_key, cache_pm)
+            cached_build_dir = build_cache.restore_artifact(source_key, clone_dir)
+        node_env = {**os.environ, **(build_cache.package_manager_env() if build_cache is not None else {})}
+        
+        if cached_build_dir is not None:
+            build_dir = cached_build_dir
+            with _LOCK:
+                _DEPLOY_STATES[deployment_id]["logs"].append(f"♻️ Sources unchanged - reusing cached build output from {build_dir.relative_to(clone_dir)}/ (install and build skipped)")
+        elif is_node_project and (clone_dir / "package.json").exists():
             with _LOCK:
                 _DEPLOY_STATES[deployment_id]["logs"].append("✅ Proceeding with Node.js build process...")
                 _DEPLOY_STATES[deployment_id]["logs"].append("📦 Installing dependencies...")
@@ -1980,7 +2259,13 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
             else:
                 raise Exception("No Node.js package manager available")
             
-            install_result = subprocess.run(install_cmd, cwd=clone_dir, capture_output=True, text=True, timeout=600)
+            dependencies_restored = build_cache is not None and build_cache.restore_dependencies(dependency_key, clone_dir)
+            if dependencies_restored:
+                with _LOCK:
+                    _DEPLOY_STATES[deployment_id]["logs"].append("♻️ Restored node_modules from build cache (lockfile unchanged)")
+                install_result = StepResult(name="install (cached)", command=install_cmd, returncode=0)
+            else:
+                install_result = _run_logged_step(deployment_id, install_cmd, cwd=clone_dir, timeout=600, env=node_env)
             
             if install_result.returncode != 0:
                 with _LOCK:
@@ -1997,14 +2282,14 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
                         _DEPLOY_STATES[deployment_id]["logs"].append("🔄 npm ci failed, trying npm install...")
                     fallback_cmd = [get_node_cmd("npm"), "install"]
                 
-                fallback_result = subprocess.run(fallback_cmd, cwd=clone_dir, capture_output=True, text=True, timeout=600)
+                fallback_result = _run_logged_step(deployment_id, fallback_cmd, cwd=clone_dir, timeout=600, env=node_env)
                 if fallback_result.returncode != 0:
                     # Final fallback: try yarn install if we haven't tried it yet
                     if not use_yarn:
                         with _LOCK:
                             _DEPLOY_STATES[deployment_id]["logs"].append("🔄 npm install failed, trying yarn as final fallback...")
                         final_cmd = [get_node_cmd("yarn"), "install"]
-                        final_result = subprocess.run(final_cmd, cwd=clone_dir, capture_output=True, text=True, timeout=600)
+                        final_result = _run_logged_step(deployment_id, final_cmd, cwd=clone_dir, timeout=600, env=node_env)
                         if final_result.returncode != 0:
                             raise Exception(f"All dependency installation methods failed: yarn: {install_result.stderr[:100]} | npm ci: {install_result.stderr[:100]} | npm install: {fallback_result.stderr[:100]} | yarn final: {final_result.stderr[:100]}")
                         else:
@@ -2021,6 +2306,13 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
                 with _LOCK:
                     _DEPLOY_STATES[deployment_id]["logs"].append(f"✅ Dependencies installed with {' '.join(install_cmd)}")
             
+            # Snapshot for the build cache before build scripts run; fallback installs
+            # may rewrite the lockfile, so only cache what it pins
+            dependency_snapshot = None
+            if (build_cache is not None and not dependencies_restored
+                    and build_cache.dependency_key(clone_dir, cache_pm) == dependency_key):
+                dependency_snapshot = build_cache.snapshot_dependencies(dependency_key, clone_dir)
+            
             # Build the project
             with _LOCK:
                 _DEPLOY_STATES[deployment_id]["logs"].append("🏗️ Building React application...")
@@ -2035,7 +2327,7 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
                 with _LOCK:
                     _DEPLOY_STATES[deployment_id]["logs"].append("🔨 Running: npm run build")
             
-            build_result = subprocess.run(build_cmd, cwd=clone_dir, capture_output=True, text=True, timeout=900)
+            build_result = _run_logged_step(deployment_id, build_cmd, cwd=clone_dir, timeout=900, env=node_env)
             
             if build_result.returncode == 0:
                 with _LOCK:
@@ -2058,7 +2350,7 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
                         _DEPLOY_STATES[deployment_id]["logs"].append("🔄 npm run build failed, trying yarn build...")
                     alt_build_cmd = [get_node_cmd("yarn"), "build"]
                 
-                alt_build_result = subprocess.run(alt_build_cmd, cwd=clone_dir, capture_output=True, text=True, timeout=900)
+                alt_build_result = _run_logged_step(deployment_id, alt_build_cmd, cwd=clone_dir, timeout=900, env=node_env)
                 if alt_build_result.returncode == 0:
                     with _LOCK:
                         _DEPLOY_STATES[deployment_id]["logs"].append(f"✅ Build completed with {' '.join(alt_build_cmd)}!")
@@ -2071,6 +2363,10 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
                     build_success = False
             
             if not build_success:
+                if dependencies_restored:
+                    build_cache.discard_dependencies(dependency_key)  # Next attempt installs from scratch
+                if dependency_snapshot is not None:
+                    build_cache.discard_snapshot(dependency_snapshot)
                 raise Exception(f"React build failed: {build_result.stderr[:300]}")
             
             # Verify build directory exists and has content
@@ -2106,6 +2402,10 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
             if not build_dir_found:
                 raise Exception("Build completed but no valid build directory found with index.html")
             
+            if build_cache is not None:
+                build_cache.commit_snapshot(dependency_key, dependency_snapshot)
+                build_cache.save_artifact(source_key, clone_dir, build_dir)
+            
             # Log what we're deploying
             with _LOCK:
                 _DEPLOY_STATES[deployment_id]["logs"].append(f"📁 Deploying from: {build_dir.relative_to(clone_dir)}")
@@ -2187,6 +2487,7 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         s3_bucket_url = f"http://{bucket_name}.s3-website-{request.aws_region}.amazonaws.com"
         
         # Cleanup temp directory
+        cleanup_service.discard_workspace(f"deploy_{deployment_id}")
         shutil.rmtree(temp_dir, ignore_errors=True)
         
         with _LOCK:
@@ -2214,6 +2515,7 @@ def _run_basic_deployment(deployment_id: str, analysis: Dict[str, Any], request:
         logger.error(f"AWS deployment failed: {e}")
         # Cleanup temp directory on error
         try:
+            cleanup_service.discard_workspace(f"deploy_{deployment_id}")
             if 'temp_dir' in locals():
                 shutil.rmtree(temp_dir, ignore_errors=True)
         except:
@@ -2725,6 +3027,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli/gzip + ETag for JSON responses (analysis payloads are large and highly compressible)
+from src.middleware.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Outermost, so request timings include compression and CORS handling
+from src.middleware.request_metrics import RequestMetricsMiddleware
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics, profiler=request_profiler)
+
 # Add simple Cognito authentication routes
 try:
     from src.api.auth_routes import router as auth_router
@@ -2786,12 +3096,19 @@ except Exception as e:
         return {"github_routes_loaded": False, "available": GITHUB_AUTH_AVAILABLE, "error": str(e)}
 
 # Add simple payment routes (Stripe integration)
-try:
-    from src.routes.payment_routes import router as payment_router
-    app.include_router(payment_router)
-    logger.info("✅ Simple payment routes loaded successfully")
-except ImportError as e:
-    logger.warning(f"⚠️ Payment routes not available: {e}")
+# Payment routes import stripe; they are mounted on the first /api/v1/payments request
+LAZY_ROUTERS = os.getenv("CODEFLOWOPS_LAZY_ROUTERS", "1").lower() not in ("0", "false", "no")
+if LAZY_ROUTERS and (src_path / "routes" / "payment_routes.py").exists():
+    payment_routes = LazyRouter(app, "src.routes.payment_routes", "/api/v1/payments", include_prefix="").install()
+    startup_profile.add_warmup("payment routes", payment_routes.load)
+    logger.info("✅ Simple payment routes registered (loaded on first request)")
+else:
+    try:
+        from src.routes.payment_routes import router as payment_router
+        app.include_router(payment_router)
+        logger.info("✅ Simple payment routes loaded successfully")
+    except ImportError as e:
+        logger.warning(f"⚠️ Payment routes not available: {e}")
 
 # Include modular routers if available
 if MODULAR_ROUTERS_AVAILABLE:
@@ -3057,13 +3374,12 @@ async def get_quota_status():
 async def get_user_deployments(user_id: str = "demo_user"):
     """Get deployment history for the current user to display in profile dashboard"""
     try:
-        with _LOCK:
-            user_deployments = _USER_DEPLOYMENT_HISTORY.get(user_id, [])
+        user_deployments = _USER_DEPLOYMENT_HISTORY.get(user_id)
         
         # Also include any currently active deployments for this user
         active_deployments = []
         with _LOCK:
-            for dep_id, state in _DEPLOY_STATES.items():
+            for dep_id, state in _DEPLOY_STATES.for_user(user_id):
                 if state.get("user_id") == user_id:
                     # Convert active deployment to deployment history format
                     active_deployment = {
@@ -3314,8 +3630,15 @@ try:
     
     # Force mount Node.js LightSail router (for Node.js backend deployments)
     logger.info("🔧 Force mounting Node.js LightSail router...")
-    from routers.stacks.nodejs_lightsail_router import router as nodejs_lightsail_router
-    app.include_router(nodejs_lightsail_router, prefix="/api/deploy/nodejs-lightsail", tags=["nodejs-lightsail"])
+    if LAZY_ROUTERS:
+        # boto3 + GitPython: imported on the first /api/deploy/nodejs-lightsail request or by the warm-up
+        nodejs_lightsail_routes = LazyRouter(
+            app, "routers.stacks.nodejs_lightsail_router", "/api/deploy/nodejs-lightsail", tags=["nodejs-lightsail"]
+        ).install()
+        startup_profile.add_warmup("nodejs-lightsail router", nodejs_lightsail_routes.load)
+    else:
+        from routers.stacks.nodejs_lightsail_router import router as nodejs_lightsail_router
+        app.include_router(nodejs_lightsail_router, prefix="/api/deploy/nodejs-lightsail", tags=["nodejs-lightsail"])
     logger.info("✅ Node.js LightSail router force-mounted at /api/deploy/nodejs-lightsail")
 except Exception as router_error:
     logger.error(f"❌ CRITICAL: Failed to mount LightSail routers: {router_error}")
@@ -3324,8 +3647,9 @@ except Exception as router_error:
 
 if MODULAR_ROUTERS_AVAILABLE:
     try:
-        # Mount other stack routers via registry
-        for stack_name, router_instance in stack_router_registry.routers.items():
+        # Mount stack routers the registry has already loaded (base routers are only imported on first use)
+        for stack_name in sorted(stack_router_registry.loaded_stacks):
+            router_instance = stack_router_registry.routers[stack_name]
             if hasattr(router_instance, 'router'):
                 app.include_router(router_instance.router, prefix=f"/api/deploy/{stack_name}", tags=[stack_name])
                 logger.info(f"✅ {stack_name} router mounted at /api/deploy/{stack_name}")
@@ -3333,6 +3657,9 @@ if MODULAR_ROUTERS_AVAILABLE:
     except Exception as e:
         logger.error(f"❌ Failed to mount other modular routers: {e}")
 
+startup_profile.mark("routes")
+startup_profile.ready()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
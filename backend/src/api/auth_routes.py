@@ -483,8 +483,7 @@ async def get_user_deployments(credentials: Optional[HTTPAuthorizationCredential
     else:
         # Import the real deployment history from simple_api
         try:
-            from ...simple_api import _USER_DEPLOYMENT_HISTORY, _DEPLOY_STATES, _LOCK
-            import threading
+            from ..services.deployment_state_store import get_deployment_history, get_deployment_states
         except ImportError:
             # Fallback to mock data if import fails
             return {
@@ -511,25 +510,22 @@ async def get_user_deployments(credentials: Optional[HTTPAuthorizationCredential
             }
 
         try:
-            with _LOCK:
-                user_deployments = _USER_DEPLOYMENT_HISTORY.get(user_id, [])
+            user_deployments = get_deployment_history().get(user_id)
 
             # Also include any currently active deployments for this user
             active_deployments = []
-            with _LOCK:
-                for dep_id, state in _DEPLOY_STATES.items():
-                    if state.get("user_id") == user_id:
-                        # Convert active deployment to deployment history format
-                        active_deployment = {
-                            "id": dep_id,
-                            "name": state.get("project_name", "Unknown Project"),
-                            "repository": state.get("repository_url", ""),
-                            "status": "building" if state.get("status") in ["analyzing", "deploying", "routing_react"] else "pending",
-                            "createdAt": state.get("created_at", ""),
-                            "technology": state.get("framework", "Static")
-                        }
-                        # Don't show URL for active deployments
-                        active_deployments.append(active_deployment)
+            for dep_id, state in get_deployment_states().for_user(user_id):
+                # Convert active deployment to deployment history format
+                active_deployment = {
+                    "id": dep_id,
+                    "name": state.get("project_name", "Unknown Project"),
+                    "repository": state.get("repository_url", ""),
+                    "status": "building" if state.get("status") in ["analyzing", "deploying", "routing_react"] else "pending",
+                    "createdAt": state.get("created_at", ""),
+                    "technology": state.get("framework", "Static")
+                }
+                # Don't show URL for active deployments
+                active_deployments.append(active_deployment)
 
             # Combine completed deployments from history with active ones
             all_deployments = active_deployments + user_deployments
@@ -567,8 +563,7 @@ async def clear_user_deployment_history(current_user: User = Depends(get_current
 
         # Import the real deployment history from simple_api
         try:
-            from ...simple_api import _USER_DEPLOYMENT_HISTORY, _LOCK
-            import threading
+            from ..services.deployment_state_store import get_deployment_history
         except ImportError:
             # Fallback to just marking as cleared
             user_cleared_deployments[user_id] = True
@@ -579,11 +574,7 @@ async def clear_user_deployment_history(current_user: User = Depends(get_current
             }
 
         # Clear the real deployment history
-        cleared_count = 0
-        with _LOCK:
-            if user_id in _USER_DEPLOYMENT_HISTORY:
-                cleared_count = len(_USER_DEPLOYMENT_HISTORY[user_id])
-                _USER_DEPLOYMENT_HISTORY[user_id] = []
+        cleared_count = get_deployment_history().clear(user_id)
 
         # Also mark as cleared for consistency
         user_cleared_deployments[user_id] = True
@@ -1,17 +1,17 @@
 # Smart Deploy API Routes - REST endpoints for AI-powered infrastructure generation
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, File, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 import tempfile
 import shutil
-import zipfile
 from pathlib import Path
 import json
 import asyncio
 from datetime import datetime
 
 from ..controllers.smart_deploy_controller import SmartDeployController, SmartDeployError
+from ..services.deployment_update_bus import get_deployment_update_bus, diff_update
 from ..services.infrastructure_template_service import (
     InfrastructureTemplateEngine, 
     CloudProvider, 
@@ -22,6 +22,7 @@ from ..services.infrastructure_template_service import (
 from ..models.enhanced_models import User
 from ..auth.dependencies import get_current_user
 from ..utils.rate_limiting import rate_limit
+from ..utils.zip_ingest import UploadLimits, UploadRejected, save_upload_stream, extract_zip_bounded, remember_file_index
 
 # Pydantic models for request/response
 class SmartDeployRequest(BaseModel):
@@ -192,33 +193,41 @@ async def upload_repository(
     """
     Upload a repository as a ZIP file for Smart Deploy analysis
     """
+    # Validate file type
+    if not file.filename or not file.filename.lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Only ZIP files are supported")
+    
+    limits = UploadLimits.from_env()
+    temp_dir = tempfile.mkdtemp(prefix=f"smart-deploy-{current_user.id}-")
+    
     try:
-        # Validate file type
-        if not file.filename.endswith('.zip'):
-            raise HTTPException(status_code=400, detail="Only ZIP files are supported")
-        
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix=f"smart-deploy-{current_user.id}-")
-        zip_path = Path(temp_dir) / file.filename
+        # Stream the upload to disk without blocking the event loop
+        zip_path = Path(temp_dir) / "upload.zip"
+        uploaded_bytes = await save_upload_stream(file, zip_path, limits.max_upload_bytes)
         
-        # Save uploaded file
-        with open(zip_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract ZIP file
+        # Extract with size/ratio/entry limits in a worker thread
         extract_path = Path(temp_dir) / "extracted"
         extract_path.mkdir()
+        file_index = await asyncio.to_thread(extract_zip_bounded, zip_path, extract_path, limits)
+        zip_path.unlink(missing_ok=True)
         
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_path)
+        # The analyzer reuses this index instead of walking the tree again
+        remember_file_index(file_index)
         
         return {
             "message": "Repository uploaded successfully",
             "temp_path": str(extract_path),
-            "files_count": len(list(extract_path.rglob("*")))
+            "files_count": file_index.file_count,
+            "uploaded_bytes": uploaded_bytes,
+            "extracted_bytes": file_index.total_bytes,
+            "skipped_entries": file_index.skipped_entries
         }
-        
+    
+    except UploadRejected as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/status/{deployment_id}", response_model=DeploymentStatusResponse)
@@ -501,23 +510,50 @@ async def deployment_websocket(websocket, deployment_id: str):
     WebSocket endpoint for real-time deployment updates
     
     Clients can connect to this endpoint to receive live updates
-    about their deployment progress.
+    about their deployment progress. The first message is a full
+    ``snapshot``; after that only ``delta`` messages with changed fields
+    are pushed, with rapid updates coalesced into one message.
     """
     await websocket.accept()
     
+    update_bus = get_deployment_update_bus()
+    subscription = await update_bus.subscribe(deployment_id)
+    receiver = None
+    
     try:
+        # Subscribe before reading the snapshot so no update falls in between
+        status = await smart_deploy_controller.get_deployment_status(deployment_id)
+        await websocket.send_json({"type": "snapshot", "deployment_id": deployment_id, "data": status})
+        
+        # Drain client frames so a disconnect is noticed even while no updates arrive
+        async def wait_for_disconnect():
+            while True:
+                await websocket.receive_text()
+        
+        receiver = asyncio.create_task(wait_for_disconnect())
+        last_sent = dict(status.get("terraform_status") or {})
         while True:
-            # Get current deployment status
-            status = await smart_deploy_controller.get_deployment_status(deployment_id)
-            
-            if status:
-                await websocket.send_json(status)
+            next_update = asyncio.ensure_future(subscription.next_update(update_bus.coalesce_seconds))
+            done, _ = await asyncio.wait({next_update, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                next_update.cancel()
+                break
             
-            # Wait before next update
-            await asyncio.sleep(2)
+            update = next_update.result()
+            changes = diff_update(last_sent, update)
+            if not changes:
+                continue
+            last_sent.update(changes)
+            await websocket.send_json({"type": "delta", "deployment_id": deployment_id, "changes": changes})
             
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         await websocket.close(code=1011, reason=str(e))
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        update_bus.unsubscribe(subscription)
 
 @router.get("/deployments")
 async def get_deployments(
@@ -0,0 +1,44 @@
+"""
+Observability Access
+Guard for the metrics and profiling endpoints, which expose route names,
+traffic volumes and stack traces of the API process
+
+With CODEFLOWOPS_OBSERVABILITY_TOKEN set, callers (e.g. a Prometheus scrape
+job with ``authorization: {credentials: ...}``) must send it as a Bearer
+token. Without it the endpoints only answer requests from the loopback
+interface, so they stay closed behind a load balancer until a token is
+configured.
+"""
+
+import os
+import hmac
+import logging
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_observability_access(request: Request):
+    """FastAPI dependency: Bearer CODEFLOWOPS_OBSERVABILITY_TOKEN, or a loopback client when no token is set"""
+    token = os.getenv("CODEFLOWOPS_OBSERVABILITY_TOKEN")
+    if token:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), token.encode()):
+            return
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Observability token required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    client_host = request.client.host if request.client else None
+    if client_host in LOOPBACK_HOSTS:
+        return
+    logger.warning(f"🚫 Refused {request.url.path} to {client_host}; set CODEFLOWOPS_OBSERVABILITY_TOKEN to allow remote access")
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Observability endpoints are only served to localhost unless CODEFLOWOPS_OBSERVABILITY_TOKEN is set"
+    )
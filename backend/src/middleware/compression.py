@@ -0,0 +1,186 @@
+"""
+Response Compression Middleware
+Negotiated brotli/gzip compression and ETag revalidation for buffered API responses
+"""
+
+import gzip
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml", "application/xml")
+# Compressing in the event loop is fine for small bodies; larger ones go to a thread
+THREAD_THRESHOLD = 256 * 1024
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that buffers compressible responses and then:
+    
+    - adds a weak ETag to 200 responses of GET requests and answers a
+      matching If-None-Match with 304 (no body is sent at all)
+    - compresses bodies of at least ``minimum_size`` bytes with the best
+      encoding the client accepts (br when the brotli package is installed,
+      otherwise gzip)
+    
+    Streaming responses (text/event-stream), responses that already carry a
+    Content-Encoding and bodies larger than ``max_buffer_size`` pass through
+    unchanged.
+    """
+    
+    def __init__(self, app, minimum_size: int = 1024, max_buffer_size: int = 64 * 1024 * 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_buffer_size = max_buffer_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        responder = _BufferedResponse(self, send, scope.get("method", "GET"), request_headers)
+        await self.app(scope, receive, responder.send)
+    
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Pick br or gzip from an Accept-Encoding header (q-values honoured)"""
+        offered = _parse_accept_encoding(accept_encoding)
+        candidates = (["br"] if brotli is not None else []) + ["gzip"]
+        best, best_q = None, 0.0
+        for encoding in candidates:
+            q = offered.get(encoding, offered.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+    
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+class _BufferedResponse:
+    """Per-request send() wrapper"""
+    
+    def __init__(self, middleware: CompressionMiddleware, send, method: str, request_headers: Dict[str, str]):
+        self.middleware = middleware
+        self.downstream = send
+        self.method = method
+        self.request_headers = request_headers
+        self.start_message = None
+        self.chunks: List[bytes] = []
+        self.buffered = 0
+        self.passthrough = False
+    
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = _header_dict(message.get("headers", []))
+            content_type = headers.get("content-type", "")
+            if (
+                "content-encoding" in headers
+                or content_type.startswith("text/event-stream")
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+        
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        
+        self.chunks.append(message.get("body", b""))
+        self.buffered += len(self.chunks[-1])
+        if self.buffered > self.middleware.max_buffer_size:
+            # Too large to hold in memory: send what we have unchanged and stream the rest
+            self.passthrough = True
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": b"".join(self.chunks), "more_body": message.get("more_body", False)})
+            self.chunks = []
+            return
+        if message.get("more_body", False):
+            return
+        
+        await self._finish(b"".join(self.chunks))
+    
+    async def _finish(self, body: bytes):
+        status = self.start_message["status"]
+        headers = [(k, v) for k, v in self.start_message.get("headers", []) if k.lower() != b"content-length"]
+        existing = _header_dict(headers)
+        vary = existing.get("vary", "")
+        if "accept-encoding" not in vary.lower():
+            headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+            headers.append((b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")))
+        
+        if self.method == "GET" and status == 200:
+            etag = existing.get("etag") or f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            if "etag" not in existing:
+                headers.append((b"etag", etag.encode("latin-1")))
+            if _etag_matches(self.request_headers.get("if-none-match"), etag):
+                not_modified = [(k, v) for k, v in headers if k.lower() not in (b"content-type",)]
+                await self.downstream({"type": "http.response.start", "status": 304, "headers": not_modified})
+                await self.downstream({"type": "http.response.body", "body": b""})
+                return
+        
+        encoding = None
+        if len(body) >= self.middleware.minimum_size:
+            encoding = self.middleware.negotiate(self.request_headers.get("accept-encoding", ""))
+        if encoding:
+            if len(body) >= THREAD_THRESHOLD:
+                compressed = await asyncio.to_thread(self.middleware.compress, body, encoding)
+            else:
+                compressed = self.middleware.compress(body, encoding)
+            if len(compressed) < len(body):
+                body = compressed
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+        
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await self.downstream({"type": "http.response.start", "status": status, "headers": headers})
+        await self.downstream({"type": "http.response.body", "body": body})
+
+
+def _header_dict(headers) -> Dict[str, str]:
+    return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in headers}
+
+
+def _parse_accept_encoding(value: str) -> Dict[str, float]:
+    offered: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    return offered
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == target:
+            return True
+    return False
@@ -0,0 +1,269 @@
+"""
+Request Metrics Middleware
+Per-route latency histograms, in-flight request counts and event-loop lag,
+rendered in the Prometheus text exposition format
+"""
+
+import time
+import asyncio
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.request_profiler import SlowRequestProfiler
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Requests that match no route (scanners, typos) share one label so they can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+# The method is client-controlled too; anything else is recorded as OTHER_METHOD
+KNOWN_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+OTHER_METHOD = "OTHER"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics, seconds)"""
+    
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate from the buckets (linear within a bucket, like histogram_quantile)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+    
+    def render(self, name: str, labels: str, lines: List[str]):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a task that sleeps ``interval``
+    
+    Lag means a coroutine (or a sync call made from one) held the loop;
+    every request in flight at that moment was delayed by the same amount.
+    """
+    
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.histogram = Histogram(LOOP_LAG_BUCKETS)
+        self.last = 0.0
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last = lag
+            self.max = max(self.max, lag)
+            self.histogram.observe(lag)
+            if lag >= 1.0:
+                logger.warning(f"🐢 Event loop blocked for {lag:.2f}s")
+
+
+class RequestMetrics:
+    """Process-wide request counters; written from the event loop, read by /metrics"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.in_flight_by_method: Dict[str, int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, str], int] = {}
+        self.loop_lag = LoopLagMonitor()
+        self._lock = threading.Lock()
+    
+    def request_started(self, method: str):
+        with self._lock:
+            self.in_flight += 1
+            self.in_flight_by_method[method] = self.in_flight_by_method.get(method, 0) + 1
+    
+    def request_finished(self, method: str, route: str, status: int, duration: float):
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            self.in_flight -= 1
+            self.in_flight_by_method[method] -= 1
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = Histogram(self.buckets)
+            histogram.observe(duration)
+            key = (method, route, status_class)
+            self.responses[key] = self.responses.get(key, 0) + 1
+    
+    def slowest_routes(self, quantile: float = 0.99, limit: int = 20) -> List[Dict[str, Any]]:
+        """Routes ranked by estimated latency quantile, for finding what drives p99"""
+        with self._lock:
+            rows = [
+                {
+                    "method": method,
+                    "route": route,
+                    "count": h.count,
+                    "mean_ms": round(h.sum / h.count * 1000, 1),
+                    "p50_ms": round(h.quantile(0.5) * 1000, 1),
+                    "p95_ms": round(h.quantile(0.95) * 1000, 1),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 1),
+                    "sort_key": h.quantile(quantile),
+                    "total_seconds": round(h.sum, 3)
+                }
+                for (method, route), h in self.latency.items() if h.count
+            ]
+        rows.sort(key=lambda r: r.pop("sort_key"), reverse=True)
+        return rows[:limit]
+    
+    def render(self, profiler: Optional[SlowRequestProfiler] = None) -> str:
+        """Prometheus text format (version 0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            lines += ["# HELP codeflowops_http_request_duration_seconds API request latency by route",
+                      "# TYPE codeflowops_http_request_duration_seconds histogram"]
+            for (method, route), histogram in sorted(self.latency.items(), key=lambda item: item[0]):
+                histogram.render("codeflowops_http_request_duration_seconds",
+                                 f'method="{method}",route="{_escape(route)}"', lines)
+            
+            lines += ["# HELP codeflowops_http_responses_total API responses by route and status class",
+                      "# TYPE codeflowops_http_responses_total counter"]
+            for (method, route, status_class), count in sorted(self.responses.items()):
+                lines.append(f'codeflowops_http_responses_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status_class}"}} {count}')
+            
+            lines += ["# HELP codeflowops_http_requests_in_flight Requests currently being handled",
+                      "# TYPE codeflowops_http_requests_in_flight gauge"]
+            for method, count in sorted(self.in_flight_by_method.items()):
+                lines.append(f'codeflowops_http_requests_in_flight{{method="{method}"}} {count}')
+        
+        lag = self.loop_lag
+        lines += ["# HELP codeflowops_event_loop_lag_seconds Delay of event loop wake-ups",
+                  "# TYPE codeflowops_event_loop_lag_seconds histogram"]
+        lag.histogram.render("codeflowops_event_loop_lag_seconds", "", lines)
+        lines += ["# HELP codeflowops_event_loop_lag_max_seconds Largest event loop lag since start",
+                  "# TYPE codeflowops_event_loop_lag_max_seconds gauge",
+                  f"codeflowops_event_loop_lag_max_seconds {lag.max:.6f}",
+                  "# HELP codeflowops_process_start_time_seconds Start time of the API process",
+                  "# TYPE codeflowops_process_start_time_seconds gauge",
+                  f"codeflowops_process_start_time_seconds {self.started_at:.3f}"]
+        if profiler is not None:
+            lines += ["# HELP codeflowops_slow_requests_profiled_total Requests captured by the slow request profiler",
+                      "# TYPE codeflowops_slow_requests_profiled_total counter",
+                      f"codeflowops_slow_requests_profiled_total {profiler.profiled}"]
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request
+    
+    Latency is labelled with the route template (``/api/analysis/{analysis_id}``),
+    not the raw path, so the series count stays bounded by the number of
+    routes. The time runs until the app returns, which for streaming
+    responses includes sending the body. With a ``profiler`` every request
+    is sampled and the ones above its threshold are stored.
+    """
+    
+    def __init__(self, app, metrics: RequestMetrics, profiler: Optional[SlowRequestProfiler] = None):
+        self.app = app
+        self.metrics = metrics
+        self.profiler = profiler
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope.get("method", "GET")
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        recording = self.profiler.begin() if self.profiler is not None else None
+        self.metrics.request_started(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            route = _route_label(scope)
+            self.metrics.request_finished(method, route, status, duration)
+            if recording is not None:
+                profile = self.profiler.finish(recording, method, route, scope.get("path", ""), status, duration)
+                if profile is not None:
+                    await _save_profile(self.profiler, profile)
+
+
+async def _save_profile(profiler: SlowRequestProfiler, profile: Dict[str, Any]):
+    try:
+        await asyncio.to_thread(profiler.store.save, profile)
+        logger.info(f"🔬 Profiled slow request {profile['method']} {profile['route']} "
+                    f"({profile['duration_ms']:.0f}ms, id {profile['id']})")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not store request profile: {e}")
+
+
+def _route_label(scope) -> str:
+    # FastAPI's APIRoute puts itself into the scope when it matches
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    return UNMATCHED_ROUTE
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_request_metrics: Optional[RequestMetrics] = None
+
+
+def get_request_metrics() -> RequestMetrics:
+    global _request_metrics
+    if _request_metrics is None:
+        _request_metrics = RequestMetrics()
+    return _request_metrics
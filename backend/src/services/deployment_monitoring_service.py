@@ -11,6 +11,7 @@ from fastapi import WebSocket
 import redis.asyncio as redis
 
 from ..models.enhanced_models import DeploymentStatus
+from ..utils.ws_broadcast import BroadcastBatcher, encode_message
 # Claude service removed - using traditional monitoring
 
 class MonitoringEventType(Enum):
@@ -83,6 +84,9 @@ class DeploymentMonitor:
         # Performance tracking
         self.step_durations: Dict[str, List[float]] = {}
         
+        # Events for a deployment within a few ms go out as one shared frame
+        self.event_batcher = BroadcastBatcher(self._send_frame_to_monitors)
+        
     async def get_redis_client(self) -> redis.Redis:
         """Get Redis client for event streaming"""
         if self.redis_client is None:
@@ -521,35 +525,42 @@ class DeploymentMonitor:
         """
         try:
             event_dict = event.to_dict()
+            encoded_event = encode_message(event_dict)
             
             # Store in Redis for persistence
             redis_client = await self.get_redis_client()
             if redis_client:
                 events_key = f"deployment:{event.deployment_id}:events"
-                await redis_client.lpush(events_key, json.dumps(event_dict))
+                await redis_client.lpush(events_key, encoded_event)
                 await redis_client.expire(events_key, 7200)  # 2 hours TTL
             
-            # Send to WebSocket subscribers
-            if event.deployment_id in self.active_monitors:
-                disconnected_websockets = set()
-                
-                for websocket in self.active_monitors[event.deployment_id]:
-                    try:
-                        await websocket.send_json({
-                            "type": "monitoring_event",
-                            "data": event_dict
-                        })
-                    except Exception:
-                        # WebSocket is disconnected
-                        disconnected_websockets.add(websocket)
-                
-                # Clean up disconnected WebSockets
-                for websocket in disconnected_websockets:
-                    self.active_monitors[event.deployment_id].discard(websocket)
+            # Send to WebSocket subscribers, reusing the encoded event inside the envelope
+            if self.active_monitors.get(event.deployment_id):
+                self.event_batcher.add(
+                    event.deployment_id,
+                    event_dict,
+                    encoded=f'{{"type":"monitoring_event","data":{encoded_event}}}'
+                )
             
         except Exception as e:
             print(f"Failed to publish event: {str(e)}")
     
+    async def _send_frame_to_monitors(self, deployment_id: str, frame: str) -> None:
+        """Send one pre-encoded frame to every WebSocket monitoring a deployment"""
+        websockets_for_deployment = list(self.active_monitors.get(deployment_id, ()))
+        if not websockets_for_deployment:
+            return
+        
+        results = await asyncio.gather(
+            *(websocket.send_text(frame) for websocket in websockets_for_deployment),
+            return_exceptions=True
+        )
+        
+        # Clean up disconnected WebSockets
+        for websocket, result in zip(websockets_for_deployment, results):
+            if isinstance(result, Exception) and deployment_id in self.active_monitors:
+                self.active_monitors[deployment_id].discard(websocket)
+    
     # Claude cost method removed - AI integration no longer needed
 
 class DeploymentAnalytics:
@@ -0,0 +1,560 @@
+"""
+Deployment State Store
+Bounded deployment/analysis state shared across API workers
+
+Replaces the plain module-level dicts in simple_api. Stores behave like
+dicts of dicts so existing call sites (``states[id]["status"] = ...``,
+``states[id]["logs"].append(...)``) keep working, but:
+
+- entries expire after a TTL and the local copy is LRU-bounded
+- with Redis configured, every field assignment and log line is written
+  through individually (HSET / RPUSH), and other workers read the entry
+  from Redis, so status polling works on any worker
+- active deployments are indexed per user, so quota checks are O(1)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # In-process store only
+    redis = None
+
+# Statuses counted against a user's concurrent deployment quota
+ACTIVE_DEPLOYMENT_STATUSES = {
+    "initializing", "routing", "deploying", "routing_react", "routing_secure_baas", "routing_fullstack"
+}
+
+LOGS_FIELD = "logs"
+_MISSING = object()  # Redis answered and the entry does not exist
+
+
+def _connect_redis(url: Optional[str]):
+    if not url or redis is None:
+        return None
+    try:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        client.ping()
+        logger.info("✅ Deployment state store connected to Redis")
+        return client
+    except Exception as e:
+        logger.info(f"Deployment state store running in-process only (Redis unavailable: {e})")
+        return None
+
+
+class StateLog(list):
+    """Log list that writes each appended line through to the store"""
+    
+    def __init__(self, state: "DeploymentState", lines=()):
+        super().__init__(lines)
+        self._state = state
+    
+    def append(self, line: Any):
+        super().append(line)
+        store = self._state._store
+        if len(self) > store.max_log_entries:
+            del self[:len(self) - store.max_log_entries]
+        store._log_appended(self._state._key, line)
+    
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+
+class DeploymentState(dict):
+    """A single state entry; assignments are written through per field"""
+    
+    def __init__(self, store: "DeploymentStateStore", key: str, data: Dict[str, Any]):
+        super().__init__()
+        self._store = store
+        self._key = key
+        self._load(data)
+    
+    def _load(self, data: Dict[str, Any]):
+        """Replace contents without writing through (used when refreshing from Redis)"""
+        dict.clear(self)
+        for field, value in data.items():
+            if field == LOGS_FIELD and isinstance(value, list):
+                value = StateLog(self, value)
+            dict.__setitem__(self, field, value)
+    
+    def __setitem__(self, field: str, value: Any):
+        if field == LOGS_FIELD and isinstance(value, list):
+            value = StateLog(self, value)
+        dict.__setitem__(self, field, value)
+        self._store._field_changed(self._key, self, field, value)
+    
+    def __delitem__(self, field: str):
+        dict.__delitem__(self, field)
+        self._store._field_changed(self._key, self, field, None, removed=True)
+    
+    def update(self, *args, **kwargs):
+        for field, value in dict(*args, **kwargs).items():
+            self[field] = value
+    
+    def setdefault(self, field: str, default: Any = None) -> Any:
+        if field not in self:
+            self[field] = default
+        return dict.__getitem__(self, field)
+    
+    def pop(self, field: str, *default):
+        if field not in self:
+            if default:
+                return default[0]
+            raise KeyError(field)
+        value = dict.__getitem__(self, field)
+        del self[field]
+        return value
+
+
+class DeploymentStateStore(MutableMapping):
+    """
+    TTL/LRU-bounded mapping of id -> DeploymentState with optional Redis
+    
+    Without Redis the store is process-local. With Redis, local entries are
+    a cache that is re-read after ``refresh_seconds`` so updates made by
+    other workers (or job worker processes) become visible; writes go to
+    both. Iteration and ``len()`` cover this process's cached entries only;
+    use ``for_user()`` for a cross-worker view of one user's deployments.
+    """
+    
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 2000,
+        ttl_seconds: float = 6 * 3600,
+        redis_url: Optional[str] = None,
+        track_users: bool = False,
+        refresh_seconds: float = 1.0,
+        max_log_entries: int = 1000
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.track_users = track_users
+        self.refresh_seconds = refresh_seconds
+        self.max_log_entries = max_log_entries
+        self.prefix = f"codeflowops:{namespace}"
+        
+        self._entries: "OrderedDict[str, DeploymentState]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._refreshed: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        # Local indexes: user -> ids, user -> active ids
+        self._user_ids: Dict[str, Set[str]] = {}
+        self._active_ids: Dict[str, Set[str]] = {}
+        self._indexed_user: Dict[str, str] = {}
+        
+        self._redis = _connect_redis(redis_url)
+        self.stats = {"hits": 0, "redis_loads": 0, "evictions": 0, "redis_errors": 0}
+    
+    # Mapping interface
+    
+    def __getitem__(self, key: str) -> DeploymentState:
+        now = time.monotonic()
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None and self._expires[key] <= now:
+                self._drop_local(key)
+                state = None
+            if state is not None and (self._redis is None or now - self._refreshed[key] < self.refresh_seconds):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return state
+        
+        data = self._redis_load(key)
+        with self._lock:
+            state = self._entries.get(key)
+            if data is _MISSING:
+                self._drop_local(key)  # Deleted or expired by another worker
+                raise KeyError(key)
+            if data is None:
+                if state is None:
+                    raise KeyError(key)
+                return state  # Redis unavailable; serve the local copy
+            self.stats["redis_loads"] += 1
+            if state is None:
+                state = DeploymentState(self, key, data)
+                self._remember(key, state)
+            else:
+                state._load(data)
+                self._touch(key)
+            self._refreshed[key] = time.monotonic()
+            self._index(key, state)
+            return state
+    
+    def __setitem__(self, key: str, value: Dict[str, Any]):
+        state = DeploymentState(self, key, dict(value))
+        with self._lock:
+            self._remember(key, state)
+            self._refreshed[key] = time.monotonic()
+            self._index(key, state)
+        
+        if self._redis is not None:
+            fields = {field: json.dumps(item, default=str) for field, item in state.items() if field != LOGS_FIELD}
+            self._redis_write(key, state, lambda pipe: (
+                pipe.delete(self._hash_key(key), self._logs_key(key)),
+                fields and pipe.hset(self._hash_key(key), mapping=fields),
+                state.get(LOGS_FIELD) and pipe.rpush(
+                    self._logs_key(key), *(json.dumps(line, default=str) for line in state[LOGS_FIELD][-self.max_log_entries:])
+                )
+            ))
+    
+    def __delitem__(self, key: str):
+        with self._lock:
+            existed = key in self._entries
+            self._drop_local(key)
+        
+        if self._redis is not None:
+            try:
+                user_id = self._redis.hget(self._hash_key(key), "user_id")
+                pipe = self._redis.pipeline()
+                pipe.delete(self._hash_key(key), self._logs_key(key))
+                if user_id:
+                    user_id = json.loads(user_id)
+                    pipe.srem(self._user_key(user_id), key)
+                    pipe.zrem(self._active_key(user_id), key)
+                existed = bool(pipe.execute()[0]) or existed
+            except Exception as e:
+                self._redis_failed("delete", e)
+        if not existed:
+            raise KeyError(key)
+    
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._purge_expired()
+            return iter(list(self._entries))
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired()
+            return len(self._entries)
+    
+    # Queries
+    
+    def active_count(self, user_id: str) -> int:
+        """Active deployments for a user (O(1) locally, one ZCARD with Redis)"""
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.zremrangebyscore(self._active_key(user_id), "-inf", time.time())
+                pipe.zcard(self._active_key(user_id))
+                return pipe.execute()[1]
+            except Exception as e:
+                self._redis_failed("active_count", e)
+        with self._lock:
+            return len(self._active_ids.get(str(user_id), ()))
+    
+    def for_user(self, user_id: str) -> List[Tuple[str, DeploymentState]]:
+        """(id, state) pairs for a user's deployments"""
+        user_id = str(user_id)
+        keys: Set[str] = set()
+        if self._redis is not None:
+            try:
+                keys = set(self._redis.smembers(self._user_key(user_id)))
+            except Exception as e:
+                self._redis_failed("for_user", e)
+        with self._lock:
+            keys |= self._user_ids.get(user_id, set())
+        
+        results = []
+        for key in keys:
+            try:
+                results.append((key, self[key]))
+            except KeyError:
+                if self._redis is not None:
+                    try:
+                        self._redis.srem(self._user_key(user_id), key)
+                    except Exception:
+                        pass
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "redis": self._redis is not None,
+                **self.stats
+            }
+    
+    # Write-through hooks (called by DeploymentState / StateLog)
+    
+    def _field_changed(self, key: str, state: DeploymentState, field: str, value: Any, removed: bool = False):
+        with self._lock:
+            if self._entries.get(key) is state:
+                self._touch(key)
+            if field in ("status", "user_id"):
+                self._index(key, state)
+        
+        if self._redis is None:
+            return
+        if field == LOGS_FIELD:
+            lines = [json.dumps(line, default=str) for line in (value or [])[-self.max_log_entries:]]
+            self._redis_write(key, state, lambda pipe: (
+                pipe.delete(self._logs_key(key)),
+                lines and pipe.rpush(self._logs_key(key), *lines)
+            ))
+        elif removed:
+            self._redis_write(key, state, lambda pipe: pipe.hdel(self._hash_key(key), field))
+        else:
+            encoded = json.dumps(value, default=str)
+            self._redis_write(key, state, lambda pipe: pipe.hset(self._hash_key(key), field, encoded))
+    
+    def _log_appended(self, key: str, line: Any):
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._touch(key)
+        if self._redis is None:
+            return
+        encoded = json.dumps(line, default=str)
+        self._redis_write(key, state, lambda pipe: (
+            pipe.rpush(self._logs_key(key), encoded),
+            pipe.ltrim(self._logs_key(key), -self.max_log_entries, -1)
+        ))
+    
+    # Local bookkeeping (call with self._lock held)
+    
+    def _remember(self, key: str, state: DeploymentState):
+        self._entries[key] = state
+        self._touch(key)
+        self._purge_expired()
+        while len(self._entries) > self.max_entries:
+            self._drop_local(self._eviction_candidate())
+            self.stats["evictions"] += 1
+    
+    def _touch(self, key: str):
+        self._entries.move_to_end(key)
+        self._expires[key] = time.monotonic() + self.ttl_seconds
+    
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self._expires[oldest] > now:
+                break
+            self._drop_local(oldest)
+    
+    def _eviction_candidate(self) -> str:
+        """Least recently used entry, preferring ones that are not active deployments"""
+        for key, state in self._entries.items():
+            if state.get("status") not in ACTIVE_DEPLOYMENT_STATUSES:
+                return key
+        return next(iter(self._entries))
+    
+    def _drop_local(self, key: str):
+        self._entries.pop(key, None)
+        self._expires.pop(key, None)
+        self._refreshed.pop(key, None)
+        self._unindex(key)
+    
+    def _index(self, key: str, state: DeploymentState):
+        if not self.track_users:
+            return
+        self._unindex(key)
+        user_id = state.get("user_id")
+        if user_id is None:
+            return
+        user_id = str(user_id)
+        self._indexed_user[key] = user_id
+        self._user_ids.setdefault(user_id, set()).add(key)
+        if state.get("status") in ACTIVE_DEPLOYMENT_STATUSES:
+            self._active_ids.setdefault(user_id, set()).add(key)
+    
+    def _unindex(self, key: str):
+        user_id = self._indexed_user.pop(key, None)
+        if user_id is None:
+            return
+        for index in (self._user_ids, self._active_ids):
+            ids = index.get(user_id)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del index[user_id]
+    
+    # Redis
+    
+    def _hash_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+    
+    def _logs_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}:logs"
+    
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.prefix}:user:{user_id}"
+    
+    def _active_key(self, user_id: str) -> str:
+        return f"{self.prefix}:active:{user_id}"
+    
+    def _redis_write(self, key: str, state: Optional[DeploymentState], commands):
+        """Run commands in one pipeline, then refresh TTLs and the per-user indexes"""
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            commands(pipe)
+            ttl = int(self.ttl_seconds)
+            pipe.expire(self._hash_key(key), ttl)
+            pipe.expire(self._logs_key(key), ttl)
+            user_id = state.get("user_id") if (self.track_users and state is not None) else None
+            if user_id is not None:
+                user_id = str(user_id)
+                pipe.sadd(self._user_key(user_id), key)
+                pipe.expire(self._user_key(user_id), ttl)
+                if state.get("status") in ACTIVE_DEPLOYMENT_STATUSES:
+                    # Scored by deadline so entries of crashed workers age out of the count
+                    pipe.zadd(self._active_key(user_id), {key: time.time() + self.ttl_seconds})
+                    pipe.expire(self._active_key(user_id), ttl)
+                else:
+                    pipe.zrem(self._active_key(user_id), key)
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed("write", e)
+    
+    def _redis_load(self, key: str) -> Any:
+        """Entry data, _MISSING if Redis has no such entry, None if Redis is unavailable"""
+        if self._redis is None:
+            return None
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.hgetall(self._hash_key(key))
+            pipe.lrange(self._logs_key(key), 0, -1)
+            fields, lines = pipe.execute()
+        except Exception as e:
+            self._redis_failed("read", e)
+            return None
+        if not fields:
+            return _MISSING
+        data = {field: json.loads(value) for field, value in fields.items()}
+        data[LOGS_FIELD] = [json.loads(line) for line in lines]
+        return data
+    
+    def _redis_failed(self, operation: str, error: Exception):
+        self.stats["redis_errors"] += 1
+        logger.warning(f"⚠️ Deployment state store Redis {operation} failed for {self.namespace}: {error}")
+
+
+class DeploymentHistoryStore:
+    """Most recent finished deployments per user (newest first, bounded)"""
+    
+    def __init__(
+        self,
+        per_user_limit: int = 50,
+        max_users: int = 10000,
+        redis_url: Optional[str] = None,
+        ttl_seconds: int = 30 * 24 * 3600
+    ):
+        self.per_user_limit = per_user_limit
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.prefix = "codeflowops:deployment_history"
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = _connect_redis(redis_url)
+    
+    def add(self, user_id: str, entry: Dict[str, Any]):
+        user_id = str(user_id)
+        with self._lock:
+            history = self._entries.pop(user_id, [])
+            history.insert(0, entry)
+            self._entries[user_id] = history[:self.per_user_limit]
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.lpush(f"{self.prefix}:{user_id}", json.dumps(entry, default=str))
+                pipe.ltrim(f"{self.prefix}:{user_id}", 0, self.per_user_limit - 1)
+                pipe.expire(f"{self.prefix}:{user_id}", self.ttl_seconds)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to store deployment history for {user_id}: {e}")
+    
+    def get(self, user_id: str) -> List[Dict[str, Any]]:
+        user_id = str(user_id)
+        if self._redis is not None:
+            try:
+                return [json.loads(item) for item in self._redis.lrange(f"{self.prefix}:{user_id}", 0, -1)]
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to read deployment history for {user_id}: {e}")
+        with self._lock:
+            return list(self._entries.get(user_id, []))
+    
+    def clear(self, user_id: str) -> int:
+        """Remove a user's history; returns how many entries were removed"""
+        user_id = str(user_id)
+        with self._lock:
+            cleared = len(self._entries.pop(user_id, []))
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.llen(f"{self.prefix}:{user_id}")
+                pipe.delete(f"{self.prefix}:{user_id}")
+                cleared = max(cleared, pipe.execute()[0])
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to clear deployment history for {user_id}: {e}")
+        return cleared
+
+
+_deployment_states: Optional[DeploymentStateStore] = None
+_analysis_sessions: Optional[DeploymentStateStore] = None
+_deployment_history: Optional[DeploymentHistoryStore] = None
+_stores_lock = threading.Lock()
+
+
+def _redis_url() -> Optional[str]:
+    return os.getenv("DEPLOYMENT_STATE_REDIS_URL")
+
+
+def get_deployment_states() -> DeploymentStateStore:
+    """Deployment progress by deployment_id"""
+    global _deployment_states
+    with _stores_lock:
+        if _deployment_states is None:
+            _deployment_states = DeploymentStateStore(
+                "deploy_state",
+                max_entries=int(os.getenv("DEPLOYMENT_STATE_MAX_ENTRIES", "2000")),
+                ttl_seconds=float(os.getenv("DEPLOYMENT_STATE_TTL_SECONDS", str(6 * 3600))),
+                redis_url=_redis_url(),
+                track_users=True
+            )
+        return _deployment_states
+
+
+def get_analysis_sessions() -> DeploymentStateStore:
+    """Analysis results kept until the matching deployment starts"""
+    global _analysis_sessions
+    with _stores_lock:
+        if _analysis_sessions is None:
+            _analysis_sessions = DeploymentStateStore(
+                "analysis_session",
+                max_entries=int(os.getenv("ANALYSIS_SESSION_MAX_ENTRIES", "500")),
+                ttl_seconds=float(os.getenv("ANALYSIS_SESSION_TTL_SECONDS", str(2 * 3600))),
+                redis_url=_redis_url()
+            )
+        return _analysis_sessions
+
+
+def get_deployment_history() -> DeploymentHistoryStore:
+    """Finished deployments per user for the dashboard"""
+    global _deployment_history
+    with _stores_lock:
+        if _deployment_history is None:
+            _deployment_history = DeploymentHistoryStore(redis_url=_redis_url())
+        return _deployment_history
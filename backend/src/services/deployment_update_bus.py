@@ -0,0 +1,203 @@
+# Deployment Update Bus - one pub/sub subscriber per worker, fanned out to WebSockets
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # In-process delivery only
+    redis = None
+
+
+class DeploymentSubscription:
+    """
+    Pending updates for one WebSocket watching one deployment
+    
+    Updates that arrive while the previous one is still being sent are
+    merged into a single pending dict, so a slow client receives the latest
+    state rather than a backlog of intermediate ones.
+    """
+    
+    def __init__(self, deployment_id: str):
+        self.deployment_id = deployment_id
+        self.coalesced = 0
+        self._pending: Dict[str, Any] = {}
+        self._event = asyncio.Event()
+    
+    def push(self, update: Dict[str, Any]):
+        if self._pending:
+            self.coalesced += 1
+        self._pending.update(update)
+        self._event.set()
+    
+    async def next_update(self, coalesce_seconds: float = 0.0) -> Dict[str, Any]:
+        """Wait for the next update, merging anything that arrives within coalesce_seconds"""
+        await self._event.wait()
+        if coalesce_seconds:
+            await asyncio.sleep(coalesce_seconds)
+        update, self._pending = self._pending, {}
+        self._event.clear()
+        return update
+
+
+class DeploymentUpdateBus:
+    """
+    Fans deployment status updates out to every local subscriber
+    
+    With Redis available, each worker holds a single pattern subscription on
+    ``deployment:updates:*`` and dispatches messages to its own WebSockets,
+    so updates published by any worker reach every dashboard. Without Redis
+    the bus delivers in-process.
+    """
+    
+    CHANNEL_PREFIX = "deployment:updates:"
+    
+    def __init__(self, redis_url: Optional[str] = None, coalesce_seconds: float = 0.1):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/1")
+        self.coalesce_seconds = coalesce_seconds
+        self.subscriptions: Dict[str, Set[DeploymentSubscription]] = {}
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self.stats = {"published": 0, "delivered": 0, "dropped_no_subscriber": 0}
+    
+    @property
+    def mode(self) -> str:
+        return "redis" if self._redis is not None else "in_process"
+    
+    async def start(self):
+        """Connect the worker's subscriber (no-op after the first call)"""
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            
+            if redis is None:
+                logger.info("📡 Deployment update bus running in-process (redis not installed)")
+                return
+            
+            try:
+                client = redis.from_url(self.redis_url)
+                await client.ping()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                self._redis = client
+                self._listener_task = asyncio.create_task(self._listen(pubsub))
+                logger.info("📡 Deployment update bus subscribed to Redis")
+            except Exception as e:
+                logger.info(f"📡 Deployment update bus running in-process (Redis unavailable: {e})")
+    
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
+        self._started = False
+    
+    async def publish(self, deployment_id: str, update: Dict[str, Any]):
+        """Publish an update to every worker (or locally when Redis is unavailable)"""
+        await self.start()
+        self.stats["published"] += 1
+        
+        if self._redis is not None:
+            try:
+                await self._redis.publish(f"{self.CHANNEL_PREFIX}{deployment_id}", json.dumps(update))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Redis publish failed, delivering locally: {e}")
+        
+        self._dispatch(deployment_id, update)
+    
+    async def subscribe(self, deployment_id: str) -> DeploymentSubscription:
+        await self.start()
+        subscription = DeploymentSubscription(deployment_id)
+        self.subscriptions.setdefault(deployment_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: DeploymentSubscription):
+        subscribers = self.subscriptions.get(subscription.deployment_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self.subscriptions[subscription.deployment_id]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "deployments": len(self.subscriptions),
+            "subscribers": sum(len(s) for s in self.subscriptions.values()),
+            **self.stats
+        }
+    
+    def _dispatch(self, deployment_id: str, update: Dict[str, Any]):
+        subscribers = self.subscriptions.get(deployment_id)
+        if not subscribers:
+            self.stats["dropped_no_subscriber"] += 1
+            return
+        for subscription in subscribers:
+            subscription.push(update)
+        self.stats["delivered"] += len(subscribers)
+    
+    async def _listen(self, pubsub):
+        backoff = 1.0
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode("utf-8")
+                    deployment_id = channel[len(self.CHANNEL_PREFIX):]
+                    if deployment_id not in self.subscriptions:
+                        continue
+                    try:
+                        update = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self._dispatch(deployment_id, update)
+                    backoff = 1.0
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Deployment update subscriber error, reconnecting in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                try:
+                    await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                except Exception:
+                    pass
+
+
+_update_bus: Optional[DeploymentUpdateBus] = None
+
+
+def get_deployment_update_bus() -> DeploymentUpdateBus:
+    """Per-worker update bus shared by executors and WebSocket endpoints"""
+    global _update_bus
+    if _update_bus is None:
+        _update_bus = DeploymentUpdateBus()
+    return _update_bus
+
+
+def diff_update(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level keys whose values changed between two status payloads"""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
@@ -1,6 +1,7 @@
 # Enhanced Repository Analysis Service (Claude dependencies removed)
 import os
 import json
+import asyncio
 import subprocess
 from typing import Dict, List, Optional, Tuple, Any
 from pathlib import Path
@@ -8,6 +9,7 @@ import yaml
 
 # Claude service removed - now using traditional Terraform templates
 from ..controllers.analysisController import AnalysisController
+from ..utils.zip_ingest import RepositoryFileIndex, get_file_index
 
 class EnhancedAnalysisService:
     """
@@ -57,14 +59,17 @@ class EnhancedAnalysisService:
         Simplified analysis method for Smart Deploy Terraform template selection
         """
         try:
+            # One index of the tree (recorded at upload time when available) instead of a walk per step
+            file_index = get_file_index(repo_path) or await asyncio.to_thread(RepositoryFileIndex.from_directory, repo_path)
+            
             # Perform basic repository analysis
             analysis = {
                 "project_type": await self._detect_project_type(repo_path),
                 "framework": await self._detect_framework(repo_path),
-                "languages": await self._detect_languages(repo_path),
+                "languages": await self._detect_languages(repo_path, file_index),
                 "dependencies": await self._extract_dependencies(repo_path),
                 "build_system": await self._detect_build_system(repo_path),
-                "environment_vars": await self._extract_environment_variables(repo_path),
+                "environment_vars": await self._extract_environment_variables(repo_path, file_index),
                 "deployment_hints": await self._get_deployment_hints(repo_path),
                 "scaling_requirements": await self._analyze_scaling_requirements(repo_path),
                 "estimated_complexity": "medium"
@@ -492,7 +497,11 @@ class EnhancedAnalysisService:
         
         return scaling
     
-    async def _extract_environment_variables(self, repo_path: str) -> List[str]:
+    async def _extract_environment_variables(
+        self,
+        repo_path: str,
+        file_index: Optional[RepositoryFileIndex] = None
+    ) -> List[str]:
         """Extract environment variable patterns from the repository"""
         
         env_vars = set()
@@ -520,12 +529,18 @@ class EnhancedAnalysisService:
         
         # Sample some source files to find env var usage
         source_files = []
-        for root, dirs, files in os.walk(repo_path):
-            if 'node_modules' not in root and '.git' not in root:
-                source_files.extend([
-                    os.path.join(root, f) for f in files 
-                    if f.endswith(('.js', '.jsx', '.ts', '.tsx', '.py', '.rb'))
-                ])
+        if file_index is not None:
+            source_files = [
+                file_index.absolute(path)
+                for path in file_index.with_suffix(('.js', '.jsx', '.ts', '.tsx', '.py', '.rb'))
+            ]
+        else:
+            for root, dirs, files in os.walk(repo_path):
+                if 'node_modules' not in root and '.git' not in root:
+                    source_files.extend([
+                        os.path.join(root, f) for f in files 
+                        if f.endswith(('.js', '.jsx', '.ts', '.tsx', '.py', '.rb'))
+                    ])
         
         for source_file in source_files[:10]:  # Check first 10 source files
             try:
@@ -700,27 +715,39 @@ class EnhancedAnalysisService:
         
         return "Unknown"
     
-    async def _detect_languages(self, repo_path: str) -> List[str]:
+    async def _detect_languages(
+        self,
+        repo_path: str,
+        file_index: Optional[RepositoryFileIndex] = None
+    ) -> List[str]:
         """Detect programming languages used"""
         languages = []
         
-        for root, dirs, files in os.walk(repo_path):
-            dirs[:] = [d for d in dirs if d not in ['node_modules', '.git', '__pycache__', '.venv']]
-            
-            for file in files:
-                ext = Path(file).suffix.lower()
-                if ext == '.js':
-                    languages.append('JavaScript')
-                elif ext == '.ts':
-                    languages.append('TypeScript')
-                elif ext == '.py':
-                    languages.append('Python')
-                elif ext == '.java':
-                    languages.append('Java')
-                elif ext == '.css':
-                    languages.append('CSS')
-                elif ext == '.html':
-                    languages.append('HTML')
+        if file_index is not None:
+            file_names = [
+                path.rsplit('/', 1)[-1] for path in file_index.files
+                if not any(part in ('__pycache__', '.venv') for part in path.split('/')[:-1])
+            ]
+        else:
+            file_names = []
+            for root, dirs, files in os.walk(repo_path):
+                dirs[:] = [d for d in dirs if d not in ['node_modules', '.git', '__pycache__', '.venv']]
+                file_names.extend(files)
+        
+        for file in file_names:
+            ext = Path(file).suffix.lower()
+            if ext == '.js':
+                languages.append('JavaScript')
+            elif ext == '.ts':
+                languages.append('TypeScript')
+            elif ext == '.py':
+                languages.append('Python')
+            elif ext == '.java':
+                languages.append('Java')
+            elif ext == '.css':
+                languages.append('CSS')
+            elif ext == '.html':
+                languages.append('HTML')
         
         return list(set(languages))
     
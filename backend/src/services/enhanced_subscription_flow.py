@@ -11,6 +11,7 @@ import uuid
 from ..utils.database import get_db_context
 from ..models.enhanced_models import User, Customer, Subscription, SubscriptionPlan, SubscriptionStatus
 from ..services.subscription_service import SubscriptionService
+from ..services.subscription_cache import get_subscription_cache, STATUS_SNAPSHOT
 
 logger = logging.getLogger(__name__)
 
@@ -223,58 +224,67 @@ class EnhancedSubscriptionFlow:
             Dict: Complete subscription status information
         """
         try:
-            with get_db_context() as db:
-                # Get user
-                user = db.query(User).filter(User.user_id == user_id).first()
-                if not user:
-                    return {
-                        "has_subscription": False,
-                        "error": "User not found"
-                    }
-                
-                # Get customer
-                customer = db.query(Customer).filter(Customer.user_id == user_id).first()
-                if not customer:
-                    return {
-                        "has_subscription": False,
-                        "status": "no_customer_record",
-                        "message": "User has no customer record - never subscribed"
-                    }
-                
-                # Get active subscriptions
-                active_subscriptions = db.query(Subscription).filter(
-                    Subscription.customer_id == customer.id,
-                    Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING])
-                ).all()
-                
-                if not active_subscriptions:
-                    return {
-                        "has_subscription": False,
-                        "status": "no_active_subscription",
-                        "message": "User has customer record but no active subscriptions"
-                    }
-                
-                # Return active subscription details
-                subscription = active_subscriptions[0]  # Get the first active subscription
-                
-                return {
-                    "has_subscription": True,
-                    "subscription_id": subscription.stripe_subscription_id,  # Add subscription ID
-                    "stripe_subscription_id": subscription.stripe_subscription_id,
-                    "status": subscription.status.value,
-                    "plan": subscription.plan.value,
-                    "amount": subscription.amount,
-                    "currency": subscription.currency,
-                    "interval": subscription.interval,
-                    "current_period_end": subscription.current_period_end.isoformat() if subscription.current_period_end else None,
-                    "trial_end": subscription.trial_end.isoformat() if subscription.trial_end else None,
-                    "cancel_at_period_end": subscription.cancel_at_period_end if hasattr(subscription, 'cancel_at_period_end') else False,  # Add cancel flag
-                    "is_trial": subscription.status == SubscriptionStatus.TRIALING
-                }
-                
+            return await get_subscription_cache().get_or_load(
+                user_id,
+                STATUS_SNAPSHOT,
+                lambda: EnhancedSubscriptionFlow._load_subscription_status(user_id),
+                cacheable=lambda status: "error" not in status  # e.g. user not created yet
+            )
         except Exception as e:
             logger.error(f"❌ Error getting subscription status for user {user_id}: {str(e)}")
             return {
                 "has_subscription": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    @staticmethod
+    async def _load_subscription_status(user_id: str) -> Dict[str, Any]:
+        """Query the subscription status (uncached; raises on database errors)"""
+        with get_db_context() as db:
+            # Get user
+            user = db.query(User).filter(User.user_id == user_id).first()
+            if not user:
+                return {
+                    "has_subscription": False,
+                    "error": "User not found"
+                }
+            
+            # Get customer
+            customer = db.query(Customer).filter(Customer.user_id == user_id).first()
+            if not customer:
+                return {
+                    "has_subscription": False,
+                    "status": "no_customer_record",
+                    "message": "User has no customer record - never subscribed"
+                }
+            
+            # Get active subscriptions
+            active_subscriptions = db.query(Subscription).filter(
+                Subscription.customer_id == customer.id,
+                Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING])
+            ).all()
+            
+            if not active_subscriptions:
+                return {
+                    "has_subscription": False,
+                    "status": "no_active_subscription",
+                    "message": "User has customer record but no active subscriptions"
+                }
+            
+            # Return active subscription details
+            subscription = active_subscriptions[0]  # Get the first active subscription
+            
+            return {
+                "has_subscription": True,
+                "subscription_id": subscription.stripe_subscription_id,  # Add subscription ID
+                "stripe_subscription_id": subscription.stripe_subscription_id,
+                "status": subscription.status.value,
+                "plan": subscription.plan.value,
+                "amount": subscription.amount,
+                "currency": subscription.currency,
+                "interval": subscription.interval,
+                "current_period_end": subscription.current_period_end.isoformat() if subscription.current_period_end else None,
+                "trial_end": subscription.trial_end.isoformat() if subscription.trial_end else None,
+                "cancel_at_period_end": subscription.cancel_at_period_end if hasattr(subscription, 'cancel_at_period_end') else False,  # Add cancel flag
+                "is_trial": subscription.status == SubscriptionStatus.TRIALING
+            }
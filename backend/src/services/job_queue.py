@@ -0,0 +1,914 @@
+"""
+Deployment Job Queue
+Durable job queue with leases, per-tenant fairness and plan-tier priority
+
+Jobs are ordered by weighted fair queuing: each job gets a virtual tag of
+``max(virtual_now, tenant_last_tag) + cost(plan_tier)``, and workers always
+claim the lowest tag. Tenants therefore take turns instead of one tenant's
+backlog blocking everyone, and higher plan tiers (lower cost) receive
+proportionally more turns without ever starving the free tier.
+
+A claimed job carries a lease that its worker renews with heartbeats; if
+the worker dies the lease expires and the job is handed to another worker
+(up to ``max_attempts``). Enqueueing with an idempotency key returns the
+existing job while it is still queued or running instead of creating a
+duplicate; once it has finished the key is free for a new job. Workers
+delete finished jobs after CODEFLOWOPS_JOB_RETENTION_SECONDS (default one
+day), so payloads do not accumulate in the store.
+
+Backends:
+- RedisJobBackend: shared by every API replica and worker process
+- SQLiteJobBackend: a file for single-host deployments, ``:memory:`` for tests
+
+Run standalone workers (scaled independently of API pods) with:
+    python -m src.services.job_queue --concurrency 4
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import logging
+import argparse
+import importlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # Redis backend unavailable; SQLite still works
+    redis = None
+
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATES = {JobState.SUCCEEDED.value, JobState.FAILED.value, JobState.CANCELLED.value}
+
+# Virtual-time cost per job by plan tier: lower cost = more turns
+PLAN_COSTS = {
+    "enterprise": 1.0,
+    "business": 1.0,
+    "pro": 2.0,
+    "starter": 3.0,
+    "free": 4.0
+}
+
+
+def plan_cost(plan_tier: Optional[str]) -> float:
+    return PLAN_COSTS.get(str(plan_tier or "free").lower(), PLAN_COSTS["free"])
+
+
+@dataclass
+class QueuedJob:
+    """A job and its queue bookkeeping"""
+    job_id: str
+    job_type: str
+    handler: str  # "module:function", resolved by the worker
+    payload: Dict[str, Any]
+    tenant_id: str
+    plan_tier: str = "free"
+    idempotency_key: Optional[str] = None
+    state: str = JobState.QUEUED.value
+    score: float = 0.0
+    attempts: int = 0
+    max_attempts: int = 3
+    available_at: float = 0.0
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.state in FINISHED_STATES
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobQueueBackend(ABC):
+    """Storage and atomic state transitions for queued jobs"""
+    
+    name = "base"
+    
+    @abstractmethod
+    def enqueue(self, job: QueuedJob) -> QueuedJob:
+        """Store a new job, or return the unfinished one with the same idempotency key"""
+    
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        """Lease the next job (lowest fair-queuing tag), recovering expired leases first"""
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False if the worker no longer owns the job"""
+    
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        """Mark a leased job succeeded"""
+    
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in: Optional[float] = None) -> bool:
+        """Release a leased job for retry after retry_in seconds, or fail it permanently"""
+    
+    @abstractmethod
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not finished"""
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        pass
+    
+    @abstractmethod
+    def position(self, job_id: str) -> Optional[int]:
+        """Jobs ahead of this one in the ready queue (None if not queued)"""
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        pass
+    
+    @abstractmethod
+    def prune_finished(self, older_than_seconds: float) -> int:
+        """Delete jobs that finished more than older_than_seconds ago"""
+
+
+class SQLiteJobBackend(JobQueueBackend):
+    """
+    Jobs in a SQLite database
+    
+    Claims run inside ``BEGIN IMMEDIATE`` transactions, so several worker
+    processes on one host can share a database file. ``:memory:`` gives an
+    isolated in-process queue for tests.
+    """
+    
+    name = "sqlite"
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            job_type TEXT NOT NULL,
+            handler TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            tenant_id TEXT NOT NULL,
+            plan_tier TEXT NOT NULL,
+            idempotency_key TEXT UNIQUE,
+            state TEXT NOT NULL,
+            score REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            available_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            result TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, score);
+        CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (state, lease_expires_at);
+        CREATE TABLE IF NOT EXISTS fair_clock (
+            tenant_id TEXT PRIMARY KEY,
+            last_tag REAL NOT NULL
+        );
+    """
+    
+    # fair_clock row holding the global virtual time
+    VIRTUAL_NOW = ""
+    
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def enqueue(self, job: QueuedJob) -> QueuedJob:
+        with self._transaction() as db:
+            if job.idempotency_key:
+                existing = db.execute(
+                    "SELECT * FROM jobs WHERE idempotency_key = ?", (job.idempotency_key,)
+                ).fetchone()
+                if existing and existing["state"] not in FINISHED_STATES:
+                    return self._to_job(existing)
+                if existing:
+                    db.execute("UPDATE jobs SET idempotency_key = NULL WHERE job_id = ?", (existing["job_id"],))
+            
+            job.score = self._next_tag(db, job.tenant_id, job.plan_tier)
+            db.execute(
+                """INSERT INTO jobs (job_id, job_type, handler, payload, tenant_id, plan_tier, idempotency_key,
+                                     state, score, attempts, max_attempts, available_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)""",
+                (job.job_id, job.job_type, job.handler, json.dumps(job.payload, default=str), job.tenant_id,
+                 job.plan_tier, job.idempotency_key, JobState.QUEUED.value, job.score, job.max_attempts,
+                 job.available_at, job.created_at, job.updated_at)
+            )
+            return job
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        now = time.time()
+        with self._transaction() as db:
+            self._recover_expired_leases(db, now)
+            
+            row = db.execute(
+                """SELECT * FROM jobs WHERE state = ? AND available_at <= ?
+                   ORDER BY score, created_at LIMIT 1""",
+                (JobState.QUEUED.value, now)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            self._advance_virtual_now(db, row["score"])
+            db.execute(
+                """UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?,
+                                   lease_expires_at = ?, updated_at = ?
+                   WHERE job_id = ?""",
+                (JobState.RUNNING.value, worker_id, now + lease_seconds, now, row["job_id"])
+            )
+            return self._to_job(db.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute(
+                """UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                   WHERE job_id = ? AND state = ? AND lease_owner = ?""",
+                (now + lease_seconds, now, job_id, JobState.RUNNING.value, worker_id)
+            ).rowcount
+            return updated == 1
+    
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        with self._transaction() as db:
+            updated = db.execute(
+                """UPDATE jobs SET state = ?, result = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                   WHERE job_id = ? AND state = ? AND lease_owner = ?""",
+                (JobState.SUCCEEDED.value, json.dumps(result, default=str), time.time(),
+                 job_id, JobState.RUNNING.value, worker_id)
+            ).rowcount
+            return updated == 1
+    
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE job_id = ? AND state = ? AND lease_owner = ?",
+                (job_id, JobState.RUNNING.value, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            
+            if retry_in is not None and row["attempts"] < row["max_attempts"]:
+                db.execute(
+                    """UPDATE jobs SET state = ?, score = ?, available_at = ?, error = ?,
+                                       lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                       WHERE job_id = ?""",
+                    (JobState.QUEUED.value, self._next_tag(db, row["tenant_id"], row["plan_tier"]),
+                     now + retry_in, error, now, job_id)
+                )
+            else:
+                db.execute(
+                    """UPDATE jobs SET state = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                       WHERE job_id = ?""",
+                    (JobState.FAILED.value, error, now, job_id)
+                )
+            return True
+    
+    def cancel(self, job_id: str) -> bool:
+        with self._transaction() as db:
+            updated = db.execute(
+                f"""UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+                    WHERE job_id = ? AND state NOT IN ({','.join('?' * len(FINISHED_STATES))})""",
+                (JobState.CANCELLED.value, time.time(), job_id, *FINISHED_STATES)
+            ).rowcount
+            return updated == 1
+    
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+    
+    def position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT COUNT(*) FROM jobs ahead, jobs target
+                   WHERE target.job_id = ? AND target.state = ? AND ahead.state = ?
+                     AND (ahead.score < target.score
+                          OR (ahead.score = target.score AND ahead.created_at < target.created_at))""",
+                (job_id, JobState.QUEUED.value, JobState.QUEUED.value)
+            ).fetchone()
+            queued = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE job_id = ? AND state = ?", (job_id, JobState.QUEUED.value)
+            ).fetchone()
+        return row[0] if queued else None
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            tenants = self._conn.execute(
+                "SELECT COUNT(DISTINCT tenant_id) FROM jobs WHERE state = ?", (JobState.QUEUED.value,)
+            ).fetchone()[0]
+        return {"backend": self.name, **{state.value: counts.get(state.value, 0) for state in JobState},
+                "queued_tenants": tenants}
+    
+    def prune_finished(self, older_than_seconds: float) -> int:
+        """Delete finished jobs (and with them their idempotency keys)"""
+        with self._transaction() as db:
+            return db.execute(
+                f"DELETE FROM jobs WHERE state IN ({','.join('?' * len(FINISHED_STATES))}) AND updated_at < ?",
+                (*FINISHED_STATES, time.time() - older_than_seconds)
+            ).rowcount
+    
+    def _recover_expired_leases(self, db: sqlite3.Connection, now: float):
+        expired = db.execute(
+            "SELECT job_id, tenant_id, plan_tier, attempts, max_attempts FROM jobs WHERE state = ? AND lease_expires_at < ?",
+            (JobState.RUNNING.value, now)
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= row["max_attempts"]:
+                db.execute(
+                    """UPDATE jobs SET state = ?, error = 'lease expired', lease_owner = NULL,
+                                       lease_expires_at = NULL, updated_at = ? WHERE job_id = ?""",
+                    (JobState.FAILED.value, now, row["job_id"])
+                )
+            else:
+                db.execute(
+                    """UPDATE jobs SET state = ?, score = ?, available_at = ?, lease_owner = NULL,
+                                       lease_expires_at = NULL, updated_at = ? WHERE job_id = ?""",
+                    (JobState.QUEUED.value, self._next_tag(db, row["tenant_id"], row["plan_tier"]),
+                     now, now, row["job_id"])
+                )
+            logger.warning(f"⚠️ Lease expired for job {row['job_id']} (attempt {row['attempts']}/{row['max_attempts']})")
+    
+    def _next_tag(self, db: sqlite3.Connection, tenant_id: str, plan_tier: str) -> float:
+        virtual_now = self._clock(db, self.VIRTUAL_NOW)
+        tag = max(virtual_now, self._clock(db, tenant_id)) + plan_cost(plan_tier)
+        db.execute(
+            "INSERT INTO fair_clock (tenant_id, last_tag) VALUES (?, ?) "
+            "ON CONFLICT(tenant_id) DO UPDATE SET last_tag = excluded.last_tag",
+            (tenant_id, tag)
+        )
+        return tag
+    
+    def _advance_virtual_now(self, db: sqlite3.Connection, tag: float):
+        db.execute(
+            "INSERT INTO fair_clock (tenant_id, last_tag) VALUES (?, ?) "
+            "ON CONFLICT(tenant_id) DO UPDATE SET last_tag = MAX(last_tag, excluded.last_tag)",
+            (self.VIRTUAL_NOW, tag)
+        )
+    
+    @staticmethod
+    def _clock(db: sqlite3.Connection, key: str) -> float:
+        row = db.execute("SELECT last_tag FROM fair_clock WHERE tenant_id = ?", (key,)).fetchone()
+        return row[0] if row else 0.0
+    
+    def _transaction(self):
+        return _SQLiteTransaction(self._conn, self._lock)
+    
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> QueuedJob:
+        data = dict(row)
+        data["payload"] = json.loads(data["payload"])
+        data["result"] = json.loads(data["result"]) if data["result"] is not None else None
+        return QueuedJob(**data)
+
+
+class _SQLiteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT under the backend's thread lock"""
+    
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+    
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.lock.release()
+            raise
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+
+
+class RedisJobBackend(JobQueueBackend):
+    """
+    Jobs in Redis, shared by every API replica and worker process
+    
+    Each job is a hash; ready jobs live in a sorted set scored by their fair
+    queuing tag, leases in a sorted set scored by expiry and retries in a
+    sorted set scored by availability. Every state transition is a Lua
+    script, so claims are atomic across processes.
+    """
+    
+    name = "redis"
+    
+    ENQUEUE_SCRIPT = """
+        local prefix, job_id, idem, tenant, cost = ARGV[1], ARGV[2], ARGV[3], ARGV[4], tonumber(ARGV[5])
+        if idem ~= '' then
+            local existing = redis.call('HGET', prefix .. ':idempotency', idem)
+            local state = existing and redis.call('HGET', prefix .. ':job:' .. existing, 'state')
+            if state and state ~= 'succeeded' and state ~= 'failed' and state ~= 'cancelled' then
+                return existing
+            end
+        end
+        local virtual_now = tonumber(redis.call('GET', prefix .. ':virtual_now') or '0')
+        local last = tonumber(redis.call('HGET', prefix .. ':fair_clock', tenant) or '0')
+        local tag = math.max(virtual_now, last) + cost
+        redis.call('HSET', prefix .. ':fair_clock', tenant, tostring(tag))
+        local key = prefix .. ':job:' .. job_id
+        for i = 6, #ARGV, 2 do
+            redis.call('HSET', key, ARGV[i], ARGV[i + 1])
+        end
+        redis.call('HSET', key, 'score', tostring(tag), 'cost', tostring(cost))
+        redis.call('ZADD', prefix .. ':ready', tag, job_id)
+        if idem ~= '' then
+            redis.call('HSET', prefix .. ':idempotency', idem, job_id)
+        end
+        return job_id
+    """
+    
+    CLAIM_SCRIPT = """
+        local prefix, now, worker, lease = ARGV[1], tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+        local function job_key(id) return prefix .. ':job:' .. id end
+        
+        -- Expired leases go back to the retry set (or fail after max_attempts)
+        for _, id in ipairs(redis.call('ZRANGEBYSCORE', prefix .. ':leases', '-inf', now, 'LIMIT', 0, 100)) do
+            redis.call('ZREM', prefix .. ':leases', id)
+            local attempts = tonumber(redis.call('HGET', job_key(id), 'attempts') or '0')
+            local max_attempts = tonumber(redis.call('HGET', job_key(id), 'max_attempts') or '1')
+            if attempts >= max_attempts then
+                redis.call('HSET', job_key(id), 'state', 'failed', 'error', 'lease expired',
+                           'lease_owner', '', 'lease_expires_at', '', 'updated_at', tostring(now))
+                redis.call('ZADD', prefix .. ':finished', now, id)
+            else
+                redis.call('HSET', job_key(id), 'state', 'queued', 'lease_owner', '', 'lease_expires_at', '',
+                           'updated_at', tostring(now))
+                redis.call('ZADD', prefix .. ':delayed', now, id)
+            end
+        end
+        
+        -- Due retries get a fresh fair-queuing tag
+        local virtual_now = tonumber(redis.call('GET', prefix .. ':virtual_now') or '0')
+        for _, id in ipairs(redis.call('ZRANGEBYSCORE', prefix .. ':delayed', '-inf', now, 'LIMIT', 0, 100)) do
+            redis.call('ZREM', prefix .. ':delayed', id)
+            local tenant = redis.call('HGET', job_key(id), 'tenant_id')
+            local cost = tonumber(redis.call('HGET', job_key(id), 'cost') or '1')
+            local last = tonumber(redis.call('HGET', prefix .. ':fair_clock', tenant) or '0')
+            local tag = math.max(virtual_now, last) + cost
+            redis.call('HSET', prefix .. ':fair_clock', tenant, tostring(tag))
+            redis.call('HSET', job_key(id), 'score', tostring(tag))
+            redis.call('ZADD', prefix .. ':ready', tag, id)
+        end
+        
+        local head = redis.call('ZRANGE', prefix .. ':ready', 0, 0, 'WITHSCORES')
+        if #head == 0 then
+            return false
+        end
+        local id, score = head[1], tonumber(head[2])
+        redis.call('ZREM', prefix .. ':ready', id)
+        if score > virtual_now then
+            redis.call('SET', prefix .. ':virtual_now', tostring(score))
+        end
+        local expires = now + lease
+        redis.call('HINCRBY', job_key(id), 'attempts', 1)
+        redis.call('HSET', job_key(id), 'state', 'running', 'lease_owner', worker,
+                   'lease_expires_at', tostring(expires), 'updated_at', tostring(now))
+        redis.call('ZADD', prefix .. ':leases', expires, id)
+        return id
+    """
+    
+    HEARTBEAT_SCRIPT = """
+        local prefix, id, worker, expires = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+        local key = prefix .. ':job:' .. id
+        if redis.call('HGET', key, 'state') ~= 'running' or redis.call('HGET', key, 'lease_owner') ~= worker then
+            return 0
+        end
+        redis.call('HSET', key, 'lease_expires_at', expires)
+        redis.call('ZADD', prefix .. ':leases', tonumber(expires), id)
+        return 1
+    """
+    
+    FINISH_SCRIPT = """
+        -- ARGV: prefix, id, worker, now, state, field, value, retry_at ('' = no retry)
+        local prefix, id, worker, now = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+        local key = prefix .. ':job:' .. id
+        if redis.call('HGET', key, 'state') ~= 'running' or redis.call('HGET', key, 'lease_owner') ~= worker then
+            return 0
+        end
+        redis.call('ZREM', prefix .. ':leases', id)
+        redis.call('HSET', key, ARGV[6], ARGV[7], 'lease_owner', '', 'lease_expires_at', '', 'updated_at', now)
+        local attempts = tonumber(redis.call('HGET', key, 'attempts') or '0')
+        local max_attempts = tonumber(redis.call('HGET', key, 'max_attempts') or '1')
+        if ARGV[8] ~= '' and attempts < max_attempts then
+            redis.call('HSET', key, 'state', 'queued', 'available_at', ARGV[8])
+            redis.call('ZADD', prefix .. ':delayed', tonumber(ARGV[8]), id)
+        else
+            redis.call('HSET', key, 'state', ARGV[5])
+            redis.call('ZADD', prefix .. ':finished', tonumber(now), id)
+        end
+        return 1
+    """
+    
+    CANCEL_SCRIPT = """
+        local prefix, id, now = ARGV[1], ARGV[2], ARGV[3]
+        local key = prefix .. ':job:' .. id
+        local state = redis.call('HGET', key, 'state')
+        if not state or state == 'succeeded' or state == 'failed' or state == 'cancelled' then
+            return 0
+        end
+        redis.call('ZREM', prefix .. ':ready', id)
+        redis.call('ZREM', prefix .. ':delayed', id)
+        redis.call('ZREM', prefix .. ':leases', id)
+        redis.call('HSET', key, 'state', 'cancelled', 'lease_owner', '', 'lease_expires_at', '', 'updated_at', now)
+        redis.call('ZADD', prefix .. ':finished', tonumber(now), id)
+        return 1
+    """
+    
+    # Hash fields stored as JSON rather than plain strings
+    JSON_FIELDS = {"payload", "result"}
+    NUMERIC_FIELDS = {"score": float, "attempts": int, "max_attempts": int, "available_at": float,
+                      "lease_expires_at": float, "created_at": float, "updated_at": float}
+    
+    def __init__(self, url: str, prefix: str = "codeflowops:deploy_jobs", client=None):
+        if client is None and redis is None:
+            raise RuntimeError("redis package is required for the Redis job queue backend")
+        self.client = client or redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._enqueue = self.client.register_script(self.ENQUEUE_SCRIPT)
+        self._claim = self.client.register_script(self.CLAIM_SCRIPT)
+        self._heartbeat = self.client.register_script(self.HEARTBEAT_SCRIPT)
+        self._finish = self.client.register_script(self.FINISH_SCRIPT)
+        self._cancel = self.client.register_script(self.CANCEL_SCRIPT)
+    
+    def enqueue(self, job: QueuedJob) -> QueuedJob:
+        fields = []
+        for name, value in job.to_dict().items():
+            if name in ("score", "idempotency_key") and value is None:
+                continue
+            fields.extend([name, self._encode_field(name, value)])
+        job_id = self._enqueue(args=[
+            self.prefix, job.job_id, job.idempotency_key or "", job.tenant_id, plan_cost(job.plan_tier), *fields
+        ])
+        return self.get(job_id)
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[QueuedJob]:
+        job_id = self._claim(args=[self.prefix, time.time(), worker_id, lease_seconds])
+        return self.get(job_id) if job_id else None
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return bool(self._heartbeat(args=[self.prefix, job_id, worker_id, time.time() + lease_seconds]))
+    
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        return bool(self._finish(args=[
+            self.prefix, job_id, worker_id, time.time(), JobState.SUCCEEDED.value,
+            "result", json.dumps(result, default=str), ""
+        ]))
+    
+    def fail(self, job_id: str, worker_id: str, error: str, retry_in: Optional[float] = None) -> bool:
+        now = time.time()
+        return bool(self._finish(args=[
+            self.prefix, job_id, worker_id, now, JobState.FAILED.value,
+            "error", error, "" if retry_in is None else now + retry_in
+        ]))
+    
+    def cancel(self, job_id: str) -> bool:
+        return bool(self._cancel(args=[self.prefix, job_id, time.time()]))
+    
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        data = self.client.hgetall(f"{self.prefix}:job:{job_id}")
+        if not data:
+            return None
+        known = QueuedJob.__dataclass_fields__
+        return QueuedJob(**{
+            name: self._decode_field(name, value) for name, value in data.items() if name in known
+        })
+    
+    def position(self, job_id: str) -> Optional[int]:
+        return self.client.zrank(f"{self.prefix}:ready", job_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        pipe = self.client.pipeline()
+        pipe.zcard(f"{self.prefix}:ready")
+        pipe.zcard(f"{self.prefix}:delayed")
+        pipe.zcard(f"{self.prefix}:leases")
+        pipe.zcard(f"{self.prefix}:finished")
+        ready, delayed, running, finished = pipe.execute()
+        return {
+            "backend": self.name,
+            JobState.QUEUED.value: ready + delayed,
+            JobState.RUNNING.value: running,
+            "finished": finished
+        }
+    
+    def prune_finished(self, older_than_seconds: float) -> int:
+        """Delete finished jobs and their idempotency keys"""
+        cutoff = time.time() - older_than_seconds
+        job_ids = self.client.zrangebyscore(f"{self.prefix}:finished", "-inf", cutoff, start=0, num=1000)
+        for job_id in job_ids:
+            idempotency_key = self.client.hget(f"{self.prefix}:job:{job_id}", "idempotency_key")
+            pipe = self.client.pipeline()
+            if idempotency_key and self.client.hget(f"{self.prefix}:idempotency", idempotency_key) == job_id:
+                pipe.hdel(f"{self.prefix}:idempotency", idempotency_key)
+            pipe.delete(f"{self.prefix}:job:{job_id}")
+            pipe.zrem(f"{self.prefix}:finished", job_id)
+            pipe.execute()
+        return len(job_ids)
+    
+    def _encode_field(self, name: str, value: Any) -> str:
+        if name in self.JSON_FIELDS:
+            return json.dumps(value, default=str)
+        return "" if value is None else str(value)
+    
+    def _decode_field(self, name: str, value: str) -> Any:
+        if name in self.JSON_FIELDS:
+            return json.loads(value) if value else None
+        if name in self.NUMERIC_FIELDS:
+            return self.NUMERIC_FIELDS[name](float(value)) if value != "" else None
+        return value if value != "" else None
+
+
+class JobQueue:
+    """Enqueue side of the queue, used by API processes"""
+    
+    def __init__(self, backend: JobQueueBackend, lease_seconds: float = 60.0):
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+    
+    def enqueue(
+        self,
+        job_type: str,
+        handler: str,
+        payload: Dict[str, Any],
+        tenant_id: str,
+        plan_tier: str = "free",
+        idempotency_key: Optional[str] = None,
+        max_attempts: int = 3,
+        job_id: Optional[str] = None
+    ) -> QueuedJob:
+        """Queue a job; with an idempotency key, repeated calls return the job until it finishes"""
+        job = self.backend.enqueue(QueuedJob(
+            job_id=job_id or str(uuid.uuid4()),
+            job_type=job_type,
+            handler=handler,
+            payload=payload,
+            tenant_id=str(tenant_id or "anonymous"),
+            plan_tier=str(plan_tier or "free").lower(),
+            idempotency_key=idempotency_key,
+            max_attempts=max_attempts
+        ))
+        logger.info(f"📥 Queued {job.job_type} job {job.job_id} for tenant {job.tenant_id} ({job.plan_tier})")
+        return job
+    
+    def get_job(self, job_id: str) -> Optional[QueuedJob]:
+        return self.backend.get(job_id)
+    
+    def position(self, job_id: str) -> Optional[int]:
+        return self.backend.position(job_id)
+    
+    def cancel(self, job_id: str) -> bool:
+        return self.backend.cancel(job_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+    
+    def prune_finished(self, older_than_seconds: float) -> int:
+        return self.backend.prune_finished(older_than_seconds)
+
+
+class JobWorker:
+    """
+    Runs queued jobs on a pool of threads
+    
+    Each slot claims a job, resolves its ``module:function`` handler, calls
+    it with the job payload as keyword arguments and renews the lease every
+    third of ``lease_seconds`` while it runs. Failures are retried with
+    exponential backoff until ``max_attempts``. A janitor thread prunes
+    jobs that finished more than ``retention_seconds`` ago.
+    """
+    
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 4,
+        worker_id: Optional[str] = None,
+        poll_interval: float = 1.0,
+        retry_base_seconds: float = 30.0,
+        retention_seconds: Optional[float] = None
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval
+        self.retry_base_seconds = retry_base_seconds
+        self.retention_seconds = (
+            retention_seconds if retention_seconds is not None
+            else float(os.getenv("CODEFLOWOPS_JOB_RETENTION_SECONDS", str(24 * 3600)))
+        )
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self.stats = {"claimed": 0, "succeeded": 0, "failed": 0, "leases_lost": 0, "pruned": 0}
+    
+    def register(self, handler: str, function: Callable[..., Any]):
+        """Bind a handler name to a function instead of importing it (inline workers)"""
+        self._handlers[handler] = function
+    
+    def start(self):
+        """Start the worker slots as daemon threads (inline mode inside an API process)"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for slot in range(self.concurrency):
+            thread = threading.Thread(target=self._run_slot, name=f"job-worker-{slot}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        janitor = threading.Thread(target=self._prune_loop, name="job-janitor", daemon=True)
+        janitor.start()
+        self._threads.append(janitor)
+        logger.info(f"👷 Job worker {self.worker_id} started with {self.concurrency} slots ({self.queue.backend.name})")
+    
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+    
+    def run_forever(self):
+        """Run until interrupted (standalone worker process)"""
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            logger.info("🛑 Job worker interrupted; releasing slots")
+        finally:
+            self.stop()
+    
+    def run_once(self) -> bool:
+        """Claim and run a single job in the calling thread (tests, draining)"""
+        job = self.queue.backend.claim(self.worker_id, self.queue.lease_seconds)
+        if job is None:
+            return False
+        self._execute(job)
+        return True
+    
+    def _run_slot(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval * random.uniform(0.5, 1.5))
+            except Exception as e:
+                logger.error(f"❌ Job worker slot error: {e}")
+                self._stop.wait(self.poll_interval)
+    
+    def _prune_loop(self):
+        interval = max(60.0, min(3600.0, self.retention_seconds / 4))
+        while True:
+            try:
+                pruned = self.queue.prune_finished(self.retention_seconds)
+                if pruned:
+                    self.stats["pruned"] += pruned
+                    logger.info(f"🧹 Pruned {pruned} finished jobs older than {self.retention_seconds:.0f}s")
+            except Exception as e:
+                logger.warning(f"⚠️ Pruning finished jobs failed: {e}")
+            if self._stop.wait(interval):
+                return
+    
+    def _execute(self, job: QueuedJob):
+        self.stats["claimed"] += 1
+        lease_lost = threading.Event()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(job.job_id, done, lease_lost),
+            name=f"job-heartbeat-{job.job_id[:8]}", daemon=True
+        )
+        heartbeat.start()
+        
+        started = time.monotonic()
+        try:
+            result = self._resolve(job.handler)(**job.payload)
+        except Exception as e:
+            done.set()
+            retry_in = self.retry_base_seconds * (2 ** (job.attempts - 1)) if job.attempts < job.max_attempts else None
+            self.queue.backend.fail(job.job_id, self.worker_id, f"{type(e).__name__}: {e}", retry_in)
+            self.stats["failed"] += 1
+            logger.error(f"❌ Job {job.job_id} ({job.job_type}) failed on attempt {job.attempts}/{job.max_attempts}: {e}")
+            return
+        finally:
+            done.set()
+            heartbeat.join(timeout=1.0)
+        
+        if lease_lost.is_set():
+            self.stats["leases_lost"] += 1
+        if self.queue.backend.complete(job.job_id, self.worker_id, result if _is_json_safe(result) else None):
+            self.stats["succeeded"] += 1
+            logger.info(f"✅ Job {job.job_id} ({job.job_type}) finished in {time.monotonic() - started:.1f}s")
+        else:
+            logger.warning(f"⚠️ Job {job.job_id} finished after its lease was lost or it was cancelled")
+    
+    def _heartbeat_loop(self, job_id: str, done: threading.Event, lease_lost: threading.Event):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                if not self.queue.backend.heartbeat(job_id, self.worker_id, self.queue.lease_seconds):
+                    lease_lost.set()
+                    logger.warning(f"⚠️ Lost lease on job {job_id}; another worker may pick it up")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat failed for job {job_id}: {e}")
+    
+    def _resolve(self, handler: str) -> Callable[..., Any]:
+        function = self._handlers.get(handler)
+        if function is None:
+            module_name, _, attribute = handler.partition(":")
+            function = getattr(importlib.import_module(module_name), attribute)
+            self._handlers[handler] = function
+        return function
+
+
+def _is_json_safe(value: Any) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def create_job_queue_backend(url: Optional[str] = None) -> JobQueueBackend:
+    """
+    Backend from CODEFLOWOPS_JOB_QUEUE_URL
+    
+    ``redis://...`` -> RedisJobBackend, ``sqlite:///path`` -> SQLite file,
+    ``memory`` -> in-process SQLite. Defaults to a SQLite file in the temp dir.
+    """
+    url = url or os.getenv("CODEFLOWOPS_JOB_QUEUE_URL")
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisJobBackend(url)
+    if url == "memory":
+        return SQLiteJobBackend(":memory:")
+    if url and url.startswith("sqlite:///"):
+        return SQLiteJobBackend(url[len("sqlite:///"):])
+    return SQLiteJobBackend(os.path.join(tempfile.gettempdir(), "codeflowops-jobs.db"))
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(
+                    create_job_queue_backend(),
+                    lease_seconds=float(os.getenv("CODEFLOWOPS_JOB_LEASE_SECONDS", "60"))
+                )
+    return _job_queue
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run CodeFlowOps deployment job workers")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("CODEFLOWOPS_JOB_CONCURRENCY", "4")))
+    parser.add_argument("--queue-url", default=None, help="Overrides CODEFLOWOPS_JOB_QUEUE_URL")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Handlers are resolved by module path relative to the backend directory
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    
+    global _job_queue
+    if args.queue_url:
+        _job_queue = JobQueue(create_job_queue_backend(args.queue_url))
+    JobWorker(get_job_queue(), concurrency=args.concurrency).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Monitoring Registry
+Shared record of the deployments under production monitoring, keyed by the
+monitoring shard that owns them
+
+Any API process can register a deployment; the worker owning its shard picks
+it up on its next poll. Backends mirror the job queue:
+- RedisMonitoringRegistry: shared by every API replica and monitoring worker
+- SQLiteMonitoringRegistry: a file for single-host deployments, ``:memory:`` for tests
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+try:
+    import redis
+except ImportError:  # Redis backend unavailable; SQLite still works
+    redis = None
+
+
+class MonitoringRegistry(ABC):
+    """Deployments to monitor, grouped by owning shard"""
+    
+    name = "abstract"
+    
+    @abstractmethod
+    def add(self, deployment_id: str, shard: int, record: Dict[str, Any]):
+        """Register (or update) a deployment for its owning shard"""
+    
+    @abstractmethod
+    def remove(self, deployment_id: str, shard: int):
+        """Stop monitoring a deployment"""
+    
+    @abstractmethod
+    def list_shard(self, shard: int) -> Dict[str, Dict[str, Any]]:
+        """deployment_id -> record for every deployment owned by ``shard``"""
+
+
+class SQLiteMonitoringRegistry(MonitoringRegistry):
+    """Registry table in a SQLite database (WAL mode, shareable between processes on one host)"""
+    
+    name = "sqlite"
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS monitored_deployments (
+            deployment_id TEXT PRIMARY KEY,
+            shard INTEGER NOT NULL,
+            record TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS monitored_by_shard ON monitored_deployments (shard);
+    """
+    
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def add(self, deployment_id: str, shard: int, record: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO monitored_deployments (deployment_id, shard, record, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (deployment_id, shard, json.dumps(record, default=str), time.time())
+            )
+    
+    def remove(self, deployment_id: str, shard: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM monitored_deployments WHERE deployment_id = ?", (deployment_id,))
+    
+    def list_shard(self, shard: int) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT deployment_id, record FROM monitored_deployments WHERE shard = ?", (shard,)
+            ).fetchall()
+        return {deployment_id: json.loads(record) for deployment_id, record in rows}
+
+
+class RedisMonitoringRegistry(MonitoringRegistry):
+    """One hash per shard: ``<prefix>:shard:<n>`` maps deployment_id -> JSON record"""
+    
+    name = "redis"
+    
+    def __init__(self, url: str, prefix: str = "codeflowops:monitoring", client=None):
+        if client is None and redis is None:
+            raise RuntimeError("redis package is required for the Redis monitoring registry")
+        self.client = client or redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+    
+    def add(self, deployment_id: str, shard: int, record: Dict[str, Any]):
+        self.client.hset(f"{self.prefix}:shard:{shard}", deployment_id, json.dumps(record, default=str))
+    
+    def remove(self, deployment_id: str, shard: int):
+        self.client.hdel(f"{self.prefix}:shard:{shard}", deployment_id)
+    
+    def list_shard(self, shard: int) -> Dict[str, Dict[str, Any]]:
+        return {
+            deployment_id: json.loads(record)
+            for deployment_id, record in self.client.hgetall(f"{self.prefix}:shard:{shard}").items()
+        }
+
+
+def create_monitoring_registry(url: Optional[str] = None) -> MonitoringRegistry:
+    """
+    Registry from CODEFLOWOPS_MONITORING_REGISTRY_URL
+    
+    ``redis://...`` -> RedisMonitoringRegistry, ``sqlite:///path`` -> SQLite
+    file, ``memory`` -> in-process SQLite. Defaults to a SQLite file in the
+    temp dir, which only reaches shards on the same host.
+    """
+    url = url or os.getenv("CODEFLOWOPS_MONITORING_REGISTRY_URL")
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisMonitoringRegistry(url)
+    if url == "memory":
+        return SQLiteMonitoringRegistry(":memory:")
+    if url and url.startswith("sqlite:///"):
+        return SQLiteMonitoringRegistry(url[len("sqlite:///"):])
+    return SQLiteMonitoringRegistry(os.path.join(tempfile.gettempdir(), "codeflowops-monitoring.db"))
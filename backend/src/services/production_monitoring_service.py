@@ -4,16 +4,23 @@ Comprehensive monitoring with CloudWatch integration, alerting, and performance
 """
 
 import asyncio
+import heapq
 import json
 import logging
+import math
+import os
+import zlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import boto3
 import aiohttp
 import time
 
+from core.metrics_aggregator import get_metric_aggregator
+from .monitoring_registry import MonitoringRegistry, create_monitoring_registry
+
 logger = logging.getLogger(__name__)
 
 class AlertSeverity(Enum):
@@ -51,9 +58,39 @@ class Alert:
     resolution_time: Optional[datetime] = None
 
 class ProductionMonitoringService:
-    """Enhanced monitoring service for production deployments"""
+    """
+    Enhanced monitoring service for production deployments
+    
+    Health, performance and cost checks for every deployment run from one
+    scheduler: a heap of (due time, check) entries rounded to a one-second
+    tick, so checks falling due together are started as one batch under a
+    global concurrency limit. CloudWatch datums are buffered per namespace
+    and written up to 1000 per PutMetricData call.
+    
+    Deployments are sharded across workers by a stable hash of the
+    deployment ID (CODEFLOWOPS_MONITORING_SHARD_INDEX / _SHARD_COUNT); a
+    worker only schedules and keeps state for the deployments it owns.
+    With more than one shard every deployment is written to a shared
+    registry (CODEFLOWOPS_MONITORING_REGISTRY_URL) and each worker polls it
+    for its own shard, so a deployment received by any process reaches its
+    owner. Shard workers call ``start_registry_sync()`` at startup.
+    """
     
-    def __init__(self, aws_region: str = "us-east-1"):
+    # Scheduler resolution; due times are rounded up to this so checks share wake-ups
+    TICK_SECONDS = 1.0
+    # Checks in flight at once across all deployments
+    MAX_CONCURRENT_CHECKS = 50
+    COST_CHECK_INTERVAL = 3600
+    # How often a shard worker looks for deployments registered by other processes
+    REGISTRY_POLL_SECONDS = 15.0
+    
+    def __init__(
+        self,
+        aws_region: str = "us-east-1",
+        shard_index: Optional[int] = None,
+        shard_count: Optional[int] = None,
+        registry: Optional[MonitoringRegistry] = None
+    ):
         self.aws_region = aws_region
         self.cloudwatch = boto3.client('cloudwatch', region_name=aws_region)
         self.sns = boto3.client('sns', region_name=aws_region)
@@ -63,6 +100,29 @@ class ProductionMonitoringService:
         self.performance_metrics: Dict[str, List[PerformanceMetric]] = {}
         self.active_alerts: Dict[str, Alert] = {}
         
+        # Worker sharding
+        self.shard_count = max(1, shard_count or int(os.getenv("CODEFLOWOPS_MONITORING_SHARD_COUNT", "1")))
+        self.shard_index = (
+            shard_index if shard_index is not None
+            else int(os.getenv("CODEFLOWOPS_MONITORING_SHARD_INDEX", "0"))
+        ) % self.shard_count
+        self.registry = registry if registry is not None else (
+            create_monitoring_registry() if self.shard_count > 1 else None
+        )
+        self._registry_task: Optional[asyncio.Task] = None
+        
+        # Scheduler state: heap of (due_at, sequence, deployment_id, check_name)
+        self._schedule: List[Tuple[float, int, str, str]] = []
+        self._schedule_sequence = 0
+        self._schedule_changed: Optional[asyncio.Event] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._check_semaphore: Optional[asyncio.Semaphore] = None
+        self._running_checks: set = set()
+        
+        # CloudWatch datums are aggregated and flushed by the process-wide aggregator
+        self.metric_aggregator = get_metric_aggregator()
+        self.scheduler_stats = {"batches": 0, "checks_run": 0, "largest_batch": 0}
+        
         # Monitoring configuration
         self.monitoring_config = {
             "health_check_interval": 60,  # seconds
@@ -81,148 +141,280 @@ class ProductionMonitoringService:
         deployment_url: str,
         monitoring_config: Optional[Dict] = None
     ) -> bool:
-        """Start comprehensive monitoring for a deployment"""
+        """Start comprehensive monitoring for a deployment
+        
+        Deployments owned by another shard are handed over through the
+        registry; the owning worker schedules them on its next poll.
+        """
         try:
-            deployment_info = {
-                "deployment_id": deployment_id,
-                "deployment_url": deployment_url,
-                "monitoring_started": datetime.utcnow(),
-                "status": "monitoring",
-                "health_status": "unknown",
-                "last_health_check": None,
-                "performance_summary": {},
-                "alert_count": 0,
-                "config": monitoring_config or self.monitoring_config
-            }
-            
-            self.active_deployments[deployment_id] = deployment_info
-            self.performance_metrics[deployment_id] = []
-            
-            # Start monitoring tasks
-            asyncio.create_task(self._health_check_loop(deployment_id))
-            asyncio.create_task(self._performance_monitoring_loop(deployment_id))
-            asyncio.create_task(self._cost_monitoring_loop(deployment_id))
-            
-            logger.info(f"✅ Started comprehensive monitoring for deployment: {deployment_id}")
+            if self.registry is not None:
+                await asyncio.to_thread(
+                    self.registry.add,
+                    deployment_id,
+                    self.shard_for(deployment_id),
+                    {"deployment_url": deployment_url, "monitoring_config": self._shareable_config(monitoring_config)}
+                )
+                self._ensure_registry_sync()
             
-            # Send initial CloudWatch metric
-            await self._send_cloudwatch_metric(
-                "DeploymentMonitoring",
-                "MonitoringStarted",
-                1,
-                deployment_id
-            )
+            if not self.owns_deployment(deployment_id):
+                logger.info(
+                    f"↪️ Deployment {deployment_id} handed to monitoring shard "
+                    f"{self.shard_for(deployment_id)}/{self.shard_count} via the registry"
+                )
+                return True
             
-            return True
+            return await self._start_local_monitoring(deployment_id, deployment_url, monitoring_config)
             
         except Exception as e:
             logger.error(f"Failed to start monitoring for {deployment_id}: {e}")
             return False
     
-    async def _health_check_loop(self, deployment_id: str):
-        """Continuous health checking loop"""
-        deployment = self.active_deployments.get(deployment_id)
-        if not deployment:
-            return
+    async def _start_local_monitoring(
+        self,
+        deployment_id: str,
+        deployment_url: str,
+        monitoring_config: Optional[Dict] = None
+    ) -> bool:
+        """Schedule checks for a deployment owned by this shard"""
+        if deployment_id in self.active_deployments:
+            return True
+        
+        deployment_info = {
+            "deployment_id": deployment_id,
+            "deployment_url": deployment_url,
+            "monitoring_started": datetime.utcnow(),
+            "status": "monitoring",
+            "health_status": "unknown",
+            "last_health_check": None,
+            "performance_summary": {},
+            "alert_count": 0,
+            "config": monitoring_config or self.monitoring_config
+        }
+        
+        self.active_deployments[deployment_id] = deployment_info
+        self.performance_metrics[deployment_id] = []
+        
+        # Schedule the first round of checks
+        config = deployment_info["config"]
+        self._schedule_check(deployment_id, "health", 0)
+        self._schedule_check(deployment_id, "performance", config.get("performance_check_interval", 300))
+        self._schedule_check(deployment_id, "cost", 0)
+        self._ensure_scheduler()
         
-        interval = deployment["config"].get("health_check_interval", 60)
+        logger.info(f"✅ Started comprehensive monitoring for deployment: {deployment_id}")
         
-        while deployment_id in self.active_deployments:
+        # Send initial CloudWatch metric
+        await self._send_cloudwatch_metric(
+            "DeploymentMonitoring",
+            "MonitoringStarted",
+            1,
+            deployment_id
+        )
+        
+        return True
+    
+    @staticmethod
+    def _shareable_config(monitoring_config: Optional[Dict]) -> Optional[Dict]:
+        """The per-deployment settings the scheduler reads; alert thresholds stay service-wide"""
+        if not monitoring_config:
+            return None
+        return {
+            key: monitoring_config[key]
+            for key in ("health_check_interval", "performance_check_interval")
+            if key in monitoring_config
+        } or None
+    
+    async def start_registry_sync(self):
+        """Begin polling the registry for this shard's deployments (no-op with a single shard)"""
+        self._ensure_registry_sync()
+        await self.sync_registry()
+    
+    def _ensure_registry_sync(self):
+        if self.registry is not None and (self._registry_task is None or self._registry_task.done()):
+            self._registry_task = asyncio.create_task(self._registry_poll_loop())
+    
+    async def _registry_poll_loop(self):
+        while True:
+            await asyncio.sleep(self.REGISTRY_POLL_SECONDS)
             try:
-                health_result = await self._perform_health_check(deployment_id)
-                
-                # Update deployment status
-                deployment["health_status"] = health_result["status"]
-                deployment["last_health_check"] = datetime.utcnow()
-                
-                # Send CloudWatch metrics
-                await self._send_cloudwatch_metric(
-                    "DeploymentHealth",
-                    "HealthStatus",
-                    1 if health_result["status"] == "healthy" else 0,
-                    deployment_id
+                await self.sync_registry()
+            except Exception as e:
+                logger.warning(f"⚠️ Monitoring registry poll failed: {e}")
+    
+    async def sync_registry(self):
+        """Adopt registered deployments of this shard and drop ones unregistered elsewhere"""
+        if self.registry is None:
+            return
+        registered = await asyncio.to_thread(self.registry.list_shard, self.shard_index)
+        for deployment_id, record in registered.items():
+            if deployment_id not in self.active_deployments:
+                await self._start_local_monitoring(
+                    deployment_id, record.get("deployment_url", ""), record.get("monitoring_config")
                 )
+        for deployment_id in [d for d in self.active_deployments if d not in registered]:
+            await self._stop_local_monitoring(deployment_id)
+    
+    def shard_for(self, deployment_id: str) -> int:
+        """Stable shard assignment (independent of PYTHONHASHSEED)"""
+        return zlib.crc32(deployment_id.encode("utf-8")) % self.shard_count
+    
+    def owns_deployment(self, deployment_id: str) -> bool:
+        return self.shard_for(deployment_id) == self.shard_index
+    
+    def _check_interval(self, deployment_id: str, check_name: str) -> float:
+        deployment = self.active_deployments.get(deployment_id)
+        config = deployment["config"] if deployment else self.monitoring_config
+        if check_name == "health":
+            return config.get("health_check_interval", 60)
+        if check_name == "performance":
+            return config.get("performance_check_interval", 300)
+        return self.COST_CHECK_INTERVAL
+    
+    def _schedule_check(self, deployment_id: str, check_name: str, delay: float):
+        """Queue a check, rounding its due time up to the next scheduler tick"""
+        due_at = math.ceil((time.monotonic() + delay) / self.TICK_SECONDS) * self.TICK_SECONDS
+        self._schedule_sequence += 1
+        heapq.heappush(self._schedule, (due_at, self._schedule_sequence, deployment_id, check_name))
+        if self._schedule_changed is not None and self._schedule[0][1] == self._schedule_sequence:
+            self._schedule_changed.set()  # New earliest entry; wake the scheduler
+    
+    def _ensure_scheduler(self):
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._schedule_changed = asyncio.Event()
+            self._check_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+            self._scheduler_task = asyncio.create_task(self._scheduler_loop())
+    
+    async def _scheduler_loop(self):
+        """Start every due check in one batch per tick"""
+        try:
+            while self.active_deployments or self._running_checks:
+                now = time.monotonic()
+                batch = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, _, deployment_id, check_name = heapq.heappop(self._schedule)
+                    if deployment_id in self.active_deployments:
+                        batch.append((deployment_id, check_name))
                 
-                if health_result["response_time"]:
-                    await self._send_cloudwatch_metric(
-                        "DeploymentPerformance",
-                        "ResponseTime",
-                        health_result["response_time"],
-                        deployment_id,
-                        unit="Milliseconds"
-                    )
-                
-                # Check for alerts
-                await self._evaluate_health_alerts(deployment_id, health_result)
+                if batch:
+                    self.scheduler_stats["batches"] += 1
+                    self.scheduler_stats["largest_batch"] = max(self.scheduler_stats["largest_batch"], len(batch))
+                    for deployment_id, check_name in batch:
+                        task = asyncio.create_task(self._run_scheduled_check(deployment_id, check_name))
+                        self._running_checks.add(task)
+                        task.add_done_callback(self._running_checks.discard)
                 
-            except Exception as e:
-                logger.error(f"Health check failed for {deployment_id}: {e}")
-                await self._create_alert(
-                    deployment_id,
-                    AlertSeverity.WARNING,
-                    "Health Check Failed",
-                    f"Health check error: {str(e)}"
-                )
-            
-            await asyncio.sleep(interval)
+                # Sleep until the next due entry or a new earlier entry
+                timeout = max(0.0, self._schedule[0][0] - time.monotonic()) if self._schedule else self.TICK_SECONDS
+                self._schedule_changed.clear()
+                try:
+                    await asyncio.wait_for(self._schedule_changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._flush_cloudwatch_metrics()
     
-    async def _performance_monitoring_loop(self, deployment_id: str):
-        """Continuous performance monitoring loop"""
+    async def _run_scheduled_check(self, deployment_id: str, check_name: str):
+        async with self._check_semaphore:
+            if deployment_id not in self.active_deployments:
+                return
+            self.scheduler_stats["checks_run"] += 1
+            if check_name == "health":
+                await self._run_health_check(deployment_id)
+            elif check_name == "performance":
+                await self._run_performance_check(deployment_id)
+            else:
+                await self._run_cost_check(deployment_id)
+        
+        # Reschedule after completion so a slow check never overlaps itself
+        if deployment_id in self.active_deployments:
+            self._schedule_check(deployment_id, check_name, self._check_interval(deployment_id, check_name))
+    
+    async def _run_health_check(self, deployment_id: str):
+        """Single health check for a deployment"""
         deployment = self.active_deployments.get(deployment_id)
         if not deployment:
             return
         
-        interval = deployment["config"].get("performance_check_interval", 300)
-        
-        while deployment_id in self.active_deployments:
-            try:
-                performance_data = await self._collect_performance_metrics(deployment_id)
-                
-                # Store metrics
-                for metric in performance_data:
-                    self.performance_metrics[deployment_id].append(metric)
-                    
-                    # Send to CloudWatch
-                    await self._send_cloudwatch_metric(
-                        "DeploymentPerformance",
-                        metric.metric_type.value,
-                        metric.value,
-                        deployment_id,
-                        unit=metric.unit
-                    )
-                
-                # Update performance summary
-                await self._update_performance_summary(deployment_id)
-                
-                # Check for performance alerts
-                await self._evaluate_performance_alerts(deployment_id, performance_data)
+        try:
+            health_result = await self._perform_health_check(deployment_id)
+            
+            # Update deployment status
+            deployment["health_status"] = health_result["status"]
+            deployment["last_health_check"] = datetime.utcnow()
+            
+            # Send CloudWatch metrics
+            await self._send_cloudwatch_metric(
+                "DeploymentHealth",
+                "HealthStatus",
+                1 if health_result["status"] == "healthy" else 0,
+                deployment_id
+            )
+            
+            if health_result["response_time"]:
+                await self._send_cloudwatch_metric(
+                    "DeploymentPerformance",
+                    "ResponseTime",
+                    health_result["response_time"],
+                    deployment_id,
+                    unit="Milliseconds"
+                )
+            
+            # Check for alerts
+            await self._evaluate_health_alerts(deployment_id, health_result)
+            
+        except Exception as e:
+            logger.error(f"Health check failed for {deployment_id}: {e}")
+            await self._create_alert(
+                deployment_id,
+                AlertSeverity.WARNING,
+                "Health Check Failed",
+                f"Health check error: {str(e)}"
+            )
+    
+    async def _run_performance_check(self, deployment_id: str):
+        """Single performance collection for a deployment"""
+        try:
+            performance_data = await self._collect_performance_metrics(deployment_id)
+            
+            # Store metrics
+            for metric in performance_data:
+                self.performance_metrics[deployment_id].append(metric)
                 
-            except Exception as e:
-                logger.error(f"Performance monitoring failed for {deployment_id}: {e}")
+                # Send to CloudWatch
+                await self._send_cloudwatch_metric(
+                    "DeploymentPerformance",
+                    metric.metric_type.value,
+                    metric.value,
+                    deployment_id,
+                    unit=metric.unit
+                )
             
-            await asyncio.sleep(interval)
+            # Update performance summary
+            await self._update_performance_summary(deployment_id)
+            
+            # Check for performance alerts
+            await self._evaluate_performance_alerts(deployment_id, performance_data)
+            
+        except Exception as e:
+            logger.error(f"Performance monitoring failed for {deployment_id}: {e}")
     
-    async def _cost_monitoring_loop(self, deployment_id: str):
+    async def _run_cost_check(self, deployment_id: str):
         """Monitor deployment costs and usage"""
-        while deployment_id in self.active_deployments:
-            try:
-                cost_data = await self._collect_cost_metrics(deployment_id)
-                
-                # Send cost metrics to CloudWatch
-                if cost_data:
-                    await self._send_cloudwatch_metric(
-                        "DeploymentCost",
-                        "HourlyCost",
-                        cost_data.get("hourly_cost", 0),
-                        deployment_id,
-                        unit="Count"
-                    )
-                
-            except Exception as e:
-                logger.error(f"Cost monitoring failed for {deployment_id}: {e}")
+        try:
+            cost_data = await self._collect_cost_metrics(deployment_id)
             
-            # Check costs every hour
-            await asyncio.sleep(3600)
+            # Send cost metrics to CloudWatch
+            if cost_data:
+                await self._send_cloudwatch_metric(
+                    "DeploymentCost",
+                    "HourlyCost",
+                    cost_data.get("hourly_cost", 0),
+                    deployment_id,
+                    unit="Count"
+                )
+            
+        except Exception as e:
+            logger.error(f"Cost monitoring failed for {deployment_id}: {e}")
     
     async def _perform_health_check(self, deployment_id: str) -> Dict[str, Any]:
         """Perform comprehensive health check"""
@@ -422,31 +614,26 @@ class ProductionMonitoringService:
         unit: str = "Count",
         dimensions: Optional[Dict[str, str]] = None
     ):
-        """Send metric to CloudWatch"""
+        """Record a metric in the shared aggregator (flushed in the background)"""
+        metric_dimensions = {"DeploymentId": deployment_id}
+        if dimensions:
+            metric_dimensions.update(dimensions)
+        
+        self.metric_aggregator.record(
+            f"CodeFlowOps/{namespace}",
+            metric_name,
+            value,
+            unit=unit,
+            dimensions=metric_dimensions,
+            region=self.aws_region
+        )
+    
+    async def _flush_cloudwatch_metrics(self):
+        """Push aggregated metrics now instead of waiting for the background flush"""
         try:
-            metric_dimensions = [
-                {"Name": "DeploymentId", "Value": deployment_id}
-            ]
-            
-            if dimensions:
-                for key, val in dimensions.items():
-                    metric_dimensions.append({"Name": key, "Value": val})
-            
-            self.cloudwatch.put_metric_data(
-                Namespace=f"CodeFlowOps/{namespace}",
-                MetricData=[
-                    {
-                        "MetricName": metric_name,
-                        "Value": value,
-                        "Unit": unit,
-                        "Dimensions": metric_dimensions,
-                        "Timestamp": datetime.utcnow()
-                    }
-                ]
-            )
-            
+            await asyncio.to_thread(self.metric_aggregator.flush)
         except Exception as e:
-            logger.error(f"Failed to send CloudWatch metric: {e}")
+            logger.error(f"Failed to flush CloudWatch metrics: {e}")
     
     async def _update_performance_summary(self, deployment_id: str):
         """Update performance summary for deployment"""
@@ -506,6 +693,7 @@ class ProductionMonitoringService:
                 for alert in recent_alerts
             ],
             "monitoring_status": "active" if deployment_id in self.active_deployments else "inactive",
+            "monitoring_shard": {"index": self.shard_index, "count": self.shard_count},
             "uptime_percentage": self._calculate_uptime(deployment_id),
             "cost_summary": {
                 "current_hourly": 0.15,
@@ -529,27 +717,35 @@ class ProductionMonitoringService:
             return 0.0
     
     async def stop_monitoring_deployment(self, deployment_id: str) -> bool:
-        """Stop monitoring a deployment"""
+        """Stop monitoring a deployment (on whichever shard owns it)"""
         try:
-            if deployment_id in self.active_deployments:
-                del self.active_deployments[deployment_id]
-                
-                # Send final CloudWatch metric
-                await self._send_cloudwatch_metric(
-                    "DeploymentMonitoring",
-                    "MonitoringStopped",
-                    1,
-                    deployment_id
-                )
-                
-                logger.info(f"✅ Stopped monitoring for deployment: {deployment_id}")
-                return True
+            if self.registry is not None:
+                await asyncio.to_thread(self.registry.remove, deployment_id, self.shard_for(deployment_id))
+                if not self.owns_deployment(deployment_id):
+                    return True  # The owner drops it on its next poll
             
-            return False
+            return await self._stop_local_monitoring(deployment_id)
             
         except Exception as e:
             logger.error(f"Failed to stop monitoring for {deployment_id}: {e}")
             return False
+    
+    async def _stop_local_monitoring(self, deployment_id: str) -> bool:
+        if deployment_id in self.active_deployments:
+            del self.active_deployments[deployment_id]
+            
+            # Send final CloudWatch metric
+            await self._send_cloudwatch_metric(
+                "DeploymentMonitoring",
+                "MonitoringStopped",
+                1,
+                deployment_id
+            )
+            
+            logger.info(f"✅ Stopped monitoring for deployment: {deployment_id}")
+            return True
+        
+        return False
 
 # Singleton instance
 production_monitoring_service = ProductionMonitoringService()
@@ -0,0 +1,229 @@
+"""
+Subscription Cache - per-user subscription snapshots for billing checks
+Read-through LRU with optional Redis, invalidated whenever a subscription is written
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # In-process cache only
+    redis = None
+
+# Snapshot kinds cached per user
+STATUS_SNAPSHOT = "status"              # EnhancedSubscriptionFlow.get_user_subscription_status
+SUBSCRIPTION_SNAPSHOT = "subscription"  # SubscriptionService.get_user_subscription
+
+# SET the snapshot only if the user's shared generation still matches the one read before loading
+_SET_IF_GENERATION = """
+local current = redis.call('GET', KEYS[1]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class SubscriptionCache:
+    """
+    Caches subscription lookups per user
+    
+    Reads go local LRU -> Redis (when configured) -> database loader.
+    Concurrent misses for the same user share one loader call. Every write
+    path (``create_subscription``, ``update_subscription`` and therefore the
+    Stripe webhooks) calls ``invalidate(user_id)``; a per-user generation
+    counter stops a load that started before the invalidation from storing
+    its now-stale result. With Redis the generation lives there too
+    (``INCR`` on invalidate, compared atomically before the ``SET``), so a
+    load on one worker cannot republish a value another worker just
+    invalidated. Other workers drop their local copy after
+    ``local_ttl_seconds``, which bounds cross-worker staleness.
+    """
+    
+    KEY_PREFIX = "subscription:snapshot:"
+    GENERATION_PREFIX = "subscription:generation:"
+    # Outlives any snapshot; an expired counter reads as 0, which only makes in-flight loads skip their write
+    GENERATION_TTL_SECONDS = 86400
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        local_ttl_seconds: float = 30.0,
+        redis_ttl_seconds: int = 300,
+        redis_url: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.local_ttl_seconds = local_ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.redis_url = redis_url if redis_url is not None else os.getenv("SUBSCRIPTION_CACHE_REDIS_URL")
+        
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._redis = None
+        self._redis_checked = False
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "shared_loads": 0, "invalidations": 0}
+    
+    async def get_or_load(
+        self,
+        user_id: str,
+        kind: str,
+        loader: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """Return the cached snapshot or load it once for all concurrent callers"""
+        key = (kind, str(user_id))
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return dict(entry[1]) if isinstance(entry[1], dict) else entry[1]  # Callers may mutate
+            del self._entries[key]
+        
+        in_flight = self._loading.get(key)
+        if in_flight is not None:
+            self.stats["shared_loads"] += 1
+            return await asyncio.shield(in_flight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generations.get(key[1], 0)
+        try:
+            found, value = await self._redis_get(key)
+            if found:
+                self.stats["redis_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                shared_generation = await self._redis_generation(key[1])
+                value = await loader()
+                if cacheable(value) and self._generations.get(key[1], 0) == generation:
+                    await self._redis_set(key, value, shared_generation)
+            
+            if cacheable(value) and self._generations.get(key[1], 0) == generation:
+                self._store_local(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._loading.pop(key, None)
+    
+    async def invalidate(self, user_id: Optional[str]):
+        """Drop every snapshot for a user (call after any subscription write)"""
+        if not user_id:
+            return
+        user_id = str(user_id)
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for kind in (STATUS_SNAPSHOT, SUBSCRIPTION_SNAPSHOT):
+            self._entries.pop((kind, user_id), None)
+        self.stats["invalidations"] += 1
+        
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                # Bump the generation first so a load already running elsewhere cannot write after the delete
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.incr(f"{self.GENERATION_PREFIX}{user_id}")
+                    pipe.expire(f"{self.GENERATION_PREFIX}{user_id}", self.GENERATION_TTL_SECONDS)
+                    pipe.delete(*(f"{self.KEY_PREFIX}{kind}:{user_id}" for kind in (STATUS_SNAPSHOT, SUBSCRIPTION_SNAPSHOT)))
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to invalidate cached subscription for user {user_id}: {e}")
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "redis": self._redis is not None,
+            **self.stats
+        }
+    
+    def _store_local(self, key: Tuple[str, str], value: Any):
+        self._entries[key] = (time.monotonic() + self.local_ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def _get_redis(self):
+        if self._redis_checked:
+            return self._redis
+        self._redis_checked = True
+        if not self.redis_url or redis is None:
+            return None
+        try:
+            client = redis.from_url(self.redis_url)
+            await client.ping()
+            self._redis = client
+            logger.info("✅ Subscription cache connected to Redis")
+        except Exception as e:
+            logger.info(f"Subscription cache running in-process only (Redis unavailable: {e})")
+        return self._redis
+    
+    async def _redis_get(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        client = await self._get_redis()
+        if client is None:
+            return False, None
+        try:
+            raw = await client.get(f"{self.KEY_PREFIX}{key[0]}:{key[1]}")
+            if raw is None:
+                return False, None
+            return True, json.loads(raw)
+        except Exception as e:
+            logger.warning(f"⚠️ Subscription cache read failed: {e}")
+            return False, None
+    
+    async def _redis_generation(self, user_id: str) -> Optional[str]:
+        """The user's shared generation ("0" if never invalidated); None without Redis or on error"""
+        client = await self._get_redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(f"{self.GENERATION_PREFIX}{user_id}")
+            if raw is None:
+                return "0"
+            return raw.decode() if isinstance(raw, bytes) else str(raw)
+        except Exception as e:
+            logger.warning(f"⚠️ Subscription cache read failed: {e}")
+            return None
+    
+    async def _redis_set(self, key: Tuple[str, str], value: Any, generation: Optional[str]):
+        client = await self._get_redis()
+        if client is None or generation is None:
+            return  # Without a generation to compare, a write could outlive an invalidation
+        try:
+            await client.eval(
+                _SET_IF_GENERATION, 2,
+                f"{self.GENERATION_PREFIX}{key[1]}", f"{self.KEY_PREFIX}{key[0]}:{key[1]}",
+                generation, json.dumps(value, default=str), self.redis_ttl_seconds
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Subscription cache write failed: {e}")
+
+
+_subscription_cache: Optional[SubscriptionCache] = None
+
+
+def get_subscription_cache() -> SubscriptionCache:
+    """Per-worker subscription cache shared by the billing services"""
+    global _subscription_cache
+    if _subscription_cache is None:
+        _subscription_cache = SubscriptionCache(
+            max_entries=int(os.getenv("SUBSCRIPTION_CACHE_MAX_ENTRIES", "10000")),
+            local_ttl_seconds=float(os.getenv("SUBSCRIPTION_CACHE_TTL_SECONDS", "30"))
+        )
+    return _subscription_cache
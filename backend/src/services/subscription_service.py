@@ -10,6 +10,7 @@ from sqlalchemy import and_, desc
 
 from ..utils.database import get_db_context
 from ..models.enhanced_models import User, Customer, Subscription, Payment, SubscriptionPlan, SubscriptionStatus
+from .subscription_cache import get_subscription_cache, SUBSCRIPTION_SNAPSHOT
 import logging
 import uuid
 
@@ -163,6 +164,9 @@ class SubscriptionService:
                 db.commit()
                 db.refresh(subscription)
                 
+                user_id = db.query(Customer.user_id).filter(Customer.id == customer_id).scalar()
+                await get_subscription_cache().invalidate(user_id)
+                
                 subscription_dict = {
                     "id": subscription.id,
                     "customer_id": subscription.customer_id,
@@ -225,6 +229,9 @@ class SubscriptionService:
                 db.commit()
                 db.refresh(subscription)
                 
+                user_id = db.query(Customer.user_id).filter(Customer.id == subscription.customer_id).scalar()
+                await get_subscription_cache().invalidate(user_id)
+                
                 logger.info(f"Updated subscription {subscription.id}")
                 return subscription
                 
@@ -234,59 +241,67 @@ class SubscriptionService:
     
     @staticmethod
     async def get_user_subscription(user_id: str) -> Optional[Dict[str, Any]]:
-        """Get the active subscription for a user"""
+        """Get the active subscription for a user (cached until the subscription changes)"""
         try:
-            with get_db_context() as db:
-                # Get customer for user
-                customer = db.query(Customer).filter(
-                    Customer.user_id == user_id
-                ).first()
-                
-                if not customer:
-                    logger.info(f"No customer found for user {user_id}")
-                    return None
-                
-                # Get active subscription
-                subscription = db.query(Subscription).filter(
-                    and_(
-                        Subscription.customer_id == customer.id,
-                        Subscription.status.in_([
-                            SubscriptionStatus.ACTIVE,
-                            SubscriptionStatus.TRIALING,
-                            SubscriptionStatus.PAST_DUE
-                        ])
-                    )
-                ).order_by(desc(Subscription.created_at)).first()
-                
-                if not subscription:
-                    logger.info(f"No active subscription found for user {user_id}")
-                    return None
-                
-                # Return subscription data
-                return {
-                    "id": subscription.id,
-                    "stripe_subscription_id": subscription.stripe_subscription_id,
-                    "plan": subscription.plan.value,
-                    "status": subscription.status.value,
-                    "amount": subscription.amount,
-                    "currency": subscription.currency,
-                    "interval": subscription.interval,
-                    "current_period_start": subscription.current_period_start.isoformat() if subscription.current_period_start else None,
-                    "current_period_end": subscription.current_period_end.isoformat() if subscription.current_period_end else None,
-                    "trial_start": subscription.trial_start.isoformat() if subscription.trial_start else None,
-                    "trial_end": subscription.trial_end.isoformat() if subscription.trial_end else None,
-                    "cancel_at_period_end": subscription.cancel_at_period_end,
-                    "canceled_at": subscription.canceled_at.isoformat() if subscription.canceled_at else None,
-                    "is_active": subscription.is_active,
-                    "is_trial": subscription.is_trial,
-                    "days_until_end": subscription.days_until_end,
-                    "created_at": subscription.created_at.isoformat() if subscription.created_at else None
-                }
-                
+            return await get_subscription_cache().get_or_load(
+                user_id,
+                SUBSCRIPTION_SNAPSHOT,
+                lambda: SubscriptionService._load_user_subscription(user_id)
+            )
         except Exception as e:
             logger.error(f"Error getting subscription for user {user_id}: {str(e)}")
             return None
     
+    @staticmethod
+    async def _load_user_subscription(user_id: str) -> Optional[Dict[str, Any]]:
+        """Query the active subscription (uncached; raises on database errors)"""
+        with get_db_context() as db:
+            # Get customer for user
+            customer = db.query(Customer).filter(
+                Customer.user_id == user_id
+            ).first()
+            
+            if not customer:
+                logger.info(f"No customer found for user {user_id}")
+                return None
+            
+            # Get active subscription
+            subscription = db.query(Subscription).filter(
+                and_(
+                    Subscription.customer_id == customer.id,
+                    Subscription.status.in_([
+                        SubscriptionStatus.ACTIVE,
+                        SubscriptionStatus.TRIALING,
+                        SubscriptionStatus.PAST_DUE
+                    ])
+                )
+            ).order_by(desc(Subscription.created_at)).first()
+            
+            if not subscription:
+                logger.info(f"No active subscription found for user {user_id}")
+                return None
+            
+            # Return subscription data
+            return {
+                "id": subscription.id,
+                "stripe_subscription_id": subscription.stripe_subscription_id,
+                "plan": subscription.plan.value,
+                "status": subscription.status.value,
+                "amount": subscription.amount,
+                "currency": subscription.currency,
+                "interval": subscription.interval,
+                "current_period_start": subscription.current_period_start.isoformat() if subscription.current_period_start else None,
+                "current_period_end": subscription.current_period_end.isoformat() if subscription.current_period_end else None,
+                "trial_start": subscription.trial_start.isoformat() if subscription.trial_start else None,
+                "trial_end": subscription.trial_end.isoformat() if subscription.trial_end else None,
+                "cancel_at_period_end": subscription.cancel_at_period_end,
+                "canceled_at": subscription.canceled_at.isoformat() if subscription.canceled_at else None,
+                "is_active": subscription.is_active,
+                "is_trial": subscription.is_trial,
+                "days_until_end": subscription.days_until_end,
+                "created_at": subscription.created_at.isoformat() if subscription.created_at else None
+            }
+    
     @staticmethod
     async def get_subscription_by_stripe_id(stripe_subscription_id: str) -> Optional[Subscription]:
         """Get subscription by Stripe subscription ID"""
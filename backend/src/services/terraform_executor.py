@@ -7,6 +7,7 @@ import tempfile
 import shutil
 import os
 import json
+import time
 import uuid
 from pathlib import Path
 from typing import Dict, List, Optional, Any, AsyncGenerator
@@ -14,6 +15,9 @@ from datetime import datetime
 import re
 
 from ..utils.memory_storage import create_memory_redis_client
+from ..utils.terraform_workspace_cache import TerraformWorkspaceCache, get_terraform_workspace_cache
+from ..utils.terraform_state_backend import TerraformStateBackend, get_terraform_state_backend
+from .deployment_update_bus import get_deployment_update_bus
 
 class TerraformExecutionError(Exception):
     """Custom exception for Terraform execution errors"""
@@ -24,14 +28,26 @@ class TerraformExecutor:
     Service for executing Terraform commands with real-time status updates
     """
     
-    def __init__(self, redis_client=None):
+    # How long plan/apply wait for another run holding the same state lock
+    STATE_LOCK_TIMEOUT = "120s"
+    
+    def __init__(
+        self,
+        redis_client=None,
+        workspace_cache: Optional[TerraformWorkspaceCache] = None,
+        state_backend: Optional[TerraformStateBackend] = None
+    ):
         self.redis_client = redis_client
         self.active_executions: Dict[str, Dict] = {}
+        # Shared provider plugin cache and pre-initialized template workspaces
+        self.workspace_cache = workspace_cache or get_terraform_workspace_cache()
+        # State outlives the temporary deployment directory so redeploys are incremental
+        self.state_backend = state_backend or get_terraform_state_backend()
         
     async def get_redis_client(self):
         """Get Redis client for status updates"""
         if self.redis_client is None:
-            self.redis_client = await create_memory_redis_client()
+            self.redis_client = create_memory_redis_client()
         return self.redis_client
     
     async def execute_deployment(
@@ -53,35 +69,51 @@ class TerraformExecutor:
                 "current_step": "setup",
                 "started_at": datetime.utcnow().isoformat(),
                 "logs": [],
-                "outputs": {}
+                "outputs": {},
+                "timings": {}
             }
             
             self.active_executions[deployment_id] = execution_data
             await self._update_status(deployment_id, "initializing", "🚀 Starting Terraform deployment...", 5)
             
             # Extract custom environment if provided
-            custom_env = deployment_config.get("environment", {})
+            custom_env, project, environment, owner = self._resolve_state_scope(
+                deployment_id, template_variables, deployment_config
+            )
+            dry_run = deployment_config.get("dry_run", False)
             
             # Create temporary directory for Terraform files
             with tempfile.TemporaryDirectory(prefix=f"terraform-{deployment_id}-") as temp_dir:
                 terraform_dir = Path(temp_dir)
                 
-                # Write Terraform files
-                await self._write_terraform_files(terraform_dir, template_files, template_variables)
-                await self._update_status(deployment_id, "preparing", "📝 Terraform files prepared", 15)
+                state_info = await self._prepare_workspace(
+                    deployment_id, terraform_dir, template_files, template_variables,
+                    custom_env, project, environment, owner
+                )
+                execution_data["state"] = state_info
                 
-                # Initialize Terraform
-                await self._run_terraform_init(deployment_id, terraform_dir, custom_env)
-                await self._update_status(deployment_id, "planning", "📋 Generating Terraform plan...", 35)
+                # Refresh existing state on its own so refresh and apply time are reported separately
+                refresh_separately = state_info["has_state"] and not dry_run
+                if refresh_separately:
+                    await self._update_status(deployment_id, "refreshing", "🔄 Refreshing existing infrastructure state...", 38)
+                    refresh_started = time.monotonic()
+                    await self._run_terraform_refresh(deployment_id, terraform_dir, custom_env)
+                    execution_data["timings"]["refresh_seconds"] = round(time.monotonic() - refresh_started, 2)
                 
-                # Create Terraform plan
-                plan_result = await self._run_terraform_plan(deployment_id, terraform_dir, custom_env)
+                # Create Terraform plan (incremental against existing state)
+                plan_started = time.monotonic()
+                plan_result = await self._run_terraform_plan(
+                    deployment_id, terraform_dir, custom_env, refresh=not refresh_separately
+                )
+                execution_data["timings"]["plan_seconds"] = round(time.monotonic() - plan_started, 2)
                 await self._update_status(deployment_id, "planned", "✅ Terraform plan complete", 50)
                 
                 # Apply Terraform (if not dry-run)
-                if not deployment_config.get("dry_run", False):
+                if not dry_run:
                     await self._update_status(deployment_id, "applying", "🏗️ Applying infrastructure changes...", 60)
+                    apply_started = time.monotonic()
                     apply_result = await self._run_terraform_apply(deployment_id, terraform_dir, custom_env)
+                    execution_data["timings"]["apply_seconds"] = round(time.monotonic() - apply_started, 2)
                     
                     # Get outputs
                     await self._update_status(deployment_id, "outputs", "📊 Retrieving deployment outputs...", 90)
@@ -96,6 +128,9 @@ class TerraformExecutor:
                         "outputs": outputs,
                         "plan_summary": plan_result.get("summary", {}),
                         "execution_time": self._calculate_execution_time(execution_data),
+                        "timings": execution_data["timings"],
+                        "state": state_info,
+                        "incremental": state_info["has_state"],
                         "message": "Infrastructure deployed successfully"
                     }
                 else:
@@ -105,6 +140,9 @@ class TerraformExecutor:
                         "status": "plan_complete", 
                         "deployment_id": deployment_id,
                         "plan_summary": plan_result.get("summary", {}),
+                        "timings": execution_data["timings"],
+                        "state": state_info,
+                        "incremental": state_info["has_state"],
                         "message": "Terraform plan completed successfully (dry-run)"
                     }
                     
@@ -118,6 +156,144 @@ class TerraformExecutor:
                 execution_data = self.active_executions[deployment_id]
                 execution_data["completed_at"] = datetime.utcnow().isoformat()
     
+    async def destroy_deployment(
+        self,
+        deployment_id: str,
+        template_files: Dict[str, str],
+        template_variables: Dict[str, Any],
+        deployment_config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Destroy the infrastructure recorded in the state for this project/environment
+        """
+        try:
+            execution_data = {
+                "deployment_id": deployment_id,
+                "status": "initializing",
+                "progress": 0,
+                "current_step": "setup",
+                "started_at": datetime.utcnow().isoformat(),
+                "logs": [],
+                "outputs": {},
+                "timings": {}
+            }
+            self.active_executions[deployment_id] = execution_data
+            await self._update_status(deployment_id, "initializing", "🧹 Preparing Terraform destroy...", 5)
+            
+            custom_env, project, environment, owner = self._resolve_state_scope(
+                deployment_id, template_variables, deployment_config
+            )
+            
+            with tempfile.TemporaryDirectory(prefix=f"terraform-{deployment_id}-") as temp_dir:
+                terraform_dir = Path(temp_dir)
+                
+                state_info = await self._prepare_workspace(
+                    deployment_id, terraform_dir, template_files, template_variables,
+                    custom_env, project, environment, owner
+                )
+                if not state_info["has_state"]:
+                    await self._update_status(deployment_id, "destroyed", "ℹ️ No Terraform state found - nothing to destroy", 100)
+                    return {
+                        "status": "destroyed",
+                        "deployment_id": deployment_id,
+                        "state": state_info,
+                        "message": "No existing state for this project and environment"
+                    }
+                
+                await self._update_status(deployment_id, "destroying", "💥 Destroying infrastructure...", 50)
+                destroy_started = time.monotonic()
+                cmd = ["terraform", "destroy", "-no-color", "-input=false", "-auto-approve", f"-lock-timeout={self.STATE_LOCK_TIMEOUT}"]
+                result = await self._run_terraform_command(cmd, terraform_dir, deployment_id, "destroy", custom_env)
+                if result["returncode"] != 0:
+                    raise TerraformExecutionError(f"Terraform destroy failed: {result['stderr']}")
+                execution_data["timings"]["destroy_seconds"] = round(time.monotonic() - destroy_started, 2)
+                
+                await self._update_status(deployment_id, "destroyed", "✅ Infrastructure destroyed", 100)
+                return {
+                    "status": "destroyed",
+                    "deployment_id": deployment_id,
+                    "state": state_info,
+                    "timings": execution_data["timings"],
+                    "message": "Infrastructure destroyed successfully"
+                }
+        
+        except Exception as e:
+            await self._update_status(deployment_id, "failed", f"❌ Destroy failed: {str(e)}", 0)
+            raise TerraformExecutionError(f"Terraform destroy failed: {str(e)}")
+        
+        finally:
+            if deployment_id in self.active_executions:
+                self.active_executions[deployment_id]["completed_at"] = datetime.utcnow().isoformat()
+    
+    def _resolve_state_scope(
+        self,
+        deployment_id: str,
+        template_variables: Dict[str, Any],
+        deployment_config: Dict[str, Any]
+    ) -> tuple:
+        """
+        Split deployment_config into (custom_env, project, environment, owner)
+        
+        deployment_config["environment"] carries extra process environment
+        variables for Terraform; callers that pass a stage name there instead
+        (e.g. "prod") get it used as the state environment.
+        """
+        custom_env = deployment_config.get("environment", {})
+        environment = deployment_config.get("environment_name") or template_variables.get("environment") or "prod"
+        if not isinstance(custom_env, dict):
+            environment = str(custom_env) if custom_env else environment
+            custom_env = {}
+        
+        project = deployment_config.get("project_name") or template_variables.get("project_name") or deployment_id
+        owner = deployment_config.get("user_id")
+        return custom_env, project, environment, owner
+    
+    async def _prepare_workspace(
+        self,
+        deployment_id: str,
+        terraform_dir: Path,
+        template_files: Dict[str, str],
+        template_variables: Dict[str, Any],
+        custom_env: Dict[str, str],
+        project: str,
+        environment: str,
+        owner: Optional[str]
+    ) -> Dict[str, Any]:
+        """Write templates, attach persistent state and run terraform init"""
+        execution_data = self.active_executions[deployment_id]
+        
+        # Write Terraform files
+        await self._write_terraform_files(terraform_dir, template_files, template_variables)
+        
+        # Seed .terraform from the warm workspace for this template so
+        # init links cached providers instead of downloading them
+        init_env = dict(custom_env)
+        if await self.workspace_cache.prepare_deployment_dir(terraform_dir, template_files, custom_env):
+            init_env.update(self.workspace_cache.environment())
+            execution_data["timings"]["init_cache"] = "warm"
+        else:
+            execution_data["timings"]["init_cache"] = "cold"
+        
+        # Point the backend at the state for this project/environment
+        state_info = await self.state_backend.configure(terraform_dir, project, environment, owner)
+        await self._update_status(
+            deployment_id, "preparing",
+            f"📝 Terraform files prepared ({'existing' if state_info['has_state'] else 'new'} "
+            f"{state_info['backend']} state for {project}/{environment})", 15
+        )
+        
+        # Initialize Terraform
+        init_started = time.monotonic()
+        await self._run_terraform_init(deployment_id, terraform_dir, init_env)
+        execution_data["timings"]["init_seconds"] = round(time.monotonic() - init_started, 2)
+        await self._update_status(
+            deployment_id, "planning",
+            f"📋 Terraform initialized in {execution_data['timings']['init_seconds']}s "
+            f"({execution_data['timings']['init_cache']} cache)", 35
+        )
+        
+        return state_info
+    
     async def _write_terraform_files(
         self, 
         terraform_dir: Path, 
@@ -149,7 +325,7 @@ class TerraformExecutor:
     
     async def _run_terraform_init(self, deployment_id: str, terraform_dir: Path, custom_env: Dict[str, str] = None):
         """Run terraform init"""
-        cmd = ["terraform", "init", "-no-color"]
+        cmd = ["terraform", "init", "-input=false", "-no-color"]
         
         await self._update_status(deployment_id, "initializing", "🔧 Initializing Terraform...", 20)
         
@@ -160,9 +336,32 @@ class TerraformExecutor:
         if result["returncode"] != 0:
             raise TerraformExecutionError(f"Terraform init failed: {result['stderr']}")
     
-    async def _run_terraform_plan(self, deployment_id: str, terraform_dir: Path, custom_env: Dict[str, str] = None) -> Dict[str, Any]:
+    async def _run_terraform_refresh(self, deployment_id: str, terraform_dir: Path, custom_env: Dict[str, str] = None):
+        """Sync existing state with real infrastructure (refresh-only apply)"""
+        cmd = [
+            "terraform", "apply", "-refresh-only", "-auto-approve",
+            "-no-color", "-input=false", f"-lock-timeout={self.STATE_LOCK_TIMEOUT}"
+        ]
+        
+        result = await self._run_terraform_command(
+            cmd, terraform_dir, deployment_id, "refresh", custom_env
+        )
+        
+        if result["returncode"] != 0:
+            raise TerraformExecutionError(f"Terraform refresh failed: {result['stderr']}")
+    
+    async def _run_terraform_plan(
+        self,
+        deployment_id: str,
+        terraform_dir: Path,
+        custom_env: Dict[str, str] = None,
+        refresh: bool = True
+    ) -> Dict[str, Any]:
         """Run terraform plan and parse output"""
-        cmd = ["terraform", "plan", "-no-color", "-out=tfplan"]
+        cmd = ["terraform", "plan", "-no-color", "-input=false", f"-lock-timeout={self.STATE_LOCK_TIMEOUT}", "-out=tfplan"]
+        if not refresh:
+            # State was just refreshed; don't pay for a second refresh
+            cmd.append("-refresh=false")
         
         result = await self._run_terraform_command(
             cmd, terraform_dir, deployment_id, "plan", custom_env
@@ -182,7 +381,7 @@ class TerraformExecutor:
     
     async def _run_terraform_apply(self, deployment_id: str, terraform_dir: Path, custom_env: Dict[str, str] = None) -> Dict[str, Any]:
         """Run terraform apply"""
-        cmd = ["terraform", "apply", "-no-color", "-auto-approve", "tfplan"]
+        cmd = ["terraform", "apply", "-no-color", "-input=false", f"-lock-timeout={self.STATE_LOCK_TIMEOUT}", "-auto-approve", "tfplan"]
         
         result = await self._run_terraform_command(
             cmd, terraform_dir, deployment_id, "apply", custom_env
@@ -303,6 +502,12 @@ Initializing provider plugins...
 - Installed hashicorp/aws v5.17.0
 
 Terraform has been successfully initialized!
+"""
+        elif "-refresh-only" in cmd:
+            output = """
+No changes. Your infrastructure still matches the configuration.
+
+Apply complete! Resources: 0 added, 0 changed, 0 destroyed.
 """
         elif "plan" in cmd:
             output = """
@@ -424,14 +629,14 @@ website_url = "https://d1a2b3c4d5e6f7.cloudfront.net"
                 3600,  # 1 hour TTL
                 json.dumps(status_data)
             )
-            
-            # Also publish to real-time channel
-            await redis_client.publish(
-                f"deployment:updates:{deployment_id}",
-                json.dumps(status_data)
-            )
         except Exception as e:
             print(f"⚠️ Failed to update Redis status: {e}")
+        
+        # Publish to the real-time channel (deployment:updates:{id}) for WebSocket subscribers
+        try:
+            await get_deployment_update_bus().publish(deployment_id, status_data)
+        except Exception as e:
+            print(f"⚠️ Failed to publish deployment update: {e}")
     
     async def _log_terraform_output(
         self, 
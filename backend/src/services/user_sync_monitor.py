@@ -4,20 +4,40 @@ Detects and reports Cognito-Database synchronization issues
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import uuid
+
+from sqlalchemy import and_, or_, func, case, select, text
+from sqlalchemy.exc import IntegrityError
 
 from ..utils.database import get_db_context
-from ..models.enhanced_models import User, Customer, Subscription
+from ..models.enhanced_models import User, Customer, Subscription, SubscriptionStatus
 from ..auth.providers.cognito import CognitoAuthProvider
 
 logger = logging.getLogger(__name__)
 
 class UserSyncMonitor:
-    """Monitor and detect user synchronization issues"""
+    """
+    Monitor and detect user synchronization issues
+    
+    Missing customer records are found incrementally: each run scans only
+    users created after the last (created_at, id) it checked, in keyset
+    pages, and re-checks the users already known to be missing with one
+    set-based query. Statistics come from a single aggregate query.
+    """
+    
+    # Users per keyset page / bulk insert
+    PAGE_SIZE = 1000
     
     def __init__(self):
+        # Keyset watermark: (created_at, id) of the last user checked
+        self._watermark: Optional[Tuple[datetime, str]] = None
+        # Users known to be missing customer records, by user id
+        self._missing_customers: Dict[str, Dict[str, Any]] = {}
+        self._scan_lock = asyncio.Lock()
+        
         self.cognito_provider = None
         try:
             self.cognito_provider = CognitoAuthProvider()
@@ -43,7 +63,7 @@ class UserSyncMonitor:
             # 1. Database connectivity check
             try:
                 with get_db_context() as db:
-                    db.execute("SELECT 1").fetchone()
+                    db.execute(text("SELECT 1")).fetchone()
                 health_report["statistics"]["database_connected"] = True
             except Exception as e:
                 health_report["overall_status"] = "unhealthy"
@@ -63,6 +83,9 @@ class UserSyncMonitor:
             
             # 4. Check for missing customer records
             missing_customers = await self._check_missing_customer_records()
+            health_report["statistics"]["customer_scan_watermark"] = (
+                self._watermark[0].isoformat() if self._watermark else None
+            )
             if missing_customers:
                 health_report["issues"].append({
                     "type": "missing_customer_records",
@@ -98,7 +121,7 @@ class UserSyncMonitor:
                 health_report["overall_status"] = "degraded"
             
             return health_report
-            
+        
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}")
             return {
@@ -108,65 +131,130 @@ class UserSyncMonitor:
             }
     
     async def _get_user_statistics(self) -> Dict[str, Any]:
-        """Get user-related statistics"""
+        """Get user-related statistics (one aggregate query)"""
         try:
+            week_ago = datetime.utcnow() - timedelta(days=7)
+            user_counts = select(
+                func.count(User.id).label("total_users"),
+                func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0).label("active_users"),
+                func.coalesce(func.sum(case((User.created_at >= week_ago, 1), else_=0)), 0).label("recent_users"),
+                select(func.count(Customer.id)).scalar_subquery().label("total_customers"),
+                select(func.count(Subscription.id)).scalar_subquery().label("total_subscriptions"),
+                select(func.count(Subscription.id)).where(
+                    Subscription.status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING])
+                ).scalar_subquery().label("active_subscriptions")
+            )
+            
             with get_db_context() as db:
-                # Basic user counts
-                total_users = db.query(User).count()
-                active_users = db.query(User).filter(User.is_active == True).count()
-                
-                # Customer counts
-                total_customers = db.query(Customer).count()
-                
-                # Subscription counts
-                total_subscriptions = db.query(Subscription).count()
-                active_subscriptions = db.query(Subscription).filter(
-                    Subscription.status.in_(["ACTIVE", "TRIALING"])
-                ).count()
-                
-                # Recent activity (last 7 days)
-                week_ago = datetime.utcnow() - timedelta(days=7)
-                recent_users = db.query(User).filter(
-                    User.created_at >= week_ago
-                ).count()
-                
-                return {
-                    "total_users": total_users,
-                    "active_users": active_users,
-                    "total_customers": total_customers,
-                    "total_subscriptions": total_subscriptions,
-                    "active_subscriptions": active_subscriptions,
-                    "recent_users": recent_users,
-                    "user_to_customer_ratio": round(total_customers / total_users * 100, 2) if total_users > 0 else 0,
-                    "customer_to_subscription_ratio": round(total_subscriptions / total_customers * 100, 2) if total_customers > 0 else 0
-                }
-                
+                row = db.execute(user_counts).mappings().one()
+            
+            total_users = int(row["total_users"])
+            total_customers = int(row["total_customers"])
+            total_subscriptions = int(row["total_subscriptions"])
+            
+            return {
+                "total_users": total_users,
+                "active_users": int(row["active_users"]),
+                "total_customers": total_customers,
+                "total_subscriptions": total_subscriptions,
+                "active_subscriptions": int(row["active_subscriptions"]),
+                "recent_users": int(row["recent_users"]),
+                "user_to_customer_ratio": round(total_customers / total_users * 100, 2) if total_users > 0 else 0,
+                "customer_to_subscription_ratio": round(total_subscriptions / total_customers * 100, 2) if total_customers > 0 else 0
+            }
+        
         except Exception as e:
             logger.error(f"Error getting user statistics: {str(e)}")
             return {"error": str(e)}
     
-    async def _check_missing_customer_records(self) -> List[Dict[str, str]]:
-        """Find users without customer records"""
+    async def _check_missing_customer_records(self, full_scan: bool = False) -> List[Dict[str, str]]:
+        """
+        Find users without customer records
+        
+        Scans users past the watermark in keyset pages (only id/email/name/
+        created_at are selected) and drops previously reported users that
+        have since gained a customer record. ``full_scan`` resets the
+        watermark, e.g. after customers were deleted by hand.
+        """
         try:
-            with get_db_context() as db:
-                # Find users who don't have customer records
-                users_without_customers = db.query(User).outerjoin(Customer).filter(
-                    Customer.id.is_(None)
-                ).all()
+            async with self._scan_lock:
+                if full_scan:
+                    self._watermark = None
+                    self._missing_customers.clear()
                 
-                return [
-                    {
-                        "user_id": user.user_id,
-                        "email": user.email,
-                        "created_at": user.created_at.isoformat() if user.created_at else None
-                    }
-                    for user in users_without_customers
-                ]
+                await asyncio.to_thread(self._scan_new_users)
+                await asyncio.to_thread(self._prune_resolved_missing)
                 
+                return sorted(
+                    self._missing_customers.values(),
+                    key=lambda user: user["created_at"] or ""
+                )
+        
         except Exception as e:
             logger.error(f"Error checking missing customer records: {str(e)}")
             return []
     
+    def _scan_new_users(self):
+        """Advance the watermark over users created since the last scan"""
+        columns = (User.id, User.email, User.full_name, User.created_at)
+        missing_customer = ~select(Customer.id).where(Customer.user_id == User.id).exists()
+        
+        with get_db_context() as db:
+            if self._watermark is None:
+                # Users without created_at can't be keyset-paged; pick them up on full scans
+                for row in db.execute(
+                    select(*columns).where(User.created_at.is_(None), missing_customer)
+                ):
+                    self._remember_missing(row)
+            
+            while True:
+                query = select(*columns).where(User.created_at.is_not(None))
+                if self._watermark is not None:
+                    last_created_at, last_id = self._watermark
+                    query = query.where(or_(
+                        User.created_at > last_created_at,
+                        and_(User.created_at == last_created_at, User.id > last_id)
+                    ))
+                page = db.execute(
+                    query.order_by(User.created_at, User.id).limit(self.PAGE_SIZE)
+                ).all()
+                if not page:
+                    return
+                
+                # Anti-join only this page's ids, so the page scan stays index-driven
+                page_ids = [row.id for row in page]
+                with_customer = set(db.execute(
+                    select(Customer.user_id).where(Customer.user_id.in_(page_ids))
+                ).scalars())
+                for row in page:
+                    if row.id not in with_customer:
+                        self._remember_missing(row)
+                
+                self._watermark = (page[-1].created_at, page[-1].id)
+                if len(page) < self.PAGE_SIZE:
+                    return
+    
+    def _prune_resolved_missing(self):
+        """Forget reported users that now have a customer record"""
+        if not self._missing_customers:
+            return
+        missing_ids = list(self._missing_customers)
+        with get_db_context() as db:
+            for start in range(0, len(missing_ids), self.PAGE_SIZE):
+                chunk = missing_ids[start:start + self.PAGE_SIZE]
+                for user_id in db.execute(
+                    select(Customer.user_id).where(Customer.user_id.in_(chunk))
+                ).scalars():
+                    self._missing_customers.pop(user_id, None)
+    
+    def _remember_missing(self, row):
+        self._missing_customers[row.id] = {
+            "user_id": row.id,
+            "email": row.email,
+            "name": row.full_name,
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        }
+    
     async def _check_subscription_consistency(self) -> List[Dict[str, Any]]:
         """Check for subscription-related inconsistencies"""
         issues = []
@@ -174,9 +262,11 @@ class UserSyncMonitor:
         try:
             with get_db_context() as db:
                 # Check for subscriptions without valid customers
-                invalid_subscriptions = db.query(Subscription).outerjoin(Customer).filter(
-                    Customer.id.is_(None)
-                ).count()
+                invalid_subscriptions = db.execute(
+                    select(func.count(Subscription.id)).where(
+                        ~select(Customer.id).where(Customer.id == Subscription.customer_id).exists()
+                    )
+                ).scalar_one()
                 
                 if invalid_subscriptions > 0:
                     issues.append({
@@ -187,10 +277,12 @@ class UserSyncMonitor:
                     })
                 
                 # Check for expired trials that haven't been cleaned up
-                expired_trials = db.query(Subscription).filter(
-                    Subscription.status == "TRIALING",
-                    Subscription.trial_end < datetime.utcnow()
-                ).count()
+                expired_trials = db.execute(
+                    select(func.count(Subscription.id)).where(
+                        Subscription.status == SubscriptionStatus.TRIALING,
+                        Subscription.trial_end < datetime.utcnow()
+                    )
+                ).scalar_one()
                 
                 if expired_trials > 0:
                     issues.append({
@@ -199,7 +291,7 @@ class UserSyncMonitor:
                         "count": expired_trials,
                         "message": f"{expired_trials} expired trial subscriptions need cleanup"
                     })
-                
+        
         except Exception as e:
             logger.error(f"Error checking subscription consistency: {str(e)}")
             issues.append({
@@ -222,7 +314,7 @@ class UserSyncMonitor:
         
         Args:
             issue_types: List of issue types to fix (if None, fix all)
-            
+        
         Returns:
             Dict: Results of fix attempts
         """
@@ -252,46 +344,74 @@ class UserSyncMonitor:
                     })
             
             return fix_results
-            
+        
         except Exception as e:
             logger.error(f"Error during sync issue fixes: {str(e)}")
             fix_results["error"] = str(e)
             return fix_results
     
     async def _fix_missing_customer_records(self) -> Dict[str, Any]:
-        """Create customer records for users who are missing them"""
+        """Create customer records for users who are missing them (bulk inserts per page)"""
         try:
-            from ..services.enhanced_subscription_flow import EnhancedSubscriptionFlow
-            
             missing_customers = await self._check_missing_customer_records()
             fixed_count = 0
             
-            for user_info in missing_customers:
-                try:
-                    customer = await EnhancedSubscriptionFlow.ensure_customer_record(
-                        user_id=user_info["user_id"],
-                        email=user_info["email"]
-                    )
-                    
-                    if customer:
-                        fixed_count += 1
-                        logger.info(f"Created customer record for user {user_info['email']}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to create customer record for {user_info['email']}: {e}")
+            for start in range(0, len(missing_customers), self.PAGE_SIZE):
+                page = missing_customers[start:start + self.PAGE_SIZE]
+                fixed_count += await asyncio.to_thread(self._insert_customer_records, page)
+            
+            await asyncio.to_thread(self._prune_resolved_missing)
+            logger.info(f"Created {fixed_count} missing customer records")
             
             return {
                 "success": True,
                 "fixed_count": fixed_count,
                 "total_missing": len(missing_customers)
             }
-            
+        
         except Exception as e:
             logger.error(f"Error fixing missing customer records: {str(e)}")
             return {
                 "success": False,
                 "error": str(e)
             }
+    
+    def _insert_customer_records(self, users: List[Dict[str, Any]]) -> int:
+        """Insert customer rows for a page of users in one statement, row by row if that fails"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user["user_id"],
+                # Unique placeholder (the column is unique) until the Stripe customer is created
+                "stripe_customer_id": f"pending_{user['user_id']}",
+                "email": user["email"],
+                "name": user.get("name") or user["email"].split('@')[0].title(),
+                "created_at": now,
+                "updated_at": now
+            }
+            for user in users
+        ]
+        
+        with get_db_context() as db:
+            try:
+                db.execute(Customer.__table__.insert(), rows)
+                db.commit()
+                return len(rows)
+            except IntegrityError as e:
+                db.rollback()
+                logger.warning(f"Bulk customer insert failed, retrying row by row: {e.orig}")
+            
+            inserted = 0
+            for row in rows:
+                try:
+                    db.execute(Customer.__table__.insert(), [row])
+                    db.commit()
+                    inserted += 1
+                except IntegrityError as e:
+                    db.rollback()
+                    logger.error(f"Failed to create customer record for {row['email']}: {e.orig}")
+            return inserted
 
 
 # Global monitor instance
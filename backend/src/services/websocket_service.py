@@ -7,6 +7,8 @@ from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect
 from enum import Enum
 
+from ..utils.ws_broadcast import BroadcastBatcher, encode_message
+
 logger = logging.getLogger(__name__)
 
 class WebSocketMessageType(Enum):
@@ -29,6 +31,8 @@ class ConnectionManager:
         self.system_connections: Set[WebSocket] = set()
         # Connection metadata
         self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}
+        # Deployment events within a few ms share one encoded frame
+        self.deployment_batcher = BroadcastBatcher(self._send_frame_to_deployment)
     
     async def connect(self, websocket: WebSocket, deployment_id: Optional[str] = None):
         """Accept a new WebSocket connection"""
@@ -78,7 +82,7 @@ class ConnectionManager:
     async def send_message(self, websocket: WebSocket, message: Dict[str, Any]):
         """Send a message to a specific WebSocket connection"""
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_text(encode_message(message))
         except Exception as e:
             logger.error(f"Failed to send WebSocket message: {e}")
             # Remove the connection if it's broken
@@ -93,33 +97,35 @@ class ConnectionManager:
         message["deployment_id"] = deployment_id
         message["timestamp"] = datetime.utcnow().isoformat()
         
-        disconnected_connections = []
-        for websocket in self.deployment_connections[deployment_id].copy():
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to broadcast to deployment {deployment_id}: {e}")
-                disconnected_connections.append(websocket)
-        
-        # Clean up disconnected connections
-        for websocket in disconnected_connections:
-            self.disconnect(websocket)
+        # Encoded once here; the batcher sends one frame per burst to every connection
+        self.deployment_batcher.add(deployment_id, message)
+    
+    async def _send_frame_to_deployment(self, deployment_id: str, frame: str):
+        """Send one pre-encoded frame to every connection monitoring a deployment"""
+        connections = list(self.deployment_connections.get(deployment_id, ()))
+        await self._send_frame(connections, frame, f"deployment {deployment_id}")
     
     async def broadcast_system_wide(self, message: Dict[str, Any]):
         """Broadcast a message to all system-wide connections"""
         message["timestamp"] = datetime.utcnow().isoformat()
         
-        disconnected_connections = []
-        for websocket in self.system_connections.copy():
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to broadcast system message: {e}")
-                disconnected_connections.append(websocket)
+        await self._send_frame(list(self.system_connections), encode_message(message), "system")
+    
+    async def _send_frame(self, connections: List[WebSocket], frame: str, target: str):
+        """Send the same text frame to many connections concurrently"""
+        if not connections:
+            return
+        
+        results = await asyncio.gather(
+            *(websocket.send_text(frame) for websocket in connections),
+            return_exceptions=True
+        )
         
         # Clean up disconnected connections
-        for websocket in disconnected_connections:
-            self.disconnect(websocket)
+        for websocket, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to broadcast to {target}: {result}")
+                self.disconnect(websocket)
     
     def get_connection_count(self, deployment_id: Optional[str] = None) -> int:
         """Get the number of active connections"""
@@ -301,6 +307,7 @@ class WebSocketService:
         """Cleanup WebSocket service"""
         if self.heartbeat_task:
             self.heartbeat_task.cancel()
+        self.connection_manager.deployment_batcher.cancel_pending()
 
 # Global WebSocket service instance
 websocket_service = None
@@ -0,0 +1,143 @@
+"""
+Analysis Response Views
+Summary-first projection of a stored repository analysis, plus paginated
+slices of its file list, directory tree and findings
+"""
+
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+INLINE_FINDINGS = 20
+SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+
+def detail_endpoints(analysis_id: str) -> Dict[str, str]:
+    return {
+        "summary": f"/api/analysis/{analysis_id}",
+        "files": f"/api/analysis/{analysis_id}/files",
+        "tree": f"/api/analysis/{analysis_id}/tree",
+        "findings": f"/api/analysis/{analysis_id}/findings"
+    }
+
+
+def summarize_analysis(analysis: Dict[str, Any], analysis_id: str) -> Dict[str, Any]:
+    """
+    Copy of an analysis without its bulky per-file sections
+    
+    ``intelligence_profile.file_intelligence`` keeps its statistics but drops
+    the file list and directory tree, and only the most severe findings are
+    inlined. Everything the frontend reads for routing (frameworks,
+    stack_classification, projectType, ...) is left untouched. The dropped
+    data is served by the paginated endpoints in ``detail_endpoints``.
+    """
+    summary = dict(analysis)
+    profile = analysis.get("intelligence_profile")
+    if isinstance(profile, dict):
+        profile = dict(profile)
+        file_intel = profile.get("file_intelligence")
+        if isinstance(file_intel, dict):
+            slim = {k: v for k, v in file_intel.items() if k not in ("files", "directory_structure")}
+            slim["file_count"] = len(file_intel.get("files") or [])
+            profile["file_intelligence"] = slim
+        risks = profile.get("security_risks")
+        if isinstance(risks, list):
+            profile["security_risks"] = _sorted_findings(risks)[:INLINE_FINDINGS]
+            profile["security_risk_count"] = len(risks)
+        summary["intelligence_profile"] = profile
+    summary["details"] = detail_endpoints(analysis_id)
+    summary["details_truncated"] = True
+    return summary
+
+
+def paginate(items: List[Any], offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    return {
+        "items": page,
+        "total": len(items),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < len(items) else None
+    }
+
+
+def analysis_files(analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    profile = analysis.get("intelligence_profile") or {}
+    return list((profile.get("file_intelligence") or {}).get("files") or [])
+
+
+def list_files(analysis: Dict[str, Any], offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+               prefix: Optional[str] = None, language: Optional[str] = None) -> Dict[str, Any]:
+    """File metadata sorted by path, optionally restricted to a directory prefix or language"""
+    files = analysis_files(analysis)
+    if prefix:
+        prefix = prefix.strip("/") + "/"
+        files = [f for f in files if f.get("path", "").replace("\\", "/").startswith(prefix)]
+    if language:
+        files = [f for f in files if (f.get("language") or "").lower() == language.lower()]
+    files.sort(key=lambda f: f.get("path", ""))
+    return paginate(files, offset, limit)
+
+
+def list_tree(analysis: Dict[str, Any], path: str = "", offset: int = 0,
+              limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    One level of the directory tree under ``path``
+    
+    Directories come first and carry aggregate file counts and sizes, so a
+    client can expand the tree lazily instead of receiving it whole.
+    """
+    base = PurePosixPath(path.strip("/")) if path.strip("/") else None
+    directories: Dict[str, Dict[str, Any]] = {}
+    files: List[Dict[str, Any]] = []
+    
+    for meta in analysis_files(analysis):
+        parts = PurePosixPath(meta.get("path", "").replace("\\", "/")).parts
+        if base is not None:
+            if parts[:len(base.parts)] != base.parts:
+                continue
+            parts = parts[len(base.parts):]
+        if not parts:
+            continue
+        if len(parts) == 1:
+            files.append({"name": parts[0], "type": "file", "path": meta.get("path"),
+                          "size": meta.get("size", 0), "language": meta.get("language")})
+            continue
+        child = directories.setdefault(parts[0], {
+            "name": parts[0], "type": "directory",
+            "path": str(base / parts[0]) if base is not None else parts[0],
+            "file_count": 0, "size": 0
+        })
+        child["file_count"] += 1
+        child["size"] += meta.get("size", 0) or 0
+    
+    entries = sorted(directories.values(), key=lambda d: d["name"]) + sorted(files, key=lambda f: f["name"])
+    page = paginate(entries, offset, limit)
+    page["path"] = str(base) if base is not None else ""
+    return page
+
+
+def list_findings(analysis: Dict[str, Any], offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                  severity: Optional[str] = None) -> Dict[str, Any]:
+    """Security findings, most severe first"""
+    profile = analysis.get("intelligence_profile") or {}
+    findings = list(profile.get("security_risks") or [])
+    if severity:
+        findings = [f for f in findings if str(f.get("severity", "")).lower() == severity.lower()]
+    return paginate(_sorted_findings(findings), offset, limit)
+
+
+def full_analysis(analysis: Dict[str, Any], analysis_id: str) -> Dict[str, Any]:
+    """The complete analysis (opt-in), with the detail endpoints advertised as well"""
+    result = dict(analysis)
+    result["details"] = detail_endpoints(analysis_id)
+    result["details_truncated"] = False
+    return result
+
+
+def _sorted_findings(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(findings, key=lambda f: SEVERITY_ORDER.get(str(f.get("severity", "")).lower(), len(SEVERITY_ORDER)))
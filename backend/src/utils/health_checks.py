@@ -10,10 +10,10 @@ import psutil
 import time
 from typing import Dict, Any, List, Optional
 import httpx
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
 from ..config.env import get_settings
+from core.aws_clients import get_aws_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -121,7 +121,7 @@ async def check_aws_services_health() -> Dict[str, Any]:
         
         # Check S3 service
         try:
-            s3_client = boto3.client('s3', region_name=settings.AWS_REGION)
+            s3_client = get_aws_client('s3', region_name=settings.AWS_REGION)
             start_time = time.time()
             
             # Test S3 access by listing buckets
@@ -155,7 +155,7 @@ async def check_aws_services_health() -> Dict[str, Any]:
         
         # Check CloudFormation service
         try:
-            cf_client = boto3.client('cloudformation', region_name=settings.AWS_REGION)
+            cf_client = get_aws_client('cloudformation', region_name=settings.AWS_REGION)
             start_time = time.time()
             
             # Test CloudFormation access
@@ -179,7 +179,7 @@ async def check_aws_services_health() -> Dict[str, Any]:
         
         # Check CloudFront service
         try:
-            cloudfront_client = boto3.client('cloudfront', region_name=settings.AWS_REGION)
+            cloudfront_client = get_aws_client('cloudfront', region_name=settings.AWS_REGION)
             start_time = time.time()
             
             # Test CloudFront access
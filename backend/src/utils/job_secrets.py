@@ -0,0 +1,62 @@
+"""
+Job Secrets
+Seal credentials that travel inside queued job payloads so they are never
+written to the job store in plaintext
+
+With CODEFLOWOPS_JOB_SECRET_KEY (a Fernet key shared by the API processes and
+the job workers) any worker can open a sealed payload. Without it every
+process generates its own key, so only the process that queued a job can
+open its secrets - callers must then keep those jobs on a process-local queue.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+# Request fields that must never be stored with a job
+SECRET_FIELDS = ("aws_access_key", "aws_secret_key", "aws_access_key_id", "aws_secret_access_key")
+
+_fernet: Optional[Fernet] = None
+_fernet_lock = threading.Lock()
+
+
+def has_shared_key() -> bool:
+    """Whether sealed payloads can be opened by other processes"""
+    return bool(os.getenv("CODEFLOWOPS_JOB_SECRET_KEY"))
+
+
+def _get_fernet() -> Fernet:
+    global _fernet
+    if _fernet is None:
+        with _fernet_lock:
+            if _fernet is None:
+                key = os.getenv("CODEFLOWOPS_JOB_SECRET_KEY")
+                if not key:
+                    logger.info("🔐 CODEFLOWOPS_JOB_SECRET_KEY not set; job secrets are sealed with a per-process key")
+                _fernet = Fernet(key.encode("ascii") if key else Fernet.generate_key())
+    return _fernet
+
+
+def split_secrets(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """``(data without secret fields, sealed token or None)``"""
+    public = {k: v for k, v in data.items() if k not in SECRET_FIELDS}
+    secrets = {k: data[k] for k in SECRET_FIELDS if data.get(k)}
+    return public, seal(secrets) if secrets else None
+
+
+def seal(secrets: Dict[str, Any]) -> str:
+    return _get_fernet().encrypt(json.dumps(secrets).encode("utf-8")).decode("ascii")
+
+
+def unseal(token: str) -> Dict[str, Any]:
+    """Open a sealed token; raises ValueError if this process cannot read it"""
+    try:
+        return json.loads(_get_fernet().decrypt(token.encode("ascii")))
+    except InvalidToken:
+        raise ValueError("Sealed job credentials cannot be opened by this process (CODEFLOWOPS_JOB_SECRET_KEY mismatch)")
@@ -0,0 +1,158 @@
+"""
+Lazy Loading
+Deferred imports for heavy optional dependencies and stack routers that are
+mounted on their first request
+"""
+
+import sys
+import time
+import asyncio
+import importlib
+import logging
+import threading
+from types import ModuleType
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+from .startup_profile import get_startup_profile
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+    
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+    
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+                    get_startup_profile().record_load(self.__name__, time.perf_counter() - start)
+        return module
+    
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+    
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> LazyModule:
+    """``boto3 = lazy_import("boto3")`` - same call sites, import deferred to first use"""
+    return LazyModule(name)
+
+
+def lazy_attribute(module_name: str, attribute: str, trigger: str = "first_use") -> Any:
+    """Import ``module_name`` (timed in the startup profile) and return one of its attributes"""
+    module = sys.modules.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        get_startup_profile().record_load(module_name, time.perf_counter() - start, trigger)
+    return getattr(module, attribute)
+
+
+def module_getattr(module_name: str, attributes: Dict[str, Tuple[str, str]]):
+    """
+    PEP 562 ``__getattr__`` for a module whose public names are imported lazily
+    
+    ``attributes`` maps an exported name to ``(module, attribute)``; resolved
+    values are cached in the owning module's namespace.
+    """
+    def __getattr__(name: str):
+        if name not in attributes:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        value = lazy_attribute(*attributes[name])
+        setattr(sys.modules[module_name], name, value)
+        return value
+    
+    return __getattr__
+
+
+class LazyRouter:
+    """
+    Stack router included into the app on the first request under its prefix
+    
+    Until then a placeholder route matches ``prefix`` and everything below
+    it; the first request imports the router module (in a worker thread),
+    replaces the placeholder with the real routes and is dispatched again.
+    ``load()`` does the same ahead of time and is what the warm-up calls.
+    ``include_prefix`` overrides the prefix passed to ``include_router`` for
+    routers that carry their own. The router's endpoints appear in the OpenAPI schema once it is loaded.
+    """
+    
+    def __init__(self, app, module: str, prefix: str, attribute: str = "router",
+                 include_prefix: Optional[str] = None, **include_kwargs):
+        self.app = app
+        self.module = module
+        self.prefix = prefix.rstrip("/")
+        self.include_prefix = self.prefix if include_prefix is None else include_prefix
+        self.attribute = attribute
+        self.include_kwargs = include_kwargs
+        self.mounted = False
+        self.error: Optional[Exception] = None
+        self._placeholder = _LazyRoutePlaceholder(self)
+    
+    def install(self) -> "LazyRouter":
+        self.app.router.routes.append(self._placeholder)
+        return self
+    
+    async def load(self, trigger: str = "warmup"):
+        """Import and include the router (idempotent; must run on the event loop)"""
+        if self.mounted:
+            return
+        start = time.perf_counter()
+        router = await asyncio.to_thread(lambda: getattr(importlib.import_module(self.module), self.attribute))
+        if self.mounted:
+            return
+        # Mounting happens on the loop thread, so requests never see a half-updated route list
+        if self._placeholder in self.app.router.routes:
+            self.app.router.routes.remove(self._placeholder)
+        self.app.include_router(router, prefix=self.include_prefix, **self.include_kwargs)
+        self.app.openapi_schema = None
+        self.mounted = True
+        get_startup_profile().record_load(self.module, time.perf_counter() - start, trigger)
+        logger.info(f"✅ {self.module} mounted at {self.prefix or '/'}")
+
+
+class _LazyRoutePlaceholder(BaseRoute):
+    def __init__(self, lazy_router: LazyRouter):
+        self.lazy_router = lazy_router
+    
+    def matches(self, scope) -> Tuple[Match, Dict[str, Any]]:
+        if scope["type"] != "http":
+            return Match.NONE, {}
+        path = scope["path"]
+        prefix = self.lazy_router.prefix
+        if path == prefix or path.startswith(prefix + "/"):
+            return Match.FULL, {}
+        return Match.NONE, {}
+    
+    def url_path_for(self, name: str, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+    
+    async def handle(self, scope, receive, send):
+        lazy_router = self.lazy_router
+        try:
+            await lazy_router.load(trigger="first_use")
+        except Exception as e:
+            lazy_router.error = e
+            logger.error(f"❌ Failed to load {lazy_router.module}: {e}")
+            response = JSONResponse({"detail": f"Router {lazy_router.module} is not available"}, status_code=503)
+            await response(scope, receive, send)
+            return
+        await lazy_router.app.router(scope, receive, send)
+    
+    async def __call__(self, scope, receive, send):
+        await self.handle(scope, receive, send)
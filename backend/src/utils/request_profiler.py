@@ -0,0 +1,255 @@
+"""
+Slow Request Profiler
+Opt-in sampling profiler that keeps stack profiles of API requests slower
+than a threshold in a bounded on-disk store
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads that are parked, not working; counted but not kept as stacks
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+MAX_STACK_DEPTH = 64
+MAX_STACKS_PER_PROFILE = 200
+
+
+class _Recording:
+    """Samples collected for one in-flight request"""
+    
+    __slots__ = ("id", "started", "samples", "total", "idle_samples", "max_samples")
+    
+    def __init__(self, max_samples: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.samples: Counter = Counter()
+        self.total = 0  # sum(samples.values()), kept so add() stays O(1)
+        self.idle_samples = 0
+        self.max_samples = max_samples
+    
+    def add(self, stack: Optional[str]):
+        if stack is None:
+            self.idle_samples += 1
+        elif self.total < self.max_samples:
+            self.samples[stack] += 1
+            self.total += 1
+
+
+class ProfileStore:
+    """
+    Bounded store of slow-request profiles
+    
+    The full profile (folded stacks) is written to ``directory`` as one JSON
+    file per request. The directory is the source of truth: gunicorn
+    workers share it, so eviction keeps the newest ``max_entries`` files on
+    disk and ``list()`` reads the listing rather than this process's saves.
+    """
+    
+    def __init__(self, directory: str, max_entries: int = 50):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._summaries: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # id -> (mtime, summary)
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def save(self, profile: Dict[str, Any]):
+        """Write a profile and evict the oldest ones (blocking I/O; call from a thread)"""
+        path = self.directory / f"{profile['id']}.json"
+        path.write_text(json.dumps(profile), encoding="utf-8")
+        for stale, _ in self._files()[self.max_entries:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass  # Already evicted by another worker
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first, across every process writing to the directory"""
+        summaries = []
+        with self._lock:
+            files = self._files()[:self.max_entries]
+            for path, mtime in files:
+                cached = self._summaries.get(path.stem)
+                if cached is None or cached[0] != mtime:
+                    try:
+                        cached = (mtime, _summary(json.loads(path.read_text(encoding="utf-8"))))
+                    except (OSError, ValueError):
+                        continue
+                    self._summaries[path.stem] = cached
+                summaries.append(cached[1])
+            live = {path.stem for path, _ in files}
+            for profile_id in [p for p in self._summaries if p not in live]:
+                del self._summaries[profile_id]
+        return summaries
+    
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id.isalnum():
+            return None
+        path = self.directory / f"{profile_id}.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+    
+    def _files(self) -> List[Tuple[Path, float]]:
+        """(path, mtime) of stored profiles, newest first"""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path, path.stat().st_mtime))
+            except OSError:
+                continue  # Evicted between listing and stat
+        files.sort(key=lambda item: item[1], reverse=True)
+        return files
+
+
+class SlowRequestProfiler:
+    """
+    Samples the stacks of all Python threads while requests are in flight
+    
+    A daemon thread wakes every ``interval_ms`` as long as at least one
+    request is running and adds the current stack of every busy thread to
+    each in-flight recording. Requests that finish above ``threshold_ms``
+    are turned into a folded-stack profile (flamegraph.pl / speedscope
+    format); faster ones are discarded. Samples from overlapping requests
+    are not separated, so a profile shows what the process was doing while
+    the slow request ran - usually the request itself, or whatever was
+    blocking the event loop.
+    """
+    
+    def __init__(self, threshold_ms: float, store: ProfileStore, interval_ms: float = 10.0,
+                 max_samples: int = 5000):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.max_samples = max_samples
+        self.store = store
+        self.profiled = 0
+        self._active: Dict[str, _Recording] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def begin(self) -> _Recording:
+        recording = _Recording(self.max_samples)
+        with self._lock:
+            self._active[recording.id] = recording
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return recording
+    
+    def finish(self, recording: _Recording, method: str, route: str, path: str, status: int,
+               duration: float) -> Optional[Dict[str, Any]]:
+        """Stop sampling for ``recording``; returns a profile if the request was slow"""
+        with self._lock:
+            self._active.pop(recording.id, None)
+            samples = recording.samples.copy()
+            total = recording.total
+            idle = recording.idle_samples
+        duration_ms = duration * 1000
+        if duration_ms < self.threshold_ms:
+            return None
+        self.profiled += 1
+        stacks = [{"stack": stack, "samples": count}
+                  for stack, count in samples.most_common(MAX_STACKS_PER_PROFILE)]
+        return {
+            "id": recording.id,
+            "captured_at": time.time(),
+            "method": method,
+            "route": route,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "interval_ms": self.interval * 1000,
+            "samples": total,
+            "idle_samples": idle,
+            "stacks": stacks
+        }
+    
+    def _sample_loop(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._wakeup.clear()
+                    continue
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = [_fold(names.get(ident, str(ident)), frame)
+                      for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                for recording in active:
+                    for stack in stacks:
+                        recording.add(stack)
+
+
+def _fold(thread_name: str, frame) -> Optional[str]:
+    """``thread;outer (file:line);...;leaf (file:line)``, or None for a parked thread"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+        return None
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    parts.append(thread_name)
+    return ";".join(reversed(parts))
+
+
+def _summary(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: profile.get(k) for k in ("id", "captured_at", "method", "route", "path", "status", "duration_ms", "samples")}
+
+
+def folded_text(profile: Dict[str, Any]) -> str:
+    """Collapsed-stack text for flamegraph.pl / speedscope"""
+    return "\n".join(f"{s['stack']} {s['samples']}" for s in profile.get("stacks", []))
+
+
+_profiler: Optional[SlowRequestProfiler] = None
+_profiler_configured = False
+
+
+def get_request_profiler() -> Optional[SlowRequestProfiler]:
+    """
+    Process-wide slow-request profiler, or None when it is not enabled
+    
+    Enabled by CODEFLOWOPS_SLOW_REQUEST_PROFILE_MS (threshold); tuned with
+    CODEFLOWOPS_PROFILE_SAMPLE_INTERVAL_MS, CODEFLOWOPS_PROFILE_DIR and
+    CODEFLOWOPS_PROFILE_MAX_ENTRIES.
+    """
+    global _profiler, _profiler_configured
+    if not _profiler_configured:
+        _profiler_configured = True
+        threshold = os.getenv("CODEFLOWOPS_SLOW_REQUEST_PROFILE_MS")
+        if threshold:
+            directory = os.getenv("CODEFLOWOPS_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "codeflowops-profiles")
+            try:
+                store = ProfileStore(directory, int(os.getenv("CODEFLOWOPS_PROFILE_MAX_ENTRIES", "50")))
+                _profiler = SlowRequestProfiler(
+                    float(threshold), store,
+                    interval_ms=float(os.getenv("CODEFLOWOPS_PROFILE_SAMPLE_INTERVAL_MS", "10"))
+                )
+                logger.info(f"🔬 Profiling requests slower than {float(threshold):.0f}ms into {directory}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Slow request profiler disabled: {e}")
+    return _profiler
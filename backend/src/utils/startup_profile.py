@@ -0,0 +1,209 @@
+"""
+Startup Profile
+Import-time breakdown of API startup, first-use load timings and the
+background warm-up that preloads lazily loaded components
+"""
+
+import os
+import sys
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_MODULES = 25
+
+
+class _TimedLoader:
+    """Loader proxy that records how long a module body takes to execute"""
+    
+    def __init__(self, loader, timer: "_ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+    
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+    
+    def exec_module(self, module):
+        self._timer.enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.leave(module.__name__, time.perf_counter() - start)
+    
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer:
+    """
+    sys.meta_path hook timing every module imported while it is installed
+    
+    ``self`` time excludes nested imports, so the slowest entries point at
+    the modules that are expensive themselves rather than at whoever
+    imported them first.
+    """
+    
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, float]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._local.finding = False
+    
+    def enter(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+    
+    def leave(self, name: str, elapsed: float):
+        stack = self._local.stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self._lock:
+            self.modules[name] = {"total": elapsed, "self": max(0.0, elapsed - nested)}
+    
+    def slowest(self, limit: int = SLOWEST_MODULES) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self.modules.items(), key=lambda item: item[1]["self"], reverse=True)[:limit]
+        return [
+            {"module": name, "self_ms": round(t["self"] * 1000, 1), "total_ms": round(t["total"] * 1000, 1)}
+            for name, t in ranked
+        ]
+
+
+class StartupProfile:
+    """
+    Timeline of the API process start
+    
+    ``mark(phase)`` closes the phase that started at the previous mark, so
+    simple_api records its import sections with one call each. Components
+    that are loaded lazily report their first-use cost with ``record_load``,
+    and the warm-up task registered with ``add_warmup`` runs once the server
+    is accepting connections.
+    """
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._last_mark = self._start
+        self._modules_at_mark = len(sys.modules)
+        self.phases: List[Dict[str, Any]] = []
+        self.loads: List[Dict[str, Any]] = []
+        self.ready_seconds: Optional[float] = None
+        self.warmup: Dict[str, Any] = {"status": "not_started", "items": []}
+        self._warmup_items: List[tuple] = []
+        self._import_timer: Optional[_ImportTimer] = None
+        self._lock = threading.Lock()
+    
+    def enable_import_timing(self):
+        """Time individual module imports (CODEFLOWOPS_STARTUP_PROFILE=1)"""
+        if self._import_timer is None:
+            self._import_timer = _ImportTimer()
+            sys.meta_path.insert(0, self._import_timer)
+    
+    def disable_import_timing(self):
+        if self._import_timer is not None and self._import_timer in sys.meta_path:
+            sys.meta_path.remove(self._import_timer)
+    
+    def mark(self, phase: str):
+        """Record the time spent since the previous mark as ``phase``"""
+        now = time.perf_counter()
+        module_count = len(sys.modules)
+        with self._lock:
+            self.phases.append({
+                "phase": phase,
+                "ms": round((now - self._last_mark) * 1000, 1),
+                "modules_loaded": module_count - self._modules_at_mark
+            })
+            self._last_mark = now
+            self._modules_at_mark = module_count
+    
+    def record_load(self, name: str, seconds: float, trigger: str = "first_use"):
+        """A lazily loaded component was imported (on first use or by the warm-up)"""
+        with self._lock:
+            self.loads.append({"component": name, "ms": round(seconds * 1000, 1), "trigger": trigger,
+                               "after_start_s": round(time.perf_counter() - self._start, 2)})
+        logger.info(f"📦 Loaded {name} in {seconds * 1000:.0f}ms ({trigger})")
+    
+    def ready(self):
+        """The application object is fully built; logs the import breakdown"""
+        self.ready_seconds = time.perf_counter() - self._start
+        self.disable_import_timing()
+        slowest = sorted(self.phases, key=lambda p: p["ms"], reverse=True)[:5]
+        breakdown = ", ".join(f"{p['phase']}={p['ms']:.0f}ms" for p in slowest)
+        logger.info(f"⏱️ API imported in {self.ready_seconds:.2f}s ({breakdown})")
+    
+    def add_warmup(self, name: str, func: Callable[[], Any]):
+        """Preload ``func`` (sync functions run in a thread, coroutines on the loop) after startup"""
+        self._warmup_items.append((name, func))
+    
+    async def run_warmup(self, delay: float = 1.0):
+        """Run the registered warm-up items one after another"""
+        # Startup hooks run before uvicorn binds its socket; wait so health checks are served first
+        await asyncio.sleep(delay)
+        self.warmup["status"] = "running"
+        started = time.perf_counter()
+        for name, func in self._warmup_items:
+            item_start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(func):
+                    await func()
+                else:
+                    await asyncio.to_thread(func)
+                self.warmup["items"].append({"name": name, "ms": round((time.perf_counter() - item_start) * 1000, 1)})
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up of {name} failed: {e}")
+                self.warmup["items"].append({"name": name, "error": str(e)})
+        self.warmup["status"] = "completed"
+        self.warmup["seconds"] = round(time.perf_counter() - started, 2)
+        logger.info(f"🔥 Warm-up finished in {self.warmup['seconds']:.2f}s ({len(self._warmup_items)} components)")
+    
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {
+                "started_at": self.started_at,
+                "import_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+                "phases": list(self.phases),
+                "lazy_loads": list(self.loads),
+                "warmup": dict(self.warmup, items=list(self.warmup["items"])),
+                "modules_loaded": len(sys.modules)
+            }
+        if self._import_timer is not None:
+            report["slowest_modules"] = self._import_timer.slowest()
+        return report
+
+
+_startup_profile: Optional[StartupProfile] = None
+
+
+def get_startup_profile() -> StartupProfile:
+    """Process-wide startup profile; per-module timing when CODEFLOWOPS_STARTUP_PROFILE is set"""
+    global _startup_profile
+    if _startup_profile is None:
+        _startup_profile = StartupProfile()
+        if os.getenv("CODEFLOWOPS_STARTUP_PROFILE", "").lower() in ("1", "true", "yes"):
+            _startup_profile.enable_import_timing()
+    return _startup_profile
@@ -0,0 +1,190 @@
+"""
+Terraform State Backends
+Persistent Terraform state keyed by project and environment
+"""
+
+import os
+import re
+import asyncio
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# File written next to the templates; Terraform merges *_override.tf last
+BACKEND_OVERRIDE_FILE = "backend_override.tf"
+
+
+def _sanitize_key_part(value: str) -> str:
+    """Sanitize a value for use in a state path or S3 key"""
+    sanitized = re.sub(r'[^a-zA-Z0-9\-_.]', '-', str(value))
+    sanitized = re.sub(r'-+', '-', sanitized)
+    return sanitized.strip('-.') or "default"
+
+
+class TerraformStateBackend(ABC):
+    """
+    Where Terraform keeps state for a project/environment pair
+    
+    Deployment directories are temporary, so state must live outside them
+    for redeploys to produce incremental plans (and for destroy to work at
+    all). Backends write a ``backend_override.tf`` into the deployment
+    directory; ``terraform init`` then attaches to the existing state.
+    """
+    
+    name = "base"
+    
+    def state_key(self, project: str, environment: str, owner: Optional[str] = None) -> str:
+        """Stable key for a project/environment pair, optionally scoped by owner"""
+        parts = ["projects"]
+        if owner:
+            parts.append(_sanitize_key_part(owner))
+        parts.extend([_sanitize_key_part(project), _sanitize_key_part(environment), "terraform.tfstate"])
+        return "/".join(parts)
+    
+    async def configure(
+        self,
+        terraform_dir: Path,
+        project: str,
+        environment: str,
+        owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Write the backend block for this project/environment into terraform_dir"""
+        state_key = self.state_key(project, environment, owner)
+        backend_block = self._backend_block(state_key)
+        (terraform_dir / BACKEND_OVERRIDE_FILE).write_text(backend_block, encoding="utf-8")
+        return {
+            "backend": self.name,
+            "state_key": state_key,
+            "has_state": await asyncio.to_thread(self.has_state, state_key)
+        }
+    
+    @abstractmethod
+    def has_state(self, state_key: str) -> bool:
+        """Whether state already exists for this key (i.e. this is a redeploy)"""
+    
+    @abstractmethod
+    def _backend_block(self, state_key: str) -> str:
+        """HCL terraform { backend ... } block for this key"""
+
+
+class LocalStateBackend(TerraformStateBackend):
+    """
+    State files on local disk (default)
+    
+    Uses Terraform's built-in ``local`` backend, which takes an OS file lock
+    on the state while a command runs, so concurrent deploys of the same
+    project/environment are serialized by Terraform itself.
+    """
+    
+    name = "local"
+    
+    def __init__(self, state_root: Optional[str] = None):
+        self.state_root = Path(
+            state_root
+            or os.getenv("CODEFLOWOPS_TF_STATE_DIR")
+            or Path(tempfile.gettempdir()) / "codeflowops-terraform-state"
+        ).resolve()
+        self.state_root.mkdir(parents=True, exist_ok=True)
+    
+    def state_path(self, state_key: str) -> Path:
+        return self.state_root / state_key
+    
+    def has_state(self, state_key: str) -> bool:
+        state_path = self.state_path(state_key)
+        return state_path.exists() and state_path.stat().st_size > 0
+    
+    def _backend_block(self, state_key: str) -> str:
+        state_path = self.state_path(state_key)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        return f'''terraform {{
+  backend "local" {{
+    path = "{state_path.as_posix()}"
+  }}
+}}
+'''
+
+
+class S3StateBackend(TerraformStateBackend):
+    """
+    State in S3 with DynamoDB locking
+    
+    ``endpoint_url`` points both S3 and DynamoDB at a compatible local
+    stand-in (LocalStack, MinIO + DynamoDB Local) for development. Requires
+    Terraform >= 1.6 for the ``endpoints`` / ``use_path_style`` settings.
+    """
+    
+    name = "s3"
+    
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        lock_table: Optional[str] = None,
+        region: Optional[str] = None,
+        endpoint_url: Optional[str] = None
+    ):
+        self.bucket = bucket or os.getenv("TERRAFORM_STATE_BUCKET", "codeflowops-terraform-state")
+        self.lock_table = lock_table or os.getenv("TERRAFORM_LOCK_TABLE", "codeflowops-terraform-locks")
+        self.region = region or os.getenv("AWS_REGION", "us-east-1")
+        self.endpoint_url = endpoint_url or os.getenv("CODEFLOWOPS_TF_STATE_ENDPOINT")
+        self._s3_client = None
+    
+    def has_state(self, state_key: str) -> bool:
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            return False
+        
+        if self._s3_client is None:
+            self._s3_client = boto3.client("s3", region_name=self.region, endpoint_url=self.endpoint_url)
+        try:
+            self._s3_client.head_object(Bucket=self.bucket, Key=state_key)
+            return True
+        except ClientError:
+            return False
+        except Exception as e:
+            logger.warning(f"⚠️ Could not check Terraform state s3://{self.bucket}/{state_key}: {e}")
+            return False
+    
+    def _backend_block(self, state_key: str) -> str:
+        extra = ""
+        if self.endpoint_url:
+            extra = f'''
+    endpoints = {{
+      s3       = "{self.endpoint_url}"
+      dynamodb = "{self.endpoint_url}"
+    }}
+    use_path_style              = true
+    skip_credentials_validation = true
+    skip_requesting_account_id  = true
+    skip_metadata_api_check     = true'''
+        return f'''terraform {{
+  backend "s3" {{
+    bucket         = "{self.bucket}"
+    key            = "{state_key}"
+    region         = "{self.region}"
+    dynamodb_table = "{self.lock_table}"
+    encrypt        = true{extra}
+  }}
+}}
+'''
+
+
+_state_backend: Optional[TerraformStateBackend] = None
+
+
+def get_terraform_state_backend() -> TerraformStateBackend:
+    """Process-wide state backend selected by CODEFLOWOPS_TF_STATE_BACKEND (local | s3)"""
+    global _state_backend
+    if _state_backend is None:
+        backend_name = os.getenv("CODEFLOWOPS_TF_STATE_BACKEND", "local").lower()
+        if backend_name == "s3":
+            _state_backend = S3StateBackend()
+        else:
+            _state_backend = LocalStateBackend()
+        logger.info(f"🗄️ Terraform state backend: {_state_backend.name}")
+    return _state_backend
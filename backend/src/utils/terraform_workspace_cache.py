@@ -0,0 +1,256 @@
+"""
+Terraform Workspace Cache
+Shares provider plugins across deployments and keeps pre-initialized workspaces per template
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Repository templates that are pre-initialized by prewarm_templates()
+DEFAULT_TEMPLATES_ROOT = Path(__file__).resolve().parents[3] / "infrastructure" / "templates"
+
+
+class TerraformWorkspaceCache:
+    """
+    Provider plugin cache plus one initialized workspace per template
+    
+    A warm workspace is a directory where ``terraform init -backend=false``
+    has already run for a given set of template files. Each deployment
+    directory receives a hardlinked copy of its ``.terraform`` directory and
+    dependency lock file, so the deployment's own ``terraform init`` only
+    links providers from the shared plugin cache instead of downloading them.
+    
+    Writes to the plugin cache (building a warm workspace) are serialized
+    with a file lock, because Terraform does not guarantee the cache is safe
+    for concurrent installs.
+    """
+    
+    MARKER_FILE = ".codeflowops-initialized"
+    
+    def __init__(self, cache_root: Optional[str] = None):
+        root = Path(
+            cache_root
+            or os.getenv("CODEFLOWOPS_TF_CACHE_DIR")
+            or Path(tempfile.gettempdir()) / "codeflowops-terraform-cache"
+        )
+        self.plugin_cache_dir = root / "plugins"
+        self.workspaces_dir = root / "workspaces"
+        self.plugin_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workspaces_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._install_lock = asyncio.Lock()
+        self.metrics = {
+            "warm_hits": 0,
+            "warm_builds": 0,
+            "warm_failures": 0,
+            "last_warm_build_seconds": None,
+        }
+    
+    def environment(self) -> Dict[str, str]:
+        """Environment variables that point Terraform at the shared plugin cache"""
+        return {"TF_PLUGIN_CACHE_DIR": str(self.plugin_cache_dir)}
+    
+    @staticmethod
+    def template_key(template_files: Dict[str, str]) -> str:
+        """Stable key for a set of template files (tfvars do not affect providers)"""
+        digest = hashlib.sha256()
+        for file_key in sorted(template_files):
+            if file_key.endswith("tfvars"):
+                continue
+            digest.update(file_key.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(template_files[file_key].encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+    
+    async def prepare_deployment_dir(
+        self,
+        terraform_dir: Path,
+        template_files: Dict[str, str],
+        env: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """
+        Seed a deployment directory from the warm workspace for its templates
+        
+        Returns True when the directory was seeded; callers should then run
+        ``terraform init`` with ``environment()`` applied.
+        """
+        if not shutil.which("terraform"):
+            return False
+        
+        warm_dir = await self.ensure_workspace(template_files, env)
+        if warm_dir is None:
+            return False
+        
+        try:
+            await asyncio.to_thread(self._clone_workspace, warm_dir, terraform_dir)
+            self.metrics["warm_hits"] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clone warm Terraform workspace {warm_dir}: {e}")
+            return False
+    
+    async def ensure_workspace(
+        self,
+        template_files: Dict[str, str],
+        env: Optional[Dict[str, str]] = None
+    ) -> Optional[Path]:
+        """Return the initialized workspace for these templates, building it if needed"""
+        key = self.template_key(template_files)
+        warm_dir = self.workspaces_dir / key
+        
+        if (warm_dir / self.MARKER_FILE).exists():
+            return warm_dir
+        
+        async with self._install_lock:
+            lock_fd = await asyncio.to_thread(self._acquire_file_lock)
+            try:
+                # Another worker process may have built it while we waited
+                if (warm_dir / self.MARKER_FILE).exists():
+                    return warm_dir
+                return await self._build_workspace(warm_dir, template_files, env)
+            finally:
+                self._release_file_lock(lock_fd)
+    
+    async def prewarm_templates(self, templates_root: Optional[Path] = None) -> Dict[str, Optional[str]]:
+        """Initialize a warm workspace for every template directory (e.g. at startup)"""
+        templates_root = Path(templates_root or DEFAULT_TEMPLATES_ROOT)
+        results: Dict[str, Optional[str]] = {}
+        
+        if not templates_root.is_dir() or not shutil.which("terraform"):
+            return results
+        
+        for template_dir in sorted(p for p in templates_root.iterdir() if p.is_dir()):
+            template_files = {
+                tf_file.name.replace(".", "_"): tf_file.read_text(encoding="utf-8")
+                for tf_file in template_dir.glob("*.tf")
+            }
+            if not template_files:
+                continue
+            warm_dir = await self.ensure_workspace(template_files)
+            results[template_dir.name] = str(warm_dir) if warm_dir else None
+        
+        return results
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        warm_workspaces = sum(
+            1 for p in self.workspaces_dir.iterdir()
+            if (p / self.MARKER_FILE).exists()
+        ) if self.workspaces_dir.exists() else 0
+        return {
+            "plugin_cache_dir": str(self.plugin_cache_dir),
+            "warm_workspaces": warm_workspaces,
+            **self.metrics
+        }
+    
+    async def _build_workspace(
+        self,
+        warm_dir: Path,
+        template_files: Dict[str, str],
+        env: Optional[Dict[str, str]]
+    ) -> Optional[Path]:
+        staging_dir = Path(tempfile.mkdtemp(prefix=f"{warm_dir.name}-", dir=self.workspaces_dir))
+        started = time.monotonic()
+        
+        try:
+            for file_key, content in template_files.items():
+                if file_key.endswith("tfvars"):
+                    continue
+                file_name = file_key.replace("_", ".")  # main_tf -> main.tf
+                (staging_dir / file_name).write_text(content, encoding="utf-8")
+            
+            process = await asyncio.create_subprocess_exec(
+                "terraform", "init", "-backend=false", "-input=false", "-no-color",
+                cwd=staging_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env={**os.environ, **(env or {}), "TF_IN_AUTOMATION": "1", **self.environment()}
+            )
+            _, stderr = await process.communicate()
+            
+            if process.returncode != 0:
+                self.metrics["warm_failures"] += 1
+                logger.warning(f"⚠️ Warm Terraform init failed: {stderr.decode('utf-8', 'replace')[-500:]}")
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                return None
+            
+            (staging_dir / self.MARKER_FILE).write_text(str(time.time()), encoding="utf-8")
+            shutil.rmtree(warm_dir, ignore_errors=True)
+            os.replace(staging_dir, warm_dir)
+            
+            elapsed = time.monotonic() - started
+            self.metrics["warm_builds"] += 1
+            self.metrics["last_warm_build_seconds"] = round(elapsed, 2)
+            logger.info(f"✅ Warm Terraform workspace {warm_dir.name} initialized in {elapsed:.1f}s")
+            return warm_dir
+        
+        except Exception as e:
+            self.metrics["warm_failures"] += 1
+            logger.warning(f"⚠️ Failed to build warm Terraform workspace: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return None
+    
+    def _clone_workspace(self, warm_dir: Path, terraform_dir: Path):
+        """Hardlink the warm workspace's init artifacts into a deployment directory"""
+        lock_file = warm_dir / ".terraform.lock.hcl"
+        if lock_file.exists():
+            shutil.copy2(lock_file, terraform_dir / ".terraform.lock.hcl")
+        
+        source = warm_dir / ".terraform"
+        if source.exists():
+            shutil.copytree(
+                source,
+                terraform_dir / ".terraform",
+                symlinks=True,  # Providers are symlinks into the plugin cache
+                copy_function=_link_or_copy,
+                ignore=shutil.ignore_patterns("terraform.tfstate"),  # Backend config is per deployment
+                dirs_exist_ok=True
+            )
+    
+    def _acquire_file_lock(self):
+        if fcntl is None:
+            return None
+        lock_fd = os.open(self.workspaces_dir / ".install.lock", os.O_CREAT | os.O_RDWR)
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        return lock_fd
+    
+    def _release_file_lock(self, lock_fd):
+        if lock_fd is None:
+            return
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        finally:
+            os.close(lock_fd)
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink when possible (same filesystem), otherwise copy"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+_workspace_cache: Optional[TerraformWorkspaceCache] = None
+
+
+def get_terraform_workspace_cache() -> TerraformWorkspaceCache:
+    """Process-wide workspace cache shared by all TerraformExecutor instances"""
+    global _workspace_cache
+    if _workspace_cache is None:
+        _workspace_cache = TerraformWorkspaceCache()
+    return _workspace_cache
@@ -4,16 +4,79 @@ Handles real-time communication for deployment progress updates
 """
 
 import logging
-import json
+import time
 import asyncio
-from typing import Dict, Set, Any, Optional, List
+from typing import Dict, Set, Any, Optional, List, Tuple, Deque
 from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 import uuid
 
+from .ws_broadcast import encode_message, build_batch_frame
+
 logger = logging.getLogger(__name__)
 
+# Message types where only the latest pending message matters; a newer one
+# replaces an unsent older one instead of queueing behind it
+COALESCE_TYPES = {"progress", "deployment_progress", "status", "heartbeat"}
+
+
+class _OutboundQueue:
+    """
+    Outbound messages for one connection, drained by its own writer task
+    
+    Enqueueing never blocks, so fan-out to many connections is just a loop
+    of appends and a slow client only delays itself. Messages are queued
+    already encoded, so a broadcast shares one encoded text across all
+    queues. Coalescible messages replace their pending predecessor; when the
+    queue is full the oldest message is dropped.
+    """
+    
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self.messages: Deque[Tuple[Optional[Tuple[str, str]], str]] = deque()
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.writer_task: Optional[asyncio.Task] = None
+    
+    def put(self, key: Optional[Tuple[str, str]], encoded: str):
+        if key is not None:
+            for index, (pending_key, _) in enumerate(self.messages):
+                if pending_key == key:
+                    self.messages[index] = (key, encoded)
+                    self.coalesced += 1
+                    return
+        
+        if len(self.messages) >= self.max_messages:
+            self.messages.popleft()
+            self.dropped += 1
+        
+        self.messages.append((key, encoded))
+        self.ready.set()
+    
+    async def get_batch(self, window_seconds: float, max_messages: int) -> List[str]:
+        """Wait for a message, give a burst window_seconds to arrive, then take up to max_messages"""
+        while not self.messages:
+            self.ready.clear()
+            await self.ready.wait()
+        if window_seconds and len(self.messages) < max_messages:
+            await asyncio.sleep(window_seconds)
+        
+        batch = []
+        while self.messages and len(batch) < max_messages:
+            batch.append(self.messages.popleft()[1])
+        return batch
+
+
+def _coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    message_type = message.get("type")
+    if message_type not in COALESCE_TYPES:
+        return None
+    scope = message.get("deployment_id") or message.get("session_id") or ""
+    return (message_type, str(scope))
+
 
 class WebSocketManager:
     """
@@ -21,6 +84,18 @@ class WebSocketManager:
     Supports session-based communication and broadcasting
     """
     
+    # Per-connection outbound backlog before the oldest messages are dropped
+    MAX_OUTBOUND_MESSAGES = 100
+    # A send that takes longer than this marks the client as stuck
+    SEND_TIMEOUT_SECONDS = 10.0
+    # Messages queued within this window go out together as one batch frame
+    BATCH_WINDOW_SECONDS = 0.005
+    MAX_BATCH_MESSAGES = 50
+    # Offline backlog limits (per session/user, number of keys, age)
+    OFFLINE_QUEUE_MAX_MESSAGES = 50
+    OFFLINE_QUEUE_MAX_KEYS = 1000
+    OFFLINE_QUEUE_TTL_SECONDS = 3600
+    
     def __init__(self):
         # Session ID -> Set of WebSocket connections
         self.session_connections: Dict[str, Set[WebSocket]] = defaultdict(set)
@@ -31,14 +106,23 @@ class WebSocketManager:
         # WebSocket -> Connection info
         self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
         
+        # Every registered connection, maintained incrementally for broadcast
+        self.all_connections: Set[WebSocket] = set()
+        
+        # WebSocket -> outbound queue drained by a per-connection writer task
+        self.outbound_queues: Dict[WebSocket, _OutboundQueue] = {}
+        
         # Active connections count
         self.active_connections = 0
         
-        # Message queue for offline users
-        self.message_queue: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # Message queue for offline users: key -> deque of (expires_at, encoded message), LRU by key
+        self.message_queue: "OrderedDict[str, Deque[Tuple[float, str]]]" = OrderedDict()
         
         # Heartbeat tracking
         self.heartbeat_tasks: Dict[WebSocket, asyncio.Task] = {}
+        
+        # Messages dropped or coalesced on behalf of closed connections
+        self.slow_consumer_stats = {"dropped": 0, "coalesced": 0, "send_timeouts": 0}
     
     async def connect(
         self,
@@ -65,6 +149,17 @@ class WebSocketManager:
                 "connected_at": datetime.utcnow(),
                 "last_heartbeat": datetime.utcnow()
             }
+            self.all_connections.add(websocket)
+            self._start_writer(websocket)
+            
+            # Send connection confirmation ahead of any backlog
+            self._enqueue(websocket, {
+                "type": "connection_established",
+                "connection_id": connection_id,
+                "session_id": session_id,
+                "user_id": user_id,
+                "timestamp": datetime.utcnow().isoformat()
+            })
             
             # Register connection for session
             if session_id:
@@ -87,15 +182,6 @@ class WebSocketManager:
                 self._heartbeat_loop(websocket)
             )
             
-            # Send connection confirmation
-            await self._send_to_websocket(websocket, {
-                "type": "connection_established",
-                "connection_id": connection_id,
-                "session_id": session_id,
-                "user_id": user_id,
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            
             logger.info(f"WebSocket connection established: {connection_id}")
             
         except Exception as e:
@@ -129,11 +215,21 @@ class WebSocketManager:
             # Remove connection info
             if websocket in self.connection_info:
                 del self.connection_info[websocket]
+            self.all_connections.discard(websocket)
+            
+            # Stop the writer (unless it is the caller) and keep its counters
+            outbound = self.outbound_queues.pop(websocket, None)
+            if outbound is not None:
+                self.slow_consumer_stats["dropped"] += outbound.dropped
+                self.slow_consumer_stats["coalesced"] += outbound.coalesced
+                if outbound.writer_task and outbound.writer_task is not asyncio.current_task():
+                    outbound.writer_task.cancel()
             
             # Cancel heartbeat task
             if websocket in self.heartbeat_tasks:
-                self.heartbeat_tasks[websocket].cancel()
-                del self.heartbeat_tasks[websocket]
+                heartbeat_task = self.heartbeat_tasks.pop(websocket)
+                if heartbeat_task is not asyncio.current_task():
+                    heartbeat_task.cancel()
             
             self.active_connections = max(0, self.active_connections - 1)
             
@@ -149,31 +245,18 @@ class WebSocketManager:
         Broadcasts message to all WebSocket connections associated with the session
         """
         try:
-            connections = self.session_connections.get(session_id, set())
+            connections = self.session_connections.get(session_id)
             
             if not connections:
                 # Queue message for when session connects
-                self.message_queue[f"session:{session_id}"].append({
-                    **message,
-                    "queued_at": datetime.utcnow().isoformat()
-                })
+                self._queue_offline(f"session:{session_id}", message)
                 logger.debug(f"Message queued for session {session_id}")
                 return
             
-            # Send to all active connections
-            disconnected = []
-            for websocket in connections:
-                try:
-                    await self._send_to_websocket(websocket, message)
-                except Exception as e:
-                    logger.warning(f"Failed to send to WebSocket: {str(e)}")
-                    disconnected.append(websocket)
+            # Hand off to each connection's writer; slow clients don't hold up the rest
+            self._fan_out(connections, message)
             
-            # Clean up disconnected WebSockets
-            for websocket in disconnected:
-                await self.disconnect(websocket)
-            
-            logger.debug(f"Message sent to {len(connections) - len(disconnected)} connections for session {session_id}")
+            logger.debug(f"Message queued to {len(connections)} connections for session {session_id}")
             
         except Exception as e:
             logger.error(f"Failed to send message to session {session_id}: {str(e)}")
@@ -185,31 +268,18 @@ class WebSocketManager:
         Broadcasts message to all WebSocket connections associated with the user
         """
         try:
-            connections = self.user_connections.get(user_id, set())
+            connections = self.user_connections.get(user_id)
             
             if not connections:
                 # Queue message for when user connects
-                self.message_queue[f"user:{user_id}"].append({
-                    **message,
-                    "queued_at": datetime.utcnow().isoformat()
-                })
+                self._queue_offline(f"user:{user_id}", message)
                 logger.debug(f"Message queued for user {user_id}")
                 return
             
-            # Send to all active connections
-            disconnected = []
-            for websocket in connections:
-                try:
-                    await self._send_to_websocket(websocket, message)
-                except Exception as e:
-                    logger.warning(f"Failed to send to WebSocket: {str(e)}")
-                    disconnected.append(websocket)
-            
-            # Clean up disconnected WebSockets
-            for websocket in disconnected:
-                await self.disconnect(websocket)
+            # Hand off to each connection's writer; slow clients don't hold up the rest
+            self._fan_out(connections, message)
             
-            logger.debug(f"Message sent to {len(connections) - len(disconnected)} connections for user {user_id}")
+            logger.debug(f"Message queued to {len(connections)} connections for user {user_id}")
             
         except Exception as e:
             logger.error(f"Failed to send message to user {user_id}: {str(e)}")
@@ -221,34 +291,11 @@ class WebSocketManager:
         Optionally excludes connections from a specific session
         """
         try:
-            all_connections = set()
-            
-            # Collect all connections
-            for connections in self.session_connections.values():
-                all_connections.update(connections)
-            
-            for connections in self.user_connections.values():
-                all_connections.update(connections)
+            excluded_connections = self.session_connections.get(exclude_session) if exclude_session else None
             
-            # Remove excluded session connections
-            if exclude_session:
-                excluded_connections = self.session_connections.get(exclude_session, set())
-                all_connections = all_connections - excluded_connections
+            recipients = self._fan_out(self.all_connections, message, exclude=excluded_connections)
             
-            # Send to all connections
-            disconnected = []
-            for websocket in all_connections:
-                try:
-                    await self._send_to_websocket(websocket, message)
-                except Exception as e:
-                    logger.warning(f"Failed to send broadcast to WebSocket: {str(e)}")
-                    disconnected.append(websocket)
-            
-            # Clean up disconnected WebSockets
-            for websocket in disconnected:
-                await self.disconnect(websocket)
-            
-            logger.info(f"Broadcast sent to {len(all_connections) - len(disconnected)} connections")
+            logger.info(f"Broadcast queued to {recipients} connections")
             
         except Exception as e:
             logger.error(f"Broadcast failed: {str(e)}")
@@ -261,6 +308,7 @@ class WebSocketManager:
             # Update existing connection with session
             self.connection_info[websocket]["session_id"] = session_id
             self.session_connections[session_id].add(websocket)
+            self.all_connections.add(websocket)
     
     async def remove_connection(self, session_id: str, websocket: WebSocket):
         """Remove WebSocket connection from session (compatibility method)"""
@@ -295,6 +343,11 @@ class WebSocketManager:
                 "session_connections": len(self.session_connections),
                 "user_connections": len(self.user_connections),
                 "queued_messages": sum(len(messages) for messages in self.message_queue.values()),
+                "offline_queues": len(self.message_queue),
+                "outbound_pending": sum(len(q.messages) for q in self.outbound_queues.values()),
+                "outbound_dropped": self.slow_consumer_stats["dropped"] + sum(q.dropped for q in self.outbound_queues.values()),
+                "outbound_coalesced": self.slow_consumer_stats["coalesced"] + sum(q.coalesced for q in self.outbound_queues.values()),
+                "send_timeouts": self.slow_consumer_stats["send_timeouts"],
                 "connections_by_session": {
                     session_id: len(connections)
                     for session_id, connections in self.session_connections.items()
@@ -313,7 +366,7 @@ class WebSocketManager:
             stale_connections = []
             
             # Find stale connections (no heartbeat for 5 minutes)
-            for websocket, info in self.connection_info.items():
+            for websocket, info in list(self.connection_info.items()):
                 last_heartbeat = info.get("last_heartbeat")
                 if last_heartbeat and (now - last_heartbeat).total_seconds() > 300:
                     stale_connections.append(websocket)
@@ -322,20 +375,12 @@ class WebSocketManager:
             for websocket in stale_connections:
                 await self.disconnect(websocket)
             
-            # Clean up old queued messages (older than 1 hour)
+            # Clean up expired queued messages
             expired_keys = []
-            for key, messages in self.message_queue.items():
-                self.message_queue[key] = [
-                    msg for msg in messages
-                    if "queued_at" in msg and 
-                    (now - datetime.fromisoformat(msg["queued_at"])).total_seconds() < 3600
-                ]
-                if not self.message_queue[key]:
+            for key in list(self.message_queue):
+                if not self._prune_offline(key):
                     expired_keys.append(key)
             
-            for key in expired_keys:
-                del self.message_queue[key]
-            
             if stale_connections or expired_keys:
                 logger.info(f"Cleaned up {len(stale_connections)} stale connections and {len(expired_keys)} expired message queues")
                 
@@ -344,6 +389,72 @@ class WebSocketManager:
     
     # Private methods
     
+    def _fan_out(
+        self,
+        connections: Set[WebSocket],
+        message: Dict[str, Any],
+        exclude: Optional[Set[WebSocket]] = None
+    ) -> int:
+        """Encode one message once and queue it on many connections without awaiting any send"""
+        key, encoded = self._encode(message)
+        
+        recipients = 0
+        for websocket in connections:
+            if exclude and websocket in exclude:
+                continue
+            self._enqueue_encoded(websocket, key, encoded)
+            recipients += 1
+        return recipients
+    
+    def _encode(self, message: Dict[str, Any]) -> Tuple[Optional[Tuple[str, str]], str]:
+        if "timestamp" not in message:
+            message["timestamp"] = datetime.utcnow().isoformat()
+        return _coalesce_key(message), encode_message(message)
+    
+    def _enqueue(self, websocket: WebSocket, message: Dict[str, Any]):
+        self._enqueue_encoded(websocket, *self._encode(message))
+    
+    def _enqueue_encoded(self, websocket: WebSocket, key: Optional[Tuple[str, str]], encoded: str):
+        outbound = self.outbound_queues.get(websocket)
+        if outbound is None:
+            outbound = self._start_writer(websocket)
+        outbound.put(key, encoded)
+    
+    def _start_writer(self, websocket: WebSocket) -> _OutboundQueue:
+        outbound = self.outbound_queues.get(websocket)
+        if outbound is None:
+            outbound = _OutboundQueue(self.MAX_OUTBOUND_MESSAGES)
+            self.outbound_queues[websocket] = outbound
+            outbound.writer_task = asyncio.create_task(self._writer_loop(websocket, outbound))
+        return outbound
+    
+    async def _writer_loop(self, websocket: WebSocket, outbound: _OutboundQueue):
+        """Drain one connection's outbound queue; a failed or stuck send closes it"""
+        try:
+            while True:
+                batch = await outbound.get_batch(self.BATCH_WINDOW_SECONDS, self.MAX_BATCH_MESSAGES)
+                try:
+                    await asyncio.wait_for(
+                        websocket.send_text(build_batch_frame(batch)),
+                        timeout=self.SEND_TIMEOUT_SECONDS
+                    )
+                    outbound.sent += len(batch)
+                except asyncio.TimeoutError:
+                    self.slow_consumer_stats["send_timeouts"] += 1
+                    logger.warning(f"WebSocket send timed out after {self.SEND_TIMEOUT_SECONDS}s, dropping slow client")
+                    break
+                except WebSocketDisconnect:
+                    logger.debug("WebSocket closed by the client, stopping its writer")
+                    break
+                except Exception as e:
+                    logger.warning(f"Failed to send to WebSocket: {str(e)}")
+                    break
+        except asyncio.CancelledError:
+            return
+        
+        if self.outbound_queues.get(websocket) is outbound:
+            await self.disconnect(websocket)
+    
     async def _send_to_websocket(self, websocket: WebSocket, message: Dict[str, Any]):
         """Send message to a specific WebSocket connection"""
         try:
@@ -352,7 +463,7 @@ class WebSocketManager:
                 message["timestamp"] = datetime.utcnow().isoformat()
             
             # Convert to JSON string
-            message_str = json.dumps(message, default=str)
+            message_str = encode_message(message)
             
             # Send message
             await websocket.send_text(message_str)
@@ -361,70 +472,81 @@ class WebSocketManager:
             logger.error(f"Failed to send WebSocket message: {str(e)}")
             raise
     
+    def _queue_offline(self, queue_key: str, message: Dict[str, Any]):
+        """Keep a message for a session/user with no open connection (capped and TTL-bound)"""
+        messages = self.message_queue.get(queue_key)
+        if messages is None:
+            messages = deque(maxlen=self.OFFLINE_QUEUE_MAX_MESSAGES)
+            self.message_queue[queue_key] = messages
+            # Evict the least recently used backlog when there are too many
+            while len(self.message_queue) > self.OFFLINE_QUEUE_MAX_KEYS:
+                self.message_queue.popitem(last=False)
+        else:
+            self.message_queue.move_to_end(queue_key)
+        
+        messages.append((
+            time.monotonic() + self.OFFLINE_QUEUE_TTL_SECONDS,
+            encode_message({**message, "queued_at": datetime.utcnow().isoformat()})
+        ))
+    
+    def _prune_offline(self, queue_key: str) -> bool:
+        """Drop expired messages from a backlog; returns False if it is now empty (and removed)"""
+        messages = self.message_queue.get(queue_key)
+        if messages is None:
+            return False
+        
+        now = time.monotonic()
+        while messages and messages[0][0] <= now:
+            messages.popleft()
+        
+        if not messages:
+            del self.message_queue[queue_key]
+            return False
+        return True
+    
     async def _send_queued_messages(self, session_id: str, websocket: WebSocket):
         """Send queued messages for a session to a WebSocket"""
-        try:
-            queue_key = f"session:{session_id}"
-            messages = self.message_queue.get(queue_key, [])
-            
-            for message in messages:
-                try:
-                    await self._send_to_websocket(websocket, message)
-                except Exception as e:
-                    logger.warning(f"Failed to send queued message: {str(e)}")
-            
-            # Clear sent messages
-            if queue_key in self.message_queue:
-                del self.message_queue[queue_key]
-            
-            if messages:
-                logger.info(f"Sent {len(messages)} queued messages for session {session_id}")
-                
-        except Exception as e:
-            logger.error(f"Failed to send queued messages: {str(e)}")
+        await self._flush_offline(f"session:{session_id}", websocket)
     
     async def _send_queued_user_messages(self, user_id: str, websocket: WebSocket):
         """Send queued messages for a user to a WebSocket"""
+        await self._flush_offline(f"user:{user_id}", websocket)
+    
+    async def _flush_offline(self, queue_key: str, websocket: WebSocket):
         try:
-            queue_key = f"user:{user_id}"
-            messages = self.message_queue.get(queue_key, [])
+            if not self._prune_offline(queue_key):
+                return
             
-            for message in messages:
-                try:
-                    await self._send_to_websocket(websocket, message)
-                except Exception as e:
-                    logger.warning(f"Failed to send queued message: {str(e)}")
+            messages = self.message_queue.pop(queue_key)
+            for _, encoded in messages:
+                self._enqueue_encoded(websocket, None, encoded)
             
-            # Clear sent messages
-            if queue_key in self.message_queue:
-                del self.message_queue[queue_key]
+            logger.info(f"Queued {len(messages)} backlog messages for {queue_key}")
             
-            if messages:
-                logger.info(f"Sent {len(messages)} queued messages for user {user_id}")
-                
         except Exception as e:
-            logger.error(f"Failed to send queued user messages: {str(e)}")
+            logger.error(f"Failed to send queued messages: {str(e)}")
     
     async def _heartbeat_loop(self, websocket: WebSocket):
         """Heartbeat loop to keep connection alive and detect disconnections"""
         try:
+            sent_at_last_beat = -1
             while websocket in self.connection_info:
-                try:
-                    # Send ping
-                    await websocket.ping()
-                    
-                    # Update last heartbeat
+                # Wait for next heartbeat
+                await asyncio.sleep(30)  # 30 seconds
+                
+                outbound = self.outbound_queues.get(websocket)
+                if outbound is None:
+                    break
+                
+                # Update last heartbeat while the client keeps draining its queue
+                if not outbound.messages or outbound.sent != sent_at_last_beat:
                     if websocket in self.connection_info:
                         self.connection_info[websocket]["last_heartbeat"] = datetime.utcnow()
-                    
-                    # Wait for next heartbeat
-                    await asyncio.sleep(30)  # 30 seconds
-                    
-                except (WebSocketDisconnect, ConnectionError):
-                    break
-                except Exception as e:
-                    logger.warning(f"Heartbeat failed: {str(e)}")
-                    break
+                sent_at_last_beat = outbound.sent
+                
+                # Ping through the writer so sends on this socket never interleave;
+                # a send failure there disconnects the client
+                self._enqueue(websocket, {"type": "heartbeat"})
             
         except asyncio.CancelledError:
             pass  # Task was cancelled, this is expected
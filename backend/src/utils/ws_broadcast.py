@@ -0,0 +1,113 @@
+"""
+WebSocket broadcast helpers
+Encode a message once and share the resulting frame across every recipient
+"""
+
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """JSON-encode a message for a text frame (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(
+                message,
+                default=str,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    return json.dumps(message, default=str)
+
+
+def build_batch_frame(encoded_messages: List[str]) -> str:
+    """
+    Combine already-encoded messages into one frame without re-encoding them
+    
+    A single message is sent as-is; several become
+    ``{"type": "batch", "count": n, "messages": [...]}``.
+    """
+    if len(encoded_messages) == 1:
+        return encoded_messages[0]
+    return f'{{"type":"batch","count":{len(encoded_messages)},"messages":[{",".join(encoded_messages)}]}}'
+
+
+class BroadcastBatcher:
+    """
+    Groups messages for the same target that arrive within a short window
+    
+    Each message is encoded once when added; when the window closes (or the
+    batch is full) the encoded messages are joined into one frame and handed
+    to ``send(target, frame)``, which delivers the same text to every
+    subscriber of that target.
+    """
+    
+    def __init__(
+        self,
+        send: Callable[[str, str], Awaitable[None]],
+        window_seconds: float = 0.005,
+        max_batch: int = 100
+    ):
+        self.send = send
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[str]] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {"messages": 0, "frames": 0}
+    
+    def add(self, target: str, message: Dict[str, Any], encoded: Optional[str] = None):
+        pending = self._pending.setdefault(target, [])
+        pending.append(encoded if encoded is not None else encode_message(message))
+        self.stats["messages"] += 1
+        
+        if len(pending) >= self.max_batch:
+            task = self._flush_tasks.pop(target, None)
+            if task is not None:
+                task.cancel()
+            asyncio.create_task(self.flush(target))
+        elif target not in self._flush_tasks:
+            self._flush_tasks[target] = asyncio.create_task(self._flush_after_window(target))
+    
+    async def flush(self, target: str):
+        encoded_messages = self._pending.pop(target, None)
+        if not encoded_messages:
+            return
+        self.stats["frames"] += 1
+        try:
+            await self.send(target, build_batch_frame(encoded_messages))
+        except Exception as e:
+            logger.error(f"Failed to flush broadcast batch for {target}: {e}")
+    
+    async def flush_all(self):
+        for task in self._flush_tasks.values():
+            task.cancel()
+        self._flush_tasks.clear()
+        for target in list(self._pending):
+            await self.flush(target)
+    
+    def cancel_pending(self):
+        """Drop unsent batches (shutdown)"""
+        for task in self._flush_tasks.values():
+            task.cancel()
+        self._flush_tasks.clear()
+        self._pending.clear()
+    
+    async def _flush_after_window(self, target: str):
+        try:
+            await asyncio.sleep(self.window_seconds)
+        except asyncio.CancelledError:
+            return
+        self._flush_tasks.pop(target, None)
+        await self.flush(target)
@@ -0,0 +1,252 @@
+"""
+ZIP Upload Ingestion
+Streams uploads to disk and extracts them with size, ratio and entry-count limits
+"""
+
+import os
+import stat
+import asyncio
+import logging
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiofiles
+except ImportError:  # Writes fall back to a worker thread per chunk
+    aiofiles = None
+
+# Directories never extracted from uploads (or indexed from disk)
+SKIPPED_DIRECTORIES = {"node_modules", ".git"}
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+EXTRACT_CHUNK_SIZE = 256 * 1024
+# Small, highly repetitive files legitimately exceed any ratio limit
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """Upload violates an ingestion limit (maps to HTTP 413/400)"""
+    
+    def __init__(self, message: str, status_code: int = 413):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class UploadLimits:
+    """Ingestion limits; defaults overridable via CODEFLOWOPS_UPLOAD_* variables"""
+    max_upload_bytes: int = 200 * 1024 * 1024
+    max_uncompressed_bytes: int = 1024 * 1024 * 1024
+    max_entry_bytes: int = 200 * 1024 * 1024
+    max_files: int = 20000
+    max_compression_ratio: float = 100.0
+    
+    @classmethod
+    def from_env(cls) -> "UploadLimits":
+        defaults = cls()
+        return cls(
+            max_upload_bytes=int(os.getenv("CODEFLOWOPS_UPLOAD_MAX_BYTES", defaults.max_upload_bytes)),
+            max_uncompressed_bytes=int(os.getenv("CODEFLOWOPS_UPLOAD_MAX_UNCOMPRESSED_BYTES", defaults.max_uncompressed_bytes)),
+            max_entry_bytes=int(os.getenv("CODEFLOWOPS_UPLOAD_MAX_ENTRY_BYTES", defaults.max_entry_bytes)),
+            max_files=int(os.getenv("CODEFLOWOPS_UPLOAD_MAX_FILES", defaults.max_files)),
+            max_compression_ratio=float(os.getenv("CODEFLOWOPS_UPLOAD_MAX_RATIO", defaults.max_compression_ratio))
+        )
+
+
+@dataclass
+class RepositoryFileIndex:
+    """
+    Relative paths and sizes of every file in a repository tree
+    
+    Built once (during extraction, or by a single directory walk) and
+    shared by analysis steps that would otherwise each walk the tree.
+    """
+    root: str
+    files: Dict[str, int] = field(default_factory=dict)  # posix relative path -> size
+    directories: Set[str] = field(default_factory=set)
+    skipped_entries: int = 0
+    
+    @property
+    def file_count(self) -> int:
+        return len(self.files)
+    
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.files.values())
+    
+    def add_file(self, relative_path: str, size: int):
+        self.files[relative_path] = size
+        parent = PurePosixPath(relative_path).parent
+        while str(parent) != ".":
+            self.directories.add(str(parent))
+            parent = parent.parent
+    
+    def exists(self, relative_path: str) -> bool:
+        return relative_path in self.files or relative_path in self.directories
+    
+    def with_suffix(self, suffixes: Iterable[str]) -> List[str]:
+        suffixes = tuple(suffixes)
+        return [path for path in self.files if path.endswith(suffixes)]
+    
+    def absolute(self, relative_path: str) -> str:
+        return os.path.join(self.root, *relative_path.split("/"))
+    
+    @classmethod
+    def from_directory(cls, root: str, skip_dirs: Set[str] = SKIPPED_DIRECTORIES) -> "RepositoryFileIndex":
+        """Index an existing tree with a single walk"""
+        index = cls(root=str(root))
+        for current, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d not in skip_dirs]
+            relative_root = os.path.relpath(current, root)
+            for name in files:
+                relative = name if relative_root == "." else f"{relative_root}/{name}".replace(os.sep, "/")
+                try:
+                    index.add_file(relative, os.path.getsize(os.path.join(current, name)))
+                except OSError:
+                    continue
+        return index
+
+
+async def save_upload_stream(upload, destination: Path, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Stream an UploadFile to disk chunk by chunk without blocking the event loop
+    
+    Raises UploadRejected (and removes the partial file) once max_bytes is exceeded.
+    """
+    written = 0
+    try:
+        if aiofiles is not None:
+            async with aiofiles.open(destination, "wb") as out:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise UploadRejected(f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+                    await out.write(chunk)
+        else:
+            out = await asyncio.to_thread(open, destination, "wb")
+            try:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise UploadRejected(f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+                    await asyncio.to_thread(out.write, chunk)
+            finally:
+                await asyncio.to_thread(out.close)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def extract_zip_bounded(zip_path: Path, extract_path: Path, limits: UploadLimits) -> RepositoryFileIndex:
+    """
+    Extract a ZIP archive entry by entry, enforcing limits on what is actually written
+    
+    Declared sizes are checked up front, but the byte counts that matter are
+    the ones produced while decompressing, so a forged header cannot slip a
+    zip bomb through. Entries under node_modules/.git, symlinks and paths
+    escaping the extraction root are skipped. Returns the index of what was
+    extracted.
+    """
+    extract_root = extract_path.resolve()
+    index = RepositoryFileIndex(root=str(extract_root))
+    total_written = 0
+    
+    try:
+        archive = zipfile.ZipFile(zip_path, "r")
+    except zipfile.BadZipFile:
+        raise UploadRejected("File is not a valid ZIP archive", status_code=400)
+    
+    with archive:
+        for info in archive.infolist():
+            relative = _safe_relative_path(info.filename)
+            if relative is None or _is_symlink(info) or any(part in SKIPPED_DIRECTORIES for part in relative.parts):
+                index.skipped_entries += 1
+                continue
+            
+            target = extract_root.joinpath(*relative.parts)
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            
+            if index.file_count >= limits.max_files:
+                raise UploadRejected(f"Archive contains more than {limits.max_files} files")
+            if info.file_size > limits.max_entry_bytes:
+                raise UploadRejected(f"Archive entry {relative} exceeds the per-file size limit")
+            if _ratio_exceeded(info.file_size, info.compress_size, limits):
+                raise UploadRejected(f"Archive entry {relative} has a suspicious compression ratio")
+            
+            target.parent.mkdir(parents=True, exist_ok=True)
+            entry_written = 0
+            with archive.open(info) as source, open(target, "wb") as out:
+                while True:
+                    chunk = source.read(EXTRACT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry_written += len(chunk)
+                    total_written += len(chunk)
+                    if entry_written > limits.max_entry_bytes:
+                        raise UploadRejected(f"Archive entry {relative} exceeds the per-file size limit")
+                    if total_written > limits.max_uncompressed_bytes:
+                        raise UploadRejected("Archive exceeds the uncompressed size limit")
+                    if _ratio_exceeded(entry_written, info.compress_size, limits):
+                        raise UploadRejected(f"Archive entry {relative} has a suspicious compression ratio")
+                    out.write(chunk)
+            
+            index.add_file(relative.as_posix(), entry_written)
+    
+    return index
+
+
+def _safe_relative_path(name: str) -> Optional[PurePosixPath]:
+    """Normalized relative path for an entry, or None if it is absolute or escapes the root"""
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.is_absolute() or (path.parts and path.parts[0].endswith(":")):
+        return None
+    parts = [part for part in path.parts if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return PurePosixPath(*parts)
+
+
+def _ratio_exceeded(uncompressed: int, compressed: int, limits: UploadLimits) -> bool:
+    if uncompressed < RATIO_CHECK_MIN_BYTES:
+        return False
+    return uncompressed / max(compressed, 1) > limits.max_compression_ratio
+
+
+def _is_symlink(info: zipfile.ZipInfo) -> bool:
+    return stat.S_ISLNK(info.external_attr >> 16)
+
+
+# Indexes of recently ingested trees, looked up by the analyzer instead of re-walking
+MAX_REMEMBERED_INDEXES = 64
+_file_indexes: "OrderedDict[str, RepositoryFileIndex]" = OrderedDict()
+
+
+def remember_file_index(index: RepositoryFileIndex):
+    _file_indexes[index.root] = index
+    _file_indexes.move_to_end(index.root)
+    while len(_file_indexes) > MAX_REMEMBERED_INDEXES:
+        _file_indexes.popitem(last=False)
+
+
+def get_file_index(root: str) -> Optional[RepositoryFileIndex]:
+    """Index recorded at ingestion time for this tree, if it is still on disk"""
+    key = str(Path(root).resolve())
+    index = _file_indexes.get(key)
+    if index is not None and not os.path.isdir(key):
+        del _file_indexes[key]
+        return None
+    return index
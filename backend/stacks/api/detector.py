@@ -6,10 +6,29 @@ from pathlib import Path
 from typing import Optional
 from core.models import StackPlan
 from core.utils import find_files, check_file_exists
+from core.detection import StackRules, has_content, has_dependency, has_path
 
 class ApiDetector:
     """Detects backend API projects that should use ECS/Lambda instead of static hosting"""
     
+    # One of the manifests (or a root PHP file) is required before detect() runs
+    rules = StackRules("api", [
+        has_path("package.json", weight=1, required=True),
+        has_path("requirements.txt", weight=1, required=True),
+        has_path("composer.json", weight=1, required=True),
+        has_path("pom.xml", weight=1, required=True),
+        has_path("*.php", weight=0.5, required=True),
+        has_dependency("express", weight=3),
+        has_dependency("fastify", weight=3),
+        has_dependency("@nestjs/core", weight=3),
+        has_dependency("koa", weight=3),
+        has_dependency("flask", manifest="requirements.txt", weight=3),
+        has_dependency("django", manifest="requirements.txt", weight=3),
+        has_dependency("fastapi", manifest="requirements.txt", weight=3),
+        has_dependency("slim/slim", manifest="composer.json", weight=3),
+        has_content("pom.xml", r"spring-boot|quarkus", weight=3),
+    ])
+    
     def detect(self, repo_dir: Path) -> Optional[StackPlan]:
         """
         Detect if repository contains a backend API project
@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any
 from core.models import StackPlan
 from core.utils import find_files, check_file_exists
+from core.detection import get_repo_index
 
 class NonDeployableDetector:
     """Detects repositories that are not meant for web deployment"""
@@ -199,14 +200,7 @@ class NonDeployableDetector:
     
     def _count_file_types(self, repo_dir: Path) -> Dict[str, int]:
         """Count files by extension"""
-        file_counts = {}
-        
-        for file_path in repo_dir.rglob('*'):
-            if file_path.is_file() and not any(part.startswith('.git') for part in file_path.parts):
-                ext = file_path.suffix.lower()
-                file_counts[ext] = file_counts.get(ext, 0) + 1
-                
-        return file_counts
+        return get_repo_index(repo_dir).extension_counts(exclude_prefix='.git')
     
     def get_priority(self) -> int:
         """Non-deployable detection should run early to catch obvious cases"""
@@ -2,7 +2,6 @@
 PHP Stack Deployer
 """
 import logging
-import boto3
 import json
 import base64
 import time
@@ -14,6 +13,8 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from core.interfaces import StackDeployer
 from core.models import DeployResult, StackPlan
+from core.production_hardening import protect_client, credential_fingerprint
+from core.aws_clients import get_aws_client, get_aws_session
 
 logger = logging.getLogger(__name__)
 
@@ -114,7 +115,7 @@ class PHPDeployer(StackDeployer):
             environment_vars = self._prepare_environment_variables(app_requirements, infrastructure_config)
             
             # Step 3: Create App Runner service with universal configuration
-            apprunner_client = boto3.client('apprunner', **self.credentials)
+            apprunner_client = self._aws_client('apprunner')
             service_name = f"{repo_name}-service"
             
             # Detect port and health path from application requirements
@@ -245,7 +246,7 @@ class PHPDeployer(StackDeployer):
             image_uri = self._deploy_container_image({'cluster_name': f'{repo_name}-cluster'}, build_result, deployment_logs)
             
             # Step 2: Create App Runner service
-            apprunner_client = boto3.client('apprunner', **self.credentials)
+            apprunner_client = self._aws_client('apprunner')
             
             service_name = f"{repo_name}-service"
             
@@ -435,7 +436,7 @@ class PHPDeployer(StackDeployer):
         if not access_key or not secret_key:
             raise ValueError("AWS credentials are required: aws_access_key_id and aws_secret_access_key")
         
-        session = boto3.Session(
+        session = get_aws_session(
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
             region_name=region
@@ -448,13 +449,16 @@ class PHPDeployer(StackDeployer):
             'region_name': region
         }
         
-        self.ecs_client = session.client('ecs')
-        self.ecr_client = session.client('ecr')
-        self.elbv2_client = session.client('elbv2')
-        self.cloudfront_client = session.client('cloudfront')
-        self.s3_client = session.client('s3')
-        self.logs_client = session.client('logs')
-        self.iam_client = session.client('iam')
+        # Every AWS call goes through the (service, region, tenant) circuit breaker
+        self.tenant_key = credential_fingerprint(access_key)
+        
+        self.ecs_client = protect_client(session.client('ecs'), self.tenant_key)
+        self.ecr_client = protect_client(session.client('ecr'), self.tenant_key)
+        self.elbv2_client = protect_client(session.client('elbv2'), self.tenant_key)
+        self.cloudfront_client = protect_client(session.client('cloudfront'), self.tenant_key)
+        self.s3_client = protect_client(session.client('s3'), self.tenant_key)
+        self.logs_client = protect_client(session.client('logs'), self.tenant_key)
+        self.iam_client = protect_client(session.client('iam'), self.tenant_key)
         
         # Store credentials for other clients that need them
         self.credentials = {
@@ -463,6 +467,10 @@ class PHPDeployer(StackDeployer):
             'region_name': region
         }
     
+    def _aws_client(self, service: str):
+        """Create an ad-hoc AWS client guarded by the shared circuit breaker registry"""
+        return protect_client(get_aws_client(service, **self.credentials), getattr(self, 'tenant_key', None))
+    
     def _deploy_container_image(self, config: Dict[str, Any], build_result: Any, logs: list) -> str:
         """Create ECR repository and build/push Docker image"""
         
@@ -948,7 +956,7 @@ CMD ["/usr/bin/supervisord", "-c", "/etc/supervisor/conf.d/supervisord.conf"]
         
         try:
             # Get VPC information (try default VPC first, create if needed)
-            ec2_client = boto3.client('ec2', **self.credentials)
+            ec2_client = self._aws_client('ec2')
             
             # Try to get default VPC first
             vpcs = ec2_client.describe_vpcs(Filters=[{'Name': 'is-default', 'Values': ['true']}])
@@ -1125,7 +1133,7 @@ CMD ["/usr/bin/supervisord", "-c", "/etc/supervisor/conf.d/supervisord.conf"]
         try:
             # Use the VPC and subnets provided from load balancer creation
             # (no more default VPC lookup - use what was already created)
-            ec2_client = boto3.client('ec2', **self.credentials)
+            ec2_client = self._aws_client('ec2')
             logs.append(f"🌐 Using VPC {vpc_id} with {len(subnet_ids)} subnets for service")
             
             # Create security group for ECS service
@@ -1438,7 +1446,7 @@ CMD ["/usr/bin/supervisord", "-c", "/etc/supervisor/conf.d/supervisord.conf"]
     def _get_account_id(self) -> str:
         """Get AWS account ID"""
         try:
-            sts_client = boto3.client('sts', **self.credentials)
+            sts_client = self._aws_client('sts')
             return sts_client.get_caller_identity()['Account']
         except Exception:
             # Fallback to a default role ARN construction
@@ -1792,7 +1800,7 @@ CMD ["/usr/bin/supervisord", "-c", "/etc/supervisor/conf.d/supervisord.conf"]
         logs.append(f"🔄 Creating ECS service for {app_type}: {service_name}")
         
         try:
-            ec2_client = boto3.client('ec2', **self.credentials)
+            ec2_client = self._aws_client('ec2')
             logs.append(f"🌐 Using VPC {vpc_id} with {len(subnet_ids)} subnets for {app_type} service")
             
             # Create security group for ECS service
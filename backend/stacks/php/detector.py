@@ -11,12 +11,14 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from core.interfaces import StackDetector
 from core.models import StackPlan
+from core.detection import get_repo_index, shares_repo_index
 
 logger = logging.getLogger(__name__)
 
 class PHPDetector(StackDetector):
     """Universal PHP Application Detector - Supports Laravel, BookStack, WordPress, and more"""
     
+    @shares_repo_index("repo_dir")
     def detect(self, repo_dir: Path, context: Optional[dict] = None) -> Optional[StackPlan]:
         """Intelligent PHP application detection with requirements analysis"""
         
@@ -123,7 +125,8 @@ class PHPDetector(StackDetector):
         if not app_requirements:
             logger.info(f"🔄 No specific PHP app detected, using fallback detection")
             # Fallback 1: Check for any PHP files
-            php_files = list(repo_dir.glob("*.php")) + list(repo_dir.glob("**/*.php"))
+            index = get_repo_index(repo_dir)
+            php_files = index.glob("*.php") + index.glob("**/*.php")
             if php_files:
                 logger.info(f"🌐 Fallback: Detected vanilla PHP with {len(php_files)} files")
                 app_requirements = {
@@ -138,15 +141,8 @@ class PHPDetector(StackDetector):
                 }
             else:
                 # Check if this is a documentation-only repository before PHP fallback
-                file_types = {}
-                total_files = 0
-                for file_path in repo_dir.rglob('*'):
-                    if file_path.is_file() and not any(part.startswith('.git') for part in file_path.parts):
-                        total_files += 1
-                        ext = file_path.suffix.lower()
-                        if ext not in file_types:
-                            file_types[ext] = 0
-                        file_types[ext] += 1
+                file_types = index.extension_counts(exclude_prefix='.git')
+                total_files = sum(file_types.values())
                 
                 # If repository is primarily markdown files, don't treat as PHP
                 md_files = file_types.get('.md', 0)
@@ -247,7 +243,7 @@ class PHPDetector(StackDetector):
         database_info = {"type": "optional", "required": False}
         
         # Check for SQL files
-        sql_files = list(repo_path.glob("**/*.sql"))
+        sql_files = get_repo_index(repo_path).glob("**/*.sql")
         if sql_files:
             logger.info(f"📄 Found {len(sql_files)} SQL files - inferring database requirement")
             database_info = {"type": "mysql", "version": ">=5.7", "required": True}
@@ -280,6 +276,7 @@ class PHPDetector(StackDetector):
         
         return database_info
     
+    @shares_repo_index("repo_path")
     def detect_application_type(self, repo_path: Path) -> Optional[Dict[str, Any]]:
         """🔍 Detect specific PHP application and its requirements"""
         
@@ -389,7 +386,8 @@ class PHPDetector(StackDetector):
             }
         
         # 🌐 Vanilla PHP Detection
-        php_files = list(repo_path.glob("*.php")) + list(repo_path.glob("**/*.php"))
+        index = get_repo_index(repo_path)
+        php_files = index.glob("*.php") + index.glob("**/*.php")
         if php_files:
             logger.info(f"🌐 Vanilla PHP application detected ({len(php_files)} PHP files)")
             return {
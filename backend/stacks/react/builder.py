@@ -3,11 +3,13 @@ React builder - handles install and build process with robust Windows Rollup sup
 """
 import os
 import time
+import shutil
 import logging
 from pathlib import Path
 from core.models import StackPlan, BuildResult
 from core.utils import run_npm_command, find_files
 from core.utils_js import pick_package_manager, robust_install_and_build, has_build_script
+from core.build_cache import get_build_cache
 
 logger = logging.getLogger(__name__)
 
@@ -65,14 +67,56 @@ class ReactBuilder:
             # Check if build script exists
             build_script_exists = has_build_script(repo_dir)
             
-            # Call robust install and build with correct parameters
-            build_success, build_message = robust_install_and_build(
-                run_npm_command,
-                repo_dir,
-                os.environ.copy(),
-                selected_pm,
-                build_script_exists
-            )
+            # Unchanged sources reuse a cached build; unchanged lockfiles reuse node_modules
+            build_cache = get_build_cache()
+            dependency_key = source_key = None
+            cached_output = None
+            if build_cache is not None:
+                dependency_key = build_cache.dependency_key(repo_dir, selected_pm)
+                source_key = build_cache.source_key(repo_dir, dependency_key, f"{selected_pm}:{build_script_exists}")
+                cached_output = build_cache.restore_artifact(source_key, repo_dir)
+            
+            if cached_output is not None:
+                build_success, build_message = True, "✅ Reused cached build output"
+            else:
+                build_env = os.environ.copy()
+                if build_cache is not None:
+                    build_env.update(build_cache.package_manager_env())
+                dependencies_restored = build_cache is not None and build_cache.restore_dependencies(dependency_key, repo_dir)
+                snapshots = []
+                
+                def snapshot_dependencies():
+                    # Taken before the build script can touch node_modules; fallback installs
+                    # may rewrite or delete the lockfile, so only cache what it pins
+                    if build_cache is not None and build_cache.dependency_key(repo_dir, selected_pm) == dependency_key:
+                        snapshots.append(build_cache.snapshot_dependencies(dependency_key, repo_dir))
+                
+                # Call robust install and build with correct parameters
+                build_success, build_message = robust_install_and_build(
+                    run_npm_command,
+                    repo_dir,
+                    build_env,
+                    selected_pm,
+                    build_script_exists,
+                    dependencies_ready=dependencies_restored,
+                    on_installed=snapshot_dependencies
+                )
+                
+                if not build_success and dependencies_restored:
+                    logger.warning("⚠️ Build with cached node_modules failed - retrying with a clean install")
+                    shutil.rmtree(repo_dir / "node_modules", ignore_errors=True)
+                    dependencies_restored = False
+                    build_success, build_message = robust_install_and_build(
+                        run_npm_command, repo_dir, build_env, selected_pm, build_script_exists,
+                        on_installed=snapshot_dependencies
+                    )
+                
+                for snapshot in snapshots:
+                    if (build_success and snapshot is snapshots[-1]
+                            and build_cache.dependency_key(repo_dir, selected_pm) == dependency_key):
+                        build_cache.commit_snapshot(dependency_key, snapshot)
+                    else:
+                        build_cache.discard_snapshot(snapshot)
             
             # Package the result for compatibility with our builder expectations
             build_result = {
@@ -215,6 +259,9 @@ class ReactBuilder:
             if not index_html.exists():
                 logger.warning("⚠️ index.html not found - SPA routing may not work")
             
+            if build_cache is not None and cached_output is None:
+                build_cache.save_artifact(source_key, repo_dir, build_output_dir)
+            
             build_time = time.time() - start_time
             
             logger.info(f"📊 Build statistics:")
@@ -235,7 +282,8 @@ class ReactBuilder:
                     "has_index_html": index_html.exists(),
                     "build_tool": plan.config.get("build_tool"),
                     "package_manager": selected_pm,
-                    "typescript": plan.config.get("typescript", False)
+                    "typescript": plan.config.get("typescript", False),
+                    "build_cache_hit": cached_output is not None
                 }
             )
             
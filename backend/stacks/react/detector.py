@@ -5,10 +5,22 @@ from pathlib import Path
 from typing import Optional
 from core.models import StackPlan
 from core.utils import read_json_file, check_file_exists
+from core.detection import StackRules, has_dependency, has_path
 
 class ReactDetector:
     """Detects React applications"""
     
+    # A React dependency in package.json is required before detect() runs
+    rules = StackRules("react", [
+        has_dependency("react", weight=3, required=True),
+        has_dependency("react-dom", weight=2, required=True),
+        has_dependency("react-scripts", weight=2, required=True),
+        has_dependency("@types/react", weight=1, required=True),
+        has_path("src/App.[jt]sx", weight=1),
+        has_path("src/index.[jt]sx", weight=1),
+        has_path("public/index.html", weight=1),
+    ])
+    
     def detect(self, repo_dir: Path) -> Optional[StackPlan]:
         """
         Detect React applications by analyzing package.json
@@ -5,10 +5,20 @@ from pathlib import Path
 from typing import Optional
 from core.models import StackPlan
 from core.utils import find_files, check_file_exists
+from core.detection import StackRules, get_repo_index, has_path, shares_repo_index
 
 class StaticSiteDetector:
     """Detects static HTML/CSS/JS websites"""
     
+    # An HTML file in the repository root is required before detect() runs
+    rules = StackRules("static", [
+        has_path("index.html", weight=3, required=True),
+        has_path("*.html", weight=1, required=True),
+        has_path("**/*.css", weight=1),
+        has_path("**/*.js", weight=0.5),
+    ])
+    
+    @shares_repo_index("repo_dir")
     def detect(self, repo_dir: Path) -> Optional[StackPlan]:
         """
         Detect if repository contains a static website
@@ -64,9 +74,9 @@ class StaticSiteDetector:
         """Check if this is primarily a Python project that shouldn't be static"""
         
         # Count Python files
-        python_files = list(repo_dir.rglob('*.py'))
-        total_files = list(repo_dir.rglob('*'))
-        total_files = [f for f in total_files if f.is_file() and not any(part.startswith('.git') for part in f.parts)]
+        index = get_repo_index(repo_dir)
+        python_files = index.rglob('*.py')
+        total_files = [f for f in index.files if not any(part.startswith('.git') for part in f.split('/'))]
         
         if not total_files:
             return False
@@ -0,0 +1,10 @@
+"""
+Shared pytest setup: make the backend root importable as in production
+(``core``, ``stacks``, ``src`` ...)
+"""
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
@@ -0,0 +1,87 @@
+"""
+Tests for the build cache keys and entry integrity (core/build_cache.py)
+"""
+import json
+import os
+
+import pytest
+
+from core.build_cache import BuildCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    cache._node_version = "v20.0.0"  # Don't shell out to node
+    return cache
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "package.json").write_text(json.dumps({"dependencies": {"react": "18.2.0"}, "scripts": {"build": "vite build"}}))
+    (repo / "package-lock.json").write_text("{}")
+    (repo / "src" / "main.js").write_text("console.log('hi')")
+    return repo
+
+
+def _source_key(cache, repo):
+    return cache.source_key(repo, cache.dependency_key(repo, "npm"), "npm:True")
+
+
+def test_nested_output_named_directory_is_part_of_the_source_key(cache, repo):
+    (repo / "src" / "build").mkdir()
+    (repo / "src" / "build" / "foo.js").write_text("export const a = 1")
+    before = _source_key(cache, repo)
+    
+    (repo / "src" / "build" / "foo.js").write_text("export const a = 2")
+    
+    assert _source_key(cache, repo) != before
+
+
+def test_root_build_output_is_not_part_of_the_source_key(cache, repo):
+    before = _source_key(cache, repo)
+    
+    (repo / "dist").mkdir()
+    (repo / "dist" / "index.html").write_text("<html></html>")
+    (repo / "node_modules" / "x").mkdir(parents=True)
+    (repo / "node_modules" / "x" / "index.js").write_text("")
+    (repo / "src" / "node_modules").mkdir()
+    (repo / "src" / "node_modules" / "y.js").write_text("")
+    
+    assert _source_key(cache, repo) == before
+
+
+def test_scripts_and_npmrc_change_the_dependency_key(cache, repo):
+    before = cache.dependency_key(repo, "npm")
+    
+    (repo / ".npmrc").write_text("registry=https://example.invalid/")
+    with_npmrc = cache.dependency_key(repo, "npm")
+    (repo / "package.json").write_text(json.dumps({"dependencies": {"react": "18.2.0"}, "scripts": {"build": "other"}}))
+    
+    assert len({before, with_npmrc, cache.dependency_key(repo, "npm")}) == 3
+
+
+def test_restore_copies_and_rejects_a_tampered_entry(cache, repo, tmp_path):
+    (repo / "node_modules" / "react").mkdir(parents=True)
+    (repo / "node_modules" / "react" / "index.js").write_text("module.exports = 1")
+    key = cache.dependency_key(repo, "npm")
+    cache.save_dependencies(key, repo)
+    
+    first = tmp_path / "first"
+    first.mkdir()
+    assert cache.restore_dependencies(key, first)
+    restored = first / "node_modules" / "react" / "index.js"
+    stored = cache.root / "deps" / key / "node_modules" / "react" / "index.js"
+    assert restored.read_text() == "module.exports = 1"
+    assert os.stat(restored).st_ino != os.stat(stored).st_ino
+    
+    stored.write_text("module.exports = 'poisoned'")
+    second = tmp_path / "second"
+    second.mkdir()
+    
+    assert not cache.restore_dependencies(key, second)
+    assert not (second / "node_modules").exists()
+    assert not (cache.root / "deps" / key).exists()
+    assert cache.stats["integrity_failures"] == 1
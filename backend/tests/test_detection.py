@@ -0,0 +1,187 @@
+"""
+Tests for the single-pass repository index and rule-gated stack detection (core/detection.py, core/registry.py)
+"""
+import json
+import functools
+from pathlib import Path
+
+import pytest
+
+import core.registry
+from core.detection import RepoIndex, RuleMatcher, StackRules, get_repo_index, has_dependency, has_path, shares_repo_index
+from core.registry import StackRegistry
+from stacks.api.detector import ApiDetector
+from stacks.php.detector import PHPDetector
+from stacks.react.detector import ReactDetector
+from stacks.static_site.detector import StaticSiteDetector
+
+TREE = [
+    "index.html", "about.html", "README.md", "x", ".env.example",
+    "src/x", "src/app.component.ts", "src/main.ts", "src/util.spec.ts", "src/styles/site.css",
+    "src/build/foo.js", "docs/a.b.c", "docs/guide.html", "docs/x/nested.a.b",
+    "lib/one.py", "lib/two.pyc", "lib/a1.txt", "lib/b2.txt", "lib/c3.md",
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in TREE:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text(rel)
+    return tmp_path
+
+
+@pytest.mark.parametrize("pattern", [
+    "**/x", "**/*.a.b", "**/*.component.ts", "**/*.ts", "*.html", "**/*.html",
+    "lib/[ab]*.txt", "lib/[!a]*.txt", "lib/?1.txt", "src/**/*.css", "src/**/*.js", "docs/**/*.a.b",
+    "index.html", "src/styles", "**/styles", "*",
+])
+def test_match_agrees_with_path_glob(tree, pattern):
+    index = RepoIndex(tree)
+    
+    assert sorted(index.glob(pattern)) == sorted(tree.glob(pattern))
+
+
+def test_pruned_directories_are_listed_but_not_descended(tree):
+    (tree / "node_modules" / "react").mkdir(parents=True)
+    (tree / "node_modules" / "react" / "index.js").write_text("")
+    index = RepoIndex(tree)
+    
+    assert index.is_dir("node_modules")
+    assert not index.exists("node_modules/react")
+
+
+def test_truncated_index_logs_a_warning(tree, caplog):
+    index = RepoIndex(tree, max_entries=3)
+    
+    assert index.truncated
+    assert "stopped at 3 entries" in caplog.text
+
+
+def test_shares_repo_index_walks_once(tree, monkeypatch):
+    walks = []
+    original = RepoIndex._walk
+    monkeypatch.setattr(RepoIndex, "_walk", lambda self: (walks.append(self.root), original(self)))
+    
+    @shares_repo_index("repo_dir")
+    def detector(repo_dir):
+        return [get_repo_index(repo_dir) for _ in range(3)]
+    
+    indexes = detector(tree)
+    
+    assert len(walks) == 1
+    assert all(index is indexes[0] for index in indexes)
+
+
+# Stack detection through the registry
+
+class _Plugin:
+    """The parts of a StackPlugin that StackRegistry.register_stack reads"""
+    
+    def __init__(self, stack_key, detector):
+        self.stack_key = stack_key
+        self.display_name = stack_key
+        self.detector = detector
+        self.builder = self.provisioner = self.deployer = None
+    
+    def health_check(self):
+        return True
+
+
+def _registry():
+    registry = StackRegistry()
+    for stack_key, detector in (("react", ReactDetector()), ("static", StaticSiteDetector()),
+                                ("api", ApiDetector()), ("php", PHPDetector())):
+        registry.register_stack(_Plugin(stack_key, detector))
+    return registry
+
+
+def _write(repo: Path, files):
+    for rel, content in files.items():
+        (repo / rel).parent.mkdir(parents=True, exist_ok=True)
+        (repo / rel).write_text(content if isinstance(content, str) else json.dumps(content))
+    return repo
+
+
+FIXTURES = {
+    "react": {
+        "package.json": {"dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0"},
+                         "devDependencies": {"vite": "^5.0.0"}, "scripts": {"build": "vite build"}},
+        "index.html": "<div id=root></div>",
+        "src/main.jsx": "import React from 'react'",
+        "src/App.jsx": "export default function App() { return null }",
+    },
+    "static": {
+        "index.html": "<html></html>",
+        "about.html": "<html></html>",
+        "css/site.css": "body {}",
+        "js/site.js": "console.log(1)",
+    },
+    "api": {
+        "package.json": {"dependencies": {"express": "^4.18.0"}, "scripts": {"start": "node server.js"}},
+        "server.js": "const express = require('express'); const app = express(); app.listen(3000)",
+        "routes/users.js": "module.exports = {}",
+    },
+    "php": {
+        "composer.json": {"require": {"php": ">=8.1", "slim/slim": "^4.0"}},
+        "index.php": "<?php echo 'hi';",
+        "src/Controller.php": "<?php class Controller {}",
+    },
+}
+
+
+# (stack_key, entry_point, original stack) returned for the fixtures before rule gating was introduced
+BASELINE_PLANS = {
+    "react": ("react", "src/main.jsx", None),
+    "static": ("static", "index.html", None),
+    "api": ("nodejs_api", "server.js", None),
+    "php": ("non_deployable", None, "php_api"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_detect_stack_returns_the_baseline_plan(tmp_path, name):
+    repo = _write(tmp_path / name, FIXTURES[name])
+    
+    plan = _registry().detect_stack(repo)
+    
+    original = plan.config.get("original_detection", {}).get("stack_key")
+    assert (plan.stack_key, plan.config.get("entry_point"), original) == BASELINE_PLANS[name]
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_rule_gating_does_not_change_the_detected_plan(tmp_path, name):
+    repo = _write(tmp_path / name, FIXTURES[name])
+    registry = _registry()
+    
+    gated = registry.detect_stack(repo)
+    ungated = registry._run_detectors(repo, None, None)
+    
+    assert gated is not None
+    assert ungated is not None
+    assert gated.stack_key == ungated.stack_key
+    assert gated.config == ungated.config
+    assert gated.build_cmds == ungated.build_cmds
+
+
+def test_truncated_index_runs_every_detector(tmp_path, monkeypatch):
+    repo = _write(tmp_path / "static", FIXTURES["static"])
+    registry = _registry()
+    monkeypatch.setattr(core.registry, "RepoIndex", functools.partial(RepoIndex, max_entries=1))
+    monkeypatch.setattr(registry, "detect_candidates", lambda *args: pytest.fail("rules evaluated on a truncated index"))
+    
+    assert registry.detect_stack(repo).stack_key == "static"
+
+
+def test_rule_matcher_scores_and_requires(tmp_path):
+    repo = _write(tmp_path / "repo", FIXTURES["react"])
+    matcher = RuleMatcher([
+        StackRules("react", [has_dependency("react", required=True), has_path("src/**/*.jsx", weight=2)]),
+        StackRules("vue", [has_dependency("vue", required=True), has_path("src/**/*.jsx")]),
+    ])
+    
+    candidates = matcher.match(RepoIndex(repo))
+    
+    assert [candidate.stack for candidate in candidates] == ["react"]
+    assert candidates[0].score == 3
+    assert candidates[0].confidence == 1.0
@@ -0,0 +1,172 @@
+"""
+Tests for the durable job queue (src/services/job_queue.py) and sealed job
+credentials (src/utils/job_secrets.py)
+"""
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.services.job_queue import JobQueue, JobState, SQLiteJobBackend
+from src.utils import job_secrets
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(SQLiteJobBackend(":memory:"))
+
+
+def _enqueue(queue, tenant_id, plan_tier="free", **kwargs):
+    return queue.enqueue("deploy", "tests:handler", {"tenant": tenant_id}, tenant_id, plan_tier, **kwargs)
+
+
+def _claim_tenants(queue, count, worker_id="w1"):
+    tenants = []
+    for _ in range(count):
+        job = queue.backend.claim(worker_id, lease_seconds=60)
+        tenants.append(job.tenant_id)
+        queue.backend.complete(job.job_id, worker_id)
+    return tenants
+
+
+def test_one_tenants_backlog_does_not_block_another(queue):
+    for _ in range(3):
+        _enqueue(queue, "busy")
+    _enqueue(queue, "late", "pro")
+    
+    assert _claim_tenants(queue, 4) == ["late", "busy", "busy", "busy"]
+
+
+def test_higher_plan_tiers_get_proportionally_more_turns(queue):
+    for _ in range(8):
+        _enqueue(queue, "ent", "enterprise")
+    for _ in range(2):
+        _enqueue(queue, "free", "free")
+    
+    first_five = _claim_tenants(queue, 5)
+    assert first_five.count("ent") == 4
+    assert first_five.count("free") == 1
+    assert sorted(_claim_tenants(queue, 5)) == ["ent"] * 4 + ["free"]
+
+
+def test_position_follows_fair_queuing_order(queue):
+    first = _enqueue(queue, "a")
+    second = _enqueue(queue, "a")
+    other = _enqueue(queue, "b", "enterprise")
+    
+    assert queue.position(other.job_id) == 0
+    assert queue.position(first.job_id) == 1
+    assert queue.position(second.job_id) == 2
+
+
+def test_idempotency_key_returns_the_unfinished_job(queue):
+    first = _enqueue(queue, "a", idempotency_key="deploy-1")
+    again = _enqueue(queue, "a", idempotency_key="deploy-1")
+    
+    assert again.job_id == first.job_id
+    assert queue.get_stats()[JobState.QUEUED.value] == 1
+    
+    claimed = queue.backend.claim("w1", lease_seconds=60)
+    assert _enqueue(queue, "a", idempotency_key="deploy-1").job_id == first.job_id
+    
+    queue.backend.complete(claimed.job_id, "w1", {"ok": True})
+    fresh = _enqueue(queue, "a", idempotency_key="deploy-1")
+    
+    assert fresh.job_id != first.job_id
+    assert queue.get_job(first.job_id).idempotency_key is None
+    assert queue.get_job(first.job_id).result == {"ok": True}
+
+
+def test_expired_lease_is_handed_to_another_worker(queue):
+    job = _enqueue(queue, "a")
+    assert queue.backend.claim("w1", lease_seconds=0.01).job_id == job.job_id
+    time.sleep(0.05)
+    
+    reclaimed = queue.backend.claim("w2", lease_seconds=60)
+    
+    assert reclaimed.job_id == job.job_id
+    assert reclaimed.lease_owner == "w2"
+    assert reclaimed.attempts == 2
+    assert queue.backend.heartbeat(job.job_id, "w1", 60) is False
+    assert queue.backend.complete(job.job_id, "w1") is False
+    assert queue.backend.complete(job.job_id, "w2") is True
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+    job = _enqueue(queue, "a", max_attempts=1)
+    queue.backend.claim("w1", lease_seconds=0.01)
+    time.sleep(0.05)
+    
+    assert queue.backend.claim("w2", lease_seconds=60) is None
+    failed = queue.get_job(job.job_id)
+    assert failed.state == JobState.FAILED.value
+    assert failed.error == "lease expired"
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    job = _enqueue(queue, "a")
+    queue.backend.claim("w1", lease_seconds=0.05)
+    
+    assert queue.backend.heartbeat(job.job_id, "w1", 60) is True
+    time.sleep(0.1)
+    assert queue.backend.claim("w2", lease_seconds=60) is None
+
+
+def test_prune_finished_keeps_unfinished_and_recent_jobs(queue):
+    done = _enqueue(queue, "a")
+    cancelled = _enqueue(queue, "a")
+    waiting = _enqueue(queue, "a")
+    queue.backend.claim("w1", lease_seconds=60)
+    queue.backend.complete(done.job_id, "w1")
+    queue.cancel(cancelled.job_id)
+    
+    assert queue.prune_finished(3600) == 0
+    time.sleep(0.01)
+    assert queue.prune_finished(0) == 2
+    
+    assert queue.get_job(done.job_id) is None
+    assert queue.get_job(cancelled.job_id) is None
+    assert queue.get_job(waiting.job_id).state == JobState.QUEUED.value
+
+
+@pytest.fixture
+def shared_key(monkeypatch):
+    def use_key(key):
+        monkeypatch.setenv("CODEFLOWOPS_JOB_SECRET_KEY", key.decode("ascii"))
+        monkeypatch.setattr(job_secrets, "_fernet", None)
+    
+    use_key(Fernet.generate_key())
+    return use_key
+
+
+def test_split_secrets_removes_credentials_and_seals_them(shared_key):
+    public, token = job_secrets.split_secrets({
+        "repository_url": "https://github.com/acme/site",
+        "aws_access_key_id": "AKIA123",
+        "aws_secret_access_key": "secret",
+        "aws_access_key": ""
+    })
+    
+    assert public == {"repository_url": "https://github.com/acme/site"}
+    assert "secret" not in token
+    assert job_secrets.unseal(token) == {"aws_access_key_id": "AKIA123", "aws_secret_access_key": "secret"}
+
+
+def test_split_secrets_without_credentials_has_no_token(shared_key):
+    assert job_secrets.split_secrets({"repository_url": "x"}) == ({"repository_url": "x"}, None)
+
+
+def test_unseal_with_a_different_key_raises_value_error(shared_key):
+    token = job_secrets.seal({"aws_secret_access_key": "secret"})
+    shared_key(Fernet.generate_key())
+    
+    with pytest.raises(ValueError, match="CODEFLOWOPS_JOB_SECRET_KEY"):
+        job_secrets.unseal(token)
+
+
+def test_per_process_key_when_no_shared_key_is_set(monkeypatch):
+    monkeypatch.delenv("CODEFLOWOPS_JOB_SECRET_KEY", raising=False)
+    monkeypatch.setattr(job_secrets, "_fernet", None)
+    
+    assert job_secrets.has_shared_key() is False
+    assert job_secrets.unseal(job_secrets.seal({"k": "v"})) == {"k": "v"}
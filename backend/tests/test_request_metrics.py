@@ -0,0 +1,34 @@
+"""
+Tests for the request metrics middleware (src/middleware/request_metrics.py)
+"""
+import asyncio
+
+from src.middleware.request_metrics import OTHER_METHOD, UNMATCHED_ROUTE, RequestMetrics, RequestMetricsMiddleware
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 404, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _request(middleware, method):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    
+    async def send(message):
+        pass
+    
+    asyncio.run(middleware({"type": "http", "method": method, "path": "/nope"}, receive, send))
+
+
+def test_unknown_methods_share_one_series():
+    metrics = RequestMetrics()
+    middleware = RequestMetricsMiddleware(_app, metrics)
+    
+    for method in ("GET", "FOO", "BAR1", "X" * 100):
+        _request(middleware, method)
+    
+    assert set(metrics.latency) == {("GET", UNMATCHED_ROUTE), (OTHER_METHOD, UNMATCHED_ROUTE)}
+    assert metrics.latency[(OTHER_METHOD, UNMATCHED_ROUTE)].count == 3
+    assert set(metrics.in_flight_by_method) == {"GET", OTHER_METHOD}
+    assert metrics.responses[(OTHER_METHOD, UNMATCHED_ROUTE, "4xx")] == 3
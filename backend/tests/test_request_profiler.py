@@ -0,0 +1,60 @@
+"""
+Tests for the slow-request profile store (src/utils/request_profiler.py)
+"""
+import os
+import time
+
+from src.utils.request_profiler import ProfileStore, _Recording
+
+
+def _profile(profile_id):
+    return {"id": profile_id, "captured_at": time.time(), "method": "GET", "route": "/api/x", "path": "/api/x",
+            "status": 200, "duration_ms": 1500.0, "samples": 3, "stacks": [{"stack": "main;f (a.py:1)", "samples": 3}]}
+
+
+def _save(store, profile_id, mtime):
+    store.save(_profile(profile_id))
+    os.utime(store.directory / f"{profile_id}.json", (mtime, mtime))
+
+
+def test_workers_sharing_a_directory_keep_each_others_profiles(tmp_path):
+    worker_a = ProfileStore(str(tmp_path), max_entries=10)
+    worker_b = ProfileStore(str(tmp_path), max_entries=10)
+    
+    _save(worker_a, "aaa", 1000)
+    _save(worker_b, "bbb", 2000)
+    
+    assert worker_a.get("aaa") is not None
+    assert [s["id"] for s in worker_a.list()] == ["bbb", "aaa"]
+    assert [s["id"] for s in worker_b.list()] == ["bbb", "aaa"]
+
+
+def test_eviction_keeps_the_newest_files_on_disk(tmp_path):
+    worker_a = ProfileStore(str(tmp_path), max_entries=2)
+    worker_b = ProfileStore(str(tmp_path), max_entries=2)
+    
+    _save(worker_a, "one", 1000)
+    _save(worker_b, "two", 2000)
+    _save(worker_a, "three", 3000)
+    worker_b.save(_profile("four"))  # Newest (current mtime); evicts "two"
+    
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["four", "three"]
+    assert [s["id"] for s in worker_a.list()] == ["four", "three"]
+    assert worker_a.get("two") is None
+
+
+def test_get_rejects_path_like_ids(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    
+    assert store.get("../etc/passwd") is None
+
+
+def test_recording_caps_samples_with_a_running_total():
+    recording = _Recording(max_samples=3)
+    
+    for stack in ("a", "b", "a", "c", "d", None):
+        recording.add(stack)
+    
+    assert recording.total == 3
+    assert sum(recording.samples.values()) == 3
+    assert recording.idle_samples == 1
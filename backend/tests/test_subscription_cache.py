@@ -0,0 +1,62 @@
+"""
+Tests for the shared subscription cache (src/services/subscription_cache.py)
+"""
+import asyncio
+
+import pytest
+
+from src.services.subscription_cache import STATUS_SNAPSHOT, SubscriptionCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _worker(client):
+    cache = SubscriptionCache(redis_url="redis://test")
+    cache._redis, cache._redis_checked = client, True
+    return cache
+
+
+def test_load_started_before_another_workers_invalidate_is_not_shared():
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        worker_a, worker_b = _worker(client), _worker(client)
+        loading, release = asyncio.Event(), asyncio.Event()
+        
+        async def slow_loader():
+            loading.set()
+            await release.wait()
+            return {"plan": "free"}
+        
+        load = asyncio.create_task(worker_a.get_or_load("u1", STATUS_SNAPSHOT, slow_loader))
+        await loading.wait()
+        await worker_b.invalidate("u1")
+        release.set()
+        
+        assert await load == {"plan": "free"}
+        assert await client.get(f"{SubscriptionCache.KEY_PREFIX}{STATUS_SNAPSHOT}:u1") is None
+        
+        async def fresh_loader():
+            return {"plan": "pro"}
+        
+        assert await worker_b.get_or_load("u1", STATUS_SNAPSHOT, fresh_loader) == {"plan": "pro"}
+        assert await client.get(f"{SubscriptionCache.KEY_PREFIX}{STATUS_SNAPSHOT}:u1") is not None
+    
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = SubscriptionCache(redis_url="")
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return {"plan": "pro"}
+        
+        results = await asyncio.gather(*(cache.get_or_load("u2", STATUS_SNAPSHOT, loader) for _ in range(5)))
+        
+        assert results == [{"plan": "pro"}] * 5
+        assert len(calls) == 1
+    
+    asyncio.run(scenario())
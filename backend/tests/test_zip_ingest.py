@@ -0,0 +1,142 @@
+"""
+Tests for bounded ZIP upload ingestion (src/utils/zip_ingest.py)
+"""
+import asyncio
+import io
+import stat
+import zipfile
+
+import pytest
+
+from src.utils.zip_ingest import (
+    RepositoryFileIndex,
+    UploadLimits,
+    UploadRejected,
+    extract_zip_bounded,
+    save_upload_stream
+)
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extracts_files_and_indexes_them(tmp_path):
+    archive = _zip([("package.json", "{}"), ("src/App.jsx", "export default 1"), ("src/assets/", "")])
+    
+    index = extract_zip_bounded(archive, tmp_path, UploadLimits())
+    
+    assert sorted(index.files) == ["package.json", "src/App.jsx"]
+    assert index.exists("src")
+    assert (tmp_path / "src" / "App.jsx").read_text() == "export default 1"
+    assert (tmp_path / "src" / "assets").is_dir()
+
+
+@pytest.mark.parametrize("name", [
+    "../escape.txt",
+    "src/../../escape.txt",
+    "/etc/escape.txt",
+    "..\\escape.txt",
+    "C:/escape.txt"
+])
+def test_path_traversal_entries_are_skipped(tmp_path, name):
+    extract_path = tmp_path / "extract"
+    extract_path.mkdir()
+    
+    index = extract_zip_bounded(_zip([(name, "owned"), ("index.html", "<html>")]), extract_path, UploadLimits())
+    
+    assert list(index.files) == ["index.html"]
+    assert index.skipped_entries == 1
+    assert not (tmp_path / "escape.txt").exists()
+    assert [p.name for p in tmp_path.rglob("escape.txt")] == []
+
+
+def test_node_modules_git_and_symlinks_are_skipped(tmp_path):
+    link = zipfile.ZipInfo("src/link")
+    link.external_attr = (stat.S_IFLNK | 0o777) << 16
+    archive = _zip([
+        ("node_modules/react/index.js", "module.exports = {}"),
+        ("packages/web/node_modules/left-pad/index.js", "x"),
+        (".git/config", "[core]"),
+        (link, "/etc/passwd"),
+        ("src/main.js", "main()")
+    ])
+    
+    index = extract_zip_bounded(archive, tmp_path, UploadLimits())
+    
+    assert list(index.files) == ["src/main.js"]
+    assert index.skipped_entries == 4
+    assert not (tmp_path / "node_modules").exists()
+    assert not (tmp_path / "packages").exists()
+    assert not (tmp_path / "src" / "link").exists()
+
+
+def test_compression_ratio_bomb_is_rejected_with_413(tmp_path):
+    archive = _zip([("bomb.txt", b"\0" * (4 * 1024 * 1024))])
+    
+    with pytest.raises(UploadRejected, match="compression ratio") as excinfo:
+        extract_zip_bounded(archive, tmp_path, UploadLimits(max_compression_ratio=100.0))
+    
+    assert excinfo.value.status_code == 413
+
+
+def test_small_repetitive_files_pass_the_ratio_check(tmp_path):
+    archive = _zip([("package-lock.json", b" " * (512 * 1024))])
+    
+    index = extract_zip_bounded(archive, tmp_path, UploadLimits(max_compression_ratio=10.0))
+    
+    assert index.files == {"package-lock.json": 512 * 1024}
+
+
+def test_entry_count_and_total_size_limits(tmp_path):
+    many = _zip([(f"f{i}.txt", "x") for i in range(5)])
+    with pytest.raises(UploadRejected, match="more than 3 files"):
+        extract_zip_bounded(many, tmp_path / "many", UploadLimits(max_files=3))
+    
+    large = _zip([("a.bin", b"a" * 600), ("b.bin", b"b" * 600)])
+    with pytest.raises(UploadRejected, match="uncompressed size limit") as excinfo:
+        extract_zip_bounded(large, tmp_path / "large", UploadLimits(max_uncompressed_bytes=1000))
+    assert excinfo.value.status_code == 413
+
+
+def test_invalid_archive_is_rejected_with_400(tmp_path):
+    with pytest.raises(UploadRejected) as excinfo:
+        extract_zip_bounded(io.BytesIO(b"not a zip"), tmp_path, UploadLimits())
+    
+    assert excinfo.value.status_code == 400
+
+
+class _Upload:
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+    
+    async def read(self, size):
+        return self._data.read(size)
+
+
+def test_oversized_upload_stream_is_rejected_and_removed(tmp_path):
+    destination = tmp_path / "upload.zip"
+    
+    with pytest.raises(UploadRejected):
+        asyncio.run(save_upload_stream(_Upload(b"x" * 5000), destination, max_bytes=4096, chunk_size=1024))
+    
+    assert not destination.exists()
+    assert asyncio.run(save_upload_stream(_Upload(b"x" * 4096), destination, max_bytes=4096, chunk_size=1024)) == 4096
+    assert destination.stat().st_size == 4096
+
+
+def test_index_from_directory_skips_dependency_directories(tmp_path):
+    (tmp_path / "node_modules" / "react").mkdir(parents=True)
+    (tmp_path / "node_modules" / "react" / "index.js").write_text("x")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "index.ts").write_text("main()")
+    
+    index = RepositoryFileIndex.from_directory(str(tmp_path))
+    
+    assert index.files == {"src/index.ts": 6}
+    assert index.with_suffix([".ts"]) == ["src/index.ts"]